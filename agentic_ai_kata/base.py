@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Any, Dict, Optional
 from pydantic import BaseModel
@@ -11,6 +12,15 @@ class KataBase(ABC):
         """Run the kata"""
         pass
 
+    async def arun(self, *args, **kwargs) -> Any:
+        """Run the kata on the running event loop.
+
+        Katas with an async implementation override this (and their `run()` is just
+        `asyncio.run(self.arun())`); by default `run()` is called in a worker thread
+        so it doesn't block the loop.
+        """
+        return await asyncio.to_thread(self.run, *args, **kwargs)
+
     @abstractmethod
     def validate_result(self, result: Any) -> bool:
         """Validate the kata's output"""
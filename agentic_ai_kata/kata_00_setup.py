@@ -2,7 +2,8 @@ from pydantic import BaseModel, Field
 from pydantic_ai import Agent
 
 from agentic_ai_kata.base import KataBase
-from agentic_ai_kata.settings import settings
+from agentic_ai_kata.utils.clients import get_model
+from agentic_ai_kata.utils.instrumentation import span
 
 
 class Koan(BaseModel):
@@ -26,8 +27,15 @@ class SetupKata(KataBase):
         """
         Runs a simple test to verify the environment is properly set up
         """
-        sage_agent = Agent(settings.DEFAULT_MODEL, result_type=Koan)
-        return sage_agent.run_sync("Why do we practice through code?")
+        sage_agent = Agent(get_model(), result_type=Koan)
+        with span("agent", "sage"):
+            return sage_agent.run_sync("Why do we practice through code?")
+
+    async def arun(self) -> Koan:
+        """Runs the same check on the running event loop"""
+        sage_agent = Agent(get_model(), result_type=Koan)
+        with span("agent", "sage"):
+            return await sage_agent.run("Why do we practice through code?")
 
     def validate_result(self, result: Koan) -> bool:
         """Validates that the kata's output is a valid Koan"""
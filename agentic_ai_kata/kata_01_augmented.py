@@ -1,6 +1,5 @@
-from typing import Any, Optional
+from typing import TYPE_CHECKING, Any, Optional
 import asyncio
-from openai import AsyncOpenAI
 from dataclasses import dataclass
 
 from pydantic import BaseModel, Field
@@ -10,12 +9,18 @@ from pydantic_ai.messages import ToolCallPart
 
 from agentic_ai_kata.base import KataBase
 from agentic_ai_kata.settings import settings
+from agentic_ai_kata.utils.clients import get_model, get_openai_client
 from agentic_ai_kata.utils import ColBERTv2
+from agentic_ai_kata.utils.instrumentation import span
+
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 
 @dataclass
 class Deps:
-    openai: AsyncOpenAI
+    openai: "AsyncOpenAI"
 
 
 # Define a response model for PydanticAI Agents to use
@@ -51,15 +56,15 @@ class AugmentedKata(KataBase):
     """
 
     def __init__(self):
-        self.retriever = ColBERTv2(url="http://20.102.90.50:2017/wiki17_abstracts")
-        self.openai = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        self.retriever = ColBERTv2(url=settings.COLBERT_URL)
+        self.openai = get_openai_client()
         self.deps = Deps(openai=self.openai)
         self.agent = self._create_agent()
 
     def _create_agent(self) -> Agent:
         """Creates the augmented agent with tools"""
         agent = Agent(
-            settings.DEFAULT_MODEL,
+            get_model(),
             deps_type=Deps,
             system_prompt=(
                 "You are a helpful assistant that uses tools to augment your knowledge. "
@@ -78,23 +83,25 @@ class AugmentedKata(KataBase):
                 context: The call context.
                 query: The search query.
             """
-            results = self.retriever.call_sync(query, k=3)
+            with span("tool", "search_wikipedia"):
+                results = await self.retriever(query, k=3)
             # Extract text from each result dictionary
             texts = [result.get("text", "") for result in results]
             return "\n".join(texts)
 
         return agent
 
-    async def _run_async(self) -> AugmentedResult:
+    async def arun(self) -> AugmentedResult:
         """Async implementation of the kata run"""
 
         run_data = AugmentedResult()
 
         # Ask a question that requires fact checking
-        run_data.capital_size_result = await self.agent.run(
-            "Does the capital of France have more people than the capital of Germany?",
-            deps=self.deps,
-        )
+        with span("agent", "capital_size"):
+            run_data.capital_size_result = await self.agent.run(
+                "Does the capital of France have more people than the capital of Germany?",
+                deps=self.deps,
+            )
 
         # There is message data in the result.
         # We could save it to a database if we wanted to retreive it later.
@@ -102,17 +109,18 @@ class AugmentedKata(KataBase):
         messages = run_data.capital_size_result.new_messages()
 
         # Ask a question that requires fact checking and context from the previous run
-        run_data.density_result = await self.agent.run(
-            "Which is more densely populated?",
-            deps=self.deps,
-            message_history=messages,  # Here we pass the messages from the previous run
-        )
+        with span("agent", "density"):
+            run_data.density_result = await self.agent.run(
+                "Which is more densely populated?",
+                deps=self.deps,
+                message_history=messages,  # Here we pass the messages from the previous run
+            )
 
         return run_data
 
     def run(self) -> Any:
         """Demonstrates the augmented LLM pattern"""
-        return asyncio.run(self._run_async())
+        return asyncio.run(self.arun())
 
     def validate_result(self, result: AugmentedResult) -> bool:
         """Validates that the augmented LLM pattern worked correctly"""
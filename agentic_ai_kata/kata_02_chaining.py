@@ -1,22 +1,44 @@
-from typing import Any, Optional
+from typing import TYPE_CHECKING, Any, Optional
 import os
 import json
 from slugify import slugify
 from dataclasses import dataclass
-from pydantic import BaseModel, Field
+from functools import lru_cache
+from pydantic import BaseModel, Field, PrivateAttr
 from pydantic_ai import Agent, RunContext, capture_run_messages, UnexpectedModelBehavior
-import aiohttp
 import asyncio
-from openai import AsyncOpenAI
+import time
 
 from agentic_ai_kata.base import KataBase
 from agentic_ai_kata.settings import settings
+from agentic_ai_kata.utils.article_index import get_article_index
+from agentic_ai_kata.utils.cascade import get_model_cascade
+from agentic_ai_kata.utils.clients import get_openai_client
+from agentic_ai_kata.utils.instrumentation import span
+from agentic_ai_kata.utils.near_duplicates import (
+    DuplicateMatch,
+    NearDuplicateIndex,
+    get_draft_index,
+    get_near_duplicate_index,
+)
 from agentic_ai_kata.utils.wiki_search_agent import WikiSearchAgent
 
 
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+# Where articles are written, relative to the working directory
+ARTICLES_DIR = "articles"
+
+
+def article_path(slug: str) -> str:
+    """The file an article is written to."""
+    return os.path.join(ARTICLES_DIR, f"{slug}.md")
+
+
 @dataclass
 class Deps:
-    openai: AsyncOpenAI
+    openai: "AsyncOpenAI"
 
 
 class ChainStep(BaseModel):
@@ -25,6 +47,9 @@ class ChainStep(BaseModel):
     step_name: str = Field(description="The name of the step")
     prompt: str = Field(description="The prompt for this step")
     response: str = Field(description="The response from the LLM")
+    seconds: Optional[float] = Field(
+        default=None, description="Wall time since the previous step finished"
+    )
 
 
 class ChainResult(BaseModel):
@@ -32,13 +57,209 @@ class ChainResult(BaseModel):
 
     steps: list[ChainStep] = Field(description="The steps in the chain")
     final_result: str = Field(description="The final result after all steps")
+    duplicate_of: Optional[str] = Field(
+        default=None,
+        description="The slug of an existing article this one nearly duplicates, "
+        "in which case it wasn't written",
+    )
+    _last_step_at: float = PrivateAttr(default_factory=time.perf_counter)
 
     def add_step(self, step: ChainStep):
-        print(f"Finished Step: {step.step_name}")
+        now = time.perf_counter()
+        if step.seconds is None:
+            step.seconds = now - self._last_step_at
+        self._last_step_at = now
+        print(f"Finished Step: {step.step_name} ({step.seconds:.2f}s)")
         self.steps.append(step)
         self.final_result = step.response
 
 
+# Step 0: Generate a fake solar system, planet, and planetary capital
+class FakePlanetAndPlanetaryCapital(BaseModel):
+    solar_system: str = Field(description="The name of the solar system")
+    planet: str = Field(description="The name of the planet")
+    planetary_capital: str = Field(description="The name of the planetary capital")
+    full_title_of_planetary_capital: str = Field(
+        description="The full title of the planetary capital, including all the embellishments and titles given to it."
+    )
+
+    def to_string(self) -> str:
+        return (
+            f"Solar System: {self.solar_system}\n"
+            f"Planet: {self.planet}\n"
+            f"Planetary Capital: {self.planetary_capital}\n"
+            f"Full Title of Planetary Capital: {self.full_title_of_planetary_capital}\n"
+        )
+
+
+# Step 2: Interpret the search result and outline the article
+class SearchAndOutlineResult(BaseModel):
+    is_real_city: bool = Field(description="Whether the city is real.")
+    outline: Optional[list[str]] = Field(
+        description="A list of markdown outline sections for a (made up) wiki article of the founding of the city.",
+        default=None,
+    )
+
+
+# Step 3: Generate fake facts about the city
+class MadeUpFacts(BaseModel):
+    facts: list[dict[str, str]] = Field(
+        description="The (made up) facts about the city and the officially formatted bibliography entry (also made up)"
+    )
+
+
+@dataclass
+class FakeFactsDeps:
+    outline: list[str]
+
+
+# Step 4: Write a wikipedia style article about the city
+@dataclass
+class ArticleWriterDeps:
+    full_city_name: str
+    outline: list[str]
+    facts: list[dict[str, str]]
+
+
+class ArticleWriterResult(BaseModel):
+    article: str = Field(description="The wikipedia style article about the city.")
+
+
+# Step 5: Format the article into a wikipedia style article
+@dataclass
+class WikipediaFormatterDeps:
+    article_draft: str
+    outline: list[str]
+    facts: list[dict[str, str]]
+
+
+class WikipediaFormatterResult(BaseModel):
+    article: str = Field(
+        description="The fully formatted wikipedia article about the city, including citations, that fully conforms (as applicable) to the wikipedia template."
+    )
+    highlight: str = Field(description="A short highlight of the article.")
+
+
+@dataclass
+class ChainAgents:
+    """The agent for each LLM step of the chain."""
+
+    fake_planet_and_planetary_capital: Agent
+    outline: Agent
+    fake_facts: Agent
+    article_writer: Agent
+    wikipedia_formatter: Agent
+
+
+@lru_cache(maxsize=None)
+def get_chain_agents() -> ChainAgents:
+    """Build the chain's agents on first use and share them across runs.
+
+    Building an agent generates the JSON schemas of its result type and tools, so
+    this is also the chain's schema cache: each schema is generated once per process
+    rather than once per run. The agents have no model; each run gets each step's
+    model from the model cascade (see `agentic_ai_kata.utils.cascade`).
+    """
+    fake_planet_and_planetary_capital_agent = Agent(
+        result_type=FakePlanetAndPlanetaryCapital,
+        system_prompt=(
+            "You are an expert fiction writer, in the style of Rick & Morty."
+            "Your task is to generate a fake solar system, planet, and planetary capital."
+        ),
+    )
+
+    outline_agent = Agent(
+        result_type=SearchAndOutlineResult,
+        deps_type=str,
+        system_prompt=(
+            "You are an expert fiction writer, in the style of Rick & Morty."
+            "You write outlines for wikipedia articles about made up citiies.",
+            "You are given an initial question.",
+            "You are given a wikipedia search result for a city.",
+            "You determine if the city is real or not.",
+            "If it's real, you set is_real_city to a funny message."
+            "If it's not a real city, write a fictional wikipedia style city outline.",
+        ),
+    )
+
+    @outline_agent.system_prompt
+    def add_the_question_and_search_result(ctx: RunContext[str]) -> str:
+        return f"The wikipedia search result was: {ctx.deps}"
+
+    fake_facts_agent = Agent(
+        result_type=MadeUpFacts,
+        deps_type=FakeFactsDeps,
+        retries=3,  # Increase retries to handle potential tool call issues
+        system_prompt=(
+            "You are an expert fiction writer, in the style of Rick & Morty. "
+            "You are given an outline for a wikipedia article about a made up city. "
+            "Your task is to generate a list of 'facts' about the city. They are all made up. "
+            "Each fact is a dictionary with the fact and a bibliography entry. "
+            "It's all made up, the facts aren't real. "
+            "Return the facts directly in the response, do not use any tools."
+        ),
+    )
+
+    @fake_facts_agent.system_prompt
+    def add_outline_context(ctx: RunContext[FakeFactsDeps]) -> str:
+        return f"The article outline is:\n{ctx.deps.outline}"
+
+    article_writer_agent = Agent(
+        result_type=ArticleWriterResult,
+        system_prompt=(
+            "You are an expert fiction writer, in the style of Rick & Morty. "
+            "You also write the best wikipedia style articles. "
+            "You are given an outline and facts about a city. "
+            "Write a wikipedia style article about the city using markdown formatting: "
+            "- Use '# ' for the main title "
+            "- Use '## ' for section headings "
+            "- Use '### ' for subsection headings "
+            "You care that the entire article is completely up to snuff for a wikipedia page. "
+            "You turn the facts into bibliography entries."
+        ),
+    )
+
+    @article_writer_agent.system_prompt
+    def add_the_outline_and_facts(ctx: RunContext[ArticleWriterDeps]) -> str:
+        outline = "\n".join(ctx.deps.outline)
+        facts = json.dumps(ctx.deps.facts)
+        return f"The outline for the city is: {outline}\nThe facts about the city are: {facts}"
+
+    wikipedia_formatter = Agent(
+        result_type=WikipediaFormatterResult,
+        deps_type=WikipediaFormatterDeps,
+        system_prompt=(
+            "You are an expert fiction writer, in the style of Rick & Morty."
+            "You also write the best wikipedia style articles."
+            "You are given an article draft, outline, and facts about a city."
+            "You format the article to match the wikipedia template."
+            "You add citations for all the facts."
+            "You make sure the article is completely up to snuff for a wikipedia page."
+        ),
+    )
+
+    # A tool that async gets a URL and returns the contents
+    @wikipedia_formatter.tool_plain
+    async def get_template_definition() -> str:
+        """Get the template definition for a wikipedia article about a city."""
+        import aiohttp
+
+        with span("tool", "get_template_definition"):
+            async with aiohttp.ClientSession() as session:
+                async with session.get(
+                    "https://r.jina.ai/https://en.wikipedia.org/wiki/Template:Article_templates/City"
+                ) as response:
+                    return await response.text()
+
+    return ChainAgents(
+        fake_planet_and_planetary_capital=fake_planet_and_planetary_capital_agent,
+        outline=outline_agent,
+        fake_facts=fake_facts_agent,
+        article_writer=article_writer_agent,
+        wikipedia_formatter=wikipedia_formatter,
+    )
+
+
 class ChainingKata(KataBase):
     """
     Kata 02: Prompt Chaining Pattern
@@ -50,47 +271,28 @@ class ChainingKata(KataBase):
     """
 
     def __init__(self):
-        self.openai = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        self.openai = get_openai_client()
         self.deps = Deps(openai=self.openai)
+        self.search_agent = WikiSearchAgent(openai=self.openai)
 
-    async def _run_async(self) -> Any:
+    async def arun(self) -> Any:
         """Async implementation of the kata run"""
         chain_result = ChainResult(
             steps=[],
             final_result="",
         )
+        agents = get_chain_agents()
+        cascade = get_model_cascade()
 
         # Step 0: Generate a fake solar system, planet, and planetary capital
-        class FakePlanetAndPlanetaryCapital(BaseModel):
-            solar_system: str = Field(description="The name of the solar system")
-            planet: str = Field(description="The name of the planet")
-            planetary_capital: str = Field(
-                description="The name of the planetary capital"
-            )
-            full_title_of_planetary_capital: str = Field(
-                description="The full title of the planetary capital, including all the embellishments and titles given to it."
-            )
-
-            def to_string(self) -> str:
-                return (
-                    f"Solar System: {self.solar_system}\n"
-                    f"Planet: {self.planet}\n"
-                    f"Planetary Capital: {self.planetary_capital}\n"
-                    f"Full Title of Planetary Capital: {self.full_title_of_planetary_capital}\n"
+        with span("agent", "fake_planet_and_planetary_capital"):
+            fake_planet_and_planetary_capital_result = (
+                await cascade.run(
+                    agents.fake_planet_and_planetary_capital,
+                    "fake_planet_and_planetary_capital",
+                    "Ok, go!",
                 )
-
-        fake_planet_and_planetary_capital_agent = Agent(
-            settings.DEFAULT_MODEL,
-            result_type=FakePlanetAndPlanetaryCapital,
-            system_prompt=(
-                "You are an expert fiction writer, in the style of Rick & Morty."
-                "Your task is to generate a fake solar system, planet, and planetary capital."
-            ),
-        )
-
-        fake_planet_and_planetary_capital_result = (
-            await fake_planet_and_planetary_capital_agent.run("Ok, go!")
-        )
+            )
 
         chain_result.add_step(
             ChainStep(
@@ -108,8 +310,7 @@ class ChainingKata(KataBase):
         )
 
         print(f"Question: {question}")
-        search_agent = WikiSearchAgent()
-        search_result = await search_agent.run(question)
+        search_result = await self.search_agent.run(question)
 
         chain_result.add_step(
             ChainStep(
@@ -120,36 +321,14 @@ class ChainingKata(KataBase):
         )
 
         # Step 2: Let's chain right now just to interpret the result
-        class SearchAndOutlineResult(BaseModel):
-            is_real_city: bool = Field(description="Whether the city is real.")
-            outline: Optional[list[str]] = Field(
-                description="A list of markdown outline sections for a (made up) wiki article of the founding of the city.",
-                default=None,
+        with span("agent", "outline"):
+            outline_result = await cascade.run(
+                agents.outline,
+                "outline",
+                question,
+                deps=search_result.data.to_string(),
             )
 
-        outline_agent = Agent(
-            settings.DEFAULT_MODEL,
-            result_type=SearchAndOutlineResult,
-            deps_type=str,
-            system_prompt=(
-                "You are an expert fiction writer, in the style of Rick & Morty."
-                "You write outlines for wikipedia articles about made up citiies.",
-                "You are given an initial question.",
-                "You are given a wikipedia search result for a city.",
-                "You determine if the city is real or not.",
-                "If it's real, you set is_real_city to a funny message."
-                "If it's not a real city, write a fictional wikipedia style city outline.",
-            ),
-        )
-
-        @outline_agent.system_prompt
-        def add_the_question_and_search_result(ctx: RunContext[str]) -> str:
-            return f"The wikipedia search result was: {ctx.deps}"
-
-        outline_result = await outline_agent.run(
-            question, deps=search_result.data.to_string()
-        )
-
         chain_result.add_step(
             ChainStep(
                 step_name="Outline Agent",
@@ -163,37 +342,11 @@ class ChainingKata(KataBase):
         assert outline_result.data.is_real_city is False
 
         # Step 3: Generate fake facts about the city
-        class MadeUpFacts(BaseModel):
-            facts: list[dict[str, str]] = Field(
-                description="The (made up) facts about the city and the officially formatted bibliography entry (also made up)"
-            )
-
-        @dataclass
-        class FakeFactsDeps:
-            outline: list[str]
-
-        fake_facts_agent = Agent(
-            settings.DEFAULT_MODEL,
-            result_type=MadeUpFacts,
-            deps_type=FakeFactsDeps,
-            retries=3,  # Increase retries to handle potential tool call issues
-            system_prompt=(
-                "You are an expert fiction writer, in the style of Rick & Morty. "
-                "You are given an outline for a wikipedia article about a made up city. "
-                "Your task is to generate a list of 'facts' about the city. They are all made up. "
-                "Each fact is a dictionary with the fact and a bibliography entry. "
-                "It's all made up, the facts aren't real. "
-                "Return the facts directly in the response, do not use any tools."
-            ),
-        )
-
-        @fake_facts_agent.system_prompt
-        def add_outline_context(ctx: RunContext[FakeFactsDeps]) -> str:
-            return f"The article outline is:\n{ctx.deps.outline}"
-
-        with capture_run_messages() as messages:
+        with span("agent", "fake_facts"), capture_run_messages() as messages:
             try:
-                fake_facts_result = await fake_facts_agent.run(
+                fake_facts_result = await cascade.run(
+                    agents.fake_facts,
+                    "fake_facts",
                     "Please generate 3-5 made up facts about this city. "
                     "Each fact should be a dictionary with 'fact' and 'bibliography' keys.",
                     deps=FakeFactsDeps(outline=outline_result.data.outline),
@@ -203,7 +356,9 @@ class ChainingKata(KataBase):
                 print("Cause:", repr(e.__cause__))
                 print("Messages:", messages)
                 # Retry with more explicit prompt
-                fake_facts_result = await fake_facts_agent.run(
+                fake_facts_result = await cascade.run(
+                    agents.fake_facts,
+                    "fake_facts",
                     "Please generate 3-5 made up facts about this city. "
                     "Each fact should be a dictionary with 'fact' and 'bibliography' keys. "
                     "Return the facts directly in your response, do not use any tools.",
@@ -221,48 +376,18 @@ class ChainingKata(KataBase):
         # print(fake_facts_result.data)
 
         # Step 4: Write a wikipedia style article about the city
-        @dataclass
-        class ArticleWriterDeps:
-            full_city_name: str
-            outline: list[str]
-            facts: list[dict[str, str]]
-
-        class ArticleWriterResult(BaseModel):
-            article: str = Field(
-                description="The wikipedia style article about the city."
+        with span("agent", "article_writer"):
+            article_writer_result = await cascade.run(
+                agents.article_writer,
+                "article_writer",
+                f"Please write a wikipedia style article about the city of {fake_planet_and_planetary_capital_result.data.full_title_of_planetary_capital}.",
+                deps=ArticleWriterDeps(
+                    full_city_name=fake_planet_and_planetary_capital_result.data.full_title_of_planetary_capital,
+                    outline=outline_result.data.outline,
+                    facts=fake_facts_result.data.facts,
+                ),
             )
 
-        article_writer_agent = Agent(
-            settings.DEFAULT_MODEL,
-            result_type=ArticleWriterResult,
-            system_prompt=(
-                "You are an expert fiction writer, in the style of Rick & Morty. "
-                "You also write the best wikipedia style articles. "
-                "You are given an outline and facts about a city. "
-                "Write a wikipedia style article about the city using markdown formatting: "
-                "- Use '# ' for the main title "
-                "- Use '## ' for section headings "
-                "- Use '### ' for subsection headings "
-                "You care that the entire article is completely up to snuff for a wikipedia page. "
-                "You turn the facts into bibliography entries."
-            ),
-        )
-
-        @article_writer_agent.system_prompt
-        def add_the_outline_and_facts(ctx: RunContext[ArticleWriterDeps]) -> str:
-            outline = "\n".join(ctx.deps.outline)
-            facts = json.dumps(ctx.deps.facts)
-            return f"The outline for the city is: {outline}\nThe facts about the city are: {facts}"
-
-        article_writer_result = await article_writer_agent.run(
-            f"Please write a wikipedia style article about the city of {fake_planet_and_planetary_capital_result.data.full_title_of_planetary_capital}.",
-            deps=ArticleWriterDeps(
-                full_city_name=fake_planet_and_planetary_capital_result.data.full_title_of_planetary_capital,
-                outline=outline_result.data.outline,
-                facts=fake_facts_result.data.facts,
-            ),
-        )
-
         chain_result.add_step(
             ChainStep(
                 step_name="Article Writer Agent",
@@ -271,51 +396,36 @@ class ChainingKata(KataBase):
             )
         )
 
-        # Step 5: Format the article into a wikipedia style article
-        @dataclass
-        class WikipediaFormatterDeps:
-            article_draft: str
-            outline: list[str]
-            facts: list[dict[str, str]]
-
-        class WikipediaFormatterResult(BaseModel):
-            article: str = Field(
-                description="The fully formatted wikipedia article about the city, including citations, that fully conforms (as applicable) to the wikipedia template."
-            )
-            highlight: str = Field(description="A short highlight of the article.")
-
-        wikipedia_formatter = Agent(
-            settings.DEFAULT_MODEL,
-            result_type=WikipediaFormatterResult,
-            deps_type=WikipediaFormatterDeps,
-            system_prompt=(
-                "You are an expert fiction writer, in the style of Rick & Morty."
-                "You also write the best wikipedia style articles."
-                "You are given an article draft, outline, and facts about a city."
-                "You format the article to match the wikipedia template."
-                "You add citations for all the facts."
-                "You make sure the article is completely up to snuff for a wikipedia page."
-            ),
+        article_slug = slugify(
+            fake_planet_and_planetary_capital_result.data.full_title_of_planetary_capital
         )
 
-        # A tool that async gets a URL and returns the contents
-        @wikipedia_formatter.tool_plain
-        async def get_template_definition() -> str:
-            """Get the template definition for a wikipedia article about a city."""
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    "https://r.jina.ai/https://en.wikipedia.org/wiki/Template:Article_templates/City"
-                ) as response:
-                    return await response.text()
+        # Formatting is the most expensive step; optionally skip it for a draft that
+        # nearly duplicates the draft of an existing article
+        if settings.ARTICLE_DEDUPE and settings.ARTICLE_DEDUPE_SKIP_FORMATTER:
+            duplicate = self._find_duplicate(
+                get_draft_index(), article_writer_result.data.article, article_slug
+            )
+            if duplicate is not None:
+                chain_result.duplicate_of = duplicate.slug
+                print(
+                    f"Draft is {duplicate.similarity:.0%} similar to "
+                    f"{article_path(duplicate.slug)}, not formatting or writing it"
+                )
+                return chain_result
 
-        wikipedia_formatter_result = await wikipedia_formatter.run(
-            f"Please format the article about the city of {fake_planet_and_planetary_capital_result.data.full_title_of_planetary_capital} into a wikipedia style article.",
-            deps=WikipediaFormatterDeps(
-                article_draft=article_writer_result.data.article,
-                outline=outline_result.data.outline,
-                facts=fake_facts_result.data.facts,
-            ),
-        )
+        # Step 5: Format the article into a wikipedia style article
+        with span("agent", "wikipedia_formatter"):
+            wikipedia_formatter_result = await cascade.run(
+                agents.wikipedia_formatter,
+                "wikipedia_formatter",
+                f"Please format the article about the city of {fake_planet_and_planetary_capital_result.data.full_title_of_planetary_capital} into a wikipedia style article.",
+                deps=WikipediaFormatterDeps(
+                    article_draft=article_writer_result.data.article,
+                    outline=outline_result.data.outline,
+                    facts=fake_facts_result.data.facts,
+                ),
+            )
 
         chain_result.add_step(
             ChainStep(
@@ -325,25 +435,73 @@ class ChainingKata(KataBase):
             )
         )
 
+        # Don't write an article that nearly duplicates an existing one
+        if settings.ARTICLE_DEDUPE:
+            duplicate = self._find_duplicate(
+                get_near_duplicate_index(),
+                wikipedia_formatter_result.data.article,
+                article_slug,
+            )
+            if duplicate is not None:
+                chain_result.duplicate_of = duplicate.slug
+                print(
+                    f"Article is {duplicate.similarity:.0%} similar to "
+                    f"{article_path(duplicate.slug)}, not writing it"
+                )
+                return chain_result
+
         # Write the article to a file
         # Make a folder in the current directory called "articles"
-        os.makedirs("articles", exist_ok=True)
+        os.makedirs(ARTICLES_DIR, exist_ok=True)
 
         # Write the article to a file in the folder
-        article_slug = slugify(
-            fake_planet_and_planetary_capital_result.data.full_title_of_planetary_capital
-        )
-        with open(f"articles/{article_slug}.md", "w") as f:
+        with open(article_path(article_slug), "w") as f:
             f.write(wikipedia_formatter_result.data.article)
 
-        print(f"Article written to articles/{article_slug}.md")
+        # Make it searchable (see agentic_ai_kata.utils.article_index), and check
+        # later articles against it
+        stat = os.stat(article_path(article_slug))
+        if settings.ARTICLE_INDEX:
+            get_article_index().add_article(
+                article_slug,
+                wikipedia_formatter_result.data.article,
+                stat.st_size,
+                stat.st_mtime,
+            )
+        if settings.ARTICLE_DEDUPE:
+            get_near_duplicate_index().add(
+                article_slug,
+                wikipedia_formatter_result.data.article,
+                stat.st_size,
+                stat.st_mtime,
+            )
+            if settings.ARTICLE_DEDUPE_SKIP_FORMATTER:
+                get_draft_index().add(article_slug, article_writer_result.data.article)
+
+        print(f"Article written to {article_path(article_slug)}")
         print(f"Highlight: {wikipedia_formatter_result.data.highlight}")
 
         return chain_result
 
+    @staticmethod
+    def _find_duplicate(
+        index: NearDuplicateIndex, article: str, slug: str
+    ) -> Optional[DuplicateMatch]:
+        """The most similar existing article, if `article` nearly duplicates one.
+
+        The article's own slug is ignored, so regenerating an article replaces it,
+        as are articles no longer in `ARTICLES_DIR`.
+        """
+        with span("dedupe", "near_duplicates"):
+            matches = index.query(article, exclude=slug)
+        for match in matches:
+            if os.path.exists(article_path(match.slug)):
+                return match
+        return None
+
     def run(self) -> Any:
         """Demonstrates the prompt chaining pattern"""
-        return asyncio.run(self._run_async())
+        return asyncio.run(self.arun())
 
     def validate_result(self, result: ChainResult) -> bool:
         """Validates that the chaining pattern worked correctly"""
@@ -1,22 +1,28 @@
-from typing import List
+from typing import TYPE_CHECKING, List, Optional
 from dataclasses import dataclass
-from openai import AsyncOpenAI
 
 from pydantic import BaseModel, Field
 from pydantic_ai import Tool
 import asyncio
 from agentic_ai_kata.base import KataBase
 from agentic_ai_kata.settings import settings
+from agentic_ai_kata.utils.clients import get_openai_client
 from agentic_ai_kata.utils.text_message import (
     get_example_conversations,
     Conversation,
+    TextMessage,
 )
-from agentic_ai_kata.utils.routing import classify_text_message
+from agentic_ai_kata.utils.routing import classify_with_ensemble
+from agentic_ai_kata.utils.thread_summary import ThreadSummaries
+
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 
 @dataclass
 class Deps:
-    openai: AsyncOpenAI
+    openai: "AsyncOpenAI"
 
 
 class Route(BaseModel):
@@ -54,6 +60,10 @@ class RoutingResult(BaseModel):
     input: str = Field(description="The original input")
     route: Route = Field(description="The chosen route")
     response: str = Field(description="The response from the chosen handler")
+    calls: int = Field(default=1, description="Classifications made for the input")
+    expected_handler: Optional[str] = Field(
+        default=None, description="The handler the input is labeled with, if any"
+    )
 
 
 def tool_func() -> str:
@@ -89,6 +99,36 @@ class AnalysisTestResult(BaseModel):
     routing_results: List[RoutingResult] = Field(default_factory=list)
 
 
+class RoutingReport(BaseModel):
+    """How well a set of messages was routed."""
+
+    messages: int = Field(description="Messages routed")
+    labeled: int = Field(description="Messages with an expected handler")
+    correct: int = Field(description="Labeled messages routed to that handler")
+    calls: int = Field(description="Classifications made for all the messages")
+
+    @property
+    def accuracy(self) -> float:
+        return self.correct / self.labeled if self.labeled else 0.0
+
+    @property
+    def calls_per_message(self) -> float:
+        return self.calls / self.messages if self.messages else 0.0
+
+    @classmethod
+    def from_results(cls, results: List[AnalysisTestResult]) -> "RoutingReport":
+        report = cls(messages=0, labeled=0, correct=0, calls=0)
+        for r in results:
+            for routing_result in r.routing_results:
+                expected = routing_result.expected_handler
+                report.messages += 1
+                report.calls += routing_result.calls
+                if expected:
+                    report.labeled += 1
+                    report.correct += routing_result.route.handler == expected
+        return report
+
+
 class RoutingKata(KataBase):
     """
     Kata 03: Routing Pattern
@@ -100,7 +140,7 @@ class RoutingKata(KataBase):
     Key Benefits:
     1. Separation of concerns - each handler can be optimized for its specific task
     2. Better performance - specialized prompts perform better than generic ones
-    3. Cost optimization - can route simple tasks to smaller models
+    3. Cost optimization - can route simple tasks to smaller models (see `MODEL_POLICY`)
     4. Maintainability - easier to add new handlers or modify existing ones
 
     This kata demonstrates:
@@ -117,21 +157,26 @@ class RoutingKata(KataBase):
     Implementation Notes:
     - Uses a classification agent to determine input type
     - Routes to specialized handlers based on classification
-    - Includes confidence scores to handle uncertainty
+    - Includes confidence scores to handle uncertainty: a classification below
+      `ROUTING_ENSEMBLE_THRESHOLD` is put to a vote of an ensemble of classifiers
     - Validates routing decisions against expected handlers
+    - With `ROUTING_THREAD_CONTEXT`, also routes each conversation's follow-ups
+      the same way (confidence gate, then ensemble), with a rolling summary of the
+      thread so far as context (see `agentic_ai_kata.utils.thread_summary`)
     """
 
     def __init__(self):
-        self.openai = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        self.openai = get_openai_client()
         self.deps = Deps(openai=self.openai)
 
-    async def _run_async(self) -> List[AnalysisTestResult]:
+    async def arun(self) -> List[AnalysisTestResult]:
         """Demonstrates the routing pattern by handling text messages."""
 
         # It all starts with a conversation - so let's manufacture some conversations
         conversations = await get_example_conversations()
 
         results = []
+        summaries = ThreadSummaries() if settings.ROUTING_THREAD_CONTEXT else None
 
         for c in conversations:
             analysis_test_result = AnalysisTestResult(
@@ -144,30 +189,62 @@ class RoutingKata(KataBase):
             # Create a copy of the message without expected_handler before classification
             message_for_classification = message.model_copy()
             message_for_classification.expected_handler = None
-            classification_result = await classify_text_message(
+            decision = await classify_with_ensemble(
                 message_for_classification, mock_tools
             )
+            classification = decision.classification
 
-            # Create a proper Route from the classification
-            route = Route(
-                category=classification_result.data.category,
-                confidence=classification_result.data.confidence,
-                handler=classification_result.data.handler,
+            print(f"Classification: {classification}")
+            analysis_test_result.routing_results.append(
+                self._routing_result(message, classification, decision.calls)
             )
 
-            # Create a RoutingResult (for now with a mock response)
-            routing_result = RoutingResult(
-                input=message.body,
-                route=route,
-                response=f"Mock response from {route.handler}",
-            )
+            # Follow-ups only make sense in light of the thread before them
+            if summaries is not None:
+                for follow_up in c.messages[1:]:
+                    unlabeled = follow_up.model_copy()
+                    unlabeled.expected_handler = None
+                    context = await summaries.context_for(c, unlabeled)
+                    decision = await classify_with_ensemble(
+                        unlabeled, mock_tools, context=context
+                    )
+                    print(f"Follow-up classification: {decision.classification}")
+                    analysis_test_result.routing_results.append(
+                        self._routing_result(
+                            follow_up, decision.classification, decision.calls
+                        )
+                    )
 
-            print(f"Classification: {classification_result.data}")
-            analysis_test_result.routing_results.append(routing_result)
             results.append(analysis_test_result)
 
+        report = RoutingReport.from_results(results)
+        print(
+            f"Accuracy: {report.correct}/{report.labeled} ({report.accuracy:.0%}), "
+            f"{report.calls_per_message:.2f} classifications per message"
+        )
+
         return results
 
+    @staticmethod
+    def _routing_result(
+        message: TextMessage, classification, calls: int = 1
+    ) -> RoutingResult:
+        # Create a proper Route from the classification
+        route = Route(
+            category=classification.category,
+            confidence=classification.confidence,
+            handler=classification.handler,
+        )
+
+        # Create a RoutingResult (for now with a mock response)
+        return RoutingResult(
+            input=message.body,
+            route=route,
+            response=f"Mock response from {route.handler}",
+            calls=calls,
+            expected_handler=message.expected_handler,
+        )
+
     def validate_result(self, result: List[AnalysisTestResult]) -> bool:
         """Validates that the routing pattern worked correctly"""
         # Check we have a valid result object
@@ -180,17 +257,15 @@ class RoutingKata(KataBase):
 
             for routing_result in r.routing_results:
                 assert isinstance(routing_result, RoutingResult)
-                message = r.conversation.messages[
-                    0
-                ]  # We're only testing the first message for now
+                expected = routing_result.expected_handler
 
                 print(f"Message: {routing_result.input[:50]}...")
                 print(f"Handler: {routing_result.route.handler}")
-                if message.expected_handler:
-                    print(f"Expected Handler: {message.expected_handler}")
-                    assert routing_result.route.handler == message.expected_handler, (
+                if expected:
+                    print(f"Expected Handler: {expected}")
+                    assert routing_result.route.handler == expected, (
                         f"Handler mismatch for message: {routing_result.input[:50]}...\n"
-                        f"Expected: {message.expected_handler}\n"
+                        f"Expected: {expected}\n"
                         f"Got: {routing_result.route.handler}"
                     )
                 print()
@@ -199,4 +274,4 @@ class RoutingKata(KataBase):
 
     def run(self) -> List[AnalysisTestResult]:
         """Demonstrates the routing pattern"""
-        return asyncio.run(self._run_async())
+        return asyncio.run(self.arun())
@@ -1,14 +1,17 @@
-from typing import Any
+from typing import TYPE_CHECKING, Any
 from dataclasses import dataclass
-from openai import AsyncOpenAI
 
 from agentic_ai_kata.base import KataBase
-from agentic_ai_kata.settings import settings
+from agentic_ai_kata.utils.clients import get_openai_client
+
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 
 @dataclass
 class Deps:
-    openai: AsyncOpenAI
+    openai: "AsyncOpenAI"
 
 
 class AgentKata(KataBase):
@@ -22,7 +25,7 @@ class AgentKata(KataBase):
     """
 
     def __init__(self):
-        self.openai = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        self.openai = get_openai_client()
         self.deps = Deps(openai=self.openai)
         self.agent = self._create_agent()
 
@@ -1,10 +1,8 @@
+from functools import lru_cache
+
 from pydantic import ConfigDict
 from pydantic_settings import BaseSettings
 
-import logfire
-
-logfire.configure()
-
 
 class KataSettings(BaseSettings):
     """Base settings class for all katas"""
@@ -13,11 +11,114 @@ class KataSettings(BaseSettings):
     ANTHROPIC_API_KEY: str | None = None
     DEFAULT_MODEL: str = "openai:gpt-4o"
 
+    # Per-step models (see agentic_ai_kata.utils.cascade), e.g.
+    # {"classify_text_message": "openai:gpt-4o-mini"}; other steps use
+    # DEFAULT_MODEL, which is also what a step escalates to when its model falls short
+    MODEL_POLICY: dict[str, str] = {}
+    CASCADE_MIN_CONFIDENCE: float = 0.7  # Escalate less confident classifications
+    # USD per million (prompt, completion) tokens, for the cascade's spend metrics
+    MODEL_PRICES: dict[str, tuple[float, float]] = {
+        "openai:gpt-4o": (2.50, 10.00),
+        "openai:gpt-4o-mini": (0.15, 0.60),
+    }
+
+    # Routing asks an ensemble of classifiers to vote when the first is less confident
+    ROUTING_ENSEMBLE_THRESHOLD: float = 0.7
+    ROUTING_ENSEMBLE_MODELS: list[str] = []  # Members' models in turn; DEFAULT_MODEL
+    # RoutingKata also routes follow-ups, with a rolling summary of their thread
+    ROUTING_THREAD_CONTEXT: bool = False
+
+    # Micro-batched classification (see agentic_ai_kata.utils.routing.BatchClassifier)
+    CLASSIFY_BATCH_SIZE: int = 16  # Messages per request
+    CLASSIFY_BATCH_LATENCY: float = 0.005  # Seconds a message waits for others
+
+    # Connection pool shared by every model client in the process
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP2: bool = True  # Only used when the optional `h2` package is installed
+
+    # Provider quotas for `settings.DEFAULT_MODEL`; None means no client-side limit
+    RATE_LIMIT_RPM: int | None = None
+    RATE_LIMIT_TPM: int | None = None
+
+    # ColBERTv2 retrieval server used by the wikipedia search tools
+    COLBERT_URL: str = "http://20.102.90.50:2017/wiki17_abstracts"
+
+    # Opt-in local cache of model responses, keyed on model + messages + schema
+    RESPONSE_CACHE: bool = False
+    RESPONSE_CACHE_PATH: str = ".cache/responses.sqlite3"
+    RESPONSE_CACHE_TTL: int | None = 7 * 24 * 60 * 60
+    RESPONSE_CACHE_MAX_ENTRIES: int | None = 10_000
+
+    # Example conversations (see agentic_ai_kata.utils.text_message)
+    EXAMPLE_CONVERSATIONS_FILE: str | None = None  # JSON of name -> theme
+    CONVERSATION_CONCURRENCY: int = 8  # Simultaneous LLM generations
+    CONVERSATION_STORE: str = "directory"  # "directory", "jsonl" or "sqlite"
+    CONVERSATION_STORE_PATH: str | None = None  # Defaults to conversations/
+
+    # Search index of generated articles (see agentic_ai_kata.utils.article_index)
+    ARTICLE_INDEX: bool = False  # Index each article ChainingKata writes
+    ARTICLE_INDEX_PATH: str = ".cache/articles.sqlite3"
+
+    # Near-duplicate check of generated articles (see .utils.near_duplicates)
+    ARTICLE_DEDUPE: bool = False  # Don't write an article nearly duplicating another
+    ARTICLE_DEDUPE_PATH: str = ".cache/article_signatures.sqlite3"
+    ARTICLE_DEDUPE_THRESHOLD: float = 0.8  # Estimated Jaccard similarity of shingles
+    ARTICLE_DEDUPE_SKIP_FORMATTER: bool = False  # Check the draft, skip formatting
+    ARTICLE_DEDUPE_DRAFTS_PATH: str = ".cache/draft_signatures.sqlite3"
+
+    # Job queue consumed by `python -m agentic_ai_kata.utils.job_queue worker`
+    JOB_QUEUE: str = "sqlite"  # "sqlite" or "redis"
+    JOB_QUEUE_PATH: str | None = None  # SQLite file or Redis URL
+    JOB_QUEUE_MAX_ATTEMPTS: int = 3  # Leases per job before dead-lettering
+
+    # Instrumentation (see agentic_ai_kata.utils.instrumentation)
+    INSTRUMENTATION_OTEL: bool = True  # Export spans through logfire
+    INSTRUMENTATION_SUMMARY_PATH: str | None = None  # JSON summary written at exit
+
     model_config = ConfigDict(
         env_file=".env",
         extra="ignore",  # This will ignore extra fields in the .env file
     )
 
 
-# Global settings instance - properly initialized with environment variables
-settings = KataSettings()
+@lru_cache(maxsize=None)
+def configure_telemetry() -> None:
+    """Configure logfire the first time telemetry is needed.
+
+    logfire pulls in the OpenTelemetry SDK, so it is imported here rather than at
+    module level to keep `import agentic_ai_kata...` cheap.
+    """
+    import logfire
+
+    logfire.configure()
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> KataSettings:
+    """Load the settings (and configure telemetry) on first use.
+
+    Returns:
+        KataSettings: The process-wide settings instance
+    """
+    configure_telemetry()
+    return KataSettings()
+
+
+class LazySettings:
+    """Proxy that defers loading `KataSettings` until an attribute is read.
+
+    This keeps `from agentic_ai_kata.settings import settings` working everywhere
+    without reading the environment or configuring logfire at import time.
+    """
+
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+    def __repr__(self) -> str:
+        return repr(get_settings())
+
+
+# Global settings instance - initialized with environment variables on first access
+settings = LazySettings()
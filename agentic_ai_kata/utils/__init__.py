@@ -1,3 +1,15 @@
-from .colbert_v2 import ColBERTv2
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .colbert_v2 import ColBERTv2
 
 __all__ = ["ColBERTv2"]
+
+
+def __getattr__(name: str):
+    # Resolve exports on first access so importing the package stays cheap
+    if name == "ColBERTv2":
+        from .colbert_v2 import ColBERTv2
+
+        return ColBERTv2
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,443 @@
+"""A persistent full-text index over the generated articles.
+
+`ChainingKata` writes each article to `articles/<slug>.md`. Finding anything in
+them meant reading every file, so an `ArticleIndex` keeps an inverted index of their
+sections in SQLite:
+
+    - Articles are split into sections at their `#` and `##` headings (`###`
+      subsections stay in their `##` section), see `split_sections()`
+    - Sections are indexed with SQLite's FTS5 and ranked with BM25, with matches
+      in a heading weighted above matches in the text. Without FTS5 (some SQLite
+      builds) a plain postings table ranked by tf-idf is used instead
+    - Each word's section count is kept in a `terms` table. Query words found in
+      a large share of sections are ignored when the query has rarer ones, and
+      when the remaining words are in more than `max_candidates` sections only
+      the newest `max_candidates` of those are ranked: scoring every section
+      that contains a common word is what makes a search slow on a large index,
+      at the cost of older matches for such queries being missed
+    - Updates are incremental: `add_article()` replaces one article's sections,
+      and `sync()` re-indexes only the files whose size or mtime changed
+
+With `ARTICLE_INDEX` set, `ChainingKata` adds every article it writes to the
+process-wide index (`get_article_index()`, stored at `ARTICLE_INDEX_PATH`).
+
+Example Usage:
+    index = get_article_index()
+    index.sync("articles")
+    for hit in index.search("floating gardens", k=5):
+        print(hit.score, hit.title, "/", hit.heading)
+
+    python -m agentic_ai_kata.utils.article_index "floating gardens" --sync
+"""
+
+import argparse
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from pydantic import BaseModel, Field
+
+from agentic_ai_kata.settings import settings
+
+_HEADING = re.compile(r"^(#{1,2})\s+(.*?)\s*#*\s*$")
+_TOKEN = re.compile(r"\w+")
+
+
+class Section(BaseModel):
+    """A part of an article under one `#` or `##` heading."""
+
+    heading: str = Field(description="The section's heading")
+    text: str = Field(description="The section's markdown, without its heading")
+
+
+class SectionHit(BaseModel):
+    """A section matching a search."""
+
+    slug: str = Field(description="The article's file name without `.md`")
+    title: str = Field(description="The article's title")
+    heading: str = Field(description="The section's heading")
+    text: str = Field(description="The section's markdown")
+    score: float = Field(description="Relevance; higher is better")
+
+
+def split_sections(markdown: str, default_title: str = "") -> tuple[str, List[Section]]:
+    """Split an article at its `#` and `##` headings.
+
+    Args:
+        markdown: The article
+        default_title: The title to use if the article has no `#` heading
+
+    Returns:
+        tuple[str, List[Section]]: The article's title and its non-empty sections;
+        text before the first heading is in a section headed by the title
+    """
+    title = default_title
+    heading, lines = None, []
+    sections = []
+
+    def close():
+        text = "\n".join(lines).strip()
+        if text:
+            sections.append(Section(heading=heading or title, text=text))
+
+    for line in markdown.splitlines():
+        match = _HEADING.match(line)
+        if match is None:
+            lines.append(line)
+            continue
+        close()
+        heading, lines = match.group(2), []
+        if match.group(1) == "#" and title == default_title:
+            title = heading
+    close()
+    return title, sections
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase words, as FTS5's default tokenizer splits them."""
+    return _TOKEN.findall(text.lower())
+
+
+def fts5_available() -> bool:
+    """Whether this Python's SQLite was built with FTS5."""
+    try:
+        sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE t USING fts5(x)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+class ArticleIndex:
+    """Sections of articles, searchable by keywords, stored in one SQLite file."""
+
+    # Relative weight of a match in a section's heading vs its text
+    HEADING_WEIGHT = 2.0
+
+    # Words in more than this share of sections are too common to rank by
+    COMMON_TERM_FRACTION = 0.05
+
+    def __init__(self, path: Union[str, Path], use_fts5: Optional[bool] = None):
+        """
+        Args:
+            path: The SQLite file, or ":memory:"
+            use_fts5: Force the FTS5 (True) or postings (False) implementation,
+                defaults to FTS5 when available
+        """
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        if str(path) != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            " slug TEXT PRIMARY KEY, title TEXT NOT NULL, size INTEGER,"
+            " mtime REAL);"
+            "CREATE TABLE IF NOT EXISTS sections ("
+            " id INTEGER PRIMARY KEY, slug TEXT NOT NULL, heading TEXT NOT NULL,"
+            " text TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS sections_slug ON sections (slug);"
+            # The number of sections containing each term, and under the empty
+            # term (never a token) the number of sections
+            "CREATE TABLE IF NOT EXISTS terms ("
+            " term TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID;"
+        )
+        existing = {
+            name
+            for (name,) in self._db.execute(
+                "SELECT name FROM sqlite_master WHERE name IN ('fts', 'postings')"
+            )
+        }
+        if use_fts5 is None:
+            # An existing index keeps its implementation
+            use_fts5 = "fts" in existing or (
+                "postings" not in existing and fts5_available()
+            )
+        self.use_fts5 = use_fts5
+        if use_fts5:
+            # External content: the text is stored once, in `sections`
+            self._db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS fts USING fts5("
+                " heading, text, content='sections', content_rowid='id')"
+            )
+        else:
+            self._db.executescript(
+                "CREATE TABLE IF NOT EXISTS postings ("
+                " term TEXT, section INTEGER, tf REAL,"
+                " PRIMARY KEY (term, section)) WITHOUT ROWID;"
+                "CREATE INDEX IF NOT EXISTS postings_section ON postings (section);"
+            )
+        self._db.commit()
+
+    def _remove(self, slug: str) -> None:
+        rows = self._db.execute(
+            "SELECT id, heading, text FROM sections WHERE slug = ?", (slug,)
+        ).fetchall()
+        self._count_terms([(heading, text) for _, heading, text in rows], -1)
+        if self.use_fts5:
+            self._db.executemany(
+                "INSERT INTO fts (fts, rowid, heading, text)"
+                " VALUES ('delete', ?, ?, ?)",
+                rows,
+            )
+        else:
+            self._db.executemany(
+                "DELETE FROM postings WHERE section = ?", [(row[0],) for row in rows]
+            )
+        self._db.execute("DELETE FROM sections WHERE slug = ?", (slug,))
+        self._db.execute("DELETE FROM articles WHERE slug = ?", (slug,))
+
+    def _add(
+        self, slug: str, markdown: str, size: Optional[int], mtime: Optional[float]
+    ) -> int:
+        self._remove(slug)
+        default_title = slug.replace("-", " ").title()
+        title, sections = split_sections(markdown, default_title)
+        self._db.execute(
+            "INSERT INTO articles VALUES (?, ?, ?, ?)", (slug, title, size, mtime)
+        )
+        self._count_terms([(s.heading, s.text) for s in sections], 1)
+        for section in sections:
+            section_id = self._db.execute(
+                "INSERT INTO sections (slug, heading, text) VALUES (?, ?, ?)",
+                (slug, section.heading, section.text),
+            ).lastrowid
+            if self.use_fts5:
+                self._db.execute(
+                    "INSERT INTO fts (rowid, heading, text) VALUES (?, ?, ?)",
+                    (section_id, section.heading, section.text),
+                )
+            else:
+                terms = Counter(tokenize(section.text))
+                for term in tokenize(section.heading):
+                    terms[term] += self.HEADING_WEIGHT
+                self._db.executemany(
+                    "INSERT INTO postings VALUES (?, ?, ?)",
+                    [(term, section_id, tf) for term, tf in terms.items()],
+                )
+        return len(sections)
+
+    def _count_terms(self, sections: List[tuple], sign: int) -> None:
+        """Add (1) or subtract (-1) sections' terms from the section counts."""
+        counts = Counter(
+            term
+            for heading, text in sections
+            for term in set(tokenize(heading)) | set(tokenize(text))
+        )
+        counts[""] = len(sections)
+        self._db.executemany(
+            "INSERT INTO terms VALUES (?, ?)"
+            " ON CONFLICT (term) DO UPDATE SET df = df + excluded.df",
+            [(term, sign * count) for term, count in counts.items()],
+        )
+        if sign < 0:
+            self._db.executemany(
+                "DELETE FROM terms WHERE term = ? AND df <= 0",
+                [(term,) for term in counts],
+            )
+
+    def add_article(
+        self,
+        slug: str,
+        markdown: str,
+        size: Optional[int] = None,
+        mtime: Optional[float] = None,
+    ) -> int:
+        """Index an article, replacing any earlier version with the same slug.
+
+        Args:
+            slug: The article's file name without `.md`
+            markdown: The article
+            size: The file's size, to detect changes in `sync()`
+            mtime: The file's modification time, to detect changes in `sync()`
+
+        Returns:
+            int: The number of sections indexed
+        """
+        with self._lock:
+            count = self._add(slug, markdown, size, mtime)
+            self._db.commit()
+        return count
+
+    def remove_article(self, slug: str) -> None:
+        """Drop an article from the index."""
+        with self._lock:
+            self._remove(slug)
+            self._db.commit()
+
+    def sync(self, directory: Union[str, Path] = "articles") -> Dict[str, int]:
+        """Bring the index up to date with a directory of `.md` articles.
+
+        Only files that are new or whose size or mtime changed are read.
+
+        Args:
+            directory: The articles directory
+
+        Returns:
+            Dict[str, int]: Counts of "added", "updated", "removed" and "unchanged"
+            articles
+        """
+        counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        with self._lock:
+            indexed = {
+                slug: (size, mtime)
+                for slug, size, mtime in self._db.execute(
+                    "SELECT slug, size, mtime FROM articles"
+                )
+            }
+            for path in sorted(Path(directory).glob("*.md")):
+                stat = path.stat()
+                current = (stat.st_size, stat.st_mtime)
+                previous = indexed.pop(path.stem, None)
+                if previous == current:
+                    counts["unchanged"] += 1
+                    continue
+                self._add(path.stem, path.read_text(), *current)
+                counts["added" if previous is None else "updated"] += 1
+            for slug in indexed:
+                self._remove(slug)
+                counts["removed"] += 1
+            self._db.commit()
+        return counts
+
+    def search(
+        self, query: str, k: int = 10, max_candidates: int = 1000
+    ) -> List[SectionHit]:
+        """Find the sections that best match a keyword query.
+
+        Args:
+            query: Words to look for; sections with any of them match, ranked by
+                how many they contain and how rare they are
+            k: The number of sections to return
+            max_candidates: The most sections to rank; when more contain the
+                query words, only the newest ones are ranked
+
+        Returns:
+            List[SectionHit]: The best matching sections, best first
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            frequencies = self._frequencies(["", *terms])
+            total = frequencies.pop("", 0)
+            if not frequencies:
+                return []
+            common = total * self.COMMON_TERM_FRACTION
+            rare = {term: df for term, df in frequencies.items() if df <= common}
+            frequencies = rare or frequencies
+            # Only newer sections than `after` are ranked
+            after = None
+            if sum(frequencies.values()) > max_candidates:
+                after = self._newest(list(frequencies), max_candidates)
+            if self.use_fts5:
+                rows = self._search_fts5(list(frequencies), k, after)
+            else:
+                rows = self._search_postings(frequencies, total, k, after)
+        return [
+            SectionHit(slug=slug, title=title, heading=heading, text=text, score=score)
+            for slug, title, heading, text, score in rows
+        ]
+
+    def _frequencies(self, terms: List[str]) -> Dict[str, int]:
+        """The number of sections containing each term, for terms in any."""
+        placeholders = ",".join("?" * len(terms))
+        return dict(
+            self._db.execute(
+                f"SELECT term, df FROM terms WHERE term IN ({placeholders})", terms
+            ).fetchall()
+        )
+
+    def _newest(self, terms: List[str], count: int) -> Optional[int]:
+        """The section id before the newest `count` containing any of the terms."""
+        if self.use_fts5:
+            sql = (
+                "SELECT rowid FROM fts WHERE fts MATCH ?"
+                " ORDER BY rowid DESC LIMIT 1 OFFSET ?"
+            )
+            params = (self._match(terms), count)
+        else:
+            placeholders = ",".join("?" * len(terms))
+            sql = (
+                f"SELECT DISTINCT section FROM postings WHERE term IN ({placeholders})"
+                " ORDER BY section DESC LIMIT 1 OFFSET ?"
+            )
+            params = (*terms, count)
+        row = self._db.execute(sql, params).fetchone()
+        return None if row is None else row[0]
+
+    @staticmethod
+    def _match(terms: List[str]) -> str:
+        # Quoted terms, so query words are never read as FTS5 syntax
+        return " OR ".join(f'"{term}"' for term in terms)
+
+    def _search_fts5(
+        self, terms: List[str], k: int, after: Optional[int]
+    ) -> List[tuple]:
+        return self._db.execute(
+            "SELECT s.slug, a.title, s.heading, s.text, -hit.score FROM ("
+            "  SELECT rowid, bm25(fts, ?, 1.0) AS score FROM fts"
+            "  WHERE fts MATCH ? AND rowid > ? ORDER BY score LIMIT ?"
+            ") hit JOIN sections s ON s.id = hit.rowid"
+            " JOIN articles a ON a.slug = s.slug ORDER BY hit.score",
+            (self.HEADING_WEIGHT, self._match(terms), after or 0, k),
+        ).fetchall()
+
+    def _search_postings(
+        self, frequencies: Dict[str, int], total: int, k: int, after: Optional[int]
+    ) -> List[tuple]:
+        weights = [(term, math.log(1 + total / df)) for term, df in frequencies.items()]
+        values = ",".join("(?, ?)" for _ in weights)
+        return self._db.execute(
+            f"WITH w(term, weight) AS (VALUES {values}),"
+            " hit AS ("
+            "  SELECT p.section, SUM(p.tf * w.weight) AS score"
+            "  FROM w JOIN postings p ON p.term = w.term WHERE p.section > ?"
+            "  GROUP BY p.section ORDER BY score DESC LIMIT ?"
+            ")"
+            " SELECT s.slug, a.title, s.heading, s.text, hit.score FROM hit"
+            " JOIN sections s ON s.id = hit.section"
+            " JOIN articles a ON a.slug = s.slug ORDER BY hit.score DESC",
+            [value for weight in weights for value in weight] + [after or 0, k],
+        ).fetchall()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+
+@lru_cache(maxsize=None)
+def get_article_index() -> ArticleIndex:
+    """Get the process-wide index stored at `ARTICLE_INDEX_PATH`."""
+    return ArticleIndex(settings.ARTICLE_INDEX_PATH)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the generated articles")
+    parser.add_argument("query")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument(
+        "--sync", metavar="DIR", nargs="?", const="articles", help="index DIR first"
+    )
+    args = parser.parse_args()
+
+    index = get_article_index()
+    if args.sync:
+        print(f"Synced {args.sync}: {index.sync(args.sync)}")
+    start = time.perf_counter()
+    hits = index.search(args.query, args.k)
+    elapsed = time.perf_counter() - start
+    for hit in hits:
+        print(f"{hit.score:7.2f}  {hit.title} / {hit.heading}")
+        print(f"         {' '.join(hit.text.split())[:100]}")
+    print(f"{len(hits)} sections in {elapsed * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""Shard batch workloads across processes to use every core.
+
+Once network waits are overlapped, batch jobs such as bulk routing or article
+generation are bound by CPU work (pydantic validation, JSON, slugify) on a single
+core. `iter_sharded()` splits the items round-robin into one shard per worker
+process; each worker runs its shard on its own event loop, with its own client pool,
+at most `concurrency` items at a time, and sends every result back through a queue
+as soon as it is ready:
+
+    items --round-robin--> worker 1: asyncio.run(shard) --\\
+                           worker 2: asyncio.run(shard) ---+--> queue --> caller
+                           ...                            --/
+
+Jobs are async functions of one item, defined at module level so they can be
+pickled (e.g. `classify_job` and `chaining_job` below). Rate limits are enforced per
+process, so N workers may use up to N times the configured rate.
+
+This is a library entry point for offline batch jobs (see
+`benchmarks/batch_scaling.py`); the ingest service keeps routing on one event loop
+with `route_messages()`, since its messages arrive one at a time.
+
+Example Usage:
+    from agentic_ai_kata.utils.batch import classify_job, map_sharded
+
+    classifications = map_sharded(classify_job, messages, workers=8)
+"""
+
+import asyncio
+import multiprocessing
+import os
+import pickle
+import queue
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+Job = Callable[[T], Awaitable[R]]
+
+# Set in each worker process by `_worker`
+_results: Optional[multiprocessing.Queue] = None
+
+# What a worker sends, with whether it succeeded, when it has finished its shard
+_DONE = "done"
+
+
+def _init_worker(results: multiprocessing.Queue, initializer, initargs) -> None:
+    from agentic_ai_kata.utils.clients import registry
+
+    global _results
+    _results = results
+    # A forked worker inherits the parent's clients; give it a pool of its own
+    registry.clear()
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def _portable(error: BaseException) -> BaseException:
+    """The exception itself if it can be pickled, else a RuntimeError describing it."""
+    try:
+        pickle.dumps(error)
+        return error
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+
+
+async def _run_shard(job: Job, shard: List[Tuple[int, Any]], concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(index: int, item: Any) -> None:
+        async with semaphore:
+            try:
+                _results.put((index, True, await job(item)))
+            except Exception as e:
+                _results.put((index, False, _portable(e)))
+
+    await asyncio.gather(*(run_one(index, item) for index, item in shard))
+
+
+def _worker(
+    results: multiprocessing.Queue,
+    initializer,
+    initargs,
+    job: Job,
+    shard: List[Tuple[int, Any]],
+    concurrency: int,
+) -> None:
+    """Run one shard on a fresh event loop in the worker process."""
+    try:
+        _init_worker(results, initializer, initargs)
+        asyncio.run(_run_shard(job, shard, concurrency))
+    except Exception as e:
+        results.put((_DONE, False, _portable(e)))
+    else:
+        results.put((_DONE, True, None))
+
+
+def iter_sharded(
+    job: Job,
+    items: Sequence[T],
+    workers: Optional[int] = None,
+    concurrency: int = 8,
+    return_exceptions: bool = False,
+    initializer: Optional[Callable[..., None]] = None,
+    initargs: tuple = (),
+    mp_context=None,
+) -> Iterator[Tuple[int, Any]]:
+    """Run `job` on every item across worker processes, yielding results as ready.
+
+    Args:
+        job: An async function of one item, picklable (defined at module level)
+        items: The items, picklable
+        workers: Worker processes, defaults to the number of CPUs
+        concurrency: Items in flight at once within each worker
+        return_exceptions: Yield a failed item's exception instead of raising it
+        initializer: Called once in each worker before any job (e.g. to configure
+            clients), picklable
+        initargs: Arguments for `initializer`
+        mp_context: The multiprocessing context, defaults to the platform's
+
+    Yields:
+        Tuple[int, Any]: Each item's index in `items` and its result, in
+        completion order
+
+    Raises:
+        Exception: The first item's exception, unless `return_exceptions`
+
+    Each shard runs in a process of its own. If iteration stops early (an error,
+    or the caller closes the iterator), the workers are terminated and items still
+    running are abandoned.
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(items)))
+    if not items:
+        return
+    shards = [
+        [(index, items[index]) for index in range(start, len(items), workers)]
+        for start in range(workers)
+    ]
+    context = mp_context or multiprocessing.get_context()
+    results = context.Queue()
+    processes = [
+        context.Process(
+            target=_worker,
+            args=(results, initializer, initargs, job, shard, concurrency),
+        )
+        for shard in shards
+    ]
+    started: List[multiprocessing.process.BaseProcess] = []
+    finished = 0
+    try:
+        for process in processes:
+            process.start()
+            started.append(process)
+        while finished < len(shards):
+            try:
+                index, ok, value = results.get(timeout=0.1)
+            except queue.Empty:
+                # A worker that died can't report; surface its exit
+                for process in started:
+                    if process.exitcode not in (None, 0):
+                        raise RuntimeError(
+                            f"Worker {process.pid} exited with code {process.exitcode}"
+                        )
+                continue
+            if index == _DONE:
+                finished += 1
+                if not ok:
+                    raise value
+            elif ok or return_exceptions:
+                yield index, value
+            else:
+                raise value
+    finally:
+        if finished < len(shards):
+            # An error, or the caller stopped early: don't wait for the shards still
+            # running, stop their workers
+            for process in started:
+                process.terminate()
+        for process in started:
+            process.join()
+
+
+def map_sharded(job: Job, items: Sequence[T], **kwargs) -> List[Any]:
+    """Like `iter_sharded`, but returns every result in the order of `items`."""
+    results: List[Any] = [None] * len(items)
+    for index, value in iter_sharded(job, items, **kwargs):
+        results[index] = value
+    return results
+
+
+async def classify_job(message) -> Any:
+    """Classify one `TextMessage` with the routing kata's handlers.
+
+    Returns:
+        TextMessageClassification: The classification
+    """
+    from agentic_ai_kata.kata_03_routing import mock_tools
+    from agentic_ai_kata.utils.routing import classify_text_message
+
+    result = await classify_text_message(message, mock_tools)
+    return result.data
+
+
+async def chaining_job(_: Any = None) -> Any:
+    """Generate one article with `ChainingKata`.
+
+    Returns:
+        ChainResult: The chain's steps and final article
+    """
+    from agentic_ai_kata.kata_02_chaining import ChainingKata
+
+    return await ChainingKata().arun()
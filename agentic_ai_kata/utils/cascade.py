@@ -0,0 +1,247 @@
+"""Run each agent step on the cheapest model that does it well enough.
+
+Every step used `settings.DEFAULT_MODEL`, even ones a smaller model handles as
+well, such as generating a planet's name or classifying a text message. A
+`ModelCascade` picks each step's model from a policy (`MODEL_POLICY`: step name to
+model name; unlisted steps use `DEFAULT_MODEL`) and escalates a step run on a
+smaller model to `DEFAULT_MODEL` when
+
+    - the smaller model's result fails validation (pydantic-ai gives up with
+      `UnexpectedModelBehavior` after the agent's retries), or
+    - the caller's `accept` check rejects it, e.g. a classification whose
+      confidence is below `CASCADE_MIN_CONFIDENCE`
+
+Each attempt is timed in an instrumentation span of kind "cascade" named
+"<step> <model>", and `CascadeStats` keeps per step: runs, escalations by reason,
+and each model's attempts, latency, tokens and cost (from `MODEL_PRICES`), along
+with what the accepted attempts would have cost on the escalation model. The
+difference is the spend the cascade saved, which is negative when a step escalates
+so often that running on both models costs more than the large model alone.
+
+Example Usage:
+    # MODEL_POLICY='{"classify_text_message": "openai:gpt-4o-mini"}'
+    result = await get_model_cascade().run(
+        agent, "classify_text_message", prompt,
+        accept=lambda data: data.confidence >= 0.7,
+    )
+    print(get_model_cascade().stats.summary())
+"""
+
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic_ai import Agent, UnexpectedModelBehavior
+
+from agentic_ai_kata.settings import settings
+from agentic_ai_kata.utils.clients import get_model
+from agentic_ai_kata.utils.instrumentation import Span, span
+
+if TYPE_CHECKING:
+    from pydantic_ai.models import Model
+    from pydantic_ai.result import RunResult
+
+# USD per million (prompt, completion) tokens
+Price = Tuple[float, float]
+
+
+@dataclass
+class ModelStats:
+    """One model's attempts at one step."""
+
+    attempts: int = 0
+    accepted: int = 0
+    wall_time: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "attempts": self.attempts,
+            "accepted": self.accepted,
+            "mean_latency": self.wall_time / self.attempts if self.attempts else 0.0,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost": self.cost,
+        }
+
+
+@dataclass
+class StepStats:
+    """Everything the cascade did for one step."""
+
+    runs: int = 0
+    wall_time: float = 0.0
+    escalations: Counter = field(default_factory=Counter)
+    models: Dict[str, ModelStats] = field(default_factory=dict)
+    # What the accepted attempts would have cost on the escalation model
+    baseline_cost: float = 0.0
+
+    @property
+    def cost(self) -> float:
+        return sum(model.cost for model in self.models.values())
+
+    def to_dict(self) -> dict:
+        return {
+            "runs": self.runs,
+            "mean_latency": self.wall_time / self.runs if self.runs else 0.0,
+            "escalations": dict(self.escalations),
+            "cost": self.cost,
+            "baseline_cost": self.baseline_cost,
+            "saved": self.baseline_cost - self.cost,
+            "models": {name: stats.to_dict() for name, stats in self.models.items()},
+        }
+
+
+class CascadeStats:
+    """Per-step counters of a `ModelCascade`, safe to update from any thread."""
+
+    def __init__(self):
+        self.steps: Dict[str, StepStats] = {}
+        self._lock = threading.Lock()
+
+    def record_attempt(
+        self,
+        step: str,
+        model: str,
+        attempt: Span,
+        accepted: bool,
+        price: Price,
+        baseline_price: Price,
+    ) -> None:
+        prompt_tokens = int(attempt.counters.get("prompt_tokens", 0))
+        completion_tokens = int(attempt.counters.get("completion_tokens", 0))
+        with self._lock:
+            stats = self.steps.setdefault(step, StepStats())
+            model_stats = stats.models.setdefault(model, ModelStats())
+            model_stats.attempts += 1
+            model_stats.wall_time += attempt.wall_time
+            model_stats.prompt_tokens += prompt_tokens
+            model_stats.completion_tokens += completion_tokens
+            model_stats.cost += _cost(price, prompt_tokens, completion_tokens)
+            stats.wall_time += attempt.wall_time
+            if accepted:
+                model_stats.accepted += 1
+                stats.runs += 1
+                stats.baseline_cost += _cost(
+                    baseline_price, prompt_tokens, completion_tokens
+                )
+
+    def record_escalation(self, step: str, reason: str) -> None:
+        with self._lock:
+            self.steps.setdefault(step, StepStats()).escalations[reason] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self.steps.clear()
+
+    def summary(self) -> dict:
+        """Each step's counters, with latency and spend saved.
+
+        Returns:
+            dict: Step name to its runs, mean latency per run, escalations by reason
+            ("validation" or "rejected"), cost, baseline cost and saved spend in
+            USD, and each model's attempts, mean latency, tokens and cost
+        """
+        with self._lock:
+            return {step: stats.to_dict() for step, stats in self.steps.items()}
+
+
+def _cost(price: Price, prompt_tokens: int, completion_tokens: int) -> float:
+    return (price[0] * prompt_tokens + price[1] * completion_tokens) / 1_000_000
+
+
+class ModelCascade:
+    """Runs agent steps on per-step models, escalating to a larger one when needed."""
+
+    def __init__(
+        self,
+        policy: Optional[Dict[str, str]] = None,
+        escalate_to: Optional[str] = None,
+        prices: Optional[Dict[str, Price]] = None,
+        model_factory: Callable[[str], "Model"] = get_model,
+    ):
+        """
+        Args:
+            policy: Step name to model name, defaults to `settings.MODEL_POLICY`
+            escalate_to: The model for unlisted steps and escalations, defaults to
+                `settings.DEFAULT_MODEL`
+            prices: Model name to USD per million (prompt, completion) tokens,
+                defaults to `settings.MODEL_PRICES`; unlisted models cost nothing
+            model_factory: Makes the pydantic-ai model for a model name
+        """
+        self.policy = settings.MODEL_POLICY if policy is None else policy
+        self.escalate_to = escalate_to or settings.DEFAULT_MODEL
+        self.prices = settings.MODEL_PRICES if prices is None else prices
+        self.model_factory = model_factory
+        self.stats = CascadeStats()
+
+    def models_for(self, step: str) -> List[str]:
+        """The models a step is tried on, in order."""
+        first = self.policy.get(step, self.escalate_to)
+        return [first] if first == self.escalate_to else [first, self.escalate_to]
+
+    def _price(self, model: str) -> Price:
+        return tuple(self.prices.get(model, (0.0, 0.0)))
+
+    async def run(
+        self,
+        agent: Agent,
+        step: str,
+        prompt: str,
+        accept: Optional[Callable[[Any], bool]] = None,
+        **kwargs: Any,
+    ) -> "RunResult":
+        """Run an agent for a step, escalating if the step's model falls short.
+
+        Args:
+            agent: The agent, built without a model
+            step: The step's name in the policy
+            prompt: The user prompt
+            accept: Whether a result from a model other than the last is good
+                enough; when it isn't, the step is escalated
+            kwargs: Passed on to `agent.run`, e.g. `deps`
+
+        Returns:
+            RunResult: The accepted attempt's result
+
+        Raises:
+            UnexpectedModelBehavior: The last model's result failed validation too
+        """
+        models = self.models_for(step)
+        baseline_price = self._price(self.escalate_to)
+        for model in models:
+            last = model == models[-1]
+            error = None
+            with span("cascade", f"{step} {model}") as attempt:
+                try:
+                    result = await agent.run(
+                        prompt, model=self.model_factory(model), **kwargs
+                    )
+                except UnexpectedModelBehavior as e:
+                    error = e
+            accepted = error is None and (last or accept is None or accept(result.data))
+            self.stats.record_attempt(
+                step, model, attempt, accepted, self._price(model), baseline_price
+            )
+            if accepted:
+                return result
+            if last:
+                raise error
+            self.stats.record_escalation(
+                step, "validation" if error is not None else "rejected"
+            )
+
+
+@lru_cache(maxsize=None)
+def get_model_cascade() -> ModelCascade:
+    """Get the process-wide cascade configured by the settings."""
+    return ModelCascade()
+
+
+def confident(data: Any) -> bool:
+    """Accept a result whose `confidence` reaches `CASCADE_MIN_CONFIDENCE`."""
+    return data.confidence >= settings.CASCADE_MIN_CONFIDENCE
@@ -0,0 +1,268 @@
+"""Process-wide registry of model clients and their HTTP connection pools.
+
+Every kata used to construct its own `AsyncOpenAI` client (and pydantic-ai built yet
+another one for each agent), so each had a separate, cold connection pool. This
+module hands out one client per provider configuration so concurrent katas share
+warm keep-alive connections.
+
+Connection pools belong to the event loop that opened them, so the shared
+`httpx.AsyncClient` routes requests through a `LoopLocalTransport` that keeps one
+pool per running loop. Sequential `asyncio.run()` calls therefore never reuse a
+socket bound to a closed loop, while everything running on the same loop shares
+one pool.
+
+Example Usage:
+    from agentic_ai_kata.utils.clients import get_model, get_openai_client
+
+    deps = Deps(openai=get_openai_client())
+    agent = Agent(get_model(), result_type=Koan)
+"""
+
+import asyncio
+import importlib.util
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterator, Optional
+
+import httpx
+
+from agentic_ai_kata.settings import settings
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+    from pydantic_ai.models import Model
+
+
+@dataclass(frozen=True)
+class ClientConfig:
+    """Everything that distinguishes one pooled client from another.
+
+    Two callers asking for an equal config get the same client back.
+    """
+
+    provider: str = "openai"
+    api_key: Optional[str] = None
+    base_url: Optional[str] = None
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = True
+
+    @classmethod
+    def from_settings(cls, provider: str = "openai") -> "ClientConfig":
+        """Build the config for a provider from the global settings.
+
+        Args:
+            provider: The model provider, e.g. "openai"
+
+        Returns:
+            ClientConfig: The config for that provider
+        """
+        api_key = settings.OPENAI_API_KEY if provider == "openai" else None
+        return cls(
+            provider=provider,
+            api_key=api_key,
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            http2=settings.HTTP2,
+        )
+
+    @property
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+
+def http2_available() -> bool:
+    """Whether the optional `h2` package needed for HTTP/2 is installed."""
+    return importlib.util.find_spec("h2") is not None
+
+
+class LoopLocalTransport(httpx.AsyncBaseTransport):
+    """An httpx transport that keeps one connection pool per event loop."""
+
+    def __init__(self, limits: httpx.Limits, http2: bool = False):
+        self.limits = limits
+        self.http2 = http2
+        self._transports: dict[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport] = {}
+        self._lock = threading.Lock()
+
+    def transport_for_running_loop(self) -> httpx.AsyncHTTPTransport:
+        """Get (or create) the pool for the currently running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            # Pools of closed loops can't be used or closed anymore; just drop them
+            for stale in [lp for lp in self._transports if lp.is_closed()]:
+                del self._transports[stale]
+            transport = self._transports.get(loop)
+            if transport is None:
+                transport = httpx.AsyncHTTPTransport(
+                    limits=self.limits, http2=self.http2
+                )
+                self._transports[loop] = transport
+        return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        transport = self.transport_for_running_loop()
+        return await transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        """Close the pool belonging to the running loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.pop(loop, None)
+        if transport is not None:
+            await transport.aclose()
+
+
+class ClientRegistry:
+    """Caches HTTP and model clients keyed by their `ClientConfig`."""
+
+    def __init__(self):
+        self._http_clients: dict[ClientConfig, httpx.AsyncClient] = {}
+        self._transports: dict[ClientConfig, LoopLocalTransport] = {}
+        self._openai_clients: dict[ClientConfig, "AsyncOpenAI"] = {}
+        self._model_override: Optional["Model"] = None
+        self._lock = threading.Lock()
+
+    def http_client(self, config: ClientConfig) -> httpx.AsyncClient:
+        """Get the pooled `httpx.AsyncClient` for a config.
+
+        Args:
+            config: The client configuration
+
+        Returns:
+            httpx.AsyncClient: A client shared by every caller with the same config
+        """
+        with self._lock:
+            client = self._http_clients.get(config)
+            if client is None:
+                transport = LoopLocalTransport(
+                    config.limits, http2=config.http2 and http2_available()
+                )
+                # Same timeouts as the OpenAI SDK's own default client
+                client = httpx.AsyncClient(
+                    transport=transport,
+                    timeout=httpx.Timeout(timeout=600, connect=5),
+                )
+                self._http_clients[config] = client
+                self._transports[config] = transport
+        return client
+
+    def openai_client(self, config: Optional[ClientConfig] = None) -> "AsyncOpenAI":
+        """Get the shared `AsyncOpenAI` client for a config.
+
+        Args:
+            config: The client configuration, defaults to the global settings
+
+        Returns:
+            AsyncOpenAI: A client shared by every caller with the same config
+        """
+        from openai import AsyncOpenAI
+
+        config = config or ClientConfig.from_settings("openai")
+        http_client = self.http_client(config)
+        with self._lock:
+            client = self._openai_clients.get(config)
+            if client is None:
+                client = AsyncOpenAI(
+                    api_key=config.api_key,
+                    base_url=config.base_url,
+                    http_client=http_client,
+                    # The shared rate limiter retries 429s, pausing every caller for
+                    # Retry-After, and transient errors; SDK retries would each back
+                    # off on their own
+                    max_retries=0,
+                )
+                self._openai_clients[config] = client
+        return client
+
+    def model(self, model_name: Optional[str] = None) -> "Model":
+        """Get a pydantic-ai model that uses the shared client and rate limiter.
+
+        Args:
+            model_name: A pydantic-ai model name, defaults to `settings.DEFAULT_MODEL`
+
+        Returns:
+            Model: The model, bound to the shared client for OpenAI models (or the
+            model set with `override_model`), wrapped in the model's process-wide
+            `RateLimitedModel` and, when `settings.RESPONSE_CACHE` is on, in a
+            `CachedModel`
+        """
+        from pydantic_ai.models import infer_model
+
+        from agentic_ai_kata.utils.rate_limit import RateLimitedModel, get_rate_limiter
+
+        model_name = model_name or settings.DEFAULT_MODEL
+        if self._model_override is not None:
+            model = self._model_override
+        elif model_name.startswith("openai:"):
+            from pydantic_ai.models.openai import OpenAIModel
+
+            model = OpenAIModel(
+                model_name[len("openai:") :], openai_client=self.openai_client()
+            )
+        else:
+            model = infer_model(model_name)
+        model = RateLimitedModel(model, get_rate_limiter(model_name))
+        if settings.RESPONSE_CACHE:
+            from agentic_ai_kata.utils.response_cache import (
+                CachedModel,
+                get_response_cache,
+            )
+
+            # Outside the rate limiter, so cache hits don't use any quota
+            model = CachedModel(model, get_response_cache())
+        return model
+
+    @contextmanager
+    def override_model(self, model: "Model") -> Iterator[None]:
+        """Make `model()` hand out `model` instead of a provider model.
+
+        Benchmarks use this to run unmodified katas against a local stub. The
+        override is process-wide, so it also applies to katas running in other
+        threads.
+
+        Args:
+            model: The model to use for every model name
+        """
+        with self._lock:
+            previous, self._model_override = self._model_override, model
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._model_override = previous
+
+    async def aclose(self) -> None:
+        """Close the running loop's connection pools for every client."""
+        with self._lock:
+            transports = list(self._transports.values())
+        for transport in transports:
+            await transport.aclose()
+
+    def clear(self) -> None:
+        """Forget every cached client (e.g. after settings change in tests)."""
+        with self._lock:
+            self._http_clients.clear()
+            self._transports.clear()
+            self._openai_clients.clear()
+
+
+# Global registry instance shared by every kata in the process
+registry = ClientRegistry()
+
+
+def get_openai_client(config: Optional[ClientConfig] = None) -> "AsyncOpenAI":
+    """Get the process-wide `AsyncOpenAI` client for a config."""
+    return registry.openai_client(config)
+
+
+def get_model(model_name: Optional[str] = None) -> "Model":
+    """Get a pydantic-ai model backed by the process-wide client pool."""
+    return registry.model(model_name)
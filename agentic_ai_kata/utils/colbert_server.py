@@ -0,0 +1,325 @@
+"""A local ColBERTv2-compatible retrieval server for offline and load testing.
+
+`ColBERTv2` talks to a remote `/wiki17_abstracts` endpoint. This server implements
+the same contract over a local corpus (the markdown articles in `articles/` by
+default):
+
+    GET  /wiki17_abstracts?query=...&k=10
+    POST /wiki17_abstracts   {"query": "...", "k": 10}
+        -> {"query": "...", "topk": [{"text", "pid", "rank", "score", "prob"}, ...]}
+
+Passages are ranked by term overlap with an in-memory inverted index, so a query
+costs microseconds and the server can answer thousands of queries per second. To
+reproduce production behaviour it can add:
+
+    - Latency: a base delay, uniform jitter, and a fraction of slow "tail" requests
+    - Errors: a fraction of requests answered with an HTTP error (503 by default)
+    - Payload size: passages padded or truncated to a fixed number of characters
+
+Whether a request is slow or fails depends only on the seed, the query and how many
+times that query has been asked, never on arrival order, so a tail-latency scenario
+replays identically under any concurrency.
+
+Example Usage:
+    # Serve on port 8893 with 50ms +- 10ms latency and 1% errors
+    python -m agentic_ai_kata.utils.colbert_server --port 8893 \\
+        --latency 0.05 --jitter 0.01 --error-rate 0.01
+
+    COLBERT_URL=http://127.0.0.1:8893/wiki17_abstracts python -m ...
+
+    # Or in-process, e.g. in a benchmark
+    with ColBERTStubServer() as server:
+        retriever = ColBERTv2(url=server.url)
+"""
+
+import argparse
+import asyncio
+import heapq
+import math
+import re
+import threading
+import zlib
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from aiohttp import web
+
+ARTICLES = Path(__file__).parent.parent.parent / "articles"
+
+# Same limit as the hosted server (and the `ColBERTv2` client's assertion)
+MAX_K = 100
+
+_WORD = re.compile(r"\w+")
+
+
+def _terms(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def load_corpus(path: Union[str, Path] = ARTICLES) -> List[str]:
+    """Split markdown articles into "Title | paragraph" passages.
+
+    Args:
+        path: A directory of `.md` files, or a text file with one passage per line
+
+    Returns:
+        List[str]: The passages, or placeholders if there are none
+    """
+    path = Path(path)
+    if path.is_file():
+        passages = [line.strip() for line in path.read_text().splitlines()]
+        return [p for p in passages if p]
+
+    passages = []
+    for article in sorted(path.glob("*.md")):
+        title = article.stem.replace("-", " ").title()
+        for block in article.read_text().split("\n\n"):
+            block = block.strip()
+            if block.startswith("# "):
+                title = block.splitlines()[0][2:].strip()
+            elif block and not block.startswith("#"):
+                passages.append(f"{title} | {' '.join(block.split())}")
+    return passages or [f"Placeholder | Passage number {i}." for i in range(100)]
+
+
+class ColBERTStubServer:
+    """Serves top-k passages from a local corpus, with injectable latency and errors."""
+
+    def __init__(
+        self,
+        passages: Optional[List[str]] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        tail_rate: float = 0.0,
+        tail_latency: float = 1.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        passage_chars: Optional[int] = None,
+        seed: int = 0,
+    ):
+        """
+        Initializes the server (use `create_app()`, `start()` or a `with` block).
+
+        Args:
+            passages: The corpus, defaults to `load_corpus()`.
+            latency: Seconds added to every request.
+            jitter: Up to this many seconds added to or taken off `latency`.
+            tail_rate: Fraction of requests that take `tail_latency` extra.
+            tail_latency: Extra seconds for a tail request.
+            error_rate: Fraction of requests answered with `error_status`.
+            error_status: The HTTP status of injected errors.
+            passage_chars: Pad or truncate passages to this length (payload size).
+            seed: Seed deciding which requests are slow or fail.
+        """
+        self.passages = passages if passages is not None else load_corpus()
+        if passage_chars is not None:
+            self.passages = [
+                p[:passage_chars].ljust(passage_chars) for p in self.passages
+            ]
+        self.latency = latency
+        self.jitter = jitter
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.seed = seed
+        self.stats = Counter()
+        self._asked: Counter = Counter()
+        self._index = self._build_index()
+        self._runner: Optional[web.AppRunner] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self.url = ""
+
+    def _build_index(self) -> Dict[str, List[Tuple[int, int]]]:
+        """Map each term to the (passage id, term count) pairs containing it."""
+        index: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for pid, passage in enumerate(self.passages):
+            for term, count in Counter(_terms(passage)).items():
+                index[term].append((pid, count))
+        return dict(index)
+
+    def search(self, query: str, k: int = 10) -> List[dict]:
+        """Rank passages by idf-weighted term overlap with the query.
+
+        Passages that share no term with the query are appended in a
+        query-dependent order, so there are always `k` results, as with ColBERT.
+
+        Args:
+            query: The search query
+            k: How many passages to return
+
+        Returns:
+            List[dict]: The top-k passages, best first
+        """
+        k = max(0, min(k, MAX_K, len(self.passages)))
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(_terms(query)):
+            postings = self._index.get(term, ())
+            if not postings:
+                continue
+            idf = math.log(1 + len(self.passages) / len(postings))
+            for pid, count in postings:
+                scores[pid] += idf * (1 + math.log(count))
+        ranked = heapq.nlargest(
+            k, scores.items(), key=lambda item: (item[1], -item[0])
+        )
+        if len(ranked) < k:
+            start = zlib.crc32(query.encode()) % len(self.passages)
+            for offset in range(len(self.passages)):
+                pid = (start + offset) % len(self.passages)
+                if pid not in scores:
+                    ranked.append((pid, 0.0))
+                    if len(ranked) == k:
+                        break
+
+        best = ranked[0][1] if ranked else 0.0
+        total = sum(math.exp(score - best) for _, score in ranked) or 1.0
+        return [
+            {
+                "text": self.passages[pid],
+                "pid": pid,
+                "rank": rank,
+                "score": score,
+                "prob": math.exp(score - best) / total,
+            }
+            for rank, (pid, score) in enumerate(ranked, start=1)
+        ]
+
+    def _draw(self, query: str, occurrence: int, purpose: str) -> float:
+        """A deterministic value in [0, 1] for one request."""
+        key = f"{self.seed}:{purpose}:{occurrence}:{query}".encode()
+        return zlib.crc32(key) / 0xFFFFFFFF
+
+    def delay_for(self, query: str, occurrence: int) -> float:
+        """Seconds to wait before answering the `occurrence`-th ask of `query`."""
+        delay = self.latency
+        if self.jitter:
+            delay += self.jitter * (2 * self._draw(query, occurrence, "jitter") - 1)
+        if self.tail_rate and self._draw(query, occurrence, "tail") < self.tail_rate:
+            delay += self.tail_latency
+        return max(0.0, delay)
+
+    def fails(self, query: str, occurrence: int) -> bool:
+        """Whether the `occurrence`-th ask of `query` gets an injected error."""
+        return bool(self.error_rate) and (
+            self._draw(query, occurrence, "error") < self.error_rate
+        )
+
+    async def handle_search(self, request: web.Request) -> web.Response:
+        """Answer a GET or POST query with the ColBERTv2 response format."""
+        try:
+            if request.method == "POST":
+                payload = await request.json()
+            else:
+                payload = request.query
+            query = str(payload["query"])
+            k = int(payload.get("k", 10))
+        except (KeyError, ValueError, TypeError):
+            self.stats["invalid"] += 1
+            return web.json_response({"error": "query and k are required"}, status=400)
+
+        occurrence = self._asked[query]
+        self._asked[query] += 1
+        self.stats["requests"] += 1
+        delay = self.delay_for(query, occurrence)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.fails(query, occurrence):
+            self.stats["errors"] += 1
+            return web.json_response(
+                {"error": "injected failure"}, status=self.error_status
+            )
+        return web.json_response({"query": query, "topk": self.search(query, k)})
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response({"passages": len(self.passages), **self.stats})
+
+    def create_app(self, path: str = "/wiki17_abstracts") -> web.Application:
+        """Build the aiohttp application serving this corpus at `path`."""
+        app = web.Application()
+        app.router.add_get(path, self.handle_search)
+        app.router.add_post(path, self.handle_search)
+        app.router.add_get("/stats", self.handle_stats)
+        return app
+
+    async def _serve(self, host: str, port: int) -> str:
+        self._runner = web.AppRunner(self.create_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}/wiki17_abstracts"
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve from a background thread (so sync clients can use it too).
+
+        Args:
+            host: The interface to bind
+            port: The port, 0 for any free port
+
+        Returns:
+            str: The endpoint URL, also kept in `self.url`
+        """
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        future = asyncio.run_coroutine_threadsafe(self._serve(host, port), self._loop)
+        self.url = future.result()
+        return self.url
+
+    def stop(self) -> None:
+        """Stop the background server started with `start()`."""
+        if self._loop is None:
+            return
+        if self._runner is not None:
+            asyncio.run_coroutine_threadsafe(
+                self._runner.cleanup(), self._loop
+            ).result()
+            self._runner = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+    def __enter__(self) -> "ColBERTStubServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local ColBERTv2-compatible server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8893)
+    parser.add_argument("--corpus", default=str(ARTICLES), help="directory or file")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--tail-rate", type=float, default=0.0)
+    parser.add_argument("--tail-latency", type=float, default=1.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--passage-chars", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = ColBERTStubServer(
+        load_corpus(args.corpus),
+        latency=args.latency,
+        jitter=args.jitter,
+        tail_rate=args.tail_rate,
+        tail_latency=args.tail_latency,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        passage_chars=args.passage_chars,
+        seed=args.seed,
+    )
+    print(f"Serving {len(server.passages)} passages")
+    web.run_app(server.create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,6 @@
 from typing import Any, Optional, Union
 
-import aiohttp
-import requests
+from agentic_ai_kata.utils.instrumentation import span
 
 
 class ColBERTv2:
@@ -83,12 +82,15 @@ class ColBERTv2:
             A list of strings (if simplify=True) or a list of dictionaries (if simplify=False)
             representing the retrieved passages.
         """
-        if self.post_requests:
-            topk: list[dict[str, Any]] = await colbertv2_post_request(
-                self.url, query, k
-            )
-        else:
-            topk: list[dict[str, Any]] = await colbertv2_get_request(self.url, query, k)
+        with span("retrieval", "colbertv2", k=k):
+            if self.post_requests:
+                topk: list[dict[str, Any]] = await colbertv2_post_request(
+                    self.url, query, k
+                )
+            else:
+                topk: list[dict[str, Any]] = await colbertv2_get_request(
+                    self.url, query, k
+                )
 
         if simplify:
             return [psg["long_text"] for psg in topk]
@@ -111,10 +113,15 @@ class ColBERTv2:
             A list of strings (if simplify=True) or a list of dictionaries (if simplify=False)
             representing the retrieved passages.
         """
-        if self.post_requests:
-            topk: list[dict[str, Any]] = colbertv2_post_request_sync(self.url, query, k)
-        else:
-            topk: list[dict[str, Any]] = colbertv2_get_request_sync(self.url, query, k)
+        with span("retrieval", "colbertv2", k=k):
+            if self.post_requests:
+                topk: list[dict[str, Any]] = colbertv2_post_request_sync(
+                    self.url, query, k
+                )
+            else:
+                topk: list[dict[str, Any]] = colbertv2_get_request_sync(
+                    self.url, query, k
+                )
 
         if simplify:
             return [psg["long_text"] for psg in topk]
@@ -138,6 +145,8 @@ async def colbertv2_get_request(url: str, query: str, k: int) -> list[dict[str,
         k <= 100
     ), "Only k <= 100 is supported for the hosted ColBERTv2 server at the moment."
 
+    import aiohttp
+
     payload = {"query": query, "k": k}
     async with aiohttp.ClientSession() as session:
         async with session.get(url, params=payload, timeout=10) as res:
@@ -162,6 +171,8 @@ def colbertv2_get_request_sync(url: str, query: str, k: int) -> list[dict[str, A
         k <= 100
     ), "Only k <= 100 is supported for the hosted ColBERTv2 server at the moment."
 
+    import requests
+
     payload = {"query": query, "k": k}
     res = requests.get(url, params=payload, timeout=10)
 
@@ -182,6 +193,8 @@ async def colbertv2_post_request(url: str, query: str, k: int) -> list[dict[str,
     Returns:
         A list of dictionaries representing the retrieved passages.
     """
+    import aiohttp
+
     headers = {"Content-Type": "application/json; charset=utf-8"}
     payload = {"query": query, "k": k}
     async with aiohttp.ClientSession() as session:
@@ -202,6 +215,8 @@ def colbertv2_post_request_sync(url: str, query: str, k: int) -> list[dict[str,
     Returns:
         A list of dictionaries representing the retrieved passages.
     """
+    import requests
+
     headers = {"Content-Type": "application/json; charset=utf-8"}
     payload = {"query": query, "k": k}
     res = requests.post(url, json=payload, headers=headers, timeout=10)
@@ -0,0 +1,876 @@
+"""Storage backends for generated conversations.
+
+The example conversations started out as one pretty-printed JSON file per
+conversation under `conversations/`. That's convenient to read in a diff but every
+lookup other than by file name means opening every file. A `ConversationStore`
+keeps the same name -> `Conversation` interface with lookups by:
+
+    - Conversation id
+    - Participant phone number (any message's `from_` or `to`)
+    - Topic
+    - Message `createdAt` time range
+
+Backends:
+    - `DirectoryStore`: the original one-JSON-file-per-conversation layout
+    - `JsonlStore`: a single append-only JSON lines file, indexed in memory by
+      byte offset so a conversation is read with one seek
+    - `SqliteStore`: a SQLite database with real indexes, for large fixture sets
+
+`DirectoryStore` and `JsonlStore` build their secondary indexes on first use from
+the raw JSON, without validating every conversation. The in-memory indexes hold a
+few fields per conversation, never one entry per message.
+
+`append_message()` adds one message to a conversation, e.g. an inbound SMS. The
+JSONL and SQLite backends store the message on its own (a line, a row) instead of
+rewriting the conversation, so a thread of n messages isn't rewritten n times.
+
+`iter_messages()` streams every stored message in `createdAt` order for bulk jobs
+such as re-routing historical traffic. It's a k-way merge across conversations that
+only opens (and validates) a conversation once the merge reaches its first
+message, so memory follows the number of conversations active at the same time
+rather than the size of the corpus. Messages are validated in bulk, a
+conversation (or a batch of rows) per `TypeAdapter` call, which is cheaper than
+validating them one at a time.
+
+Stored JSON is parsed with `orjson` when it's installed.
+
+Example Usage:
+    # .env
+    CONVERSATION_STORE=sqlite
+
+    store = get_conversation_store()
+    store.save_many({"casual_banter": conversation})
+    for conversation in store.find(participant="+12345678901", since=1736043000):
+        print(conversation.topic)
+
+    for message in store.iter_messages():
+        print(message.createdAt, message.body)
+"""
+
+import heapq
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Union,
+)
+
+from pydantic import TypeAdapter
+
+from agentic_ai_kata.settings import settings
+from agentic_ai_kata.utils.text_message import Conversation, TextMessage, get_cache_dir
+
+try:
+    from orjson import loads as _loads
+except ImportError:  # Optional: only speeds up loads
+    from json import loads as _loads
+
+# Validates a list of messages in one call
+_MESSAGES = TypeAdapter(List[TextMessage])
+
+STORE_BACKENDS = ("directory", "jsonl", "sqlite")
+
+# Every SqliteStore table, each keyed by the conversation's name
+_SQLITE_TABLES = ("conversations", "participants", "messages", "appended_messages")
+
+# Names per `WHERE name IN (...)` query, well under SQLite's variable limit
+_SQLITE_BATCH = 500
+
+
+def _participants(data: Dict[str, Any]) -> set[str]:
+    """Phone numbers in a serialized conversation's messages."""
+    phones = set()
+    for message in data.get("messages") or []:
+        # Cached files use the field name, API payloads the "from" alias
+        phones.add(message.get("from_", message.get("from")))
+        phones.add(message.get("to"))
+    phones.discard(None)
+    return phones
+
+
+def _timestamps(data: Dict[str, Any]) -> List[int]:
+    """Message creation times in a serialized conversation."""
+    return [m["createdAt"] for m in data.get("messages") or [] if "createdAt" in m]
+
+
+def merge_messages(
+    first_created: Mapping[str, int],
+    load_raw: Callable[[str], Optional[Dict[str, Any]]],
+) -> Iterator[TextMessage]:
+    """Merge the messages of many conversations into one `createdAt`-ordered stream.
+
+    Conversations are loaded, and their messages validated together, only when the
+    merge reaches their first message. Messages with the same `createdAt` come out
+    in conversation name order, then in their stored order.
+
+    Args:
+        first_created: Each conversation's name mapped to its earliest `createdAt`
+        load_raw: Loads a conversation's parsed JSON by name
+
+    Yields:
+        TextMessage: Every message, oldest first
+    """
+    pending = sorted((first, name) for name, first in first_created.items())
+    next_pending = 0
+    # (createdAt, name, position, message, rest of the conversation)
+    heap: List[tuple] = []
+
+    def push_next(name: str, stream: Iterator) -> None:
+        for position, message in stream:
+            heapq.heappush(heap, (message.createdAt, name, position, message, stream))
+            return
+
+    while heap or next_pending < len(pending):
+        # Open every conversation that starts before the earliest queued message
+        while next_pending < len(pending) and (
+            not heap or pending[next_pending] <= heap[0][:2]
+        ):
+            name = pending[next_pending][1]
+            next_pending += 1
+            data = load_raw(name) or {}
+            raw = sorted(data.get("messages") or [], key=lambda m: m["createdAt"])
+            push_next(name, enumerate(_MESSAGES.validate_python(raw)))
+        if not heap:
+            continue
+        _, name, _, message, stream = heapq.heappop(heap)
+        yield message
+        push_next(name, stream)
+
+
+def _in_range(
+    conversation: Conversation, since: Optional[int], until: Optional[int]
+) -> bool:
+    """Whether a conversation has a message created in [since, until)."""
+    low = -(2**63) if since is None else since
+    high = 2**63 if until is None else until
+    return any(low <= m.createdAt < high for m in conversation.messages)
+
+
+class ConversationIndex:
+    """In-memory secondary indexes over serialized conversations, keyed by name.
+
+    Times are indexed per conversation (its earliest and latest message), not per
+    message, so the index's size doesn't grow with the length of conversations.
+    """
+
+    def __init__(self):
+        self.by_id: Dict[str, str] = {}
+        self.by_participant: Dict[str, set[str]] = {}
+        self.by_topic: Dict[str, set[str]] = {}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, name: str, data: Dict[str, Any]) -> None:
+        """Index a conversation, replacing any earlier version with the same name.
+
+        Args:
+            name: The conversation's name in the store
+            data: The conversation as parsed JSON
+        """
+        self.remove(name)
+        timestamps = _timestamps(data)
+        entry = {
+            "id": data.get("id"),
+            "topic": data.get("topic", ""),
+            "participants": _participants(data),
+            "first": min(timestamps, default=None),
+            "last": max(timestamps, default=None),
+        }
+        self._entries[name] = entry
+        self.by_id[entry["id"]] = name
+        self.by_topic.setdefault(entry["topic"], set()).add(name)
+        for phone in entry["participants"]:
+            self.by_participant.setdefault(phone, set()).add(name)
+
+    def add_message(self, name: str, message: Dict[str, Any]) -> None:
+        """Index a message appended to an indexed conversation.
+
+        Args:
+            name: The conversation's name in the store
+            message: The message as parsed JSON
+        """
+        entry = self._entries.get(name)
+        if entry is None:
+            return
+        for phone in _participants({"messages": [message]}) - entry["participants"]:
+            entry["participants"].add(phone)
+            self.by_participant.setdefault(phone, set()).add(name)
+        if "createdAt" in message:
+            created = message["createdAt"]
+            if entry["first"] is None:
+                entry["first"] = entry["last"] = created
+            else:
+                entry["first"] = min(entry["first"], created)
+                entry["last"] = max(entry["last"], created)
+
+    def first_created(self) -> Dict[str, int]:
+        """Each conversation's earliest message time, skipping empty conversations."""
+        return {
+            name: entry["first"]
+            for name, entry in self._entries.items()
+            if entry["first"] is not None
+        }
+
+    def remove(self, name: str) -> None:
+        """Drop a conversation from every index."""
+        entry = self._entries.pop(name, None)
+        if entry is None:
+            return
+        if self.by_id.get(entry["id"]) == name:
+            del self.by_id[entry["id"]]
+        self.by_topic[entry["topic"]].discard(name)
+        for phone in entry["participants"]:
+            self.by_participant[phone].discard(name)
+
+    def find(
+        self,
+        participant: Optional[str] = None,
+        topic: Optional[str] = None,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+    ) -> List[str]:
+        """Names of conversations matching every given filter, sorted.
+
+        Time filters match conversations whose messages span overlaps
+        [since, until), which may include some with no message in the range; check
+        the loaded conversations with `_in_range` to drop them.
+
+        Args:
+            participant: A phone number that sent or received a message
+            topic: The conversation's topic slug
+            since: Only conversations with a message created at or after this time
+            until: Only conversations with a message created before this time
+
+        Returns:
+            List[str]: The matching names
+        """
+        candidates: Optional[set[str]] = None
+
+        def narrow(names: Iterable[str]) -> None:
+            nonlocal candidates
+            names = set(names)
+            candidates = names if candidates is None else candidates & names
+
+        if participant is not None:
+            narrow(self.by_participant.get(participant, ()))
+        if topic is not None:
+            narrow(self.by_topic.get(topic, ()))
+        if since is not None or until is not None:
+            narrow(
+                name
+                for name, entry in self._entries.items()
+                if entry["first"] is not None
+                and (until is None or entry["first"] < until)
+                and (since is None or entry["last"] >= since)
+            )
+        if candidates is None:
+            candidates = set(self._entries)
+        return sorted(candidates)
+
+
+class ConversationStore(ABC):
+    """A named collection of conversations with indexed lookups."""
+
+    @staticmethod
+    def _conversation_from_json(text: Union[str, bytes]) -> Conversation:
+        # Parsing with orjson, then validating, beats `model_validate_json`
+        return Conversation.model_validate(_loads(text))
+
+    @abstractmethod
+    def load(self, name: str) -> Optional[Conversation]:
+        """Load a conversation by name, or None if it isn't stored."""
+
+    @abstractmethod
+    def save_many(self, conversations: Mapping[str, Conversation]) -> None:
+        """Store several conversations at once, replacing any with the same name."""
+
+    @abstractmethod
+    def names(self) -> List[str]:
+        """The names of every stored conversation, sorted."""
+
+    @abstractmethod
+    def get_by_id(self, conversation_id: str) -> Optional[Conversation]:
+        """Load a conversation by its `Conversation.id`."""
+
+    @abstractmethod
+    def find(
+        self,
+        participant: Optional[str] = None,
+        topic: Optional[str] = None,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+    ) -> List[Conversation]:
+        """Conversations matching every given filter (see `ConversationIndex.find`)."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove every conversation."""
+
+    def save(self, name: str, conversation: Conversation) -> None:
+        """Store a single conversation."""
+        self.save_many({name: conversation})
+
+    def append_message(
+        self,
+        name: str,
+        message: TextMessage,
+        who: Optional[List[Dict[str, str]]] = None,
+    ) -> None:
+        """Add one message to a conversation, creating the conversation if needed.
+
+        This default loads and re-saves the whole conversation; backends that can
+        store a message on its own override it.
+
+        Args:
+            name: The conversation's name in the store
+            message: The message to add
+            who: The participants, if the conversation has to be created
+        """
+        conversation = self.load(name) or Conversation(who=who or [])
+        conversation.insert_message(message)
+        self.save(name, conversation)
+
+    def load_many(self, names: Iterable[str]) -> Dict[str, Conversation]:
+        """Load several conversations, skipping names that aren't stored."""
+        loaded = {}
+        for name in names:
+            conversation = self.load(name)
+            if conversation is not None:
+                loaded[name] = conversation
+        return loaded
+
+    def items(self) -> Iterator[tuple[str, Conversation]]:
+        """Iterate over every (name, conversation) pair."""
+        for name in self.names():
+            conversation = self.load(name)
+            if conversation is not None:
+                yield name, conversation
+
+    @abstractmethod
+    def iter_messages(self) -> Iterator[TextMessage]:
+        """Stream every stored message in `createdAt` order (see `merge_messages`)."""
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.names()
+
+    def __len__(self) -> int:
+        return len(self.names())
+
+
+class DirectoryStore(ConversationStore):
+    """One pretty-printed `<name>.json` file per conversation (the original format)."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._index: Optional[ConversationIndex] = None
+        self._lock = threading.Lock()
+
+    def _file(self, name: str) -> Path:
+        return self.path / f"{name}.json"
+
+    def _get_index(self) -> ConversationIndex:
+        with self._lock:
+            if self._index is None:
+                index = ConversationIndex()
+                for file in self.path.glob("*.json"):
+                    index.add(file.stem, _loads(file.read_bytes()))
+                self._index = index
+            return self._index
+
+    def load(self, name: str) -> Optional[Conversation]:
+        cache_file = self._file(name)
+        if cache_file.exists():
+            with open(cache_file, "rb") as f:
+                return self._conversation_from_json(f.read())
+        return None
+
+    def save_many(self, conversations: Mapping[str, Conversation]) -> None:
+        for name, conversation in conversations.items():
+            encoded = conversation.model_dump_json(indent=2)
+            # Write to a temporary file and rename it into place, so a crash (or a
+            # concurrent reader) never sees a half-written conversation
+            fd, tmp_path = tempfile.mkstemp(
+                dir=self.path, prefix=f".{name}.", suffix=".tmp"
+            )
+            try:
+                with os.fdopen(fd, "w") as f:
+                    f.write(encoded)
+                os.replace(tmp_path, self._file(name))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            with self._lock:
+                if self._index is not None:
+                    self._index.add(name, json.loads(encoded))
+
+    def names(self) -> List[str]:
+        return sorted(file.stem for file in self.path.glob("*.json"))
+
+    def _load_raw(self, name: str) -> Optional[Dict[str, Any]]:
+        cache_file = self._file(name)
+        if cache_file.exists():
+            return _loads(cache_file.read_bytes())
+        return None
+
+    def iter_messages(self) -> Iterator[TextMessage]:
+        return merge_messages(self._get_index().first_created(), self._load_raw)
+
+    def __contains__(self, name: str) -> bool:
+        return self._file(name).exists()
+
+    def get_by_id(self, conversation_id: str) -> Optional[Conversation]:
+        name = self._get_index().by_id.get(conversation_id)
+        return None if name is None else self.load(name)
+
+    def find(self, participant=None, topic=None, since=None, until=None):
+        names = self._get_index().find(participant, topic, since, until)
+        found = self.load_many(names).values()
+        if since is None and until is None:
+            return list(found)
+        return [c for c in found if _in_range(c, since, until)]
+
+    def clear(self) -> None:
+        for file in self.path.glob("*.json"):
+            file.unlink()
+        with self._lock:
+            self._index = None
+
+
+class JsonlStore(ConversationStore):
+    """An append-only JSON lines file of `{"name": ..., "conversation": ...}` records.
+
+    Saving appends a line; the last line for a name wins. `append_message` appends a
+    `{"name": ..., "message": ...}` line instead, which is added to the name's latest
+    conversation record when it's loaded. `compact()` rewrites the file with only the
+    live records, folding appended messages into their conversations.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch(exist_ok=True)
+        self._offsets: Dict[str, int] = {}
+        # Offsets of messages appended after each name's conversation record
+        self._appended: Dict[str, List[int]] = {}
+        self._index = ConversationIndex()
+        self._lock = threading.Lock()
+        self._scan()
+
+    def _scan(self) -> None:
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                if line.strip():
+                    record = _loads(line)
+                    name = record["name"]
+                    if "message" in record:
+                        if name in self._offsets:
+                            self._appended.setdefault(name, []).append(offset)
+                            self._index.add_message(name, record["message"])
+                    else:
+                        self._offsets[name] = offset
+                        self._appended.pop(name, None)
+                        self._index.add(name, record["conversation"])
+                offset += len(line)
+
+    def _load_raw(self, name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            offset = self._offsets.get(name)
+            appended = list(self._appended.get(name, ()))
+        if offset is None:
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = _loads(f.readline())["conversation"]
+            if appended:
+                # Validation sorts them in, after stored messages with the same time
+                data["messages"] = list(data.get("messages") or [])
+                for message_offset in appended:
+                    f.seek(message_offset)
+                    data["messages"].append(_loads(f.readline())["message"])
+        return data
+
+    def load(self, name: str) -> Optional[Conversation]:
+        data = self._load_raw(name)
+        return None if data is None else Conversation.model_validate(data)
+
+    def iter_messages(self) -> Iterator[TextMessage]:
+        with self._lock:
+            first_created = self._index.first_created()
+        return merge_messages(first_created, self._load_raw)
+
+    @staticmethod
+    def _encode(name: str, data: Dict[str, Any], kind: str = "conversation") -> bytes:
+        record = {"name": name, kind: data}
+        return (json.dumps(record, separators=(",", ":")) + "\n").encode()
+
+    def save_many(self, conversations: Mapping[str, Conversation]) -> None:
+        with self._lock, open(self.path, "ab") as f:
+            offset = f.tell()
+            for name, conversation in conversations.items():
+                data = conversation.model_dump(mode="json")
+                line = self._encode(name, data)
+                f.write(line)
+                self._offsets[name] = offset
+                self._appended.pop(name, None)
+                self._index.add(name, data)
+                offset += len(line)
+
+    def append_message(
+        self,
+        name: str,
+        message: TextMessage,
+        who: Optional[List[Dict[str, str]]] = None,
+    ) -> None:
+        with self._lock, open(self.path, "ab") as f:
+            offset = f.tell()
+            if name in self._offsets:
+                data = message.model_dump(mode="json")
+                f.write(self._encode(name, data, "message"))
+                self._appended.setdefault(name, []).append(offset)
+                self._index.add_message(name, data)
+            else:
+                conversation = Conversation(who=who or [], messages=[message])
+                data = conversation.model_dump(mode="json")
+                f.write(self._encode(name, data))
+                self._offsets[name] = offset
+                self._index.add(name, data)
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return sorted(self._offsets)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._offsets
+
+    def get_by_id(self, conversation_id: str) -> Optional[Conversation]:
+        with self._lock:
+            name = self._index.by_id.get(conversation_id)
+        return None if name is None else self.load(name)
+
+    def find(self, participant=None, topic=None, since=None, until=None):
+        with self._lock:
+            names = self._index.find(participant, topic, since, until)
+        found = self.load_many(names).values()
+        if since is None and until is None:
+            return list(found)
+        return [c for c in found if _in_range(c, since, until)]
+
+    def compact(self) -> None:
+        """Rewrite the file keeping only the latest record for each name."""
+        live = dict(self.items())
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with self._lock:
+            with open(tmp_path, "wb") as f:
+                for name, conversation in live.items():
+                    f.write(self._encode(name, conversation.model_dump(mode="json")))
+            os.replace(tmp_path, self.path)
+            self._offsets.clear()
+            self._appended.clear()
+            self._index = ConversationIndex()
+            self._scan()
+
+    def clear(self) -> None:
+        with self._lock:
+            self.path.write_bytes(b"")
+            self._offsets.clear()
+            self._appended.clear()
+            self._index = ConversationIndex()
+
+
+class SqliteStore(ConversationStore):
+    """Conversations in SQLite, with indexes on id, participants, topic and time.
+
+    `append_message` inserts a row into `appended_messages` rather than rewriting the
+    conversation; appended messages are added to their conversation when it's
+    loaded, and folded into it the next time it's saved.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS conversations ("
+            " name TEXT PRIMARY KEY, id TEXT, topic TEXT, data TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS conversations_id ON conversations (id);"
+            "CREATE INDEX IF NOT EXISTS conversations_topic ON conversations (topic);"
+            "CREATE TABLE IF NOT EXISTS participants (name TEXT, phone TEXT);"
+            "CREATE INDEX IF NOT EXISTS participants_phone ON participants (phone);"
+            "CREATE INDEX IF NOT EXISTS participants_name ON participants (name);"
+            "CREATE TABLE IF NOT EXISTS messages (name TEXT, created_at INTEGER);"
+            "CREATE INDEX IF NOT EXISTS messages_created_at"
+            " ON messages (created_at);"
+            "CREATE INDEX IF NOT EXISTS messages_name ON messages (name);"
+            "CREATE TABLE IF NOT EXISTS appended_messages"
+            " (name TEXT, data TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS appended_messages_name"
+            " ON appended_messages (name);"
+        )
+        self._db.commit()
+
+    def _delete(self, names: List[str]) -> None:
+        rows = [(name,) for name in names]
+        for table in _SQLITE_TABLES:
+            self._db.executemany(f"DELETE FROM {table} WHERE name = ?", rows)
+
+    def _with_appended(
+        self, rows: List[tuple[str, str]], every: bool = False
+    ) -> List[tuple[str, Union[str, Dict[str, Any]]]]:
+        """Add appended messages to (name, data) rows; call with the lock held.
+
+        Args:
+            rows: The (name, data) rows of the conversations loaded
+            every: Whether `rows` holds every conversation, so the whole
+                appended_messages table is read rather than looked up by name
+
+        Returns:
+            The rows, with the data of conversations that have appended messages
+            parsed and extended
+        """
+        if every:
+            appended = self._db.execute(
+                "SELECT name, data FROM appended_messages ORDER BY rowid"
+            ).fetchall()
+        else:
+            names = [name for name, _ in rows]
+            appended = []
+            for start in range(0, len(names), _SQLITE_BATCH):
+                batch = names[start : start + _SQLITE_BATCH]
+                appended += self._db.execute(
+                    "SELECT name, data FROM appended_messages"
+                    f" WHERE name IN ({','.join('?' * len(batch))}) ORDER BY rowid",
+                    batch,
+                ).fetchall()
+        if not appended:
+            return rows
+        extra: Dict[str, List[Dict[str, Any]]] = {}
+        for name, raw in appended:
+            extra.setdefault(name, []).append(json.loads(raw))
+        merged = []
+        for name, data in rows:
+            if name in extra:
+                parsed = json.loads(data)
+                # Validation sorts them in, after stored messages with the same time
+                parsed["messages"] = (parsed.get("messages") or []) + extra[name]
+                data = parsed
+            merged.append((name, data))
+        return merged
+
+    def _conversation(self, data: Union[str, Dict[str, Any]]) -> Conversation:
+        if isinstance(data, str):
+            return self._conversation_from_json(data)
+        return Conversation.model_validate(data)
+
+    def load(self, name: str) -> Optional[Conversation]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT name, data FROM conversations WHERE name = ?", (name,)
+            ).fetchall()
+            rows = self._with_appended(rows) if rows else rows
+        return self._conversation(rows[0][1]) if rows else None
+
+    def load_many(self, names: Iterable[str]) -> Dict[str, Conversation]:
+        names = list(names)
+        if not names:
+            return {}
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT name, data FROM conversations"
+                f" WHERE name IN ({','.join('?' * len(names))})",
+                names,
+            ).fetchall()
+            rows = self._with_appended(rows) if rows else rows
+        found = {name: self._conversation(data) for name, data in rows}
+        return {name: found[name] for name in names if name in found}
+
+    def _insert(self, name: str, conversation: Conversation) -> None:
+        data = conversation.model_dump(mode="json")
+        self._db.execute(
+            "INSERT INTO conversations VALUES (?, ?, ?, ?)",
+            (name, conversation.id, conversation.topic, json.dumps(data)),
+        )
+        self._db.executemany(
+            "INSERT INTO participants VALUES (?, ?)",
+            [(name, phone) for phone in _participants(data)],
+        )
+        self._db.executemany(
+            "INSERT INTO messages VALUES (?, ?)",
+            [(name, created) for created in _timestamps(data)],
+        )
+
+    def save_many(self, conversations: Mapping[str, Conversation]) -> None:
+        with self._lock:
+            self._delete(list(conversations))
+            for name, conversation in conversations.items():
+                self._insert(name, conversation)
+            self._db.commit()
+
+    def append_message(
+        self,
+        name: str,
+        message: TextMessage,
+        who: Optional[List[Dict[str, str]]] = None,
+    ) -> None:
+        with self._lock:
+            exists = self._db.execute(
+                "SELECT 1 FROM conversations WHERE name = ?", (name,)
+            ).fetchone()
+            if exists is None:
+                self._insert(name, Conversation(who=who or [], messages=[message]))
+            else:
+                data = message.model_dump(mode="json")
+                self._db.execute(
+                    "INSERT INTO appended_messages VALUES (?, ?)",
+                    (name, json.dumps(data)),
+                )
+                self._db.execute(
+                    "INSERT INTO messages VALUES (?, ?)", (name, message.createdAt)
+                )
+                self._db.executemany(
+                    "INSERT INTO participants SELECT ?, ? WHERE NOT EXISTS"
+                    " (SELECT 1 FROM participants WHERE name = ? AND phone = ?)",
+                    [
+                        (name, phone, name, phone)
+                        for phone in _participants({"messages": [data]})
+                    ],
+                )
+            self._db.commit()
+
+    def names(self) -> List[str]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT name FROM conversations ORDER BY name"
+            ).fetchall()
+        return [name for (name,) in rows]
+
+    def items(self) -> Iterator[tuple[str, Conversation]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT name, data FROM conversations ORDER BY name"
+            ).fetchall()
+            rows = self._with_appended(rows, every=True) if rows else rows
+        for name, data in rows:
+            yield name, self._conversation(data)
+
+    def iter_messages(self, batch_size: int = 500) -> Iterator[TextMessage]:
+        # SQLite does the merge: one sorted query over every message, read in batches
+        with self._lock:
+            # Appended messages come after stored ones with the same time and name
+            cursor = self._db.execute(
+                "SELECT value FROM ("
+                " SELECT m.value, json_extract(m.value, '$.createdAt') AS created,"
+                " c.name, m.key AS position"
+                " FROM conversations c, json_each(c.data, '$.messages') m"
+                " UNION ALL"
+                " SELECT data, json_extract(data, '$.createdAt'), name,"
+                " (1 << 40) + rowid FROM appended_messages"
+                ") ORDER BY created, name, position"
+            )
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield from _MESSAGES.validate_json(
+                "[" + ",".join(raw for (raw,) in rows) + "]"
+            )
+
+    def __contains__(self, name: str) -> bool:
+        with self._lock:
+            return (
+                self._db.execute(
+                    "SELECT 1 FROM conversations WHERE name = ?", (name,)
+                ).fetchone()
+                is not None
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+    def get_by_id(self, conversation_id: str) -> Optional[Conversation]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT name, data FROM conversations WHERE id = ? LIMIT 1",
+                (conversation_id,),
+            ).fetchall()
+            rows = self._with_appended(rows) if rows else rows
+        return self._conversation(rows[0][1]) if rows else None
+
+    def find(self, participant=None, topic=None, since=None, until=None):
+        clauses, params = [], []
+        if participant is not None:
+            clauses.append(
+                "name IN (SELECT name FROM participants WHERE phone = ?)"
+            )
+            params.append(participant)
+        if topic is not None:
+            clauses.append("topic = ?")
+            params.append(topic)
+        if since is not None or until is not None:
+            clauses.append(
+                "name IN (SELECT name FROM messages"
+                " WHERE created_at >= ? AND created_at < ?)"
+            )
+            params += [
+                since if since is not None else -(2**63),
+                until if until is not None else 2**63 - 1,
+            ]
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT name, data FROM conversations{where} ORDER BY name", params
+            ).fetchall()
+            rows = self._with_appended(rows) if rows else rows
+        return [self._conversation(data) for _, data in rows]
+
+    def clear(self) -> None:
+        with self._lock:
+            for table in _SQLITE_TABLES:
+                self._db.execute(f"DELETE FROM {table}")
+            self._db.commit()
+
+
+def open_store(
+    backend: str, path: Optional[Union[str, Path]] = None
+) -> ConversationStore:
+    """Open a conversation store.
+
+    Args:
+        backend: One of "directory", "jsonl" or "sqlite"
+        path: Where the store lives, defaults to a location in the conversations
+            directory
+
+    Returns:
+        ConversationStore: The opened store
+    """
+    if backend == "directory":
+        return DirectoryStore(path or get_cache_dir())
+    if backend == "jsonl":
+        return JsonlStore(path or get_cache_dir() / "conversations.jsonl")
+    if backend == "sqlite":
+        return SqliteStore(path or get_cache_dir() / "conversations.sqlite3")
+    raise ValueError(
+        f"Unknown conversation store {backend!r}, expected one of {STORE_BACKENDS}"
+    )
+
+
+@lru_cache(maxsize=None)
+def get_conversation_store() -> ConversationStore:
+    """Get the process-wide store configured by the `CONVERSATION_STORE*` settings."""
+    return open_store(settings.CONVERSATION_STORE, settings.CONVERSATION_STORE_PATH)
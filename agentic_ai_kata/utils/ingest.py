@@ -0,0 +1,315 @@
+"""Webhook ingestion service for inbound SMS.
+
+`TextMessage` mirrors an SMS provider's webhook payload, so this service accepts
+those payloads over HTTP and feeds them into the routing pipeline:
+
+    POST /webhooks/sms  ->  validate  ->  bounded queue  ->  200 (queued)
+                                              |
+                      append to the conversation store (one writer)
+                                              |
+                   route_messages() with a bounded number of classifications
+
+The handler only validates and enqueues, so the provider gets its 200 in
+microseconds regardless of LLM latency. When the queue is full the service answers
+503 with `Retry-After` instead of buffering without limit; providers retry
+webhooks on 5xx, so a burst is absorbed upstream rather than in our memory. If the
+background router ever stops, webhooks and `/health` answer 503 rather than acking
+messages nothing will route. Stopping the service (`stop`, run on aiohttp cleanup)
+first stops acking, then stores and routes what was already acked, and only cancels
+the router if that takes longer than `stop_timeout`.
+
+Each message is stored in the conversation between its two phone numbers (see
+`thread_name`), so follow-ups from either side land in the same thread. With
+`summaries` (`--thread-context`), follow-ups are classified with a rolling summary of
+their thread (see `agentic_ai_kata.utils.thread_summary`). The service is the
+store's only writer, so it keeps the threads it has recently routed in memory and
+adds each message to its thread as it's stored, loading a thread only the first time
+it's seen.
+
+Example Usage:
+    # Serve on port 8080 with the configured conversation store
+    python -m agentic_ai_kata.utils.ingest --port 8080
+
+    curl -X POST localhost:8080/webhooks/sms -H 'Content-Type: application/json' \\
+        -d '{"from": "+18015551234", "to": "+18015554321", "body": "who dis?",
+             "media": null, "meta": null}'
+"""
+
+import argparse
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional
+
+from aiohttp import web
+from pydantic import ValidationError
+from pydantic_ai import Tool
+
+from agentic_ai_kata.utils.conversation_store import (
+    ConversationStore,
+    get_conversation_store,
+)
+from agentic_ai_kata.utils.routing import (
+    TextMessageClassification,
+    classify_text_message,
+    route_messages,
+)
+from agentic_ai_kata.utils.text_message import Conversation, TextMessage
+from agentic_ai_kata.utils.thread_summary import ThreadSummaries
+
+# Called with each message and its classification once it has been routed
+OnRouted = Callable[[TextMessage, TextMessageClassification], Awaitable[None]]
+
+
+def thread_name(message: TextMessage) -> str:
+    """The store name of the conversation between a message's two participants."""
+    a, b = sorted((message.from_, message.to))
+    return f"thread_{a.lstrip('+')}_{b.lstrip('+')}"
+
+
+def _participants(message: TextMessage) -> List[dict]:
+    return [
+        {"name": message.from_, "phone": message.from_},
+        {"name": message.to, "phone": message.to},
+    ]
+
+
+class IngestService:
+    """Accepts webhook posts and routes them in the background."""
+
+    def __init__(
+        self,
+        store: ConversationStore,
+        tools: List[Tool],
+        queue_size: int = 1000,
+        concurrency: int = 8,
+        classify=classify_text_message,
+        on_routed: Optional[OnRouted] = None,
+        summaries: Optional[ThreadSummaries] = None,
+        stop_timeout: float = 30.0,
+    ):
+        """
+        Initializes the service.
+
+        Args:
+            store: Where inbound messages are appended.
+            tools: The handlers the classifier can choose from.
+            queue_size: Messages accepted but not yet stored before answering 503.
+            concurrency: Maximum classifications running at once.
+            classify: The classification function, `classify_text_message` by default.
+            on_routed: Optional callback for each routed message.
+            summaries: Optional thread summaries to give follow-ups context.
+            stop_timeout: Seconds `stop` waits for acked messages to be routed
+                before cancelling the router.
+        """
+        self.store = store
+        self.tools = tools
+        self.concurrency = concurrency
+        self.classify = classify
+        self.on_routed = on_routed
+        self.summaries = summaries
+        self.stop_timeout = stop_timeout
+        # None tells the router there's nothing more to come
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.received = 0
+        self.rejected = 0
+        self.routed = 0
+        self.failed = 0
+        self._router: Optional[asyncio.Task] = None
+        self._stopping = False
+        # Recently routed threads by name, least recently used first (with summaries)
+        self._threads: "OrderedDict[str, Conversation]" = OrderedDict()
+
+    def _append(self, message: TextMessage) -> None:
+        self.store.append_message(
+            thread_name(message), message, who=_participants(message)
+        )
+
+    async def _thread(self, name: str, message: TextMessage) -> Conversation:
+        """The thread `message` is about to be stored in, as stored so far."""
+        if name not in self._threads:
+            thread = await asyncio.to_thread(self.store.load, name)
+            # Another message of the thread may have loaded it meanwhile
+            self._threads.setdefault(
+                name, thread or Conversation(who=_participants(message))
+            )
+            while len(self._threads) > self.summaries.max_threads:
+                self._threads.popitem(last=False)
+        self._threads.move_to_end(name)
+        return self._threads[name]
+
+    async def _stored_messages(self):
+        """Drain the queue, storing each message before it is routed."""
+        while True:
+            message = await self.queue.get()
+            if message is None:
+                self.queue.task_done()
+                return
+            try:
+                thread = None
+                if self.summaries is not None:
+                    thread = await self._thread(thread_name(message), message)
+                await asyncio.to_thread(self._append, message)
+                if thread is not None:
+                    thread.insert_message(message)
+            except Exception as e:
+                self.failed += 1
+                print(f"Failed to store message {message.id}: {e!r}")
+                continue
+            finally:
+                self.queue.task_done()
+            yield message
+
+    async def _classify(self, message: TextMessage, tools: List[Tool]):
+        # One failed classification must not stop the pipeline
+        try:
+            context = None
+            if self.summaries is not None:
+                thread = await self._thread(thread_name(message), message)
+                context = await self.summaries.context_for(thread, message)
+            if context is None:
+                return await self.classify(message, tools)
+            return await self.classify(message, tools, context=context)
+        except Exception as e:
+            self.failed += 1
+            print(f"Failed to route message {message.id}: {e!r}")
+            return None
+
+    async def _route(self) -> None:
+        async for message, result in route_messages(
+            self._stored_messages(), self.tools, self.concurrency, self._classify
+        ):
+            if result is None:
+                continue
+            if self.on_routed is not None:
+                # A failed callback must not stop the pipeline either
+                try:
+                    await self.on_routed(message, result)
+                except Exception as e:
+                    self.failed += 1
+                    print(f"Failed to handle routed message {message.id}: {e!r}")
+                    continue
+            self.routed += 1
+
+    @property
+    def router_error(self) -> Optional[str]:
+        """Why the background router stopped, or None while it's running."""
+        if self._stopping:
+            return "stopping"
+        router = self._router
+        if router is None or not router.done():
+            return None
+        if router.cancelled():
+            return "cancelled"
+        return repr(router.exception() or "finished")
+
+    async def handle_sms(self, request: web.Request) -> web.Response:
+        """Validate a webhook payload and queue it for routing."""
+        try:
+            message = TextMessage.model_validate_json(await request.read())
+        except ValidationError as e:
+            return web.json_response(
+                {"status": "invalid", "errors": e.errors(include_url=False)},
+                status=400,
+            )
+        if self.router_error is not None:
+            # Nothing would route it; let the provider retry against a healthy node
+            self.rejected += 1
+            return web.json_response(
+                {"status": "unavailable", "error": self.router_error}, status=503
+            )
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return web.json_response(
+                {"status": "busy"}, status=503, headers={"Retry-After": "1"}
+            )
+        self.received += 1
+        return web.json_response({"status": "queued", "id": message.id})
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        error = self.router_error
+        return web.json_response(
+            {
+                "router": "running" if error is None else f"stopped: {error}",
+                "queued": self.queue.qsize(),
+                "received": self.received,
+                "rejected": self.rejected,
+                "routed": self.routed,
+                "failed": self.failed,
+            },
+            status=200 if error is None else 503,
+        )
+
+    async def start(self, app: Optional[web.Application] = None) -> None:
+        """Start the background router (also usable as an aiohttp startup hook)."""
+        self._stopping = False
+        self._router = asyncio.create_task(self._route())
+
+    async def _finish_routing(self, router: asyncio.Task) -> None:
+        if not router.done():
+            await self.queue.put(None)
+        # Unlike awaiting the task, this doesn't cancel it on timeout
+        await asyncio.wait([router])
+
+    async def stop(self, app: Optional[web.Application] = None) -> None:
+        """Stop acking webhooks, then route every acked message and stop the router.
+
+        Messages still queued after `stop_timeout` seconds are dropped.
+        """
+        self._stopping = True
+        router = self._router
+        if router is None:
+            return
+        try:
+            await asyncio.wait_for(self._finish_routing(router), self.stop_timeout)
+        except asyncio.TimeoutError:
+            router.cancel()
+        await asyncio.gather(router, return_exceptions=True)
+        self._router = None
+
+    async def drain(self) -> None:
+        """Wait until every queued message has been stored."""
+        await self.queue.join()
+
+    def create_app(self) -> web.Application:
+        """Build the aiohttp application serving this service."""
+        app = web.Application()
+        app.router.add_post("/webhooks/sms", self.handle_sms)
+        app.router.add_get("/health", self.handle_health)
+        app.on_startup.append(self.start)
+        app.on_cleanup.append(self.stop)
+        return app
+
+
+def main():
+    from agentic_ai_kata.kata_03_routing import mock_tools
+
+    parser = argparse.ArgumentParser(description="Inbound SMS webhook service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--queue-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--thread-context",
+        action="store_true",
+        help="Classify follow-ups with a rolling summary of their thread",
+    )
+    args = parser.parse_args()
+
+    async def print_route(message, result):
+        print(f"{message.from_} -> {result.data.handler}: {message.body[:50]}")
+
+    service = IngestService(
+        get_conversation_store(),
+        mock_tools,
+        queue_size=args.queue_size,
+        concurrency=args.concurrency,
+        on_routed=print_route,
+        summaries=ThreadSummaries() if args.thread_context else None,
+    )
+    web.run_app(service.create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""Uniform timing and usage instrumentation for agent runs, tools and retrievals.
+
+Every kata and utility wraps its units of work in a `span`:
+
+    - "agent": one `Agent.run`
+    - "model": one request to the LLM (recorded by `RateLimitedModel`)
+    - "tool": one tool call made by an agent
+    - "retrieval": one query to a retriever such as `ColBERTv2`
+
+Each span records its wall time plus counters (requests, prompt/completion tokens,
+time queued in the rate limiter, retries after a 429, response cache hits).
+Counters roll up into the enclosing span, so an agent span reports the tokens of all
+its model requests and a chain step reports everything it triggered.
+
+Finished spans are exported two ways:
+
+    - As OpenTelemetry spans through the `logfire` configured in `settings.py`
+      (turn off with `INSTRUMENTATION_OTEL=false`)
+    - As a local JSON summary grouped by kind and name, with wall time percentiles,
+      so hot spots can be found without a live collector
+
+Example Usage:
+    with span("agent", "outline"):
+        result = await outline_agent.run(prompt)
+
+    get_recorder().write_summary("instrumentation.json")
+"""
+
+import atexit
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from agentic_ai_kata.settings import configure_telemetry, settings
+
+# The counters a span can record; each is summed into the enclosing span
+COUNTERS = (
+    "requests",
+    "prompt_tokens",
+    "completion_tokens",
+    "queue_time",
+    "retries",
+    "cache_hits",
+)
+
+
+@dataclass
+class Span:
+    """One timed unit of work and the counters recorded while it ran."""
+
+    kind: str
+    name: str
+    parent: Optional["Span"] = field(default=None, repr=False)
+    wall_time: float = 0.0
+    error: Optional[str] = None
+    counters: Dict[str, float] = field(default_factory=dict)
+
+    def add(self, **counters: float) -> None:
+        """Add to this span's counters and those of every enclosing span."""
+        with _lock:
+            span = self
+            while span is not None:
+                for key, value in counters.items():
+                    span.counters[key] = span.counters.get(key, 0) + value
+                span = span.parent
+
+    def to_dict(self) -> dict:
+        return {
+            "kind": self.kind,
+            "name": self.name,
+            "wall_time": self.wall_time,
+            "error": self.error,
+            **{key: self.counters.get(key, 0) for key in COUNTERS},
+        }
+
+
+# Spans of different tasks and threads can share a parent
+_lock = threading.Lock()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar(
+    "instrumentation_span", default=None
+)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(q * len(values) + 0.5) - 1))
+    return values[index]
+
+
+class Recorder:
+    """Keeps the most recent finished spans and summarizes them."""
+
+    def __init__(self, max_spans: int = 100_000):
+        """
+        Initializes the recorder.
+
+        Args:
+            max_spans: Finished spans kept for the summary; older ones are dropped.
+        """
+        self.spans: deque[Span] = deque(maxlen=max_spans)
+
+    def record(self, span: Span) -> None:
+        with _lock:
+            self.spans.append(span)
+
+    def clear(self) -> None:
+        with _lock:
+            self.spans.clear()
+
+    def summary(self) -> dict:
+        """Group the recorded spans by kind and name.
+
+        Returns:
+            dict: The span count and one entry per (kind, name), slowest total first
+        """
+        with _lock:
+            spans = list(self.spans)
+        groups: Dict[tuple, List[Span]] = {}
+        for span in spans:
+            groups.setdefault((span.kind, span.name), []).append(span)
+
+        entries = []
+        for (kind, name), members in groups.items():
+            times = sorted(s.wall_time for s in members)
+            total = sum(times)
+            entries.append(
+                {
+                    "kind": kind,
+                    "name": name,
+                    "count": len(members),
+                    "errors": sum(1 for s in members if s.error),
+                    "wall_time": {
+                        "total": total,
+                        "mean": total / len(times),
+                        "p50": _percentile(times, 0.50),
+                        "p95": _percentile(times, 0.95),
+                        "max": times[-1],
+                    },
+                    **{
+                        key: sum(s.counters.get(key, 0) for s in members)
+                        for key in COUNTERS
+                    },
+                }
+            )
+        entries.sort(key=lambda e: e["wall_time"]["total"], reverse=True)
+        return {"spans": len(spans), "groups": entries}
+
+    def write_summary(self, path: Optional[Union[str, Path]] = None) -> Path:
+        """Write `summary()` as JSON.
+
+        Args:
+            path: Where to write, defaults to `settings.INSTRUMENTATION_SUMMARY_PATH`
+
+        Returns:
+            Path: The file written
+        """
+        path = Path(path or settings.INSTRUMENTATION_SUMMARY_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.summary(), indent=2))
+        return path
+
+
+@functools.lru_cache(maxsize=None)
+def get_recorder() -> Recorder:
+    """Get the process-wide recorder.
+
+    When `settings.INSTRUMENTATION_SUMMARY_PATH` is set, the summary is written there
+    when the process exits.
+    """
+    recorder = Recorder()
+    if settings.INSTRUMENTATION_SUMMARY_PATH:
+        atexit.register(recorder.write_summary)
+    return recorder
+
+
+@functools.lru_cache(maxsize=None)
+def _otel_enabled() -> bool:
+    if not settings.INSTRUMENTATION_OTEL:
+        return False
+    configure_telemetry()
+    return True
+
+
+@contextmanager
+def span(kind: str, name: str, **attributes: Any) -> Iterator[Span]:
+    """Time the enclosed block as a span.
+
+    Args:
+        kind: What is being timed, e.g. "agent", "tool" or "retrieval"
+        name: Which one, e.g. the agent or tool name
+        attributes: Extra attributes for the OpenTelemetry span
+
+    Yields:
+        Span: The span, for recording counters with `Span.add`
+    """
+    current = Span(kind=kind, name=name, parent=_current_span.get())
+    token = _current_span.set(current)
+    otel = None
+    if _otel_enabled():
+        import logfire
+
+        otel = logfire.span(
+            "{kind} {name}", kind=kind, name=name, **attributes
+        ).__enter__()
+    started = time.perf_counter()
+    exc_info = (None, None, None)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        exc_info = (type(e), e, e.__traceback__)
+        raise
+    finally:
+        current.wall_time = time.perf_counter() - started
+        _current_span.reset(token)
+        get_recorder().record(current)
+        if otel is not None:
+            otel.set_attributes({"wall_time": current.wall_time, **current.counters})
+            otel.__exit__(*exc_info)
+
+
+def record(**counters: float) -> None:
+    """Add counters to the current span (and its parents); a no-op outside spans."""
+    current = _current_span.get()
+    if current is not None:
+        current.add(**counters)
+
+
+def traced(kind: str, name: Optional[str] = None):
+    """Decorate a sync or async function so each call is a span.
+
+    Args:
+        kind: The span kind
+        name: The span name, defaults to the function's name
+    """
+
+    def decorator(func):
+        span_name = name or func.__name__
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(kind, span_name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(kind, span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
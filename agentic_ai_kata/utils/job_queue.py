@@ -0,0 +1,969 @@
+"""A durable job queue shared by many worker nodes.
+
+Routing and article-generation backlogs are consumed by workers on many machines.
+Producers `enqueue()` jobs (a kind plus a JSON payload); each `JobWorker` leases
+jobs, dispatches them to the handler for their kind and acknowledges them, so
+throughput scales by starting more workers against the same queue:
+
+    enqueue --> ready --lease--> leased --ack--> done
+                  ^                 |
+                  +--- fail/expiry -+--(out of attempts)--> dead
+
+Delivery is at least once:
+    - A lease hides a job from other workers for `visibility_timeout` seconds.
+      Workers extend it while a handler runs; if a worker dies the lease expires
+      and another worker picks the job up.
+    - Every lease counts as an attempt. A failed job is retried after a delay until
+      it has used `max_attempts`, then moved to the dead letters, where it stays
+      until `requeue_dead()`.
+    - `ack()` and `fail()` only apply to the current lease, so a worker whose lease
+      expired can't overwrite the outcome of the worker that took the job over.
+
+Backends:
+    - `SqliteJobQueue`: one SQLite file, shared by the workers on a machine (or a
+      network filesystem that supports SQLite locking)
+    - `RedisJobQueue`: any Redis-compatible server, shared across machines.
+      `LocalRedis` is an in-process stand-in for it, for tests and single-process
+      use.
+
+The default handlers (`HANDLERS`) run the routing classifier (kind "route"),
+`ChainingKata` ("article") and `WikiSearchAgent` ("wiki_search").
+
+Example Usage:
+    # .env
+    JOB_QUEUE=sqlite
+    JOB_QUEUE_PATH=.cache/jobs.sqlite3
+
+    queue = get_job_queue()
+    queue.enqueue("wiki_search", {"question": "What is the capital of France?"})
+
+    # On each worker node
+    python -m agentic_ai_kata.utils.job_queue worker --concurrency 8
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from pydantic import BaseModel, Field
+
+from agentic_ai_kata.settings import settings
+
+JOB_QUEUE_BACKENDS = ("sqlite", "redis")
+
+# Handles one job's payload; the result is stored with the job
+Handler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class Job(BaseModel):
+    """A unit of work and its delivery state."""
+
+    id: str = Field(description="Job ID")
+    kind: str = Field(description="Selects the handler that processes the job")
+    payload: Dict[str, Any] = Field(description="The handler's input")
+    attempts: int = Field(default=0, description="Leases taken so far")
+    max_attempts: int = Field(description="Leases allowed before dead-lettering")
+    lease_id: Optional[str] = Field(default=None, description="The current lease")
+    last_error: Optional[str] = Field(default=None, description="Why it last failed")
+    created: float = Field(description="Enqueue time in Unix epoch seconds")
+
+
+def _json_result(result: Any) -> str:
+    if isinstance(result, BaseModel):
+        return result.model_dump_json()
+    return json.dumps(result, default=str)
+
+
+class JobQueue(ABC):
+    """A queue of jobs with leases, visibility timeouts, retries and dead letters."""
+
+    def __init__(self, max_attempts: int = 3, clock: Callable[[], float] = time.time):
+        """
+        Args:
+            max_attempts: Default number of leases allowed per job
+            clock: Returns the current time in seconds (replaceable in tests)
+        """
+        self.max_attempts = max_attempts
+        self.clock = clock
+
+    def _new_job(
+        self, kind: str, payload: Dict[str, Any], max_attempts: Optional[int]
+    ) -> Job:
+        return Job(
+            id=str(uuid.uuid4()),
+            kind=kind,
+            payload=payload,
+            max_attempts=max_attempts or self.max_attempts,
+            created=self.clock(),
+        )
+
+    def enqueue(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        max_attempts: Optional[int] = None,
+        delay: float = 0.0,
+    ) -> str:
+        """Add a job.
+
+        Args:
+            kind: The handler to dispatch it to
+            payload: The handler's input, JSON-serializable
+            max_attempts: Leases allowed, defaults to the queue's `max_attempts`
+            delay: Seconds before it can be leased
+
+        Returns:
+            str: The job's id
+        """
+        return self.enqueue_many([(kind, payload)], max_attempts, delay)[0]
+
+    @abstractmethod
+    def enqueue_many(
+        self,
+        jobs: Iterable[Tuple[str, Dict[str, Any]]],
+        max_attempts: Optional[int] = None,
+        delay: float = 0.0,
+    ) -> List[str]:
+        """Add (kind, payload) jobs in one batch; returns their ids in order."""
+
+    @abstractmethod
+    def lease(self, visibility_timeout: float) -> Optional[Job]:
+        """Take the next available job, hiding it from others for a while.
+
+        Expired leases count as available; one whose job is out of attempts is
+        dead-lettered instead.
+
+        Args:
+            visibility_timeout: Seconds before the job is available again unless
+                it's acked, failed or extended
+
+        Returns:
+            Optional[Job]: The leased job, or None if nothing is available
+        """
+
+    @abstractmethod
+    def extend(self, job: Job, visibility_timeout: float) -> bool:
+        """Push back a lease's expiry; False if the lease is no longer held."""
+
+    @abstractmethod
+    def ack(self, job: Job, result: Any = None) -> bool:
+        """Mark a leased job done and store its result; False if the lease was lost."""
+
+    @abstractmethod
+    def fail(
+        self, job: Job, error: str, retry_delay: float = 0.0, retry: bool = True
+    ) -> bool:
+        """Record a failed attempt of a leased job.
+
+        Args:
+            job: The leased job
+            error: Why it failed
+            retry_delay: Seconds before it can be leased again
+            retry: False to dead-letter it regardless of attempts left
+
+        Returns:
+            bool: False if the lease was lost
+        """
+
+    @abstractmethod
+    def result(self, job_id: str) -> Optional[Any]:
+        """A done job's result as parsed JSON, or None."""
+
+    @abstractmethod
+    def dead_letters(self) -> List[Job]:
+        """Jobs that ran out of attempts, oldest failure first."""
+
+    @abstractmethod
+    def requeue_dead(self) -> int:
+        """Make every dead-lettered job available again with fresh attempts."""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """Number of jobs that are ready (including delayed), leased, done and dead."""
+
+
+class SqliteJobQueue(JobQueue):
+    """Jobs in a SQLite table; leases are taken in write transactions.
+
+    `BEGIN IMMEDIATE` makes each lease a single-writer transaction, so workers in
+    different processes sharing the file never take the same job.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        max_attempts: int = 3,
+        clock: Callable[[], float] = time.time,
+    ):
+        super().__init__(max_attempts, clock)
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit; transactions are explicit
+        self._db = sqlite3.connect(
+            str(path), timeout=30, isolation_level=None, check_same_thread=False
+        )
+        if str(path) != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        # `available_at` is when a ready job becomes visible or a lease expires
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL,"
+            " state TEXT NOT NULL, attempts INTEGER NOT NULL,"
+            " max_attempts INTEGER NOT NULL, available_at REAL NOT NULL,"
+            " lease_id TEXT, last_error TEXT, result TEXT, created REAL NOT NULL,"
+            " updated REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS jobs_available"
+            " ON jobs (state, available_at);"
+        )
+
+    _COLUMNS = (
+        "id, kind, payload, attempts, max_attempts, lease_id, last_error, created"
+    )
+
+    def _job(self, row: tuple) -> Job:
+        fields = dict(zip(self._COLUMNS.split(", "), row))
+        return Job(**{**fields, "payload": json.loads(fields["payload"])})
+
+    def enqueue_many(self, jobs, max_attempts=None, delay=0.0):
+        now = self.clock()
+        rows = []
+        for kind, payload in jobs:
+            job = self._new_job(kind, payload, max_attempts)
+            rows.append(
+                (
+                    job.id,
+                    kind,
+                    json.dumps(payload),
+                    job.max_attempts,
+                    now + delay,
+                    job.created,
+                    now,
+                )
+            )
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.executemany(
+                "INSERT INTO jobs (id, kind, payload, state, attempts, max_attempts,"
+                " available_at, created, updated)"
+                " VALUES (?, ?, ?, 'ready', 0, ?, ?, ?, ?)",
+                rows,
+            )
+            self._db.execute("COMMIT")
+        return [row[0] for row in rows]
+
+    def lease(self, visibility_timeout):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                job = self._lease(visibility_timeout)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+        return job
+
+    def _lease(self, visibility_timeout: float) -> Optional[Job]:
+        while True:
+            now = self.clock()
+            row = self._db.execute(
+                f"SELECT {self._COLUMNS}, state FROM jobs"
+                " WHERE state IN ('ready', 'leased') AND available_at <= ?"
+                " ORDER BY available_at LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            job, state = self._job(row[:-1]), row[-1]
+            if state == "leased" and job.attempts >= job.max_attempts:
+                self._db.execute(
+                    "UPDATE jobs SET state = 'dead', lease_id = NULL,"
+                    " last_error = 'lease expired', updated = ?"
+                    " WHERE id = ?",
+                    (now, job.id),
+                )
+                continue
+            job.attempts += 1
+            job.lease_id = str(uuid.uuid4())
+            self._db.execute(
+                "UPDATE jobs SET state = 'leased', attempts = ?,"
+                " lease_id = ?, available_at = ?, updated = ? WHERE id = ?",
+                (
+                    job.attempts,
+                    job.lease_id,
+                    now + visibility_timeout,
+                    now,
+                    job.id,
+                ),
+            )
+            return job
+
+    def _update_lease(self, job: Job, assignments: str, params: tuple) -> bool:
+        with self._lock:
+            cursor = self._db.execute(
+                f"UPDATE jobs SET {assignments}, updated = ?"
+                " WHERE id = ? AND lease_id = ? AND state = 'leased'",
+                params + (self.clock(), job.id, job.lease_id),
+            )
+        return cursor.rowcount == 1
+
+    def extend(self, job, visibility_timeout):
+        return self._update_lease(
+            job, "available_at = ?", (self.clock() + visibility_timeout,)
+        )
+
+    def ack(self, job, result=None):
+        return self._update_lease(
+            job, "state = 'done', lease_id = NULL, result = ?", (_json_result(result),)
+        )
+
+    def fail(self, job, error, retry_delay=0.0, retry=True):
+        if retry and job.attempts < job.max_attempts:
+            return self._update_lease(
+                job,
+                "state = 'ready', lease_id = NULL, last_error = ?, available_at = ?",
+                (error, self.clock() + retry_delay),
+            )
+        return self._update_lease(
+            job, "state = 'dead', lease_id = NULL, last_error = ?", (error,)
+        )
+
+    def result(self, job_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT result FROM jobs WHERE id = ? AND state = 'done'", (job_id,)
+            ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def dead_letters(self):
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {self._COLUMNS} FROM jobs WHERE state = 'dead'"
+                " ORDER BY updated"
+            ).fetchall()
+        return [self._job(row) for row in rows]
+
+    def requeue_dead(self):
+        now = self.clock()
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET state = 'ready', attempts = 0, available_at = ?,"
+                " updated = ? WHERE state = 'dead'",
+                (now, now),
+            )
+        return cursor.rowcount
+
+    def stats(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT state, COUNT(*) FROM jobs GROUP BY state"
+            ).fetchall()
+        return {"ready": 0, "leased": 0, "done": 0, "dead": 0, **dict(rows)}
+
+
+# Moves a job from one sorted set to another, and rewrites it, but only if it's still
+# in the source set (due by a given score) and unchanged since the caller read it.
+#   KEYS: jobs hash, source set, destination set, results hash
+#   ARGV: job id, job JSON as read, new job JSON, latest source score ("" for any),
+#         destination score ("" to only remove it), result JSON ("" for none)
+_TRANSITION_SCRIPT = """
+local score = redis.call("ZSCORE", KEYS[2], ARGV[1])
+if not score or (ARGV[4] ~= "" and tonumber(score) > tonumber(ARGV[4])) then
+    return 0
+end
+if redis.call("HGET", KEYS[1], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call("ZREM", KEYS[2], ARGV[1])
+redis.call("HSET", KEYS[1], ARGV[1], ARGV[3])
+if ARGV[5] ~= "" then
+    redis.call("ZADD", KEYS[3], ARGV[5], ARGV[1])
+end
+if ARGV[6] ~= "" then
+    redis.call("HSET", KEYS[4], ARGV[1], ARGV[6])
+end
+return 1
+"""
+
+
+class RedisJobQueue(JobQueue):
+    """Jobs in a Redis-compatible server, under keys starting with `prefix`.
+
+    Keys:
+        - `{prefix}:jobs`: hash of job id -> `Job` JSON
+        - `{prefix}:ready`: sorted set of job ids by the time they become available
+        - `{prefix}:leased`: sorted set of job ids by lease expiry
+        - `{prefix}:dead`: sorted set of job ids by the time they were dead-lettered
+        - `{prefix}:results`: hash of job id -> result JSON
+
+    Every state change (lease, extend, ack, fail, dead-letter, requeue) reads the
+    job, then applies the change with one Lua script that checks the job is still
+    where it was and unchanged (compare-and-swap on its JSON). So a claim can't be
+    half done if a worker dies, and of two workers racing for the same job or lease
+    only one wins.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        prefix: str = "kata-jobs",
+        max_attempts: int = 3,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            client: A `redis.Redis`-compatible client (or `LocalRedis`)
+            prefix: Prefix of every key the queue uses
+            max_attempts: Default number of leases allowed per job
+            clock: Returns the current time in seconds (replaceable in tests)
+        """
+        super().__init__(max_attempts, clock)
+        self.client = client
+        self.prefix = prefix
+        self._transition = client.register_script(_TRANSITION_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisJobQueue":
+        """Connect to a Redis server with the optional `redis` package."""
+        try:
+            import redis
+        except ImportError:
+            raise ImportError(
+                "The redis job queue needs the `redis` package (pip install redis)"
+            )
+
+        return cls(redis.Redis.from_url(url, decode_responses=True), **kwargs)
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}:{name}"
+
+    def _load(self, job_id: str) -> Optional[Job]:
+        data = self.client.hget(self._key("jobs"), job_id)
+        return None if data is None else Job.model_validate_json(data)
+
+    def _read(self, job_id: str) -> Optional[Tuple[str, Job]]:
+        """A job's stored JSON, to compare-and-swap on, and the job it holds."""
+        data = self.client.hget(self._key("jobs"), job_id)
+        return None if data is None else (data, Job.model_validate_json(data))
+
+    def _save(self, job: Job) -> None:
+        self.client.hset(self._key("jobs"), job.id, job.model_dump_json())
+
+    def _move(
+        self,
+        stored: str,
+        job: Job,
+        source: str,
+        due_by: Optional[float] = None,
+        destination: Optional[str] = None,
+        score: Optional[float] = None,
+        result: Optional[str] = None,
+    ) -> bool:
+        """Atomically move `job` out of `source`, if it's unchanged since read.
+
+        Args:
+            stored: The job's JSON as read
+            job: The job as it should be stored now
+            source: The set the job must be in
+            due_by: Only move it if its score in `source` is at most this
+            destination: The set to add it to, if any
+            score: Its score in `destination`
+            result: Result JSON to store with it
+
+        Returns:
+            bool: False if the job had moved or changed meanwhile
+        """
+        keys = [
+            self._key("jobs"),
+            self._key(source),
+            self._key(destination or source),
+            self._key("results"),
+        ]
+        args = [
+            job.id,
+            stored,
+            job.model_dump_json(),
+            "" if due_by is None else repr(due_by),
+            "" if destination is None else repr(score),
+            "" if result is None else result,
+        ]
+        return self._transition(keys=keys, args=args) == 1
+
+    def enqueue_many(self, jobs, max_attempts=None, delay=0.0):
+        available_at = self.clock() + delay
+        ids = []
+        for kind, payload in jobs:
+            job = self._new_job(kind, payload, max_attempts)
+            self._save(job)
+            self.client.zadd(self._key("ready"), {job.id: available_at})
+            ids.append(job.id)
+        return ids
+
+    def _claim(self, key: str, now: float, visibility_timeout: float) -> Optional[Job]:
+        """Lease the first due job in a sorted set; None if there's none to claim.
+
+        Expired leases that have used every attempt are dead-lettered on the way.
+        """
+        while True:
+            due = self.client.zrangebyscore(self._key(key), "-inf", now, 0, 10)
+            if not due:
+                return None
+            for job_id in due:
+                read = self._read(job_id)
+                if read is None:
+                    self.client.zrem(self._key(key), job_id)
+                    continue
+                stored, job = read
+                if key == "leased" and job.attempts >= job.max_attempts:
+                    job.lease_id, job.last_error = None, "lease expired"
+                    self._move(stored, job, key, now, "dead", now)
+                    continue
+                job.attempts += 1
+                job.lease_id = str(uuid.uuid4())
+                expires = now + visibility_timeout
+                if self._move(stored, job, key, now, "leased", expires):
+                    return job
+
+    def lease(self, visibility_timeout):
+        now = self.clock()
+        # Expired leases first, so a crashed worker's jobs aren't starved
+        return self._claim("leased", now, visibility_timeout) or self._claim(
+            "ready", now, visibility_timeout
+        )
+
+    def _read_lease(self, job: Job) -> Optional[Tuple[str, Job]]:
+        """The stored job if `job`'s lease is still current, else None."""
+        read = self._read(job.id)
+        if read is None or read[1].lease_id != job.lease_id:
+            return None
+        return read
+
+    def extend(self, job, visibility_timeout):
+        read = self._read_lease(job)
+        if read is None:
+            return False
+        stored, current = read
+        expires = self.clock() + visibility_timeout
+        return self._move(stored, current, "leased", None, "leased", expires)
+
+    def ack(self, job, result=None):
+        read = self._read_lease(job)
+        if read is None:
+            return False
+        stored, current = read
+        current.lease_id = None
+        if not self._move(stored, current, "leased", result=_json_result(result)):
+            return False
+        job.lease_id = None
+        return True
+
+    def fail(self, job, error, retry_delay=0.0, retry=True):
+        read = self._read_lease(job)
+        if read is None:
+            return False
+        stored, current = read
+        current.lease_id, current.last_error = None, error
+        now = self.clock()
+        if retry and current.attempts < current.max_attempts:
+            destination, score = "ready", now + retry_delay
+        else:
+            destination, score = "dead", now
+        if not self._move(stored, current, "leased", None, destination, score):
+            return False
+        job.lease_id, job.last_error = None, error
+        return True
+
+    def result(self, job_id):
+        data = self.client.hget(self._key("results"), job_id)
+        return None if data is None else json.loads(data)
+
+    def dead_letters(self):
+        ids = self.client.zrangebyscore(self._key("dead"), "-inf", "+inf")
+        return [job for job in map(self._load, ids) if job is not None]
+
+    def requeue_dead(self):
+        count = 0
+        now = self.clock()
+        for job_id in self.client.zrangebyscore(self._key("dead"), "-inf", "+inf"):
+            read = self._read(job_id)
+            if read is None:
+                continue
+            stored, job = read
+            job.attempts = 0
+            count += self._move(stored, job, "dead", None, "ready", now)
+        return count
+
+    def stats(self):
+        return {
+            "ready": self.client.zcard(self._key("ready")),
+            "leased": self.client.zcard(self._key("leased")),
+            "done": self.client.hlen(self._key("results")),
+            "dead": self.client.zcard(self._key("dead")),
+        }
+
+
+class LocalRedis:
+    """An in-process stand-in for the Redis commands `RedisJobQueue` uses.
+
+    Behaves like `redis.Redis(decode_responses=True)` for hashes and sorted sets,
+    with each command atomic, so `RedisJobQueue` can be tested (or used by a
+    single process) without a server. It can't run Lua, so `register_script` only
+    knows `RedisJobQueue`'s script, which it runs as Python under the same lock.
+    """
+
+    def __init__(self):
+        self._hashes: Dict[str, Dict[str, str]] = {}
+        self._zsets: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def hset(self, name: str, key: str, value: str) -> int:
+        with self._lock:
+            values = self._hashes.setdefault(name, {})
+            added = key not in values
+            values[key] = value
+            return int(added)
+
+    def hget(self, name: str, key: str) -> Optional[str]:
+        with self._lock:
+            return self._hashes.get(name, {}).get(key)
+
+    def hlen(self, name: str) -> int:
+        with self._lock:
+            return len(self._hashes.get(name, {}))
+
+    def zadd(self, name: str, mapping: Mapping[str, float], xx: bool = False) -> int:
+        with self._lock:
+            members = self._zsets.setdefault(name, {})
+            added = 0
+            for member, score in mapping.items():
+                if xx and member not in members:
+                    continue
+                added += member not in members
+                members[member] = float(score)
+            return added
+
+    def zrem(self, name: str, *values: str) -> int:
+        with self._lock:
+            members = self._zsets.get(name, {})
+            return sum(members.pop(value, None) is not None for value in values)
+
+    def zscore(self, name: str, value: str) -> Optional[float]:
+        with self._lock:
+            return self._zsets.get(name, {}).get(value)
+
+    def zcard(self, name: str) -> int:
+        with self._lock:
+            return len(self._zsets.get(name, {}))
+
+    def zrangebyscore(
+        self,
+        name: str,
+        min: Union[float, str],
+        max: Union[float, str],
+        start: Optional[int] = None,
+        num: Optional[int] = None,
+    ) -> List[str]:
+        low, high = float(min), float(max)
+        with self._lock:
+            members = sorted(
+                (score, member)
+                for member, score in self._zsets.get(name, {}).items()
+                if low <= score <= high
+            )
+        ids = [member for _, member in members]
+        if start is not None and num is not None:
+            ids = ids[start : start + num]
+        return ids
+
+    def register_script(self, script: str) -> Callable[..., int]:
+        if script != _TRANSITION_SCRIPT:
+            raise NotImplementedError("LocalRedis only runs RedisJobQueue's script")
+        return self._transition
+
+    def _transition(self, keys: List[str], args: List[str]) -> int:
+        """`_TRANSITION_SCRIPT`, atomically."""
+        jobs, source, destination, results = keys
+        job_id, stored, updated, due_by, score, result = args
+        with self._lock:
+            members = self._zsets.get(source, {})
+            if job_id not in members or (due_by and members[job_id] > float(due_by)):
+                return 0
+            values = self._hashes.setdefault(jobs, {})
+            if values.get(job_id) != stored:
+                return 0
+            del members[job_id]
+            values[job_id] = updated
+            if score:
+                self._zsets.setdefault(destination, {})[job_id] = float(score)
+            if result:
+                self._hashes.setdefault(results, {})[job_id] = result
+            return 1
+
+
+def open_job_queue(
+    backend: str, location: Optional[str] = None, max_attempts: int = 3
+) -> JobQueue:
+    """Open a job queue.
+
+    Args:
+        backend: One of "sqlite" or "redis"
+        location: The SQLite file, or the Redis URL
+        max_attempts: Default number of leases allowed per job
+
+    Returns:
+        JobQueue: The opened queue
+    """
+    if backend == "sqlite":
+        return SqliteJobQueue(location or ".cache/jobs.sqlite3", max_attempts)
+    if backend == "redis":
+        return RedisJobQueue.from_url(
+            location or "redis://localhost:6379/0", max_attempts=max_attempts
+        )
+    raise ValueError(
+        f"Unknown job queue {backend!r}, expected one of {JOB_QUEUE_BACKENDS}"
+    )
+
+
+@lru_cache(maxsize=None)
+def get_job_queue() -> JobQueue:
+    """Get the process-wide queue configured by the `JOB_QUEUE*` settings."""
+    return open_job_queue(
+        settings.JOB_QUEUE, settings.JOB_QUEUE_PATH, settings.JOB_QUEUE_MAX_ATTEMPTS
+    )
+
+
+async def route_handler(payload: Dict[str, Any]) -> Any:
+    """Classify `payload["message"]` (a `TextMessage`) with the routing kata's tools."""
+    from agentic_ai_kata.kata_03_routing import Route, mock_tools
+    from agentic_ai_kata.utils.routing import classify_text_message
+    from agentic_ai_kata.utils.text_message import TextMessage
+
+    message = TextMessage.model_validate(payload["message"])
+    classification = (await classify_text_message(message, mock_tools)).data
+    return Route(
+        category=classification.category,
+        confidence=classification.confidence,
+        handler=classification.handler,
+    )
+
+
+async def article_handler(payload: Dict[str, Any]) -> Any:
+    """Generate an article with `ChainingKata`."""
+    from agentic_ai_kata.kata_02_chaining import ChainingKata
+
+    return await ChainingKata().arun()
+
+
+async def wiki_search_handler(payload: Dict[str, Any]) -> Any:
+    """Answer `payload["question"]` with `WikiSearchAgent`."""
+    from agentic_ai_kata.utils.wiki_search_agent import WikiSearchAgent
+
+    return await WikiSearchAgent().run(payload["question"])
+
+
+HANDLERS: Dict[str, Handler] = {
+    "route": route_handler,
+    "article": article_handler,
+    "wiki_search": wiki_search_handler,
+}
+
+
+class WorkerStats(BaseModel):
+    """What a `JobWorker` did during one `arun()`."""
+
+    succeeded: int = Field(default=0, description="Jobs acked")
+    failed: int = Field(default=0, description="Attempts that raised")
+    lost: int = Field(default=0, description="Jobs whose lease expired mid-run")
+    seconds: float = Field(default=0.0, description="Wall time of the run")
+
+
+class JobWorker:
+    """Leases jobs from a queue and runs them with the handler for their kind.
+
+    Up to `concurrency` jobs run at once on the worker's event loop. Queue calls
+    run in a thread, so a busy SQLite file never blocks the loop. While a handler
+    runs its lease is extended every third of `visibility_timeout`; if the lease is
+    lost anyway (e.g. the worker stalled), the handler is cancelled, since another
+    worker now owns the job.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handlers: Optional[Mapping[str, Handler]] = None,
+        concurrency: int = 4,
+        visibility_timeout: float = 300.0,
+        retry_delay: float = 5.0,
+        poll_interval: float = 0.5,
+    ):
+        """
+        Args:
+            queue: The queue to consume
+            handlers: Handler per job kind, defaults to `HANDLERS`
+            concurrency: Jobs run at once
+            visibility_timeout: Seconds a lease lasts without being extended
+            retry_delay: Seconds before the first retry, doubling per attempt
+            poll_interval: Seconds to wait when the queue is empty
+        """
+        self.queue = queue
+        self.handlers = dict(HANDLERS if handlers is None else handlers)
+        self.concurrency = concurrency
+        self.visibility_timeout = visibility_timeout
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self._stopping = False
+
+    def stop(self) -> None:
+        """Stop leasing; jobs already running are finished first."""
+        self._stopping = True
+
+    async def _heartbeat(self, job: Job, task: asyncio.Task) -> None:
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 3)
+            extended = await asyncio.to_thread(
+                self.queue.extend, job, self.visibility_timeout
+            )
+            if not extended:
+                task.cancel()
+                return
+
+    async def process(self, job: Job, stats: WorkerStats) -> None:
+        """Run one leased job and record its outcome."""
+        handler = self.handlers.get(job.kind)
+        if handler is None:
+            await asyncio.to_thread(
+                self.queue.fail, job, f"No handler for {job.kind!r}", retry=False
+            )
+            stats.failed += 1
+            return
+        task = asyncio.ensure_future(handler(job.payload))
+        heartbeat = asyncio.create_task(self._heartbeat(job, task))
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            if not heartbeat.done():
+                raise
+            # The heartbeat cancelled the handler: the lease was lost
+            stats.lost += 1
+            return
+        except Exception as e:
+            stats.failed += 1
+            delay = self.retry_delay * 2 ** (job.attempts - 1)
+            await asyncio.to_thread(
+                self.queue.fail, job, f"{type(e).__name__}: {e}", delay
+            )
+            return
+        finally:
+            heartbeat.cancel()
+        if await asyncio.to_thread(self.queue.ack, job, result):
+            stats.succeeded += 1
+        else:
+            stats.lost += 1
+
+    async def arun(
+        self, max_jobs: Optional[int] = None, stop_when_idle: bool = False
+    ) -> WorkerStats:
+        """Consume jobs until stopped.
+
+        Args:
+            max_jobs: Stop after leasing this many jobs
+            stop_when_idle: Stop once the queue has nothing available
+
+        Returns:
+            WorkerStats: Counts of the jobs processed
+        """
+        stats = WorkerStats()
+        leased = 0
+        start = time.perf_counter()
+
+        async def slot():
+            nonlocal leased
+            while not self._stopping:
+                if max_jobs is not None and leased >= max_jobs:
+                    return
+                # Reserve the job before awaiting the lease, so the slots together
+                # can't lease more than max_jobs
+                leased += 1
+                job = await asyncio.to_thread(
+                    self.queue.lease, self.visibility_timeout
+                )
+                if job is None:
+                    leased -= 1
+                    if stop_when_idle:
+                        return
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                await self.process(job, stats)
+
+        await asyncio.gather(*(slot() for _ in range(self.concurrency)))
+        stats.seconds = time.perf_counter() - start
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kata job queue")
+    parser.add_argument("--backend", choices=JOB_QUEUE_BACKENDS)
+    parser.add_argument("--location", help="SQLite file or Redis URL")
+    commands = parser.add_subparsers(dest="command", required=True)
+    enqueue = commands.add_parser("enqueue", help="Add a job")
+    enqueue.add_argument("kind", choices=sorted(HANDLERS))
+    enqueue.add_argument("payload", nargs="?", default="{}", help="JSON payload")
+    enqueue.add_argument("--count", type=int, default=1)
+    worker = commands.add_parser("worker", help="Process jobs")
+    worker.add_argument("--concurrency", type=int, default=4)
+    worker.add_argument("--visibility-timeout", type=float, default=300.0)
+    worker.add_argument("--until-idle", action="store_true")
+    commands.add_parser("stats", help="Count jobs by state")
+    commands.add_parser("requeue-dead", help="Retry every dead-lettered job")
+    args = parser.parse_args()
+
+    if args.backend or args.location:
+        queue = open_job_queue(
+            args.backend or settings.JOB_QUEUE,
+            args.location or settings.JOB_QUEUE_PATH,
+            settings.JOB_QUEUE_MAX_ATTEMPTS,
+        )
+    else:
+        queue = get_job_queue()
+
+    if args.command == "enqueue":
+        payload = json.loads(args.payload)
+        for job_id in queue.enqueue_many([(args.kind, payload)] * args.count):
+            print(job_id)
+    elif args.command == "worker":
+        print(f"Worker {os.getpid()} consuming {args.concurrency} jobs at a time")
+        job_worker = JobWorker(
+            queue,
+            concurrency=args.concurrency,
+            visibility_timeout=args.visibility_timeout,
+        )
+        stats = asyncio.run(job_worker.arun(stop_when_idle=args.until_idle))
+        print(stats.model_dump_json())
+    elif args.command == "stats":
+        print(json.dumps(queue.stats()))
+    elif args.command == "requeue-dead":
+        print(f"Requeued {queue.requeue_dead()} jobs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Run many katas concurrently on one long-lived event loop.
+
+Each kata's `run()` is `asyncio.run(self.arun())`, which creates and closes an event
+loop per call. Connection pools belong to the loop that opened them (see
+`agentic_ai_kata.utils.clients.LoopLocalTransport`), so every call starts cold, and
+two katas can't run side by side. `KataRunner` owns one loop for its whole life and
+awaits `KataBase.arun()` on it, so:
+
+    - Katas (or repeated runs of one) run concurrently, up to `concurrency` at once
+    - Pooled HTTP connections stay warm from one `run()` call to the next
+    - The loop can be uvloop, when the optional `uvloop` package is installed
+
+Example Usage:
+    with KataRunner(concurrency=8, use_uvloop=True) as runner:
+        report = runner.run([RoutingKata(), ChainingKata()], repeat=4)
+    print(report.summary())
+
+    # Or from the command line
+    python -m agentic_ai_kata.utils.kata_runner Routing Chaining --repeat 4
+"""
+
+import argparse
+import asyncio
+import importlib
+import importlib.util
+import inspect
+import time
+from pathlib import Path
+from typing import Any, List, Optional, Sequence
+
+from pydantic import BaseModel, Field
+
+from agentic_ai_kata.base import KataBase
+
+PACKAGE = Path(__file__).parent.parent
+
+
+def uvloop_available() -> bool:
+    """Whether the optional `uvloop` package is installed."""
+    return importlib.util.find_spec("uvloop") is not None
+
+
+def discover_katas() -> List[type]:
+    """Every `KataBase` subclass defined in a `kata_*.py` module, in kata order."""
+    katas = []
+    for path in sorted(PACKAGE.glob("kata_*.py")):
+        module = importlib.import_module(f"agentic_ai_kata.{path.stem}")
+        for _, cls in inspect.getmembers(module, inspect.isclass):
+            if issubclass(cls, KataBase) and cls.__module__ == module.__name__:
+                katas.append(cls)
+    return katas
+
+
+class KataRun(BaseModel):
+    """The outcome of one kata run"""
+
+    kata: str = Field(description="The kata's class name")
+    seconds: float = Field(description="Wall time of the run")
+    error: Optional[str] = Field(default=None, description="Why the run failed")
+    result: Any = Field(default=None, exclude=True, description="The kata's result")
+
+
+class RunnerReport(BaseModel):
+    """Aggregate results of a `KataRunner.run()` call"""
+
+    runs: List[KataRun] = Field(description="Every run, in the order given")
+    wall_seconds: float = Field(description="Wall time of the whole batch")
+    loop: str = Field(description="The event loop implementation used")
+
+    @property
+    def failures(self) -> int:
+        return sum(1 for run in self.runs if run.error)
+
+    @property
+    def throughput(self) -> float:
+        """Kata runs completed per second."""
+        return len(self.runs) / self.wall_seconds if self.wall_seconds else 0.0
+
+    def summary(self) -> str:
+        lines = [
+            f"{len(self.runs)} runs in {self.wall_seconds:.2f}s on {self.loop}: "
+            f"{self.throughput:.2f} runs/s, {self.failures} failed"
+        ]
+        by_kata: dict[str, List[KataRun]] = {}
+        for run in self.runs:
+            by_kata.setdefault(run.kata, []).append(run)
+        for kata, runs in by_kata.items():
+            mean = sum(r.seconds for r in runs) / len(runs)
+            failed = sum(1 for r in runs if r.error)
+            lines.append(
+                f"  {kata}: {len(runs)} runs, mean {mean:.2f}s, {failed} failed"
+            )
+        return "\n".join(lines)
+
+
+class KataRunner:
+    """Runs katas concurrently on a single event loop it keeps open."""
+
+    def __init__(self, concurrency: int = 8, use_uvloop: bool = False):
+        """
+        Initializes the runner and its event loop.
+
+        Args:
+            concurrency: Maximum number of katas running at once.
+            use_uvloop: Use uvloop's event loop when the package is installed.
+        """
+        self.concurrency = concurrency
+        if use_uvloop and uvloop_available():
+            import uvloop
+
+            self.loop = uvloop.new_event_loop()
+            self.loop_name = "uvloop"
+        else:
+            self.loop = asyncio.new_event_loop()
+            self.loop_name = "asyncio"
+
+    async def _run_one(
+        self, kata: KataBase, semaphore: asyncio.Semaphore, validate: bool
+    ) -> KataRun:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                result = await kata.arun()
+                if validate and not kata.validate_result(result):
+                    raise AssertionError("validate_result returned False")
+            except Exception as e:
+                return KataRun(
+                    kata=type(kata).__name__,
+                    seconds=time.perf_counter() - start,
+                    error=f"{type(e).__name__}: {e}",
+                )
+            return KataRun(
+                kata=type(kata).__name__,
+                seconds=time.perf_counter() - start,
+                result=result,
+            )
+
+    async def arun(
+        self, katas: Sequence[KataBase], repeat: int = 1, validate: bool = False
+    ) -> RunnerReport:
+        """Run katas concurrently on the running loop.
+
+        Args:
+            katas: The kata instances to run
+            repeat: How many times to run each of them
+            validate: Whether a run whose `validate_result()` fails counts as failed
+
+        Returns:
+            RunnerReport: Every run's outcome and the aggregate throughput
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        start = time.perf_counter()
+        runs = await asyncio.gather(
+            *(
+                self._run_one(kata, semaphore, validate)
+                for _ in range(repeat)
+                for kata in katas
+            )
+        )
+        return RunnerReport(
+            runs=list(runs),
+            wall_seconds=time.perf_counter() - start,
+            loop=self.loop_name,
+        )
+
+    def run(
+        self, katas: Sequence[KataBase], repeat: int = 1, validate: bool = False
+    ) -> RunnerReport:
+        """Run katas concurrently on the runner's loop (see `arun`)."""
+        return self.loop.run_until_complete(self.arun(katas, repeat, validate))
+
+    def close(self) -> None:
+        """Close the runner's connection pools and its loop."""
+        if self.loop.is_closed():
+            return
+        from agentic_ai_kata.utils.clients import registry
+
+        self.loop.run_until_complete(registry.aclose())
+        self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+        self.loop.close()
+
+    def __enter__(self) -> "KataRunner":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run katas concurrently")
+    parser.add_argument("katas", nargs="*", help="kata class names (or parts of them)")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--uvloop", action="store_true")
+    parser.add_argument("--validate", action="store_true")
+    args = parser.parse_args()
+
+    katas = []
+    for cls in discover_katas():
+        if args.katas and not any(name in cls.__name__ for name in args.katas):
+            continue
+        try:
+            katas.append(cls())
+        except Exception as e:
+            print(f"Skipping {cls.__name__}: {type(e).__name__}: {e}")
+    with KataRunner(args.concurrency, use_uvloop=args.uvloop) as runner:
+        report = runner.run(katas, repeat=args.repeat, validate=args.validate)
+    print(report.summary())
+    for run in report.runs:
+        if run.error:
+            print(f"{run.kata}: {run.error}")
+
+
+if __name__ == "__main__":
+    main()
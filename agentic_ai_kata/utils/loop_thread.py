@@ -0,0 +1,130 @@
+"""A thread-safe sync facade over one background event loop.
+
+Threaded callers (e.g. WSGI request handlers) used to call `kata.run()`, which runs
+`asyncio.run()` each time: a new event loop, cold connection pools and, if the
+calling thread already has a running loop, a `RuntimeError`. `LoopThread` instead
+owns one event loop running forever in a daemon thread; any thread can submit a
+coroutine to it with `asyncio.run_coroutine_threadsafe` and block for the result.
+Clients, connection pools and caches tied to that loop are reused across calls.
+
+Example Usage:
+    from agentic_ai_kata.utils.loop_thread import run_kata, run_sync
+
+    # In a request handler (any thread)
+    result = run_kata(RoutingKata())
+    classification = run_sync(classify_text_message(message, tools), timeout=30)
+"""
+
+import asyncio
+import atexit
+import concurrent.futures
+import threading
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Coroutine, Optional, TypeVar
+
+if TYPE_CHECKING:
+    from agentic_ai_kata.base import KataBase
+
+T = TypeVar("T")
+
+
+class LoopThread:
+    """An event loop running in its own daemon thread, shared by every caller."""
+
+    def __init__(self, name: str = "kata-event-loop"):
+        """
+        Initializes the facade; the thread is started on first use.
+
+        Args:
+            name: The name of the background thread.
+        """
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """Start the background loop if it isn't running yet.
+
+        Returns:
+            asyncio.AbstractEventLoop: The background loop
+        """
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def serve():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(
+                    target=serve, name=self.name, daemon=True
+                )
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> "concurrent.futures.Future[T]":
+        """Schedule a coroutine on the background loop without waiting for it."""
+        return asyncio.run_coroutine_threadsafe(coro, self.start())
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+        """Run a coroutine on the background loop and wait for its result.
+
+        Args:
+            coro: The coroutine to run
+            timeout: Seconds to wait before cancelling it, None to wait forever
+
+        Returns:
+            The coroutine's result; its exception is re-raised in the caller
+
+        Raises:
+            RuntimeError: When called from the background loop itself, which would
+                deadlock
+            concurrent.futures.TimeoutError: When `timeout` expires
+        """
+        loop = self.start()
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("LoopThread.run() can't be called from its own loop")
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def stop(self) -> None:
+        """Close the loop's connection pools, then stop and close the loop."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        from agentic_ai_kata.utils.clients import registry
+
+        asyncio.run_coroutine_threadsafe(registry.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+@lru_cache(maxsize=None)
+def get_loop_thread() -> LoopThread:
+    """Get the process-wide background loop, stopped when the process exits."""
+    loop_thread = LoopThread()
+    atexit.register(loop_thread.stop)
+    return loop_thread
+
+
+def run_sync(coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+    """Run a coroutine on the process-wide background loop from any thread."""
+    return get_loop_thread().run(coro, timeout)
+
+
+def run_kata(kata: "KataBase", timeout: Optional[float] = None) -> Any:
+    """Run a kata's `arun()` on the process-wide background loop from any thread."""
+    return run_sync(kata.arun(), timeout)
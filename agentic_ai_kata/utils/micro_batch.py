@@ -0,0 +1,130 @@
+"""Collect concurrent calls into batches and process each batch at once.
+
+When many callers each make a small request with a large fixed cost, such as an
+LLM call whose system prompt dwarfs the message being classified, sending them
+together pays the fixed cost once per batch. A `MicroBatcher` holds each
+submitted item until either `max_batch_size` items are waiting or the oldest has
+waited `max_latency` seconds, then passes the batch to an async function and hands
+each caller its own result:
+
+    submit(a) --\\
+    submit(b) ---+--> process([a, b, c]) --> [ra, rb, rc] --> each caller's future
+    submit(c) --/
+
+Items waiting to be batched together must be submitted from the same event loop.
+Batches are processed concurrently, so a slow batch doesn't hold up the next.
+
+Example Usage:
+    async def embed_all(texts: list[str]) -> list[list[float]]:
+        ...
+
+    batcher = MicroBatcher(embed_all, max_batch_size=32, max_latency=0.005)
+    vectors = await asyncio.gather(*(batcher.submit(text) for text in texts))
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Generic, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass
+class BatchStats:
+    """What a `MicroBatcher` has sent."""
+
+    items: int = 0
+    batches: int = 0
+    full_batches: int = 0  # Sent because `max_batch_size` items were waiting
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.items / self.batches if self.batches else 0.0
+
+
+class MicroBatcher(Generic[T, R]):
+    """Groups items submitted close together into batches for `process`."""
+
+    def __init__(
+        self,
+        process: Callable[[List[T]], Awaitable[Sequence[R]]],
+        max_batch_size: int = 16,
+        max_latency: float = 0.005,
+    ):
+        """
+        Args:
+            process: Takes a batch of items and returns their results in the same
+                order
+            max_batch_size: Items at which a batch is sent without waiting
+            max_latency: Seconds the first item of a batch waits for others
+        """
+        self.process = process
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.stats = BatchStats()
+        self._pending: List[tuple[T, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(self, item: T) -> R:
+        """Add an item to the next batch and wait for its result.
+
+        Raises:
+            Exception: Whatever `process` raised for the item's batch
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch_size:
+            self.stats.full_batches += 1
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_latency, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        self.stats.items += len(batch)
+        self.stats.batches += 1
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        # Keep a reference until it's done, so the task isn't garbage collected
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        # If it's cancelled (even before it starts), cancel its callers rather than
+        # leave them waiting for results that will never come
+        task.add_done_callback(lambda _: self._cancel(batch))
+
+    @staticmethod
+    def _cancel(batch: List[tuple[T, asyncio.Future]]) -> None:
+        for _, future in batch:
+            if not future.done():
+                future.cancel()
+
+    async def _run(self, batch: List[tuple[T, asyncio.Future]]) -> None:
+        try:
+            results = await self.process([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(
+                    f"Batch of {len(batch)} items got {len(results)} results"
+                )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            # A caller that gave up has a cancelled future
+            if not future.done():
+                future.set_result(result)
+
+    async def aclose(self) -> None:
+        """Send any waiting items and wait for every batch to finish."""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
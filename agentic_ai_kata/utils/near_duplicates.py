@@ -0,0 +1,327 @@
+"""Find generated articles that nearly duplicate one already written.
+
+The model sometimes writes much the same article for two cities. Comparing a new
+article with every existing one is linear in the corpus, so a
+`NearDuplicateIndex` keeps a MinHash signature of each article, with
+locality-sensitive hashing (LSH) buckets, in SQLite:
+
+    - An article's shingles are its overlapping runs of `SHINGLE_SIZE` words, and
+      the similarity of two articles is the Jaccard similarity of their shingles
+    - Its MinHash signature has `NUM_PERM` values, and the share of equal values
+      in two signatures estimates their similarity. It's computed with one hash
+      per shingle rather than one per shingle and value (one permutation hashing:
+      each shingle's hash picks a bin and the signature keeps each bin's least
+      hash, and a bin no shingle fell in borrows from the next one)
+    - The signature is cut into `BANDS` bands, and each band is stored in a bucket.
+      A query only compares the articles sharing a bucket with it, so it reads a
+      few rows however large the corpus. Two articles share a bucket with
+      probability 1 - (1 - s^8)^16 at similarity s: 95% at 0.8, 1% at 0.4, so
+      thresholds below about 0.7 will miss near-duplicates
+
+With `ARTICLE_DEDUPE` set, `ChainingKata` checks each article against the index
+before writing it, and adds it to the index once written.
+With `ARTICLE_DEDUPE_SKIP_FORMATTER` also set, it checks the writer's draft against
+a second index of earlier drafts (`get_draft_index()`) before formatting it. A
+formatted article reads quite differently from its draft, so drafts are only
+compared with drafts.
+
+Example Usage:
+    index = get_near_duplicate_index()
+    for match in index.query(article, exclude="my-slug"):
+        print(f"{match.similarity:.0%} similar to articles/{match.slug}.md")
+
+    python -m agentic_ai_kata.utils.near_duplicates articles
+"""
+
+import argparse
+import hashlib
+import sqlite3
+import threading
+from array import array
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+from pydantic import BaseModel, Field
+
+from agentic_ai_kata.settings import settings
+from agentic_ai_kata.utils.article_index import tokenize
+
+# Words per shingle
+SHINGLE_SIZE = 5
+
+# Values per signature, and the bands they're cut into for LSH
+NUM_PERM = 128
+BANDS = 16
+
+# A bin's hashes are below _BIN_RANGE; a borrowed value is offset by it per bin
+# skipped, so it can't equal a value of the bin it fills
+_BIN_RANGE = (1 << 64) // NUM_PERM
+_EMPTY = (1 << 64) - 1
+
+
+class DuplicateMatch(BaseModel):
+    """An indexed article similar to a query."""
+
+    slug: str = Field(description="The article's file name without `.md`")
+    similarity: float = Field(description="Estimated Jaccard similarity, 0 to 1")
+
+
+def _hash(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set[str]:
+    """The text's overlapping runs of `size` lowercase words."""
+    words = tokenize(text)
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash(text: str) -> List[int]:
+    """The text's MinHash signature, `NUM_PERM` values."""
+    bins = [_EMPTY] * NUM_PERM
+    for shingle in shingles(text):
+        bin, value = divmod(_hash(shingle.encode()), _BIN_RANGE)
+        if value < bins[bin]:
+            bins[bin] = value
+    if all(value == _EMPTY for value in bins):
+        return bins
+    signature = []
+    for bin in range(NUM_PERM):
+        skipped = 0
+        while bins[(bin + skipped) % NUM_PERM] == _EMPTY:
+            skipped += 1
+        signature.append(bins[(bin + skipped) % NUM_PERM] + skipped * _BIN_RANGE)
+    return signature
+
+
+def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    """Estimate the Jaccard similarity of two texts from their signatures."""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def _buckets(signature: Sequence[int]) -> List[int]:
+    """The signature's bucket in each band, as signed 64-bit SQLite integers."""
+    rows = NUM_PERM // BANDS
+    buckets = []
+    for band in range(BANDS):
+        data = array("Q", signature[band * rows : (band + 1) * rows]).tobytes()
+        buckets.append(_hash(data) - (1 << 63))
+    return buckets
+
+
+class NearDuplicateIndex:
+    """MinHash signatures of articles, searchable by similarity, in one SQLite file."""
+
+    def __init__(self, path: Union[str, Path], threshold: float = 0.8):
+        """
+        Args:
+            path: The SQLite file, or ":memory:"
+            threshold: The estimated similarity from which an article is a
+                near-duplicate
+        """
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        if str(path) != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS signatures ("
+            " slug TEXT PRIMARY KEY, size INTEGER, mtime REAL,"
+            " signature BLOB NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " band INTEGER, bucket INTEGER, slug TEXT,"
+            " PRIMARY KEY (band, bucket, slug)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS buckets_slug ON buckets (slug);"
+        )
+        self._db.commit()
+
+    def _remove(self, slug: str) -> None:
+        self._db.execute("DELETE FROM buckets WHERE slug = ?", (slug,))
+        self._db.execute("DELETE FROM signatures WHERE slug = ?", (slug,))
+
+    def _add(
+        self, slug: str, markdown: str, size: Optional[int], mtime: Optional[float]
+    ) -> None:
+        self._remove(slug)
+        signature = minhash(markdown)
+        self._db.execute(
+            "INSERT INTO signatures VALUES (?, ?, ?, ?)",
+            (slug, size, mtime, array("Q", signature).tobytes()),
+        )
+        self._db.executemany(
+            "INSERT OR IGNORE INTO buckets VALUES (?, ?, ?)",
+            [(band, bucket, slug) for band, bucket in enumerate(_buckets(signature))],
+        )
+
+    def add(
+        self,
+        slug: str,
+        markdown: str,
+        size: Optional[int] = None,
+        mtime: Optional[float] = None,
+    ) -> None:
+        """Index an article, replacing any earlier version with the same slug.
+
+        Args:
+            slug: The article's file name without `.md`
+            markdown: The article
+            size: The file's size, to detect changes in `sync()`
+            mtime: The file's modification time, to detect changes in `sync()`
+        """
+        with self._lock:
+            self._add(slug, markdown, size, mtime)
+            self._db.commit()
+
+    def remove(self, slug: str) -> None:
+        """Drop an article from the index."""
+        with self._lock:
+            self._remove(slug)
+            self._db.commit()
+
+    def sync(self, directory: Union[str, Path] = "articles") -> Dict[str, int]:
+        """Bring the index up to date with a directory of `.md` articles.
+
+        Only files that are new or whose size or mtime changed are read.
+
+        Args:
+            directory: The articles directory
+
+        Returns:
+            Dict[str, int]: Counts of "added", "updated", "removed" and "unchanged"
+            articles
+        """
+        counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        with self._lock:
+            indexed = {
+                slug: (size, mtime)
+                for slug, size, mtime in self._db.execute(
+                    "SELECT slug, size, mtime FROM signatures"
+                )
+            }
+            for path in sorted(Path(directory).glob("*.md")):
+                stat = path.stat()
+                current = (stat.st_size, stat.st_mtime)
+                previous = indexed.pop(path.stem, None)
+                if previous == current:
+                    counts["unchanged"] += 1
+                    continue
+                self._add(path.stem, path.read_text(), *current)
+                counts["added" if previous is None else "updated"] += 1
+            for slug in indexed:
+                self._remove(slug)
+                counts["removed"] += 1
+            self._db.commit()
+        return counts
+
+    def query(
+        self,
+        markdown: str,
+        exclude: Optional[str] = None,
+        threshold: Optional[float] = None,
+    ) -> List[DuplicateMatch]:
+        """Find the indexed articles that nearly duplicate an article.
+
+        Args:
+            markdown: The article
+            exclude: A slug to ignore, e.g. the article's own earlier version
+            threshold: The least estimated similarity to report, defaults to the
+                index's
+
+        Returns:
+            List[DuplicateMatch]: The near-duplicates, most similar first
+        """
+        threshold = self.threshold if threshold is None else threshold
+        signature = minhash(markdown)
+        buckets = list(enumerate(_buckets(signature)))
+        values = ",".join("(?, ?)" for _ in buckets)
+        with self._lock:
+            rows = self._db.execute(
+                f"WITH q(band, bucket) AS (VALUES {values})"
+                " SELECT DISTINCT s.slug, s.signature FROM q"
+                " JOIN buckets b ON b.band = q.band AND b.bucket = q.bucket"
+                " JOIN signatures s ON s.slug = b.slug",
+                [value for bucket in buckets for value in bucket],
+            ).fetchall()
+        matches = []
+        for slug, blob in rows:
+            score = similarity(signature, array("Q", blob))
+            if slug != exclude and score >= threshold:
+                matches.append(DuplicateMatch(slug=slug, similarity=score))
+        return sorted(matches, key=lambda match: -match.similarity)
+
+    def pairs(self, threshold: Optional[float] = None) -> List[tuple]:
+        """Every pair of indexed near-duplicates.
+
+        Returns:
+            List[tuple]: (slug, slug, similarity) tuples, most similar first
+        """
+        threshold = self.threshold if threshold is None else threshold
+        with self._lock:
+            candidates = self._db.execute(
+                "SELECT DISTINCT a.slug, b.slug FROM buckets a JOIN buckets b"
+                " ON a.band = b.band AND a.bucket = b.bucket AND a.slug < b.slug"
+            ).fetchall()
+            signatures = {
+                slug: array("Q", blob)
+                for slug, blob in self._db.execute(
+                    "SELECT slug, signature FROM signatures"
+                )
+            }
+        pairs = []
+        for a, b in candidates:
+            score = similarity(signatures[a], signatures[b])
+            if score >= threshold:
+                pairs.append((a, b, score))
+        return sorted(pairs, key=lambda pair: -pair[2])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+
+
+@lru_cache(maxsize=None)
+def get_near_duplicate_index(directory: str = "articles") -> NearDuplicateIndex:
+    """Get the process-wide index stored at `ARTICLE_DEDUPE_PATH`.
+
+    It is synced with `directory` when first requested, so articles written by
+    other processes or by hand are checked against too; only new or changed files
+    are read.
+    """
+    index = NearDuplicateIndex(
+        settings.ARTICLE_DEDUPE_PATH, settings.ARTICLE_DEDUPE_THRESHOLD
+    )
+    index.sync(directory)
+    return index
+
+
+@lru_cache(maxsize=None)
+def get_draft_index() -> NearDuplicateIndex:
+    """Get the process-wide index of drafts stored at `ARTICLE_DEDUPE_DRAFTS_PATH`.
+
+    Each draft is indexed under the slug of the article written from it.
+    """
+    return NearDuplicateIndex(
+        settings.ARTICLE_DEDUPE_DRAFTS_PATH, settings.ARTICLE_DEDUPE_THRESHOLD
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List near-duplicate articles")
+    parser.add_argument("directory", nargs="?", default="articles")
+    parser.add_argument("--threshold", type=float, default=None)
+    args = parser.parse_args()
+
+    index = get_near_duplicate_index(args.directory)
+    pairs = index.pairs(args.threshold)
+    for a, b, score in pairs:
+        print(f"{score:4.0%}  {a}\n      {b}")
+    print(f"{len(pairs)} near-duplicate pairs in {len(index)} articles")
+
+
+if __name__ == "__main__":
+    main()
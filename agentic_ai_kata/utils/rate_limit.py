@@ -0,0 +1,502 @@
+"""Process-wide rate limiting for LLM requests.
+
+Concurrent routing, chaining and voting runs used to fire requests as fast as they
+could, hit provider 429s, and then retry all at once. Every model handed out by
+`agentic_ai_kata.utils.clients.get_model()` is now wrapped in a `RateLimitedModel`
+that asks a shared `RateLimiter` for permission before each request.
+
+The limiter:
+    - Enforces requests/min and tokens/min with token buckets, keyed on the model name
+    - Serves interactive requests before batch requests when the budget is short
+    - Pauses every caller (not just the one that failed) when a 429 arrives, honouring
+      `Retry-After`, and temporarily slows down until requests succeed again
+    - Retries transient failures (5xx, 408, 409, timeouts, dropped connections) with
+      exponential backoff, as the SDK would, since its own retries are off
+    - Records how long requests waited in the queue, per lane and as a "model" span
+      (see `agentic_ai_kata.utils.instrumentation`)
+
+Example Usage:
+    # Mark background work so interactive requests are served first
+    with priority(Priority.BATCH):
+        await kata.arun()
+
+    print(get_rate_limiter().metrics.snapshot())
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import TYPE_CHECKING, AsyncIterator, Iterator, Optional
+
+from pydantic_ai.messages import ModelMessage
+from pydantic_ai.models import AgentModel, EitherStreamedResponse, Model
+
+from agentic_ai_kata.settings import settings
+from agentic_ai_kata.utils.instrumentation import span
+
+if TYPE_CHECKING:
+    from pydantic_ai.messages import ModelResponse
+    from pydantic_ai.settings import ModelSettings
+    from pydantic_ai.tools import ToolDefinition
+    from pydantic_ai.usage import Usage
+
+# Rough characters-per-token ratio used to estimate prompt size before a request
+CHARS_PER_TOKEN = 4
+
+# Completion tokens reserved up front; corrected from the real usage afterwards
+ESTIMATED_COMPLETION_TOKENS = 500
+
+# How often queued callers that aren't at the head of the line re-check
+POLL_INTERVAL = 0.01
+
+# First and longest backoff (seconds) before retrying a transient failure
+TRANSIENT_RETRY_DELAY = 0.5
+MAX_TRANSIENT_RETRY_DELAY = 8.0
+
+
+class Priority(IntEnum):
+    """Priority lanes; lower values are served first."""
+
+    INTERACTIVE = 0
+    BATCH = 1
+
+
+_current_priority: ContextVar[Priority] = ContextVar(
+    "rate_limit_priority", default=Priority.INTERACTIVE
+)
+
+
+@contextmanager
+def priority(lane: Priority) -> Iterator[None]:
+    """Run the enclosed model requests in the given priority lane.
+
+    Args:
+        lane: The priority lane to use
+    """
+    token = _current_priority.set(lane)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class TokenBucket:
+    """A token bucket that refills continuously at `per_minute` units per minute.
+
+    A bucket without a limit never makes anyone wait.
+    """
+
+    def __init__(self, per_minute: Optional[float]):
+        self.per_minute = per_minute
+        self.scale = 1.0
+        self.level = float(per_minute or 0)
+        self.updated = time.monotonic()
+
+    @property
+    def capacity(self) -> float:
+        return float(self.per_minute or 0)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        rate = self.capacity * self.scale / 60.0
+        self.level = min(self.capacity, self.level + (now - self.updated) * rate)
+        self.updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if available now)."""
+        if self.per_minute is None:
+            return 0.0
+        self._refill()
+        # Never ask for more than a full bucket, or a huge prompt would wait forever
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / (self.capacity * self.scale / 60.0)
+
+    def consume(self, amount: float) -> None:
+        """Take `amount` units; negative amounts give units back."""
+        if self.per_minute is None:
+            return
+        self._refill()
+        self.level = min(self.capacity, self.level - amount)
+
+
+@dataclass
+class LaneMetrics:
+    """Queue-wait statistics for one priority lane."""
+
+    requests: int = 0
+    throttled: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        return self.total_wait / self.requests if self.requests else 0.0
+
+
+@dataclass
+class LimiterMetrics:
+    """Counters collected by a `RateLimiter`."""
+
+    lanes: dict[Priority, LaneMetrics] = field(
+        default_factory=lambda: {lane: LaneMetrics() for lane in Priority}
+    )
+    rate_limited_responses: int = 0
+    transient_errors: int = 0
+    tokens_used: int = 0
+
+    def record_wait(self, lane: Priority, waited: float, throttled: bool) -> None:
+        metrics = self.lanes[lane]
+        metrics.requests += 1
+        metrics.total_wait += waited
+        metrics.max_wait = max(metrics.max_wait, waited)
+        if throttled:
+            metrics.throttled += 1
+
+    def snapshot(self) -> dict:
+        """A JSON-friendly copy of the metrics."""
+        return {
+            "rate_limited_responses": self.rate_limited_responses,
+            "transient_errors": self.transient_errors,
+            "tokens_used": self.tokens_used,
+            "lanes": {
+                lane.name.lower(): {
+                    "requests": m.requests,
+                    "throttled": m.throttled,
+                    "mean_wait": m.mean_wait,
+                    "max_wait": m.max_wait,
+                }
+                for lane, m in self.lanes.items()
+            },
+        }
+
+
+class RateLimiter:
+    """A requests/min + tokens/min limiter with priority lanes and 429 backoff.
+
+    The limiter only uses thread-safe state and `asyncio.sleep`, so one instance can
+    be shared by every event loop and thread in the process.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        max_backoff: float = 60.0,
+    ):
+        """
+        Initializes the limiter.
+
+        Args:
+            requests_per_minute: Request quota, or None for no request limit.
+            tokens_per_minute: Token quota, or None for no token limit.
+            max_backoff: Upper bound (seconds) for a pause after a 429.
+        """
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_backoff = max_backoff
+        self.metrics = LimiterMetrics()
+        self._waiters: list[tuple[Priority, int]] = []
+        self._counter = itertools.count()
+        self._paused_until = 0.0
+        self._strikes = 0
+        self._lock = threading.Lock()
+
+    def _try_grant(self, ticket: tuple[Priority, int], tokens: int) -> float:
+        """Grant the ticket if it's first in line and the budget allows.
+
+        Returns:
+            float: 0 if granted, otherwise how long to sleep before trying again
+        """
+        if self._waiters[0] != ticket:
+            return POLL_INTERVAL
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        wait = max(self.requests.time_until(1), self.tokens.time_until(tokens))
+        if wait > 0:
+            return wait
+        self.requests.consume(1)
+        self.tokens.consume(tokens)
+        heapq.heappop(self._waiters)
+        return 0.0
+
+    async def acquire(self, tokens: int, lane: Optional[Priority] = None) -> float:
+        """Wait until a request of `tokens` tokens may be sent.
+
+        Args:
+            tokens: Estimated tokens for the request (prompt + completion)
+            lane: Priority lane, defaults to the lane set with `priority()`
+
+        Returns:
+            float: Seconds spent waiting in the queue
+        """
+        lane = _current_priority.get() if lane is None else lane
+        ticket = (lane, next(self._counter))
+        started = time.monotonic()
+        throttled = False
+        with self._lock:
+            heapq.heappush(self._waiters, ticket)
+        try:
+            while True:
+                with self._lock:
+                    delay = self._try_grant(ticket, tokens)
+                if delay == 0:
+                    break
+                throttled = True
+                await asyncio.sleep(delay)
+        except BaseException:
+            with self._lock:
+                if ticket in self._waiters:
+                    self._waiters.remove(ticket)
+                    heapq.heapify(self._waiters)
+            raise
+
+        waited = time.monotonic() - started
+        with self._lock:
+            self.metrics.record_wait(lane, waited, throttled)
+        return waited
+
+    def settle(self, estimated: int, actual: Optional[int]) -> None:
+        """Correct the token bucket once the real usage is known.
+
+        Args:
+            estimated: Tokens reserved by `acquire`
+            actual: Tokens the provider reported, if any
+        """
+        if actual is None:
+            return
+        with self._lock:
+            self.tokens.consume(actual - estimated)
+            self.metrics.tokens_used += actual
+            # A success lets the limiter speed back up after a 429
+            self._strikes = 0
+            for bucket in (self.requests, self.tokens):
+                bucket.scale = min(1.0, bucket.scale * 1.1)
+
+    def refund(self, tokens: int) -> None:
+        """Give back a request and its tokens, e.g. after the provider refused it.
+
+        Args:
+            tokens: Tokens reserved by `acquire`
+        """
+        with self._lock:
+            self.requests.consume(-1)
+            self.tokens.consume(-tokens)
+
+    def failed_transiently(self) -> None:
+        """Count a request that failed with a transient error, e.g. a 5xx."""
+        with self._lock:
+            self.metrics.transient_errors += 1
+
+    def rate_limited(self, retry_after: Optional[float] = None) -> float:
+        """Pause every caller after the provider returned a 429.
+
+        Uses `Retry-After` when the provider sent one, otherwise exponential backoff
+        with jitter. The buckets are also slowed down until requests succeed again.
+
+        Args:
+            retry_after: The provider's `Retry-After` in seconds, if any
+
+        Returns:
+            float: The pause, in seconds
+        """
+        with self._lock:
+            self._strikes += 1
+            self.metrics.rate_limited_responses += 1
+            if retry_after is None:
+                retry_after = min(self.max_backoff, 2 ** (self._strikes - 1))
+                retry_after *= 1 + random.random() * 0.25
+            retry_after = min(retry_after, self.max_backoff)
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            for bucket in (self.requests, self.tokens):
+                bucket.scale = max(0.1, bucket.scale * 0.5)
+        return retry_after
+
+
+_limiters: dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(model_name: Optional[str] = None) -> RateLimiter:
+    """Get the process-wide limiter for a model.
+
+    Args:
+        model_name: The model name, defaults to `settings.DEFAULT_MODEL`
+
+    Returns:
+        RateLimiter: The limiter shared by every request to that model
+    """
+    model_name = model_name or settings.DEFAULT_MODEL
+    with _limiters_lock:
+        limiter = _limiters.get(model_name)
+        if limiter is None:
+            limiter = RateLimiter(
+                requests_per_minute=settings.RATE_LIMIT_RPM,
+                tokens_per_minute=settings.RATE_LIMIT_TPM,
+            )
+            _limiters[model_name] = limiter
+    return limiter
+
+
+def estimate_tokens(messages: list[ModelMessage], tools: list["ToolDefinition"]) -> int:
+    """Cheaply estimate the tokens a request will use.
+
+    Args:
+        messages: The messages being sent
+        tools: The tool definitions being sent
+
+    Returns:
+        int: Estimated prompt tokens plus a completion allowance
+    """
+    chars = 0
+    for message in messages:
+        for part in message.parts:
+            content = getattr(part, "content", None) or getattr(part, "args", "")
+            chars += len(str(content))
+    for tool in tools:
+        chars += len(tool.description) + len(str(tool.parameters_json_schema))
+    return chars // CHARS_PER_TOKEN + ESTIMATED_COMPLETION_TOKENS
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read `Retry-After` from a provider error, if it has one."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for header in ("retry-after-ms", "retry-after"):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            seconds = float(value)
+        except ValueError:
+            continue
+        return seconds / 1000 if header == "retry-after-ms" else seconds
+    return None
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Whether a failed request is worth retrying: the errors the SDK retries."""
+    status_code = getattr(error, "status_code", None)
+    if status_code is not None:
+        return status_code in (408, 409) or status_code >= 500
+    try:
+        from openai import APIConnectionError
+    except ImportError:
+        return False
+    # Includes APITimeoutError
+    return isinstance(error, APIConnectionError)
+
+
+def transient_retry_delay(attempt: int) -> float:
+    """Exponential backoff with jitter before retry number `attempt` (from 1)."""
+    delay = min(MAX_TRANSIENT_RETRY_DELAY, TRANSIENT_RETRY_DELAY * 2 ** (attempt - 1))
+    return delay * (1 - random.random() * 0.25)
+
+
+class RateLimitedModel(Model):
+    """Wraps a pydantic-ai model so every request goes through a `RateLimiter`."""
+
+    def __init__(self, wrapped: Model, limiter: RateLimiter, max_retries: int = 3):
+        """
+        Initializes the wrapper.
+
+        Args:
+            wrapped: The model that actually makes requests.
+            limiter: The limiter shared by every request to this model.
+            max_retries: How many times to retry a request that got a 429 or a
+                transient error.
+        """
+        self.wrapped = wrapped
+        self.limiter = limiter
+        self.max_retries = max_retries
+
+    async def agent_model(
+        self,
+        *,
+        function_tools: list["ToolDefinition"],
+        allow_text_result: bool,
+        result_tools: list["ToolDefinition"],
+    ) -> AgentModel:
+        agent_model = await self.wrapped.agent_model(
+            function_tools=function_tools,
+            allow_text_result=allow_text_result,
+            result_tools=result_tools,
+        )
+        return RateLimitedAgentModel(
+            agent_model, self, function_tools + result_tools
+        )
+
+    def name(self) -> str:
+        return self.wrapped.name()
+
+
+class RateLimitedAgentModel(AgentModel):
+    """The per-step counterpart of `RateLimitedModel`."""
+
+    def __init__(
+        self,
+        wrapped: AgentModel,
+        model: RateLimitedModel,
+        tools: list["ToolDefinition"],
+    ):
+        self.wrapped = wrapped
+        self.model = model
+        self.tools = tools
+
+    async def request(
+        self, messages: list[ModelMessage], model_settings: Optional["ModelSettings"]
+    ) -> tuple["ModelResponse", "Usage"]:
+        limiter = self.model.limiter
+        estimated = estimate_tokens(messages, self.tools)
+        with span("model", self.model.name()) as request_span:
+            for attempt in range(self.model.max_retries + 1):
+                waited = await limiter.acquire(estimated)
+                request_span.add(queue_time=waited, retries=1 if attempt else 0)
+                try:
+                    response, usage = await self.wrapped.request(
+                        messages, model_settings
+                    )
+                except Exception as e:
+                    if is_rate_limit_error(e):
+                        # The retry acquires again, so don't charge the refused attempt
+                        limiter.refund(estimated)
+                        limiter.rate_limited(retry_after_seconds(e))
+                    elif is_transient_error(e):
+                        # Only this caller backs off: it's not a quota problem
+                        limiter.refund(estimated)
+                        limiter.failed_transiently()
+                        if attempt < self.model.max_retries:
+                            await asyncio.sleep(transient_retry_delay(attempt + 1))
+                    else:
+                        raise
+                    if attempt == self.model.max_retries:
+                        raise
+                    continue
+                limiter.settle(estimated, usage.total_tokens)
+                request_span.add(
+                    requests=1,
+                    prompt_tokens=usage.request_tokens or 0,
+                    completion_tokens=usage.response_tokens or 0,
+                )
+                return response, usage
+
+    @asynccontextmanager
+    async def request_stream(
+        self, messages: list[ModelMessage], model_settings: Optional["ModelSettings"]
+    ) -> AsyncIterator[EitherStreamedResponse]:
+        await self.model.limiter.acquire(estimate_tokens(messages, self.tools))
+        async with self.wrapped.request_stream(messages, model_settings) as stream:
+            yield stream
@@ -0,0 +1,297 @@
+"""Opt-in cache for deterministic LLM responses.
+
+Reruns of the katas send byte-identical requests (same model, system prompt, result
+schema and user prompt). With `RESPONSE_CACHE=true` every model from
+`agentic_ai_kata.utils.clients.get_model()` is wrapped in a `CachedModel`, which
+answers repeated requests from a local SQLite store instead of calling the provider.
+
+The cache key is a SHA-256 of a canonical JSON document containing:
+    - The model name
+    - The messages, without timestamps or provider-generated tool call ids
+    - The function tools and result tools (so the `result_type` schema is included)
+    - Whether a plain text result is allowed, and the model settings
+
+Entries expire after `RESPONSE_CACHE_TTL` seconds and the least recently used entries
+are evicted beyond `RESPONSE_CACHE_MAX_ENTRIES`.
+
+Example Usage:
+    # .env
+    RESPONSE_CACHE=true
+
+    # Or wrap a model explicitly:
+    model = CachedModel(get_model(), ResponseCache("responses.sqlite3"))
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, AsyncIterator, Optional, Union
+
+from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter, ModelResponse
+from pydantic_ai.models import AgentModel, EitherStreamedResponse, Model
+from pydantic_ai.usage import Usage
+
+from agentic_ai_kata.settings import settings
+from agentic_ai_kata.utils.instrumentation import record
+
+if TYPE_CHECKING:
+    from pydantic_ai.settings import ModelSettings
+    from pydantic_ai.tools import ToolDefinition
+
+# Fields that differ between otherwise identical requests
+VOLATILE_FIELDS = {"timestamp", "tool_call_id"}
+
+
+def _canonical(value: Any) -> Any:
+    """Drop volatile fields so equal requests serialize identically."""
+    if isinstance(value, dict):
+        return {
+            k: _canonical(v) for k, v in value.items() if k not in VOLATILE_FIELDS
+        }
+    if isinstance(value, list):
+        return [_canonical(v) for v in value]
+    return value
+
+
+def cache_key(
+    model_name: str,
+    messages: list[ModelMessage],
+    tools: list["ToolDefinition"],
+    allow_text_result: bool,
+    model_settings: Optional["ModelSettings"] = None,
+) -> str:
+    """Compute the cache key for a model request.
+
+    Args:
+        model_name: The name of the model being called
+        messages: The messages being sent
+        tools: Function and result tool definitions
+        allow_text_result: Whether a plain text result is permitted
+        model_settings: The model settings for the request
+
+    Returns:
+        str: A hex SHA-256 digest
+    """
+    document = {
+        "model": model_name,
+        "messages": _canonical(
+            ModelMessagesTypeAdapter.dump_python(messages, mode="json")
+        ),
+        "tools": [
+            {
+                "name": tool.name,
+                "description": tool.description,
+                "parameters": tool.parameters_json_schema,
+            }
+            for tool in tools
+        ],
+        "allow_text_result": allow_text_result,
+        "model_settings": model_settings or {},
+    }
+    encoded = json.dumps(document, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class ResponseCache:
+    """A SQLite-backed store of model responses with TTL and LRU size limits."""
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+    ):
+        """
+        Initializes the cache, creating the database if needed.
+
+        Args:
+            path: The SQLite database file (":memory:" for an in-memory cache).
+            ttl: Seconds before an entry expires, or None to keep entries forever.
+            max_entries: Maximum number of entries, or None for no limit.
+        """
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " usage TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)"
+        )
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[tuple[ModelResponse, Usage]]:
+        """Look up a response.
+
+        Args:
+            key: The cache key
+
+        Returns:
+            Optional[tuple[ModelResponse, Usage]]: The cached response and its
+            original usage, or None on a miss or an expired entry
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response, usage, created_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None or (self.ttl is not None and now - row[2] > self.ttl):
+                self.misses += 1
+                return None
+            self._db.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?", (now, key)
+            )
+            self._db.commit()
+            self.hits += 1
+
+        (response,) = ModelMessagesTypeAdapter.validate_json(row[0])
+        return response, Usage(**json.loads(row[1]))
+
+    def put(self, key: str, response: ModelResponse, usage: Usage) -> None:
+        """Store a response, evicting expired and least recently used entries.
+
+        Args:
+            key: The cache key
+            response: The model response
+            usage: The usage reported for the response
+        """
+        now = time.time()
+        encoded = ModelMessagesTypeAdapter.dump_json([response]).decode()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, encoded, json.dumps(asdict(usage)), now, now),
+            )
+            if self.ttl is not None:
+                self._db.execute(
+                    "DELETE FROM responses WHERE created_at < ?", (now - self.ttl,)
+                )
+            if self.max_entries is not None:
+                self._db.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY last_used DESC"
+                    " LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            self._db.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Get the process-wide cache configured by the `RESPONSE_CACHE_*` settings."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(
+                settings.RESPONSE_CACHE_PATH,
+                ttl=settings.RESPONSE_CACHE_TTL,
+                max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+            )
+    return _cache
+
+
+class CachedModel(Model):
+    """Wraps a pydantic-ai model so identical requests are answered from a cache."""
+
+    def __init__(self, wrapped: Model, cache: ResponseCache):
+        """
+        Initializes the wrapper.
+
+        Args:
+            wrapped: The model that makes requests on a cache miss.
+            cache: Where responses are stored.
+        """
+        self.wrapped = wrapped
+        self.cache = cache
+
+    async def agent_model(
+        self,
+        *,
+        function_tools: list["ToolDefinition"],
+        allow_text_result: bool,
+        result_tools: list["ToolDefinition"],
+    ) -> AgentModel:
+        agent_model = await self.wrapped.agent_model(
+            function_tools=function_tools,
+            allow_text_result=allow_text_result,
+            result_tools=result_tools,
+        )
+        return CachedAgentModel(
+            agent_model, self, function_tools + result_tools, allow_text_result
+        )
+
+    def name(self) -> str:
+        return self.wrapped.name()
+
+
+class CachedAgentModel(AgentModel):
+    """The per-step counterpart of `CachedModel`."""
+
+    def __init__(
+        self,
+        wrapped: AgentModel,
+        model: CachedModel,
+        tools: list["ToolDefinition"],
+        allow_text_result: bool,
+    ):
+        self.wrapped = wrapped
+        self.model = model
+        self.tools = tools
+        self.allow_text_result = allow_text_result
+
+    async def request(
+        self, messages: list[ModelMessage], model_settings: Optional["ModelSettings"]
+    ) -> tuple[ModelResponse, Usage]:
+        key = cache_key(
+            self.model.name(),
+            messages,
+            self.tools,
+            self.allow_text_result,
+            model_settings,
+        )
+        cached = self.model.cache.get(key)
+        if cached is not None:
+            # A cache hit costs nothing, so report no tokens
+            record(requests=1, cache_hits=1)
+            return cached[0], Usage(details={"cache_hits": 1})
+
+        response, usage = await self.wrapped.request(messages, model_settings)
+        self.model.cache.put(key, response, usage)
+        return response, usage
+
+    @asynccontextmanager
+    async def request_stream(
+        self, messages: list[ModelMessage], model_settings: Optional["ModelSettings"]
+    ) -> AsyncIterator[EitherStreamedResponse]:
+        # Streams are passed through uncached
+        async with self.wrapped.request_stream(messages, model_settings) as stream:
+            yield stream
@@ -1,8 +1,27 @@
+import asyncio
+from dataclasses import dataclass
+from functools import lru_cache
 from pydantic import BaseModel, Field
-from agentic_ai_kata.utils.text_message import TextMessage
 from agentic_ai_kata.settings import settings
+from agentic_ai_kata.utils.text_message import TextMessage
+from agentic_ai_kata.utils.cascade import confident, get_model_cascade
+from agentic_ai_kata.utils.clients import get_model
+from agentic_ai_kata.utils.instrumentation import span
+from agentic_ai_kata.utils.micro_batch import MicroBatcher
 from pydantic_ai import Agent, Tool
-from typing import List
+from typing import (
+    TYPE_CHECKING,
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Union,
+)
+
+if TYPE_CHECKING:
+    from pydantic_ai.models import Model
 
 
 class TextMessageClassification(BaseModel):
@@ -14,32 +33,413 @@ class TextMessageClassification(BaseModel):
     reasoning: str = Field(description="The reasoning behind the classification")
 
 
-async def classify_text_message(
-    message: TextMessage, tools: List[Tool]
-) -> TextMessageClassification:
-    """Classify the text message into a category"""
+def _guidelines(tool_string: str) -> str:
+    """The handlers and when to use each, shared by the classifiers' prompts."""
+    return (
+        "Here is a list of potential tools that can be used as handlers: "
+        f"{tool_string}\n\n"
+        "Guidelines for classification:\n"
+        "1. Use search_rolodex when someone is trying to identify who someone is, asking 'who is this?', or needs contact information\n"
+        "2. Use search_wikipedia for general information lookups or research queries\n"
+        "3. Use generate_and_email_report for requests to create and send reports\n"
+        "4. Use add_to_rolodex when someone is providing their contact information\n"
+        "5. Use conversation for general chat that doesn't fit the above categories\n"
+        "6. Use summarize_webpage when someone shares a URL or asks about webpage content"
+    )
 
-    tool_string = ",".join([tool.name for tool in tools])
 
-    classification_agent = Agent(
-        settings.DEFAULT_MODEL,
+@lru_cache(maxsize=None)
+def _classification_agent(tool_string: str, instructions: str = "") -> Agent:
+    """The classifier for a set of handlers, built once per set.
+
+    Building an agent generates the JSON schema of its result type, which costs more
+    CPU than the rest of a classification, so the model is supplied per run instead.
+    `instructions` are appended to the system prompt, e.g. by ensemble members.
+    """
+    return Agent(
         result_type=TextMessageClassification,
         system_prompt=(
             "You are an expert text message classifier and routing assistant. "
             "You are given a text message and you need to classify it into a category. "
             "You should also return the handler that should process this message. "
-            "Here is a list of potential tools that can be used as handlers: "
-            f"{tool_string}\n\n"
-            "Guidelines for classification:\n"
-            "1. Use search_rolodex when someone is trying to identify who someone is, asking 'who is this?', or needs contact information\n"
-            "2. Use search_wikipedia for general information lookups or research queries\n"
-            "3. Use generate_and_email_report for requests to create and send reports\n"
-            "4. Use add_to_rolodex when someone is providing their contact information\n"
-            "5. Use conversation for general chat that doesn't fit the above categories\n"
-            "6. Use summarize_webpage when someone shares a URL or asks about webpage content"
+            + _guidelines(tool_string)
+            + (f"\n\n{instructions}" if instructions else "")
         ),
     )
 
-    classification_result = await classification_agent.run(message.body)
+
+async def classify_text_message(
+    message: TextMessage,
+    tools: List[Tool],
+    model: Optional["Model"] = None,
+    context: Optional[str] = None,
+) -> TextMessageClassification:
+    """Classify the text message into a category.
+
+    `context` is a summary of the earlier messages in the thread (see
+    `agentic_ai_kata.utils.thread_summary`); without it only the body is sent.
+    Without a `model`, the step's model comes from the model cascade (see
+    `agentic_ai_kata.utils.cascade`), escalating less confident classifications.
+    """
+
+    tool_string = ",".join([tool.name for tool in tools])
+
+    classification_agent = _classification_agent(tool_string)
+
+    prompt = message.body
+    if context:
+        prompt = f"Conversation so far: {context}\n\nNew message: {message.body}"
+
+    with span("agent", "classify_text_message"):
+        if model is not None:
+            classification_result = await classification_agent.run(prompt, model=model)
+        else:
+            classification_result = await get_model_cascade().run(
+                classification_agent, "classify_text_message", prompt, accept=confident
+            )
 
     return classification_result
+
+
+class IndexedClassification(TextMessageClassification):
+    """The classification of one of a batch of numbered messages"""
+
+    index: int = Field(description="The number of the message classified")
+
+
+class TextMessageClassifications(BaseModel):
+    """The classifications of a batch of text messages"""
+
+    classifications: List[IndexedClassification] = Field(
+        description="One classification per message"
+    )
+
+
+@lru_cache(maxsize=None)
+def _batch_classification_agent(tool_string: str) -> Agent:
+    """The classifier of numbered batches of messages for a set of handlers."""
+    return Agent(
+        result_type=TextMessageClassifications,
+        system_prompt=(
+            "You are an expert text message classifier and routing assistant. "
+            "You are given numbered text messages from unrelated senders, and you "
+            "need to classify each one independently into a category. "
+            "For each message, return its number and the handler that should "
+            "process it. "
+            + _guidelines(tool_string)
+        ),
+    )
+
+
+def _numbered(index: int, message: TextMessage, context: Optional[str]) -> str:
+    if context:
+        return (
+            f"Message {index}:\nConversation so far: {context}\n"
+            f"New message: {message.body}"
+        )
+    return f"Message {index}:\n{message.body}"
+
+
+class BatchClassifier:
+    """Classifies messages arriving close together in one request per batch.
+
+    The system prompt, with its handler guidelines, is most of a classification's
+    prompt tokens. Messages submitted within `max_latency` seconds of each other, up
+    to `max_batch_size`, are sent as one numbered list and the classifications are
+    handed back to each caller (see `agentic_ai_kata.utils.micro_batch`). A message
+    the response leaves out is classified on its own.
+
+    Example Usage:
+        classifier = BatchClassifier(mock_tools)
+        results = await asyncio.gather(*(classifier.classify(m) for m in messages))
+    """
+
+    def __init__(
+        self,
+        tools: List[Tool],
+        max_batch_size: Optional[int] = None,
+        max_latency: Optional[float] = None,
+        model: Optional["Model"] = None,
+    ):
+        """
+        Args:
+            tools: The handlers the classifier can choose from
+            max_batch_size: Messages per request, defaults to
+                `settings.CLASSIFY_BATCH_SIZE`
+            max_latency: Seconds a message waits for others, defaults to
+                `settings.CLASSIFY_BATCH_LATENCY`
+            model: The model for every request; without it, the
+                "classify_text_message_batch" step's model from the model cascade
+        """
+        self.tools = tools
+        self.model = model
+        self.fallbacks = 0  # Messages left out of a response, classified alone
+        self._tool_string = ",".join([tool.name for tool in tools])
+        self.batcher = MicroBatcher(
+            self._classify_batch,
+            max_batch_size=max_batch_size or settings.CLASSIFY_BATCH_SIZE,
+            max_latency=(
+                settings.CLASSIFY_BATCH_LATENCY if max_latency is None else max_latency
+            ),
+        )
+
+    async def classify(
+        self, message: TextMessage, context: Optional[str] = None
+    ) -> TextMessageClassification:
+        """Classify a message in the next batch.
+
+        Args:
+            message: The message to classify
+            context: A summary of the earlier messages in the thread
+
+        Returns:
+            TextMessageClassification: The message's classification (not a run
+            result, which is shared by the whole batch)
+        """
+        return await self.batcher.submit((message, context))
+
+    async def _classify_batch(
+        self, items: List[tuple[TextMessage, Optional[str]]]
+    ) -> List[TextMessageClassification]:
+        if len(items) == 1:
+            message, context = items[0]
+            result = await classify_text_message(
+                message, self.tools, self.model, context
+            )
+            return [result.data]
+
+        agent = _batch_classification_agent(self._tool_string)
+        prompt = "\n\n".join(
+            _numbered(i, message, context)
+            for i, (message, context) in enumerate(items, 1)
+        )
+        with span("agent", "classify_text_message_batch", messages=len(items)):
+            if self.model is not None:
+                result = await agent.run(prompt, model=self.model)
+            else:
+                result = await get_model_cascade().run(
+                    agent, "classify_text_message_batch", prompt
+                )
+
+        by_index: Dict[int, TextMessageClassification] = {}
+        for indexed in result.data.classifications:
+            if 1 <= indexed.index <= len(items):
+                by_index.setdefault(
+                    indexed.index,
+                    TextMessageClassification(**indexed.model_dump(exclude={"index"})),
+                )
+        missing = [i for i in range(1, len(items) + 1) if i not in by_index]
+        self.fallbacks += len(missing)
+        alone = await asyncio.gather(
+            *(
+                classify_text_message(
+                    items[i - 1][0], self.tools, self.model, items[i - 1][1]
+                )
+                for i in missing
+            )
+        )
+        for i, run in zip(missing, alone):
+            by_index[i] = run.data
+        return [by_index[i] for i in range(1, len(items) + 1)]
+
+
+@dataclass(frozen=True)
+class EnsembleMember:
+    """One classifier of a routing ensemble: a prompt variant on a model."""
+
+    instructions: str  # Added to the classifier's system prompt
+    model: Optional[str] = None  # Defaults to `settings.DEFAULT_MODEL`
+
+
+# Different angles on the same guidelines, so members don't all make the same mistake
+ENSEMBLE_INSTRUCTIONS = (
+    "Decide by what the sender wants done, not by the topic of the message.",
+    "Consider each handler in turn and pick the one whose description fits best. "
+    "If none fits well, use conversation.",
+    "Read the message literally: a question about who someone is, shared contact "
+    "details, a URL and a request for a report each have their own handler.",
+)
+
+
+def default_ensemble() -> List[EnsembleMember]:
+    """One member per prompt variant, on `ROUTING_ENSEMBLE_MODELS` in turn."""
+    models = settings.ROUTING_ENSEMBLE_MODELS or [None]
+    return [
+        EnsembleMember(instructions=instructions, model=models[i % len(models)])
+        for i, instructions in enumerate(ENSEMBLE_INSTRUCTIONS)
+    ]
+
+
+class EnsembleClassification(BaseModel):
+    """A routing decision and the classifications it was made from."""
+
+    classification: TextMessageClassification = Field(
+        description="The decision: the winning handler, with the vote share as its "
+        "confidence when the ensemble was asked"
+    )
+    votes: List[TextMessageClassification] = Field(
+        description="Every classification made for the message, the first one first"
+    )
+
+    @property
+    def calls(self) -> int:
+        """Classifications made for the message."""
+        return len(self.votes)
+
+
+def vote(votes: List[TextMessageClassification]) -> TextMessageClassification:
+    """The handler most votes chose, ties broken by their summed confidence.
+
+    Returns:
+        TextMessageClassification: The most confident winning vote, with its
+        confidence replaced by the winners' share of all votes' confidence
+    """
+    weights: Dict[str, List[float]] = {}
+    for classification in votes:
+        weights.setdefault(classification.handler, []).append(
+            max(classification.confidence, 0.0)
+        )
+    handler = max(weights, key=lambda h: (len(weights[h]), sum(weights[h])))
+    total = sum(sum(w) for w in weights.values())
+    winners = [c for c in votes if c.handler == handler]
+    best = max(winners, key=lambda c: c.confidence)
+    return best.model_copy(
+        update={
+            "confidence": sum(weights[handler]) / total if total else 0.0,
+            "reasoning": f"{len(winners)} of {len(votes)} votes. {best.reasoning}",
+        }
+    )
+
+
+async def classify_with_ensemble(
+    message: TextMessage,
+    tools: List[Tool],
+    threshold: Optional[float] = None,
+    members: Optional[List[EnsembleMember]] = None,
+    context: Optional[str] = None,
+) -> EnsembleClassification:
+    """Classify a message once, asking an ensemble only if that's unsure.
+
+    A classification at least `threshold` confident is used as is. Otherwise the
+    ensemble's members classify the message concurrently, and the handler with
+    the most votes (counting the first classification's) wins. Members that fail
+    don't vote.
+
+    Args:
+        message: The message to classify
+        tools: The handlers the classifier can choose from
+        threshold: The confidence below which the ensemble is asked, defaults to
+            `settings.ROUTING_ENSEMBLE_THRESHOLD`
+        members: The ensemble, defaults to `default_ensemble()`
+        context: A summary of the earlier messages in the thread
+
+    Returns:
+        EnsembleClassification: The decision and every classification made
+    """
+    threshold = settings.ROUTING_ENSEMBLE_THRESHOLD if threshold is None else threshold
+    first = (await classify_text_message(message, tools, context=context)).data
+    if first.confidence >= threshold:
+        return EnsembleClassification(classification=first, votes=[first])
+
+    members = default_ensemble() if members is None else members
+    tool_string = ",".join([tool.name for tool in tools])
+    prompt = message.body
+    if context:
+        prompt = f"Conversation so far: {context}\n\nNew message: {message.body}"
+
+    async def ask(member: EnsembleMember) -> TextMessageClassification:
+        agent = _classification_agent(tool_string, member.instructions)
+        result = await agent.run(prompt, model=get_model(member.model))
+        return result.data
+
+    with span("agent", "routing_ensemble"):
+        results = await asyncio.gather(
+            *(ask(member) for member in members), return_exceptions=True
+        )
+    for result in results:
+        if isinstance(result, asyncio.CancelledError):
+            raise result
+    votes = [first] + [r for r in results if isinstance(r, TextMessageClassification)]
+    return EnsembleClassification(classification=vote(votes), votes=votes)
+
+
+# Marks the end of the input (or of a worker) in `route_messages`
+_DONE = object()
+
+
+async def route_messages(
+    messages: Union[Iterable[TextMessage], AsyncIterable[TextMessage]],
+    tools: List[Tool],
+    concurrency: int = 8,
+    classify=classify_text_message,
+    batch: Optional[BatchClassifier] = None,
+) -> AsyncIterator[tuple[TextMessage, TextMessageClassification]]:
+    """Classify a stream of messages with a bounded number of requests in flight.
+
+    Messages are pulled from `messages` only as workers free up, and results are
+    handed back through a bounded queue, so a large input (e.g.
+    `ConversationStore.iter_messages()`) is never read into memory and a slow
+    consumer slows down the input rather than piling up results.
+
+    Args:
+        messages: The messages to classify, sync or async iterable
+        tools: The handlers the classifier can choose from
+        concurrency: Maximum number of classifications running at once
+        classify: The classification function, `classify_text_message` by default
+        batch: Classify with this `BatchClassifier` instead of `classify`, so the
+            messages in flight at once (up to `concurrency`) share a request
+
+    Yields:
+        tuple[TextMessage, TextMessageClassification]: Each message with its
+        classification run result (its classification, with `batch`), in
+        completion order
+    """
+    if batch is not None:
+
+        async def classify(message: TextMessage, tools: List[Tool]):
+            return await batch.classify(message)
+
+    inbox: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+    outbox: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+
+    async def produce():
+        if hasattr(messages, "__aiter__"):
+            async for message in messages:
+                await inbox.put(message)
+        else:
+            for message in messages:
+                await inbox.put(message)
+        for _ in range(concurrency):
+            await inbox.put(_DONE)
+
+    async def work():
+        while (message := await inbox.get()) is not _DONE:
+            await outbox.put((message, await classify(message, tools)))
+        await outbox.put(_DONE)
+
+    async def fail_on_error(task: asyncio.Task):
+        # Surface a producer or worker failure to the consumer instead of hanging
+        try:
+            await task
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            await outbox.put(e)
+
+    tasks = [asyncio.create_task(produce())]
+    tasks += [asyncio.create_task(work()) for _ in range(concurrency)]
+    watchers = [asyncio.create_task(fail_on_error(task)) for task in tasks]
+    try:
+        finished = 0
+        while finished < concurrency:
+            item = await outbox.get()
+            if item is _DONE:
+                finished += 1
+            elif isinstance(item, BaseException):
+                raise item
+            else:
+                yield item
+    finally:
+        for task in tasks + watchers:
+            task.cancel()
+        await asyncio.gather(*tasks, *watchers, return_exceptions=True)
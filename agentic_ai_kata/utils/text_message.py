@@ -6,7 +6,7 @@ or examples in the kata exercises.
 
 Key Features:
     - Generate sci-fi themed SMS conversations using LLMs
-    - Save conversations to JSON files for reuse
+    - Save conversations to a `ConversationStore` (JSON files by default) for reuse
     - Load existing conversations from storage
     - Manage conversation lifecycle (create, store, load, cleanup)
 
@@ -14,6 +14,9 @@ Example Usage:
     # Generate all example conversations:
     python -m agentic_ai_kata.utils.text_message
 
+    # Generate fixtures from your own {"name": "theme"} JSON file:
+    python -m agentic_ai_kata.utils.text_message path/to/examples.json
+
     # Use in code:
     conversations = await get_example_conversations()
     for conv in conversations:
@@ -22,16 +25,43 @@ Example Usage:
             print(f"{msg.from_} -> {msg.to}: {msg.body}")
 """
 
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
 from datetime import datetime
+from functools import lru_cache
 import asyncio
+import bisect
+import json
+import sys
 from pathlib import Path
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from pydantic_ai import Agent
 from agentic_ai_kata.settings import settings
+from agentic_ai_kata.utils.clients import get_model
+from agentic_ai_kata.utils.instrumentation import span
 from slugify import slugify
 import uuid
 
+# The built-in examples, used unless EXAMPLE_CONVERSATIONS_FILE points elsewhere
+DEFAULT_EXAMPLES = {
+    "casual_banter": "Two friends, with one telling a friend about a particularly luscious Plumbus.",
+    "new_phone_who_dis": "New phone, who dis? but it's between knights of the round table",
+    "email_me_a_thing": (
+        "A text message between the boss and a new assistant."
+        "It's a Monty Python-style sketch, playing out over SMS."
+        "The boss wants a report on squanchberries emailed to him ASAP."
+        "The assistant checks with the boss, and finds out which email to use."
+        "The boss responds with the email address, and reinforces that the report is needed ASAP."
+        "The assistant responds with a confirmation that the report will be sent ASAP."
+    ),
+    "sea_shanty_lookup": (
+        "Boss: Could you look up <insert made up scifi sounding disease>?"
+        "Assistant: I'll look it up and get back to you."
+        "Assistant: I found out more <insert made up scifi sounding disease>."
+        "Boss: Ok, go on."
+        "Assistant (seashanty): <insert made up scifi sounding disease sea shanty verse>"
+    ),
+}
+
 
 class MediaObject(BaseModel):
     """Media attachment in a message.
@@ -94,6 +124,11 @@ class Conversation(BaseModel):
     - Methods to add messages and retrieve them in chronological order
     - Topic of the conversation
 
+    `messages` is kept sorted by `createdAt`: it's sorted once on validation and
+    `add_message`/`insert_message` insert in place, so reads never re-sort. Messages
+    with the same timestamp keep their insertion order. Append to `messages`
+    directly only if the new message is the newest.
+
     The conversation can be serialized to/from JSON for storage and retrieval.
     """
 
@@ -113,6 +148,25 @@ class Conversation(BaseModel):
         default=[], description="Messages in the conversation"
     )
 
+    @model_validator(mode="after")
+    def _sort_messages(self) -> "Conversation":
+        # Stored conversations are almost always in order already; check in O(n)
+        messages = self.messages
+        if any(a.createdAt > b.createdAt for a, b in zip(messages, messages[1:])):
+            messages.sort(key=lambda x: x.createdAt)
+        return self
+
+    def insert_message(self, message: TextMessage):
+        """Insert a message in `createdAt` order, after any with the same timestamp.
+
+        Args:
+            message: The message to insert
+        """
+        index = bisect.bisect_right(
+            self.messages, message.createdAt, key=lambda m: m.createdAt
+        )
+        self.messages.insert(index, message)
+
     def add_message(self, from_, to, body, media=None, meta=None):
         """Add a message to the conversation.
 
@@ -123,7 +177,7 @@ class Conversation(BaseModel):
             media: Optional list of MediaObject attachments
             meta: Optional dictionary of metadata about the message
         """
-        self.messages.append(
+        self.insert_message(
             TextMessage(from_=from_, to=to, body=body, media=media, meta=meta)
         )
 
@@ -133,7 +187,30 @@ class Conversation(BaseModel):
         Returns:
             List[TextMessage]: Messages sorted by createdAt timestamp
         """
-        return sorted(self.messages, key=lambda x: x.createdAt)
+        return list(self.messages)
+
+    def last_messages(self, n: int) -> List[TextMessage]:
+        """Get the `n` most recent messages, oldest first.
+
+        Args:
+            n: How many messages to return
+
+        Returns:
+            List[TextMessage]: Up to `n` messages sorted by createdAt timestamp
+        """
+        return self.messages[-n:] if n > 0 else []
+
+    def messages_since(self, timestamp: int) -> List[TextMessage]:
+        """Get the messages created at or after a time, oldest first.
+
+        Args:
+            timestamp: Unix epoch seconds
+
+        Returns:
+            List[TextMessage]: The matching messages sorted by createdAt timestamp
+        """
+        index = bisect.bisect_left(self.messages, timestamp, key=lambda m: m.createdAt)
+        return self.messages[index:]
 
 
 async def fabriate_conversation(theme: str, topic: str) -> Conversation:
@@ -152,7 +229,7 @@ async def fabriate_conversation(theme: str, topic: str) -> Conversation:
     """
 
     agent_message_crafter = Agent(
-        settings.DEFAULT_MODEL,
+        get_model(),
         result_type=Conversation,
         system_prompt=(
             "You write sci-fi themed text message conversations."
@@ -167,15 +244,40 @@ async def fabriate_conversation(theme: str, topic: str) -> Conversation:
     @agent_message_crafter.tool_plain
     def slugify_string(topic: str) -> str:
         """Slugify a string."""
-        return slugify(topic)
+        with span("tool", "slugify_string"):
+            return slugify(topic)
+
+    with span("agent", "fabriate_conversation"):
+        return await agent_message_crafter.run(theme)
 
-    return await agent_message_crafter.run(theme)
 
+def load_examples(path: Optional[Union[str, Path]] = None) -> Dict[str, str]:
+    """Load the example themes to generate conversations from.
 
+    Args:
+        path: A JSON file mapping conversation names to themes. Defaults to
+            `settings.EXAMPLE_CONVERSATIONS_FILE`, or the built-in examples if unset.
+
+    Returns:
+        Dict[str, str]: Conversation names mapped to their themes
+    """
+    path = path or settings.EXAMPLE_CONVERSATIONS_FILE
+    if path is None:
+        return dict(DEFAULT_EXAMPLES)
+    with open(path, "r") as f:
+        examples = json.load(f)
+    if not isinstance(examples, dict) or not all(
+        isinstance(theme, str) for theme in examples.values()
+    ):
+        raise ValueError(f"{path} must contain a JSON object of name -> theme strings")
+    return examples
+
+
+@lru_cache(maxsize=None)
 def get_cache_dir() -> Path:
     """Get the conversations directory for storing generated conversations.
 
-    Creates the directory if it doesn't exist.
+    Creates the directory the first time it's requested.
 
     Returns:
         Path: Path to the conversations directory
@@ -186,89 +288,82 @@ def get_cache_dir() -> Path:
 
 
 def load_cached_conversation(filename: str) -> Optional[Conversation]:
-    """Load a conversation from the conversations directory if it exists.
+    """Load a conversation from the conversation store if it exists.
 
     Args:
-        filename: Name of the conversation file (without .json extension)
+        filename: Name of the conversation (the file name without .json extension
+            in the default directory store)
 
     Returns:
         Optional[Conversation]: The loaded conversation, or None if not found
     """
-    cache_file = get_cache_dir() / f"{filename}.json"
-    if cache_file.exists():
-        with open(cache_file, "r") as f:
-            return Conversation.model_validate_json(f.read())
-    return None
+    from agentic_ai_kata.utils.conversation_store import get_conversation_store
+
+    return get_conversation_store().load(filename)
 
 
 def save_conversation_to_cache(filename: str, conversation: Conversation):
-    """Save a conversation to the conversations directory.
+    """Save a conversation to the conversation store.
 
     Args:
         filename: Name to save the conversation as (without .json extension)
         conversation: The conversation to save
     """
-    cache_file = get_cache_dir() / f"{filename}.json"
-    with open(cache_file, "w") as f:
-        f.write(conversation.model_dump_json(indent=2))
+    from agentic_ai_kata.utils.conversation_store import get_conversation_store
+
+    get_conversation_store().save(filename, conversation)
 
 
-async def get_example_conversations() -> List[Conversation]:
+async def get_example_conversations(
+    examples: Optional[Dict[str, str]] = None,
+    concurrency: Optional[int] = None,
+) -> List[Conversation]:
     """Get example conversations, either from cache or generate them.
 
     This is the main interface for other modules to get the example conversations.
     It will:
     1. Try to load each conversation from the conversations directory
-    2. If not found, generate it using the LLM
-    3. Save newly generated conversations for future use
+    2. Generate the missing ones using the LLM, at most `concurrency` at a time
+    3. Save each newly generated conversation as soon as it's ready
+
+    Args:
+        examples: Conversation names mapped to themes, defaults to `load_examples()`
+        concurrency: Maximum simultaneous generations, defaults to
+            `settings.CONVERSATION_CONCURRENCY`
 
     Returns:
-        List[Conversation]: List of all example conversations
+        List[Conversation]: List of all example conversations, in `examples` order
     """
-    conversations = []
-    examples = {
-        "casual_banter": "Two friends, with one telling a friend about a particularly luscious Plumbus.",
-        "new_phone_who_dis": "New phone, who dis? but it's between knights of the round table",
-        "email_me_a_thing": (
-            "A text message between the boss and a new assistant."
-            "It's a Monty Python-style sketch, playing out over SMS."
-            "The boss wants a report on squanchberries emailed to him ASAP."
-            "The assistant checks with the boss, and finds out which email to use."
-            "The boss responds with the email address, and reinforces that the report is needed ASAP."
-            "The assistant responds with a confirmation that the report will be sent ASAP."
-        ),
-        "sea_shanty_lookup": (
-            "Boss: Could you look up <insert made up scifi sounding disease>?"
-            "Assistant: I'll look it up and get back to you."
-            "Assistant: I found out more <insert made up scifi sounding disease>."
-            "Boss: Ok, go on."
-            "Assistant (seashanty): <insert made up scifi sounding disease sea shanty verse>"
-        ),
-    }
+    examples = examples if examples is not None else load_examples()
+    semaphore = asyncio.Semaphore(concurrency or settings.CONVERSATION_CONCURRENCY)
 
-    for name, theme in examples.items():
+    async def get_conversation(name: str, theme: str) -> Conversation:
         conversation = load_cached_conversation(name)
         if conversation is None:
-            print(f"Generating conversation: {name}")
-            result = await fabriate_conversation(theme, name)
+            async with semaphore:
+                print(f"Generating conversation: {name}")
+                result = await fabriate_conversation(theme, name)
             # Extract the Conversation from the RunResult
             conversation = result.data
             save_conversation_to_cache(name, conversation)
-        conversations.append(conversation)
+        return conversation
 
-    return conversations
+    return await asyncio.gather(
+        *(get_conversation(name, theme) for name, theme in examples.items())
+    )
 
 
 def cleanup_conversations():
-    """Remove all existing conversations from the conversations directory."""
-    conversations_dir = get_cache_dir()
-    if conversations_dir.exists():
-        for file in conversations_dir.glob("*.json"):
-            print(f"Removing old conversation: {file.name}")
-            file.unlink()
+    """Remove all existing conversations from the conversation store."""
+    from agentic_ai_kata.utils.conversation_store import get_conversation_store
+
+    store = get_conversation_store()
+    for name in store.names():
+        print(f"Removing old conversation: {name}")
+    store.clear()
 
 
-async def init_cache():
+async def init_cache(examples_file: Optional[str] = None):
     """Initialize the conversations by generating all examples.
 
     This is the main entry point when running this module directly.
@@ -276,18 +371,25 @@ async def init_cache():
     1. Check if conversations already exist
     2. If they do, bail out early
     3. If they don't, generate fresh versions of all example conversations
-    4. Save them to the conversations directory
+    4. Save them to the conversation store
+
+    With an examples file, only the conversations missing from the directory are
+    generated, so a large fixture set can be built (or resumed) incrementally.
+
+    Args:
+        examples_file: Optional JSON file of conversation names mapped to themes
     """
+    from agentic_ai_kata.utils.conversation_store import get_conversation_store
+
     print("Checking for existing conversations...")
-    conversations_dir = get_cache_dir()
-    if any(conversations_dir.glob("*.json")):
+    if examples_file is None and len(get_conversation_store()):
         print("Conversations already exist. Skipping initialization.")
         return
 
     print("Initializing conversations...")
-    await get_example_conversations()
+    await get_example_conversations(load_examples(examples_file))
     print("Conversations generated successfully!")
 
 
 if __name__ == "__main__":
-    asyncio.run(init_cache())
+    asyncio.run(init_cache(sys.argv[1] if len(sys.argv) > 1 else None))
@@ -0,0 +1,194 @@
+"""Rolling, cached summaries of SMS threads for routing context.
+
+Classifying a follow-up such as "ok go on" needs to know what the thread is about,
+but resending the whole thread makes the classifier prompt grow with every message.
+`ThreadSummaries` keeps one short summary per conversation and folds in only the
+messages it hasn't seen yet, so:
+
+    - The context handed to the classifier is capped at `max_words`: the summarizer
+      is asked to stay within it, and a longer summary is cut to it
+    - Each summarizer call sees the previous summary plus the new messages only
+    - Nothing is summarized until a message actually needs context
+
+The first message of a thread has no context, so it's classified exactly as before.
+
+Example Usage:
+    summaries = ThreadSummaries()
+    result = await classify_in_thread(conversation, message, tools, summaries)
+"""
+
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from pydantic_ai import Agent
+
+from agentic_ai_kata.utils.cascade import get_model_cascade
+from agentic_ai_kata.utils.instrumentation import span
+from agentic_ai_kata.utils.routing import classify_text_message
+from agentic_ai_kata.utils.text_message import Conversation, TextMessage
+
+if TYPE_CHECKING:
+    from pydantic_ai.models import Model
+
+
+@lru_cache(maxsize=None)
+def _summary_agent(max_words: int) -> Agent:
+    """The summarizer for a word budget, built once (the model is given per run)."""
+    return Agent(
+        result_type=str,
+        system_prompt=(
+            "You maintain a running summary of an SMS thread for a message router. "
+            "You are given the current summary and the newest messages. "
+            "Reply with the updated summary only: who is talking, what they want, "
+            "and any pending request or open question. "
+            f"Use at most {max_words} words."
+        ),
+    )
+
+
+async def summarize_thread(
+    summary: str,
+    messages: List[TextMessage],
+    max_words: int = 60,
+    model: Optional["Model"] = None,
+) -> str:
+    """Fold new messages into a thread summary.
+
+    Args:
+        summary: The summary so far, empty for a new thread
+        messages: Messages not yet covered by the summary, oldest first
+        max_words: Word budget for the updated summary
+        model: The model to use, defaults to the model cascade's for the
+            "summarize_thread" step
+
+    Returns:
+        str: The updated summary
+    """
+    lines = "\n".join(f"{m.from_}: {m.body}" for m in messages)
+    prompt = f"Current summary: {summary or '(new thread)'}\n\nNew messages:\n{lines}"
+    agent = _summary_agent(max_words)
+    with span("agent", "summarize_thread"):
+        if model is not None:
+            result = await agent.run(prompt, model=model)
+        else:
+            result = await get_model_cascade().run(agent, "summarize_thread", prompt)
+    return result.data
+
+
+def _cap_words(text: str, max_words: int) -> str:
+    """`text` cut to its first `max_words` words, if it's longer."""
+    words = text.split()
+    return text if len(words) <= max_words else " ".join(words[:max_words])
+
+
+@dataclass
+class _ThreadState:
+    summary: str = ""
+    # How many of the conversation's messages the summary covers, and the last one
+    covered: int = 0
+    last_id: Optional[str] = None
+
+
+class ThreadSummaries:
+    """A bounded cache of rolling summaries, keyed by conversation id."""
+
+    def __init__(
+        self,
+        max_threads: int = 10_000,
+        max_words: int = 60,
+        max_batch: int = 20,
+        summarize=summarize_thread,
+        model: Optional["Model"] = None,
+    ):
+        """
+        Initializes the cache.
+
+        Args:
+            max_threads: Summaries kept before the least recently used is dropped.
+            max_words: Word budget for each summary.
+            max_batch: Most messages folded into the summary in one call.
+            summarize: The summarizer, `summarize_thread` by default.
+            model: The model for the summarizer, defaults to the cascade's.
+        """
+        self.max_threads = max_threads
+        self.max_words = max_words
+        self.max_batch = max_batch
+        self.summarize = summarize
+        self.model = model
+        self.summarizer_calls = 0
+        self._states: "OrderedDict[str, _ThreadState]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _state(self, conversation_id: str) -> _ThreadState:
+        state = self._states.pop(conversation_id, None) or _ThreadState()
+        self._states[conversation_id] = state
+        while len(self._states) > self.max_threads:
+            evicted, _ = self._states.popitem(last=False)
+            self._locks.pop(evicted, None)
+        return state
+
+    async def context_for(
+        self, conversation: Conversation, message: TextMessage
+    ) -> Optional[str]:
+        """Summarize the messages in the thread before `message`.
+
+        Args:
+            conversation: The thread `message` belongs to
+            message: The message about to be routed
+
+        Returns:
+            Optional[str]: The summary, or None if `message` starts the thread
+        """
+        messages = conversation.messages
+        position = next(
+            (i for i, m in enumerate(messages) if m.id == message.id), len(messages)
+        )
+        if position == 0:
+            return None
+
+        lock = self._locks.setdefault(conversation.id, asyncio.Lock())
+        async with lock:
+            state = self._state(conversation.id)
+            if state.covered > position or (
+                state.covered and messages[state.covered - 1].id != state.last_id
+            ):
+                # An earlier message is being routed, or one was inserted into the
+                # summarized part of the thread: start over
+                state.summary, state.covered = "", 0
+            while state.covered < position:
+                end = min(position, state.covered + self.max_batch)
+                batch = messages[state.covered : end]
+                summary = await self.summarize(
+                    state.summary, batch, self.max_words, self.model
+                )
+                state.summary = _cap_words(summary, self.max_words)
+                self.summarizer_calls += 1
+                state.covered += len(batch)
+                state.last_id = batch[-1].id
+            return state.summary
+
+
+async def classify_in_thread(
+    conversation: Conversation,
+    message: TextMessage,
+    tools,
+    summaries: ThreadSummaries,
+    model: Optional["Model"] = None,
+):
+    """Classify a message with its thread's rolling summary as context.
+
+    Args:
+        conversation: The thread `message` belongs to
+        message: The message to classify
+        tools: The handlers the classifier can choose from
+        summaries: The summary cache
+        model: The model for the classifier, defaults to the cascade's
+
+    Returns:
+        The classification run result, as from `classify_text_message`
+    """
+    context = await summaries.context_for(conversation, message)
+    return await classify_text_message(message, tools, model=model, context=context)
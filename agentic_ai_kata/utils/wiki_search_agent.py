@@ -1,15 +1,21 @@
+from typing import TYPE_CHECKING, Optional
 from dataclasses import dataclass
-from openai import AsyncOpenAI
 from pydantic import BaseModel, Field
 from pydantic_ai import Agent, RunContext
 
 from agentic_ai_kata.settings import settings
+from agentic_ai_kata.utils.clients import get_model, get_openai_client
 from agentic_ai_kata.utils import ColBERTv2
+from agentic_ai_kata.utils.instrumentation import span
+
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 
 @dataclass
 class Deps:
-    openai: AsyncOpenAI
+    openai: "AsyncOpenAI"
 
 
 # Define a response model for PydanticAI Agents to use
@@ -35,16 +41,22 @@ class WikiSearchAgent:
     A simple agent that uses a ColBERTv2 retriever to search wikipedia for context.
     """
 
-    def __init__(self):
-        self.retriever = ColBERTv2(url="http://20.102.90.50:2017/wiki17_abstracts")
-        self.openai = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+    def __init__(self, openai: Optional["AsyncOpenAI"] = None):
+        """
+        Initializes the agent.
+
+        Args:
+            openai: The client to use, defaults to the process-wide shared client.
+        """
+        self.retriever = ColBERTv2(url=settings.COLBERT_URL)
+        self.openai = openai or get_openai_client()
         self.deps = Deps(openai=self.openai)
         self.agent = self._create_agent()
 
     def _create_agent(self) -> Agent:
         """Creates the augmented agent with tools"""
         agent = Agent(
-            settings.DEFAULT_MODEL,
+            get_model(),
             deps_type=Deps,
             system_prompt=(
                 "You are a helpful assistant that uses tools to augment your knowledge. "
@@ -63,7 +75,8 @@ class WikiSearchAgent:
                 context: The call context.
                 query: The search query.
             """
-            results = self.retriever.call_sync(query, k=3)
+            with span("tool", "search_wikipedia"):
+                results = await self.retriever(query, k=3)
             # Extract text from each result dictionary
             texts = [result.get("text", "") for result in results]
             return "\n".join(texts)
@@ -79,5 +92,6 @@ class WikiSearchAgent:
         Returns:
             QuestionAnswerWithContext: The answer with context.
         """
-        result = await self.agent.run(question, deps=self.deps)
+        with span("agent", "wiki_search"):
+            result = await self.agent.run(question, deps=self.deps)
         return result
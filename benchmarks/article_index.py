@@ -0,0 +1,99 @@
+"""Measure `ArticleIndex` build rate and query latency on a synthetic corpus.
+
+Generates `--articles` articles of `--sections` `##` sections each, with words
+drawn from a Zipf-like vocabulary (so some query words are common and some rare),
+indexes them in a fresh file and reports:
+
+    - Indexing throughput (articles/sec) and the index size on disk
+    - Latency p50/p95/p99 of `--queries` 1-3 word searches for the top 10 sections
+
+Usage:
+    python -m benchmarks.article_index
+    python -m benchmarks.article_index --articles 100000 --postings
+"""
+
+import argparse
+import itertools
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from agentic_ai_kata.utils.article_index import ArticleIndex, fts5_available
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def make_vocabulary(size: int, rng: random.Random) -> list[str]:
+    syllables = ["blor", "glip", "squan", "fiz", "orp", "zle", "wob", "nex", "tra"]
+    words = [
+        "".join(parts)
+        for length in (2, 3, 4, 5)
+        for parts in itertools.product(syllables, repeat=length)
+    ]
+    return rng.sample(words, min(size, len(words)))
+
+
+def make_article(i: int, sections: int, vocabulary, cum_weights, rng) -> str:
+    def words(n):
+        return " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=n))
+
+    parts = [f"# City {i}: {words(6)}", words(40)]
+    for _ in range(sections):
+        parts += [f"## {words(2).title()}", words(60)]
+    return "\n\n".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--articles", type=int, default=10_000)
+    parser.add_argument("--sections", type=int, default=8)
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--postings", action="store_true", help="skip FTS5")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(args.vocabulary, rng)
+    # Cumulative, so each draw doesn't re-sum them
+    weights = list(
+        itertools.accumulate(1 / rank for rank in range(1, len(vocabulary) + 1))
+    )
+    use_fts5 = fts5_available() and not args.postings
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "articles.sqlite3"
+        index = ArticleIndex(path, use_fts5=use_fts5)
+        print(f"{'FTS5' if use_fts5 else 'Postings'} index, {args.articles} articles")
+
+        elapsed = 0.0
+        for i in range(args.articles):
+            article = make_article(i, args.sections, vocabulary, weights, rng)
+            start = time.perf_counter()
+            index.add_article(f"city-{i}", article)
+            elapsed += time.perf_counter() - start
+        size = sum(p.stat().st_size for p in Path(directory).iterdir())
+        print(f"  indexed  {args.articles / elapsed:10,.0f} articles/s")
+        print(f"  size     {size / 2**20:10,.1f} MiB")
+
+        latencies, hits = [], 0
+        for _ in range(args.queries):
+            words = rng.choices(vocabulary, cum_weights=weights, k=rng.randint(1, 3))
+            query = " ".join(words)
+            start = time.perf_counter()
+            hits += len(index.search(query, k=10))
+            latencies.append(time.perf_counter() - start)
+        print(
+            f"  search   p50 {percentile(latencies, 50) * 1000:7.2f}ms"
+            f"  p95 {percentile(latencies, 95) * 1000:7.2f}ms"
+            f"  p99 {percentile(latencies, 99) * 1000:7.2f}ms"
+            f"  ({hits / args.queries:.1f} hits/query)"
+        )
+
+
+if __name__ == "__main__":
+    main()
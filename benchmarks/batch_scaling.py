@@ -0,0 +1,189 @@
+"""Measure how sharded batch jobs scale with the number of worker processes.
+
+A batch is run with `agentic_ai_kata.utils.batch.map_sharded()` on 1, 2, 4, ... up
+to N worker processes, against the local stub model from `benchmarks.stubs` (and a
+local `ColBERTStubServer` for the wiki search tool), for two workloads:
+
+    - routing:  `classify_job`, bulk classification of text messages
+    - chaining: `chaining_job`, `ChainingKata` article generation
+
+Each is also run in this process on one event loop with the same per-worker
+concurrency ("in-process"), the baseline the workers have to beat. The report shows
+items/sec, the speedup over one worker and the parallel efficiency
+(speedup / workers). Results are written as JSON for regression tracking.
+
+Usage:
+    python -m benchmarks.batch_scaling
+    python -m benchmarks.batch_scaling --workers 1 2 4 8 --items 2000 \\
+        --concurrency 16 --latency 0.01 --workloads routing
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from agentic_ai_kata.utils.batch import chaining_job, classify_job, map_sharded
+from agentic_ai_kata.utils.colbert_server import ColBERTStubServer
+from agentic_ai_kata.utils.text_message import TextMessage
+from benchmarks.stubs import stub_llm
+
+# Kept open for the life of each worker process
+_worker_context = contextlib.ExitStack()
+
+WORKLOADS = {
+    "routing": classify_job,
+    "chaining": chaining_job,
+}
+
+
+def install_stub(latency: float, jitter: float, token_rate: float, seed: int):
+    """Worker initializer: use the stub model and silence kata output."""
+    from agentic_ai_kata.settings import get_settings
+    from agentic_ai_kata.utils.clients import registry
+
+    get_settings.cache_clear()
+    model = stub_llm(latency, jitter, token_rate, seed=seed)
+    _worker_context.enter_context(registry.override_model(model))
+    _worker_context.enter_context(
+        contextlib.redirect_stdout(open(os.devnull, "w"))
+    )
+
+
+def make_items(workload: str, count: int) -> list:
+    if workload == "routing":
+        return [
+            TextMessage(
+                from_="+18015550100",
+                to="+18015550199",
+                body=f"Who is this? I got your number from message {i}",
+                media=None,
+                meta=None,
+            )
+            for i in range(count)
+        ]
+    return [None] * count
+
+
+async def run_in_process(job, items: list, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(item):
+        async with semaphore:
+            await job(item)
+
+    await asyncio.gather(*(run_one(item) for item in items))
+
+
+def measure(workload: str, items: list, workers: int, args) -> float:
+    """Run one batch; returns items per second. `workers=0` runs in-process."""
+    job = WORKLOADS[workload]
+    stub = (args.latency, args.jitter, args.token_rate, args.seed)
+    start = time.perf_counter()
+    if workers == 0:
+        asyncio.run(run_in_process(job, items, args.concurrency))
+    else:
+        map_sharded(
+            job,
+            items,
+            workers=workers,
+            concurrency=args.concurrency,
+            initializer=install_stub,
+            initargs=stub,
+        )
+    return len(items) / (time.perf_counter() - start)
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=[n for n in (1, 2, 4, 8, 16, 32, 64) if n < cores] + [cores],
+    )
+    parser.add_argument("--workloads", nargs="+", default=list(WORKLOADS))
+    parser.add_argument("--items", type=int, default=400, help="routing items")
+    parser.add_argument("--articles", type=int, default=32, help="chaining items")
+    parser.add_argument("--concurrency", type=int, default=16, help="per worker")
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--token-rate", type=float, default=0.0)
+    parser.add_argument("--retriever-latency", type=float, default=0.001)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark-results/batch_scaling.json")
+    args = parser.parse_args()
+    output = Path(args.output).resolve()
+
+    os.environ.setdefault("LOGFIRE_CONSOLE", "false")
+    from agentic_ai_kata.settings import get_settings
+    from agentic_ai_kata.utils.clients import registry
+
+    results = []
+    cwd = os.getcwd()
+    print(f"{cores} cores, {args.concurrency} items in flight per worker")
+    with ColBERTStubServer(latency=args.retriever_latency) as retriever:
+        with tempfile.TemporaryDirectory() as workdir:
+            os.environ["COLBERT_URL"] = retriever.url
+            get_settings.cache_clear()
+            # ChainingKata writes its articles relative to the working dir
+            os.chdir(workdir)
+            try:
+                for workload in args.workloads:
+                    count = args.items if workload == "routing" else args.articles
+                    items = make_items(workload, count)
+                    model = stub_llm(
+                        args.latency, args.jitter, args.token_rate, seed=args.seed
+                    )
+                    with registry.override_model(model), contextlib.redirect_stdout(
+                        open(os.devnull, "w")
+                    ):
+                        # Warm up imports and schemas, then the baseline
+                        measure(workload, items[:4], 0, args)
+                        baseline = measure(workload, items, 0, args)
+                    print(f"{workload} ({count} items)")
+                    print(f"  {'in-process':<12} {baseline:10,.1f} items/s")
+                    single = None
+                    for workers in args.workers:
+                        rate = measure(workload, items, workers, args)
+                        single = single or rate
+                        speedup = rate / single
+                        print(
+                            f"  {workers:>3} workers  {rate:10,.1f} items/s"
+                            f"  x{speedup:5.2f}  {speedup / workers:6.0%} efficient"
+                        )
+                        results.append(
+                            {
+                                "workload": workload,
+                                "items": count,
+                                "workers": workers,
+                                "items_per_sec": rate,
+                                "in_process_items_per_sec": baseline,
+                                "speedup": speedup,
+                            }
+                        )
+            finally:
+                os.chdir(cwd)
+
+    report = {
+        "created": time.time(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cores": cores,
+        "parameters": {k: v for k, v in vars(args).items() if k != "output"},
+        "results": results,
+    }
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark bulk conversation loads.
+
+Writes a synthetic corpus to a temporary store, then measures messages/sec for:
+    - Loading every conversation (`store.items()`)
+    - Streaming every message in time order (`store.iter_messages()`)
+    - Validating the corpus's parsed messages one at a time, as `iter_messages()`
+      used to, and in bulk with one `TypeAdapter` call per conversation, as it does
+
+Usage:
+    python -m benchmarks.bulk_ingest
+    python -m benchmarks.bulk_ingest --backend sqlite --conversations 2000
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from agentic_ai_kata.utils.conversation_store import (
+    STORE_BACKENDS,
+    _MESSAGES,
+    _loads,
+    open_store,
+)
+from agentic_ai_kata.utils.text_message import Conversation, TextMessage
+
+
+def _corpus(conversations: int, messages: int) -> dict[str, Conversation]:
+    return {
+        f"conversation_{c:06d}": Conversation(
+            who=[{"name": "Zorp", "phone": "+18015551234"}],
+            topic=f"topic-{c % 50}",
+            messages=[
+                TextMessage(
+                    from_="+18015551234",
+                    to=f"+1801555{c % 10_000:04d}",
+                    body=f"Message {m} about the luscious Plumbus",
+                    media=None,
+                    meta=None,
+                    createdAt=1_700_000_000 + c * 7 + m * 60,
+                )
+                for m in range(messages)
+            ],
+        )
+        for c in range(conversations)
+    }
+
+
+def _rate(run, total: int, repeat: int = 3) -> float:
+    """Best of `repeat` runs, in messages/sec."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return total / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=STORE_BACKENDS, default="jsonl")
+    parser.add_argument("--conversations", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=20, help="per conversation")
+    args = parser.parse_args()
+
+    total = args.conversations * args.messages
+    corpus = _corpus(args.conversations, args.messages)
+    parsed = [json.loads(c.model_dump_json())["messages"] for c in corpus.values()]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / f"store.{args.backend}"
+        store = open_store(args.backend, path)
+        store.save_many(corpus)
+        print(f"{args.backend}: {args.conversations} conversations, {total} messages")
+        print(f"  (parsing JSON with {_loads.__module__})")
+        load = _rate(lambda: sum(1 for _ in store.items()), total)
+        stream = _rate(lambda: sum(1 for _ in store.iter_messages()), total)
+        print(f"  items():         {load:10,.0f} msg/s")
+        print(f"  iter_messages(): {stream:10,.0f} msg/s")
+
+    one_by_one = _rate(
+        lambda: [TextMessage.model_validate(m) for ms in parsed for m in ms], total
+    )
+    bulk = _rate(lambda: [_MESSAGES.validate_python(ms) for ms in parsed], total)
+    print(f"  validation, one at a time: {one_by_one:10,.0f} msg/s")
+    print(f"  validation, in bulk:       {bulk:10,.0f} msg/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Measure the per-run setup cost `ChainingKata` saves by sharing its agents.
+
+`ChainingKata.arun()` used to define its five result models and build its five
+agents inside every run. They now live at module level, and `get_chain_agents()`
+builds the agents (and with them every result and tool JSON schema) once per
+process. This benchmark reports:
+
+    - models: defining the five result models again, as each run used to
+    - agents: building the five agents from scratch (`get_chain_agents()` after a
+      cache clear)
+    - runs/sec and CPU ms per run of the whole kata against a zero-latency stub
+      model and retriever, rebuilding the agents every run vs sharing them
+
+Usage:
+    python -m benchmarks.chaining_setup
+    python -m benchmarks.chaining_setup --runs 50
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import tempfile
+import time
+
+from pydantic import BaseModel, create_model
+
+from agentic_ai_kata.kata_02_chaining import (
+    ArticleWriterResult,
+    ChainingKata,
+    FakePlanetAndPlanetaryCapital,
+    MadeUpFacts,
+    SearchAndOutlineResult,
+    WikipediaFormatterResult,
+    get_chain_agents,
+)
+from agentic_ai_kata.utils.colbert_server import ColBERTStubServer
+from benchmarks.stubs import stub_llm
+
+RESULT_MODELS = [
+    FakePlanetAndPlanetaryCapital,
+    SearchAndOutlineResult,
+    MadeUpFacts,
+    ArticleWriterResult,
+    WikipediaFormatterResult,
+]
+
+
+def define_result_models() -> None:
+    """Define copies of the result models, as a run used to."""
+    for model in RESULT_MODELS:
+        fields = {
+            name: (field.annotation, field)
+            for name, field in model.model_fields.items()
+        }
+        create_model(model.__name__, __base__=BaseModel, **fields)
+
+
+def time_per_call(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def rebuild_agents() -> None:
+    get_chain_agents.cache_clear()
+    get_chain_agents()
+
+
+async def run_katas(runs: int, rebuild: bool) -> tuple[float, float]:
+    """Run the kata `runs` times; returns runs/sec and CPU seconds per run."""
+    wall, cpu = time.perf_counter(), time.process_time()
+    for _ in range(runs):
+        if rebuild:
+            rebuild_agents()
+        await ChainingKata().arun()
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    return runs / wall, cpu / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50, help="setup repetitions")
+    args = parser.parse_args()
+
+    os.environ.setdefault("LOGFIRE_CONSOLE", "false")
+    from agentic_ai_kata.settings import get_settings
+    from agentic_ai_kata.utils.clients import registry
+
+    models = time_per_call(define_result_models, args.repeat)
+    agents = time_per_call(rebuild_agents, args.repeat)
+    print("Per-run setup removed from ChainingKata.arun()")
+    print(f"  models   {models * 1000:8.2f}ms")
+    print(f"  agents   {agents * 1000:8.2f}ms")
+
+    cwd = os.getcwd()
+    with ColBERTStubServer(latency=0) as retriever, tempfile.TemporaryDirectory() as d:
+        os.environ["COLBERT_URL"] = retriever.url
+        get_settings.cache_clear()
+        # The kata writes its article relative to the working dir
+        os.chdir(d)
+        try:
+            with registry.override_model(stub_llm(latency=0)):
+                with contextlib.redirect_stdout(open(os.devnull, "w")):
+                    asyncio.run(run_katas(2, rebuild=False))  # Warm up
+                    rebuilt = asyncio.run(run_katas(args.runs, rebuild=True))
+                    shared = asyncio.run(run_katas(args.runs, rebuild=False))
+        finally:
+            os.chdir(cwd)
+    print(f"Whole kata, {args.runs} runs against a zero-latency stub")
+    for name, (rate, cpu) in (("rebuilt", rebuilt), ("shared", shared)):
+        print(f"  {name:<8} {rate:8.1f} runs/s  {cpu * 1000:8.2f}ms CPU/run")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark reading and writing long `Conversation` threads.
+
+Compares the original approach (append on write, sort on every read) with the
+sorted-on-insert `Conversation` for a live thread that is read after every
+inbound message.
+
+Usage:
+    python -m benchmarks.conversation_messages
+    python -m benchmarks.conversation_messages --messages 10000 --window 20
+"""
+
+import argparse
+import random
+import time
+
+from agentic_ai_kata.utils.text_message import Conversation, TextMessage
+
+
+def _messages(count: int, seed: int = 0) -> list[TextMessage]:
+    # Mostly in order, with some late arrivals, like a real SMS thread
+    rng = random.Random(seed)
+    return [
+        TextMessage(
+            from_="+18015551234",
+            to="+18015554321",
+            body=f"message {i}",
+            media=None,
+            meta=None,
+            createdAt=1_700_000_000 + i - (rng.randrange(60) if i % 10 == 0 else 0),
+        )
+        for i in range(count)
+    ]
+
+
+def bench_sort_on_read(messages: list[TextMessage], window: int) -> float:
+    """The original behaviour: append, then sort the whole thread to read it."""
+    thread: list[TextMessage] = []
+    start = time.perf_counter()
+    for message in messages:
+        thread.append(message)
+        sorted(thread, key=lambda x: x.createdAt)[-window:]
+    return time.perf_counter() - start
+
+
+def bench_sorted_insert(messages: list[TextMessage], window: int) -> float:
+    """Insert in order, then read a window without sorting."""
+    conversation = Conversation(who=[])
+    start = time.perf_counter()
+    for message in messages:
+        conversation.insert_message(message)
+        conversation.last_messages(window)
+    return time.perf_counter() - start
+
+
+def bench_since(messages: list[TextMessage], reads: int) -> float:
+    """Read "messages since" windows from a full thread."""
+    conversation = Conversation(who=[], messages=messages)
+    newest = conversation.messages[-1].createdAt
+    start = time.perf_counter()
+    for i in range(reads):
+        conversation.messages_since(newest - i % 100)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--window", type=int, default=20)
+    args = parser.parse_args()
+
+    messages = _messages(args.messages)
+    before = bench_sort_on_read(messages, args.window)
+    after = bench_sorted_insert(messages, args.window)
+    since = bench_since(messages, args.messages)
+
+    print(f"{args.messages} messages, reading the last {args.window} after each write")
+    print(f"  sort on read:     {before:8.3f}s ({before / args.messages * 1e6:8.1f}µs/msg)")
+    print(f"  sorted insert:    {after:8.3f}s ({after / args.messages * 1e6:8.1f}µs/msg)")
+    print(f"  speedup:          {before / after:8.1f}x")
+    print(f"  messages_since(): {since / args.messages * 1e6:8.1f}µs/read")
+
+
+if __name__ == "__main__":
+    main()
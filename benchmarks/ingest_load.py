@@ -0,0 +1,141 @@
+"""Load test for the SMS webhook service against a local stub model.
+
+Starts `IngestService` in-process on a random port with a temporary JSONL store and
+a pydantic-ai `FunctionModel` that answers classifications after a configurable
+latency, then posts webhooks from many concurrent clients and reports:
+
+    - Sustained ack throughput (messages/sec answered 200)
+    - Ack latency p50/p99 and 503 (backpressure) count
+    - End-to-end routed throughput once every message has been classified
+
+The clients, the service and the stub model share one process and event loop, so
+the figures are a lower bound for a dedicated server.
+
+Usage:
+    python -m benchmarks.ingest_load
+    python -m benchmarks.ingest_load --messages 20000 --clients 64 --model-latency 0.2
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from agentic_ai_kata.kata_03_routing import mock_tools
+from agentic_ai_kata.utils.conversation_store import JsonlStore
+from agentic_ai_kata.utils.ingest import IngestService
+from agentic_ai_kata.utils.routing import classify_text_message
+
+
+def stub_model(latency: float) -> FunctionModel:
+    """A model that always routes to `conversation` after `latency` seconds."""
+
+    async def respond(messages, info: AgentInfo) -> ModelResponse:
+        await asyncio.sleep(latency)
+        return ModelResponse(
+            parts=[
+                ToolCallPart.from_raw_args(
+                    info.result_tools[0].name,
+                    {
+                        "category": "chat",
+                        "confidence": 0.9,
+                        "handler": "conversation",
+                        "reasoning": "stub",
+                    },
+                )
+            ]
+        )
+
+    return FunctionModel(respond)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(args) -> None:
+    model = stub_model(args.model_latency)
+
+    async def classify(message, tools):
+        return await classify_text_message(message, tools, model=model)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        service = IngestService(
+            JsonlStore(Path(tmp) / "conversations.jsonl"),
+            mock_tools,
+            queue_size=args.queue_size,
+            concurrency=args.concurrency,
+            classify=classify,
+        )
+        runner = web.AppRunner(service.create_app())
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        url = f"http://127.0.0.1:{port}/webhooks/sms"
+
+        latencies: list[float] = []
+        busy = 0
+        next_message = iter(range(args.messages))
+
+        async def client(session: aiohttp.ClientSession) -> None:
+            nonlocal busy
+            for i in next_message:
+                payload = {
+                    "from": f"+1801555{i % args.threads:04d}",
+                    "to": "+18015550000",
+                    "body": f"Load test message {i}",
+                    "media": None,
+                    "meta": None,
+                }
+                while True:
+                    start = time.perf_counter()
+                    async with session.post(url, json=payload) as response:
+                        await response.read()
+                    latencies.append(time.perf_counter() - start)
+                    if response.status != 503:
+                        break
+                    busy += 1
+                    await asyncio.sleep(float(response.headers["Retry-After"]) / 10)
+
+        start = time.perf_counter()
+        connector = aiohttp.TCPConnector(limit=args.clients)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            await asyncio.gather(*(client(session) for _ in range(args.clients)))
+        acked = time.perf_counter() - start
+        while service.routed + service.failed < args.messages:
+            await asyncio.sleep(0.05)
+        routed = time.perf_counter() - start
+        await runner.cleanup()
+
+    print(f"{args.messages} messages from {args.clients} clients")
+    print(f"  acks:          {args.messages / acked:10,.0f} msg/s")
+    print(f"  ack latency:   p50 {percentile(latencies, 50) * 1000:.2f}ms")
+    print(f"                 p99 {percentile(latencies, 99) * 1000:.2f}ms")
+    print(f"                 mean {statistics.fmean(latencies) * 1000:.2f}ms")
+    print(f"  503 (busy):    {busy}")
+    print(f"  routed:        {args.messages / routed:10,.0f} msg/s")
+    print(f"  failed:        {service.failed}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=500, help="distinct senders")
+    parser.add_argument("--queue-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--model-latency", type=float, default=0.05)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
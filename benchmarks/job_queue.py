@@ -0,0 +1,108 @@
+"""Measure how job queue throughput scales with the number of worker processes.
+
+A backlog of "route" jobs is enqueued in a fresh queue, then drained by 1, 2, 4, ...
+worker processes, each running a `JobWorker` against the stub model from
+`benchmarks.stubs`. Workers share the queue the way separate nodes would: a SQLite
+file (`--backend sqlite`) or a Redis server (`--backend redis --location URL`).
+The report shows jobs/sec and the speedup over one worker.
+
+Usage:
+    python -m benchmarks.job_queue
+    python -m benchmarks.job_queue --workers 1 2 4 8 --jobs 2000 --concurrency 16 \\
+        --latency 0.05
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from agentic_ai_kata.utils.job_queue import (
+    JobQueue,
+    JobWorker,
+    RedisJobQueue,
+    SqliteJobQueue,
+)
+from benchmarks.stubs import stub_llm
+
+
+def make_queue(backend: str, location: str) -> JobQueue:
+    """The SQLite file at `location`, or the keys for "URL#prefix" on Redis."""
+    if backend == "sqlite":
+        return SqliteJobQueue(location)
+    url, prefix = location.rsplit("#", 1)
+    return RedisJobQueue.from_url(url, prefix=prefix)
+
+
+def work(backend: str, location: str, concurrency: int, latency: float) -> None:
+    """One worker node: drain the queue with the stub model, then exit."""
+    from agentic_ai_kata.utils.clients import registry
+
+    queue = make_queue(backend, location)
+    with registry.override_model(stub_llm(latency)):
+        asyncio.run(JobWorker(queue, concurrency=concurrency).arun(stop_when_idle=True))
+
+
+def measure(args, workers: int, location: str) -> float:
+    """Drain a new backlog with `workers` processes; returns jobs per second."""
+    queue = make_queue(args.backend, location)
+    message = {
+        "from": "+18015550100",
+        "to": "+18015550199",
+        "body": "Who is this? I got your number from a friend",
+        "media": None,
+        "meta": None,
+    }
+    queue.enqueue_many([("route", {"message": message})] * args.jobs)
+    processes = [
+        multiprocessing.Process(
+            target=work,
+            args=(args.backend, location, args.concurrency, args.latency),
+        )
+        for _ in range(workers)
+    ]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+    done = queue.stats()["done"]
+    if done != args.jobs:
+        print(f"  warning: {done} of {args.jobs} jobs done")
+    return done / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["sqlite", "redis"], default="sqlite")
+    parser.add_argument("--location", help="Redis URL for --backend redis")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--jobs", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16, help="per worker")
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    os.environ.setdefault("LOGFIRE_CONSOLE", "false")
+    print(f"{args.jobs} route jobs, {args.concurrency} in flight per worker")
+    with tempfile.TemporaryDirectory() as workdir:
+        single = None
+        for workers in args.workers:
+            if args.backend == "sqlite":
+                location = str(Path(workdir) / f"jobs-{workers}.sqlite3")
+            else:
+                # A fresh key prefix per run, so each starts with an empty queue
+                url = args.location or "redis://localhost:6379/0"
+                location = f"{url}#kata-jobs-bench-{uuid.uuid4().hex[:8]}"
+            rate = measure(args, workers, location)
+            single = single or rate
+            speedup = rate / single
+            print(f"  {workers:>3} workers  {rate:10,.1f} jobs/s  x{speedup:5.2f}")
+
+
+if __name__ == "__main__":
+    main()
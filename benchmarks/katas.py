@@ -0,0 +1,211 @@
+"""Benchmark every kata against a local stub model and retriever.
+
+Each `KataBase` implementation in `agentic_ai_kata/kata_*.py` is run, unmodified,
+with `get_model()` overridden by the stub model from `benchmarks.stubs` and the
+ColBERTv2 URL pointed at a local `ColBERTStubServer`. For each kata and concurrency
+level the benchmark records:
+
+    - Throughput (kata runs/sec) and run latency p50/p95/p99
+    - CPU seconds and CPU utilization (process-wide, so the stub server counts)
+    - Peak traced Python allocations of one run (measured in a separate run, so
+      tracing doesn't slow the timed ones) and the process's peak RSS
+    - The instrumentation summary (see `agentic_ai_kata.utils.instrumentation`),
+      to show which agents, tools and retrievals the time went to
+
+By default concurrent runs use one thread (and event loop) each, calling the sync
+`kata.run()`; with `--runner loop` they are awaited together with `KataBase.arun()` on
+one `KataRunner` loop instead. Katas that fail to construct or run are reported with
+their error instead of timings.
+Results are written as JSON for regression tracking.
+
+Usage:
+    python -m benchmarks.katas
+    python -m benchmarks.katas --katas Routing Chaining --concurrency 1 8 32 \\
+        --latency 0.2 --jitter 0.1 --token-rate 50 --output results/katas.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from agentic_ai_kata.utils.colbert_server import ColBERTStubServer
+from agentic_ai_kata.utils.kata_runner import KataRunner, discover_katas
+from benchmarks.stubs import stub_llm
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run_once(kata_class: type) -> float:
+    """Construct and run a kata on a fresh event loop; returns the run's seconds."""
+    # Katas use `asyncio.run` or `run_sync`, which need a (non-running) loop set
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        kata = kata_class()
+        start = time.perf_counter()
+        kata.run()
+        return time.perf_counter() - start
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+def run_on_loop(runner: KataRunner, kata_class: type, runs: int) -> list[float]:
+    """Run a kata `runs` times on the runner's loop; returns each run's seconds."""
+    report = runner.run([kata_class() for _ in range(runs)])
+    errors = [run.error for run in report.runs if run.error]
+    if errors:
+        raise RuntimeError(errors[0])
+    return [run.seconds for run in report.runs]
+
+
+def measure(kata_class: type, concurrency: int, runs: int, use_loop: bool) -> dict:
+    """Time `runs` runs of a kata with `concurrency` running at once."""
+    from agentic_ai_kata.utils.instrumentation import get_recorder
+
+    get_recorder().clear()
+    cpu = time.process_time()
+    start = time.perf_counter()
+    if use_loop:
+        with KataRunner(concurrency) as runner:
+            latencies = run_on_loop(runner, kata_class, runs)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(run_once, [kata_class] * runs))
+    wall = time.perf_counter() - start
+    cpu = time.process_time() - cpu
+    return {
+        "concurrency": concurrency,
+        "runs": runs,
+        "wall_seconds": wall,
+        "throughput": runs / wall,
+        "latency": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies),
+        },
+        "cpu_seconds": cpu,
+        "cpu_utilization": cpu / wall,
+        "spans": get_recorder().summary()["groups"],
+    }
+
+
+def peak_allocations(kata_class: type) -> int:
+    """Peak traced Python allocations (bytes) of one run."""
+    tracemalloc.start()
+    try:
+        run_once(kata_class)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark(kata_class: type, args) -> dict:
+    result = {"kata": kata_class.__name__, "module": kata_class.__module__}
+    # Katas print their progress; keep the benchmark's own output readable
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        try:
+            # Also warms up imports and schema generation before anything is timed
+            result["peak_alloc_bytes"] = peak_allocations(kata_class)
+            result["scenarios"] = [
+                measure(
+                    kata_class,
+                    concurrency,
+                    max(args.runs, concurrency),
+                    args.runner == "loop",
+                )
+                for concurrency in args.concurrency
+            ]
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def report_kata(result: dict) -> None:
+    if "error" in result:
+        print(f"  error: {result['error']}")
+    for s in result.get("scenarios", []):
+        print(
+            f"  x{s['concurrency']:<3} {s['throughput']:8.2f} runs/s"
+            f"  p50 {s['latency']['p50'] * 1000:8.1f}ms"
+            f"  p99 {s['latency']['p99'] * 1000:8.1f}ms"
+            f"  cpu {s['cpu_utilization']:5.0%}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--katas", nargs="*", help="only katas whose name contains")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--runs", type=int, default=16, help="runs per scenario")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--token-rate", type=float, default=2000.0)
+    parser.add_argument("--retriever-latency", type=float, default=0.005)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--runner",
+        choices=["threads", "loop"],
+        default="threads",
+        help="a thread and `run()` per run, or `arun()` on one KataRunner loop",
+    )
+    parser.add_argument("--output", default="benchmark-results/katas.json")
+    args = parser.parse_args()
+    output = Path(args.output).resolve()
+
+    os.environ.setdefault("LOGFIRE_CONSOLE", "false")
+    from agentic_ai_kata.settings import get_settings
+    from agentic_ai_kata.utils.clients import registry
+
+    model = stub_llm(args.latency, args.jitter, args.token_rate, seed=args.seed)
+    katas = [
+        k
+        for k in discover_katas()
+        if not args.katas or any(name in k.__name__ for name in args.katas)
+    ]
+    results = []
+    cwd = os.getcwd()
+    with ColBERTStubServer(latency=args.retriever_latency) as retriever:
+        with registry.override_model(model), tempfile.TemporaryDirectory() as workdir:
+            os.environ["COLBERT_URL"] = retriever.url
+            get_settings.cache_clear()
+            # Katas write their outputs (e.g. articles/) relative to the working dir
+            os.chdir(workdir)
+            try:
+                for kata_class in katas:
+                    print(f"{kata_class.__name__}...", flush=True)
+                    results.append(benchmark(kata_class, args))
+                    report_kata(results[-1])
+            finally:
+                os.chdir(cwd)
+
+    report = {
+        "created": time.time(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "parameters": {
+            k: v for k, v in vars(args).items() if k not in ("output", "katas")
+        },
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "katas": results,
+    }
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Compare micro-batched text message classification with one request per message.
+
+Classifies `--messages` messages from `--concurrency` concurrent callers, first with
+`classify_text_message` and then with a `BatchClassifier` at each batch size in
+`--batch-sizes`, against a local stub model. A stub request takes `--latency`
+seconds plus `--per-message` seconds for each message it classifies, as generating
+the answer takes longer than reading the prompt.
+
+Reports the requests, prompt and completion tokens per message (estimated from the
+prompt and response text, so the result tool's JSON schema, which a provider also
+counts on every request, is left out), throughput and mean latency per message.
+
+Usage:
+    python -m benchmarks.micro_batch
+    python -m benchmarks.micro_batch --messages 2000 --batch-sizes 4 16 64
+"""
+
+import argparse
+import asyncio
+import time
+
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from agentic_ai_kata.kata_03_routing import mock_tools
+from agentic_ai_kata.utils.clients import registry
+from agentic_ai_kata.utils.instrumentation import get_recorder
+from agentic_ai_kata.utils.routing import BatchClassifier, classify_text_message
+from agentic_ai_kata.utils.text_message import TextMessage
+
+CLASSIFICATION = {
+    "category": "identity",
+    "confidence": 0.95,
+    "handler": "search_rolodex",
+    "reasoning": "They ask who this is",
+}
+
+
+def stub(latency: float, per_message: float) -> FunctionModel:
+    """Classifies one message, or each of a numbered batch."""
+
+    async def classify(messages, info: AgentInfo) -> ModelResponse:
+        prompt = messages[-1].parts[-1].content
+        tool = info.result_tools[0]
+        if "classifications" in tool.parameters_json_schema["properties"]:
+            numbers = [
+                int(line.removeprefix("Message ").rstrip(":"))
+                for line in prompt.splitlines()
+                if line.startswith("Message ")
+            ]
+            args = {
+                "classifications": [
+                    {"index": number, **CLASSIFICATION} for number in numbers
+                ]
+            }
+        else:
+            numbers = [1]
+            args = CLASSIFICATION
+        await asyncio.sleep(latency + per_message * len(numbers))
+        return ModelResponse(parts=[ToolCallPart.from_raw_args(tool.name, args)])
+
+    return FunctionModel(classify)
+
+
+async def classify_all(messages: list, concurrency: int, classify) -> list:
+    """Classify on `concurrency` callers, returning each message's latency."""
+    pending = iter(messages)
+    latencies = []
+
+    async def caller():
+        for message in pending:
+            started = time.perf_counter()
+            await classify(message)
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    return latencies
+
+
+def report(name: str, messages: int, elapsed: float, latencies: list) -> None:
+    totals = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    for group in get_recorder().summary()["groups"]:
+        if group["kind"] == "agent":
+            for key in totals:
+                totals[key] += group[key]
+    print(
+        f"  {name:<12} {totals['requests']:6} requests"
+        f"  {totals['prompt_tokens'] / messages:7.1f} prompt"
+        f"  {totals['completion_tokens'] / messages:5.1f} completion tokens/message"
+        f"  {messages / elapsed:7.1f} msgs/s"
+        f"  {sum(latencies) / len(latencies) * 1000:6.1f}ms latency"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=512)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--max-latency", type=float, default=0.005)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--per-message", type=float, default=0.002)
+    args = parser.parse_args()
+
+    messages = [
+        TextMessage(
+            from_="+18015550100",
+            to="+18015550199",
+            body=f"Who is this? I got your number from message {i}",
+            media=None,
+            meta=None,
+        )
+        for i in range(args.messages)
+    ]
+
+    print(
+        f"{args.messages} messages from {args.concurrency} callers,"
+        f" {args.latency * 1000:.0f}ms + {args.per_message * 1000:.0f}ms/message"
+        f" per request"
+    )
+    runs = [("per message", None)] + [
+        (f"batch of {size}", size) for size in args.batch_sizes
+    ]
+    with registry.override_model(stub(args.latency, args.per_message)):
+        for name, size in runs:
+            if size is None:
+
+                async def classify(message):
+                    return await classify_text_message(message, mock_tools)
+
+            else:
+                classify = BatchClassifier(
+                    mock_tools, max_batch_size=size, max_latency=args.max_latency
+                ).classify
+            get_recorder().clear()
+            started = time.perf_counter()
+            latencies = asyncio.run(
+                classify_all(messages, args.concurrency, classify)
+            )
+            report(name, args.messages, time.perf_counter() - started, latencies)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Compare text message classification on a model cascade with the large model alone.
+
+Classifies `--messages` messages with `classify_text_message` twice, against two
+local stub models named after the default prices' models:
+
+    - "openai:gpt-4o" (large): `--large-latency` per request, always confident
+    - "openai:gpt-4o-mini" (small): `--small-latency` per request, with a
+      confidence below `CASCADE_MIN_CONFIDENCE` for an `--ambiguous` share of
+      messages, which are escalated to the large model
+
+first with every step on the large model, then with the classifier on the small
+model (`MODEL_POLICY`), and reports for each the mean latency per message,
+escalations, and cost at `MODEL_PRICES`, with the spend the cascade saved.
+
+Usage:
+    python -m benchmarks.model_cascade
+    python -m benchmarks.model_cascade --messages 500 --ambiguous 0.3
+"""
+
+import argparse
+import asyncio
+import zlib
+
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from agentic_ai_kata.kata_03_routing import mock_tools
+from agentic_ai_kata.settings import settings
+from agentic_ai_kata.utils.cascade import get_model_cascade
+from agentic_ai_kata.utils.rate_limit import RateLimitedModel, RateLimiter
+from agentic_ai_kata.utils.routing import classify_text_message
+from agentic_ai_kata.utils.text_message import TextMessage
+
+LARGE = "openai:gpt-4o"
+SMALL = "openai:gpt-4o-mini"
+
+
+def stub(latency: float, ambiguous: float) -> RateLimitedModel:
+    """A classifier that is unsure of an `ambiguous` share of messages."""
+
+    async def classify(messages, info: AgentInfo) -> ModelResponse:
+        await asyncio.sleep(latency)
+        body = messages[-1].parts[-1].content
+        unsure = zlib.crc32(body.encode()) % 1000 < ambiguous * 1000
+        args = {
+            "category": "identity",
+            "confidence": 0.4 if unsure else 0.95,
+            "handler": "search_rolodex",
+            "reasoning": "They ask who this is",
+        }
+        return ModelResponse(
+            parts=[ToolCallPart.from_raw_args(info.result_tools[0].name, args)]
+        )
+
+    # Through the rate limiter, which records each request's tokens
+    return RateLimitedModel(FunctionModel(classify), RateLimiter())
+
+
+async def classify_all(messages: list, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def classify(message):
+        async with semaphore:
+            await classify_text_message(message, mock_tools)
+
+    await asyncio.gather(*(classify(message) for message in messages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--ambiguous", type=float, default=0.15)
+    parser.add_argument("--small-latency", type=float, default=0.02)
+    parser.add_argument("--large-latency", type=float, default=0.08)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    models = {
+        LARGE: stub(args.large_latency, 0.0),
+        SMALL: stub(args.small_latency, args.ambiguous),
+    }
+    messages = [
+        TextMessage(
+            from_="+18015550100",
+            to="+18015550199",
+            body=f"Who is this? I got your number from message {i}",
+            media=None,
+            meta=None,
+        )
+        for i in range(args.messages)
+    ]
+
+    print(
+        f"{args.messages} messages, {args.ambiguous:.0%} ambiguous to the small"
+        f" model, min confidence {settings.CASCADE_MIN_CONFIDENCE}"
+    )
+    # `classify_text_message` uses the process-wide cascade
+    cascade = get_model_cascade()
+    cascade.escalate_to = LARGE
+    cascade.model_factory = models.__getitem__
+    for name, policy in (
+        ("large only", {}),
+        ("cascade", {"classify_text_message": SMALL}),
+    ):
+        cascade.policy = policy
+        cascade.stats.clear()
+        asyncio.run(classify_all(messages, args.concurrency))
+        stats = cascade.stats.summary()["classify_text_message"]
+        print(f"  {name}")
+        print(f"    latency      {stats['mean_latency'] * 1000:8.1f}ms per message")
+        print(f"    escalations  {sum(stats['escalations'].values()):8}")
+        print(
+            f"    cost        ${stats['cost']:9.5f}"
+            f"  (saved ${stats['saved']:.5f} vs large only)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Measure `NearDuplicateIndex` query latency and recall as the corpus grows.
+
+For each corpus size in `--articles`, indexes that many synthetic articles in a
+fresh file, then checks `--queries` copies of indexed articles with
+`--edits` of their words replaced, and reports:
+
+    - Latency p50/p95 of an LSH query, and of comparing the query's signature with
+      every stored signature (the linear scan it replaces)
+    - Recall: the share of edited copies reported as near-duplicates of their
+      original, and the average similarity estimated for them
+
+Usage:
+    python -m benchmarks.near_duplicates
+    python -m benchmarks.near_duplicates --articles 1000 10000 50000 --edits 0.1
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from array import array
+from pathlib import Path
+
+from agentic_ai_kata.utils.near_duplicates import (
+    NearDuplicateIndex,
+    minhash,
+    similarity,
+)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def make_article(seed: int, words: int, vocabulary: list[str]) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+
+def edit(article: str, fraction: float, rng: random.Random) -> str:
+    words = article.split(" ")
+    for i in rng.sample(range(len(words)), int(len(words) * fraction)):
+        words[i] = f"edit{i}"
+    return " ".join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--articles", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--words", type=int, default=300)
+    parser.add_argument("--vocabulary", type=int, default=5_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--edits", type=float, default=0.01, help="words replaced")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = [f"word{i}" for i in range(args.vocabulary)]
+
+    for count in args.articles:
+        with tempfile.TemporaryDirectory() as directory:
+            index = NearDuplicateIndex(Path(directory) / "signatures.sqlite3")
+            start = time.perf_counter()
+            for i in range(count):
+                index.add(f"city-{i}", make_article(i, args.words, vocabulary))
+            indexed = count / (time.perf_counter() - start)
+            stored = [
+                array("Q", blob)
+                for (blob,) in index._db.execute("SELECT signature FROM signatures")
+            ]
+
+            lsh, linear, found, estimates = [], [], 0, []
+            for _ in range(args.queries):
+                original = rng.randrange(count)
+                article = make_article(original, args.words, vocabulary)
+                query = edit(article, args.edits, rng)
+
+                start = time.perf_counter()
+                matches = index.query(query)
+                lsh.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                signature = minhash(query)
+                [similarity(signature, other) for other in stored]
+                linear.append(time.perf_counter() - start)
+
+                match = {m.slug: m.similarity for m in matches}.get(f"city-{original}")
+                found += match is not None
+                estimates.append(match or 0.0)
+
+        print(f"{count} articles ({indexed:,.0f} indexed/s)")
+        for name, latencies in (("lsh", lsh), ("linear", linear)):
+            print(
+                f"  {name:7} p50 {percentile(latencies, 50) * 1000:7.2f}ms"
+                f"  p95 {percentile(latencies, 95) * 1000:7.2f}ms"
+            )
+        print(
+            f"  recall  {found / args.queries:7.1%}"
+            f"  (similarity {sum(estimates) / len(estimates):.2f} on average)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Load test the `ColBERTv2` client against the local ColBERTv2 stub server.
+
+Starts a `ColBERTStubServer` in a background thread (with optional latency, tail
+latency and error injection) and queries it through the async `ColBERTv2` client
+from many concurrent tasks, reporting:
+
+    - Query throughput (queries/sec)
+    - Client-side latency p50/p95/p99
+    - Failed queries (injected errors surface as client exceptions)
+
+`--raw` queries the server over one shared aiohttp session instead of the client,
+which opens a session per query, to measure the server's own capacity.
+
+Usage:
+    python -m benchmarks.retrieval_load
+    python -m benchmarks.retrieval_load --queries 20000 --concurrency 128 \\
+        --latency 0.02 --tail-rate 0.01 --tail-latency 0.5 --post
+"""
+
+import argparse
+import asyncio
+import time
+
+import aiohttp
+
+from agentic_ai_kata.utils.colbert_server import ColBERTStubServer
+from agentic_ai_kata.utils.colbert_v2 import ColBERTv2
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(args, url: str) -> tuple[list[float], int, float]:
+    retriever = ColBERTv2(url=url, post_requests=args.post)
+    latencies: list[float] = []
+    failed = 0
+    next_query = iter(range(args.queries))
+
+    async def query(session: aiohttp.ClientSession, text: str) -> None:
+        if not args.raw:
+            await retriever(text, k=args.k)
+            return
+        async with session.get(url, params={"query": text, "k": args.k}) as res:
+            res.raise_for_status()
+            await res.read()
+
+    async def client(session: aiohttp.ClientSession) -> None:
+        nonlocal failed
+        for i in next_query:
+            start = time.perf_counter()
+            try:
+                await query(session, f"plumbus query {i % args.distinct}")
+            except Exception:
+                failed += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*(client(session) for _ in range(args.concurrency)))
+    return latencies, failed, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--distinct", type=int, default=500, help="distinct queries")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--post", action="store_true", help="use POST requests")
+    parser.add_argument("--raw", action="store_true", help="bypass the client")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--tail-rate", type=float, default=0.0)
+    parser.add_argument("--tail-latency", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = ColBERTStubServer(
+        latency=args.latency,
+        jitter=args.jitter,
+        tail_rate=args.tail_rate,
+        tail_latency=args.tail_latency,
+        error_rate=args.error_rate,
+    )
+    with server:
+        latencies, failed, elapsed = asyncio.run(run(args, server.url))
+
+    print(f"{args.queries} queries from {args.concurrency} clients")
+    print(f"  throughput:    {args.queries / elapsed:10,.0f} queries/s")
+    print(f"  latency:       p50 {percentile(latencies, 50) * 1000:.2f}ms")
+    print(f"                 p95 {percentile(latencies, 95) * 1000:.2f}ms")
+    print(f"                 p99 {percentile(latencies, 99) * 1000:.2f}ms")
+    print(f"  failed:        {failed}")
+    print(f"  server:        {dict(server.stats)}")
+
+
+if __name__ == "__main__":
+    main()
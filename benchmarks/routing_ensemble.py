@@ -0,0 +1,117 @@
+"""Compare routing accuracy and cost with and without the ensemble gate.
+
+Routes `--messages` labeled messages with `classify_with_ensemble` against a
+local stub classifier that makes mistakes on hard messages. Each message has a
+difficulty d in [0, 1); a classification is correct with probability
+1 - `--noise` * d, and its confidence falls with d, so unsure answers are the ones
+likely to be wrong. Which answer a classifier gives depends on the message and
+its prompt, so ensemble members err independently.
+
+Reports the accuracy and classifications per message for each threshold in
+`--thresholds`: 0 never asks the ensemble, above 1 always does.
+
+Usage:
+    python -m benchmarks.routing_ensemble
+    python -m benchmarks.routing_ensemble --messages 1000 --thresholds 0 0.5 0.8
+"""
+
+import argparse
+import asyncio
+import random
+import zlib
+
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from agentic_ai_kata.kata_03_routing import mock_tools
+from agentic_ai_kata.utils.clients import registry
+from agentic_ai_kata.utils.routing import classify_with_ensemble
+from agentic_ai_kata.utils.text_message import TextMessage
+
+HANDLERS = [tool.name for tool in mock_tools]
+
+
+def difficulty(body: str) -> float:
+    return zlib.crc32(body.encode()) % 1000 / 1000
+
+
+def stub(noise: float) -> FunctionModel:
+    def classify(messages, info: AgentInfo) -> ModelResponse:
+        request = messages[-1]
+        body = request.parts[-1].content
+        prompt = "".join(
+            part.content for part in request.parts if part.part_kind != "user-prompt"
+        )
+        expected = body.split(":", 1)[0]
+        d = difficulty(body)
+        rng = random.Random(zlib.crc32(f"{prompt}{body}".encode()))
+        correct = rng.random() >= noise * d
+        wrong = [h for h in HANDLERS if h != expected]
+        handler = expected if correct else rng.choice(wrong)
+        args = {
+            "category": handler,
+            "confidence": round(min(1, max(0.05, 1 - d + rng.uniform(-0.1, 0.1))), 2),
+            "handler": handler,
+            "reasoning": "Stub",
+        }
+        return ModelResponse(
+            parts=[ToolCallPart.from_raw_args(info.result_tools[0].name, args)]
+        )
+
+    return FunctionModel(classify)
+
+
+async def route_all(messages: list, threshold: float, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def route(message):
+        async with semaphore:
+            return await classify_with_ensemble(message, mock_tools, threshold)
+
+    return await asyncio.gather(*(route(message) for message in messages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=0.6)
+    parser.add_argument(
+        "--thresholds", type=float, nargs="+", default=[0.0, 0.5, 0.7, 1.01]
+    )
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    messages = []
+    for i in range(args.messages):
+        handler = rng.choice(HANDLERS)
+        messages.append(
+            TextMessage(
+                from_="+18015550100",
+                to="+18015550199",
+                # The stub reads the label from the body; the classifier doesn't
+                body=f"{handler}: message {i}",
+                media=None,
+                meta=None,
+                expected_handler=handler,
+            )
+        )
+
+    print(f"{args.messages} messages, noise {args.noise}")
+    with registry.override_model(stub(args.noise)):
+        for threshold in args.thresholds:
+            decisions = asyncio.run(route_all(messages, threshold, args.concurrency))
+            correct = sum(
+                decision.classification.handler == message.expected_handler
+                for message, decision in zip(messages, decisions)
+            )
+            calls = sum(decision.calls for decision in decisions)
+            print(
+                f"  threshold {threshold:4.2f}  accuracy {correct / len(messages):6.1%}"
+                f"  {calls / len(messages):4.2f} classifications/message"
+            )
+
+
+if __name__ == "__main__":
+    main()
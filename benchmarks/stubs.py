@@ -0,0 +1,151 @@
+"""A deterministic local stand-in for the LLM.
+
+`stub_llm()` returns a pydantic-ai `FunctionModel` that answers any agent with a
+result synthesized from the agent's result schema, after a simulated latency of
+
+    latency + jitter * u + completion_tokens / token_rate      (u in [-1, 1])
+
+where `u` is derived from a hash of the request, so the same request always takes
+the same time. Function tools named in `call_tools` are called once per run first,
+so retrieval tools are exercised; other tools (e.g. ones that fetch web pages) are
+never called.
+
+Retrieval is stubbed by `agentic_ai_kata.utils.colbert_server.ColBERTStubServer`.
+
+Example Usage:
+    from benchmarks.stubs import stub_llm
+    from agentic_ai_kata.utils.clients import registry
+
+    with registry.override_model(stub_llm()):
+        ...
+"""
+
+import asyncio
+import json
+import zlib
+from typing import Any, Optional
+
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    TextPart,
+    ToolCallPart,
+    ToolReturnPart,
+)
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+# Rough characters-per-token ratio, as in agentic_ai_kata.utils.rate_limit
+CHARS_PER_TOKEN = 4
+
+
+def sample_from_schema(schema: dict, defs: Optional[dict] = None) -> Any:
+    """Build a small value that validates against a JSON schema.
+
+    Args:
+        schema: The JSON schema (as generated by pydantic)
+        defs: The schema's `$defs`, for resolving references
+
+    Returns:
+        Any: A JSON-compatible value
+    """
+    defs = defs if defs is not None else schema.get("$defs", {})
+    if "$ref" in schema:
+        return sample_from_schema(defs[schema["$ref"].rsplit("/", 1)[-1]], defs)
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "const" in schema:
+        return schema["const"]
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            options = [s for s in schema[key] if s.get("type") != "null"]
+            return sample_from_schema((options or schema[key])[0], defs)
+    kind = schema.get("type", "string")
+    if kind == "object":
+        properties = schema.get("properties")
+        if properties:
+            return {
+                name: sample_from_schema(prop, defs)
+                for name, prop in properties.items()
+            }
+        values = schema.get("additionalProperties")
+        if isinstance(values, dict):
+            return {
+                key: sample_from_schema(values, defs) for key in ("fact", "source")
+            }
+        return {}
+    if kind == "array":
+        return [sample_from_schema(schema.get("items", {}), defs) for _ in range(3)]
+    if kind == "integer":
+        return 1
+    if kind == "number":
+        return 0.9
+    if kind == "boolean":
+        return False
+    if kind == "null":
+        return None
+    return "Stub text from the benchmark model about Gazorpazorp and its capital."
+
+
+def _fraction(messages: list[ModelMessage], seed: int) -> float:
+    """A deterministic value in [-1, 1] derived from the request."""
+    text = repr([part for message in messages for part in message.parts][-1:])
+    return zlib.crc32(f"{seed}:{text}".encode()) / 0xFFFFFFFF * 2 - 1
+
+
+def stub_llm(
+    latency: float = 0.05,
+    jitter: float = 0.0,
+    token_rate: Optional[float] = None,
+    call_tools: tuple[str, ...] = ("search_wikipedia",),
+    seed: int = 0,
+) -> FunctionModel:
+    """A model that answers any agent locally after a simulated delay.
+
+    Args:
+        latency: Base seconds per request
+        jitter: Maximum seconds added to or taken off the latency
+        token_rate: Completion tokens per second, or None to ignore output size
+        call_tools: Function tools to call (once per run) before answering
+        seed: Seed for the jitter
+
+    Returns:
+        FunctionModel: The stub model
+    """
+
+    async def respond(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        called = {
+            part.tool_name
+            for message in messages
+            if isinstance(message, ModelRequest)
+            for part in message.parts
+            if isinstance(part, ToolReturnPart)
+        }
+        tool = next(
+            (
+                t
+                for t in info.function_tools
+                if t.name in call_tools and t.name not in called
+            ),
+            None,
+        )
+        if tool is not None:
+            args = sample_from_schema(tool.parameters_json_schema)
+            part = ToolCallPart.from_raw_args(tool.name, args)
+            output = json.dumps(args)
+        elif info.result_tools:
+            result_tool = info.result_tools[0]
+            args = sample_from_schema(result_tool.parameters_json_schema)
+            part = ToolCallPart.from_raw_args(result_tool.name, args)
+            output = json.dumps(args)
+        else:
+            output = sample_from_schema({"type": "string"})
+            part = TextPart(output)
+
+        delay = latency + jitter * _fraction(messages, seed)
+        if token_rate:
+            delay += len(output) / CHARS_PER_TOKEN / token_rate
+        await asyncio.sleep(max(0.0, delay))
+        return ModelResponse(parts=[part])
+
+    return FunctionModel(respond)
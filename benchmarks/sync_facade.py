@@ -0,0 +1,111 @@
+"""Compare `asyncio.run()` per call with the background-loop sync facade.
+
+Many threads (64 by default, like a threaded WSGI server) each call async code
+synchronously, either:
+
+    - asyncio.run: a new event loop per call, as `kata.run()` does
+    - facade:      `run_sync()` on the shared `LoopThread`
+
+for two workloads:
+
+    - noop: `await asyncio.sleep(0)`, so the figures are pure per-call overhead
+    - kata: `SetupKata().arun()` against a local stub model (optional latency)
+
+and reports calls/sec and per-call latency p50/p99 for each.
+
+Usage:
+    python -m benchmarks.sync_facade
+    python -m benchmarks.sync_facade --threads 64 --calls 50 --model-latency 0.01
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from agentic_ai_kata.kata_00_setup import SetupKata
+from agentic_ai_kata.utils.clients import registry
+from agentic_ai_kata.utils.loop_thread import get_loop_thread, run_sync
+
+
+def stub_model(latency: float) -> FunctionModel:
+    """A model that answers the setup kata with a koan after `latency` seconds."""
+
+    async def respond(messages, info: AgentInfo) -> ModelResponse:
+        await asyncio.sleep(latency)
+        args = {"koan": "One loop, many threads", "master": "Monk Facade"}
+        return ModelResponse(
+            parts=[ToolCallPart.from_raw_args(info.result_tools[0].name, args)]
+        )
+
+    return FunctionModel(respond)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def measure(call, threads: int, calls: int) -> tuple[float, list[float]]:
+    """Run `call` `calls` times in each of `threads` threads at once."""
+    latencies: list[float] = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        barrier.wait()
+        mine = []
+        for _ in range(calls):
+            start = time.perf_counter()
+            call()
+            mine.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(mine)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for future in [pool.submit(worker) for _ in range(threads)]:
+            future.result()
+    return time.perf_counter() - start, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--calls", type=int, default=20, help="calls per thread")
+    parser.add_argument("--model-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    workloads = {
+        "noop": lambda: asyncio.sleep(0),
+        "kata": lambda: SetupKata().arun(),
+    }
+    paths = {
+        "asyncio.run": asyncio.run,
+        "facade": run_sync,
+    }
+    total = args.threads * args.calls
+    print(f"{args.threads} threads x {args.calls} calls")
+    with registry.override_model(stub_model(args.model_latency)):
+        # Warm up imports, schema generation and the background loop
+        asyncio.run(SetupKata().arun())
+        run_sync(SetupKata().arun())
+        for workload, make in workloads.items():
+            for path, run in paths.items():
+                elapsed, latencies = measure(
+                    lambda: run(make()), args.threads, args.calls
+                )
+                print(
+                    f"  {workload:<5} {path:<12} {total / elapsed:10,.0f} calls/s"
+                    f"  p50 {percentile(latencies, 50) * 1000:8.2f}ms"
+                    f"  p99 {percentile(latencies, 99) * 1000:8.2f}ms"
+                )
+    get_loop_thread().stop()
+
+
+if __name__ == "__main__":
+    main()
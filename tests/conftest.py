@@ -5,6 +5,10 @@ from pydantic_settings import BaseSettings
 from pathlib import Path
 import shutil
 
+from vcr import VCR
+
+import vcr_jsonl
+
 
 class TestSettings(BaseSettings):
     OPENAI_API_KEY: str
@@ -58,17 +62,30 @@ def vcr_config():
     return {
         # Replace the Authorization request header with 'DUMMY' in cassettes
         "filter_headers": [("authorization", "DUMMY")],
-        # Custom request matcher to handle OpenAI API versioning
-        "match_on": ["method", "scheme", "host", "port", "path", "query", "body"],
+        # Method, scheme, host, port, path, query and body, compared by a hash
+        # computed once per request (see tests/vcr_jsonl.py)
+        "match_on": ["request_key"],
         # Handle binary/compressed responses
         "decode_compressed_response": True,
         # Don't try to decode binary post data
         "filter_post_data_parameters": None,
         # Record all requests in text mode
         "record_mode": "once",
+        # Compact JSONL cassettes (see tests/vcr_jsonl.py)
+        "serializer": "jsonl",
+        "path_transformer": VCR.ensure_suffix(".jsonl"),
     }
 
 
+@pytest.fixture(scope="module")
+def vcr(vcr):
+    vcr.register_serializer("jsonl", vcr_jsonl)
+    vcr.register_persister(vcr_jsonl.JsonlPersister)
+    vcr.register_matcher("request_key", vcr_jsonl.match_request_key)
+    # Look recorded requests up by hash instead of scanning the cassette
+    return vcr_jsonl.IndexedVCR.from_vcr(vcr)
+
+
 @pytest.fixture(scope="module")
 def vcr_cassette_dir(request):
     # Store cassettes next to test files
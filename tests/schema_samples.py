@@ -0,0 +1,53 @@
+"""Sample values for agent result schemas, for test models that answer any agent.
+
+Usage:
+    def respond(messages, info: AgentInfo) -> ModelResponse:
+        tool = info.result_tools[0]
+        args = sample_from_schema(tool.parameters_json_schema)
+        return ModelResponse(parts=[ToolCallPart.from_raw_args(tool.name, args)])
+"""
+
+from typing import Any, Optional
+
+
+def sample_from_schema(schema: dict, defs: Optional[dict] = None) -> Any:
+    """Build a small value that validates against a JSON schema.
+
+    Args:
+        schema: The JSON schema (as generated by pydantic)
+        defs: The schema's `$defs`, for resolving references
+
+    Returns:
+        Any: A JSON-compatible value
+    """
+    defs = defs if defs is not None else schema.get("$defs", {})
+    if "$ref" in schema:
+        return sample_from_schema(defs[schema["$ref"].rsplit("/", 1)[-1]], defs)
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "const" in schema:
+        return schema["const"]
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            options = [s for s in schema[key] if s.get("type") != "null"]
+            return sample_from_schema((options or schema[key])[0], defs)
+    kind = schema.get("type", "string")
+    if kind == "object":
+        properties = schema.get("properties") or {}
+        values = schema.get("additionalProperties")
+        if not properties and isinstance(values, dict):
+            return {key: sample_from_schema(values, defs) for key in ("a", "b")}
+        return {
+            name: sample_from_schema(prop, defs) for name, prop in properties.items()
+        }
+    if kind == "array":
+        return [sample_from_schema(schema.get("items", {}), defs) for _ in range(2)]
+    if kind == "integer":
+        return 1
+    if kind == "number":
+        return 0.9
+    if kind == "boolean":
+        return False
+    if kind == "null":
+        return None
+    return "Sample text about Gazorpazorp and its capital."
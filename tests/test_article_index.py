@@ -0,0 +1,108 @@
+import os
+
+import pytest
+
+from agentic_ai_kata.utils.article_index import (
+    ArticleIndex,
+    fts5_available,
+    split_sections,
+)
+
+ARTICLE = """# Fribbledorp Prime
+
+**Fribbledorp Prime** is the nexus of Gleebor-7.
+
+## Geography
+### Setting
+Floating gardens surround the city.
+
+## Economy
+Trade in crystalline rivers.
+"""
+
+
+@pytest.fixture(params=[True, False], ids=["fts5", "postings"])
+def index(request, tmp_path):
+    if request.param and not fts5_available():
+        pytest.skip("SQLite was built without FTS5")
+    return ArticleIndex(tmp_path / "articles.sqlite3", use_fts5=request.param)
+
+
+def test_articles_are_split_at_top_level_headings():
+    # When: An article is split
+    title, sections = split_sections(ARTICLE)
+
+    # Then: The intro, and each ## section with its ### subsections, are sections
+    assert title == "Fribbledorp Prime"
+    assert [s.heading for s in sections] == [
+        "Fribbledorp Prime",
+        "Geography",
+        "Economy",
+    ]
+    assert sections[1].text == "### Setting\nFloating gardens surround the city."
+
+
+def test_search_ranks_sections(index):
+    # Given: Two indexed articles
+    index.add_article("fribbledorp-prime", ARTICLE)
+    index.add_article(
+        "slorpius-city",
+        "# Slorpius City\n\n## Gardens\nGardens everywhere.\n\n## People\nNone.",
+    )
+
+    # When: We search for a word in both
+    hits = index.search("gardens", k=5)
+
+    # Then: The section with it in its heading comes first
+    assert [(h.slug, h.heading) for h in hits] == [
+        ("slorpius-city", "Gardens"),
+        ("fribbledorp-prime", "Geography"),
+    ]
+    assert hits[0].title == "Slorpius City" and hits[0].score > hits[1].score
+
+    # And: Query syntax is treated as plain words
+    assert index.search('"gardens" OR NOT (') == index.search("gardens")
+    assert index.search("zzz") == [] and index.search("?!") == []
+
+
+def test_re_adding_an_article_replaces_it(index):
+    index.add_article("fribbledorp-prime", ARTICLE)
+
+    # When: The article is indexed again with different content
+    index.add_article("fribbledorp-prime", "# Fribbledorp Prime\nNow about moons.")
+
+    # Then: Only the new content is found
+    assert index.search("gardens") == []
+    assert [h.heading for h in index.search("moons")] == ["Fribbledorp Prime"]
+    assert len(index) == 1
+
+
+def test_sync_only_reads_changed_files(index, tmp_path):
+    # Given: A directory with two articles, already synced
+    articles = tmp_path / "articles"
+    articles.mkdir()
+    (articles / "a.md").write_text("# A\nApples.")
+    (articles / "b.md").write_text("# B\nBananas.")
+    assert index.sync(articles) == {
+        "added": 2,
+        "updated": 0,
+        "removed": 0,
+        "unchanged": 0,
+    }
+
+    # When: One article changes, one is deleted and one is added
+    (articles / "a.md").write_text("# A\nApricots, not apples.")
+    os.utime(articles / "a.md", (0, 1))
+    (articles / "b.md").unlink()
+    (articles / "c.md").write_text("# C\nCherries.")
+
+    # Then: Only those are re-indexed
+    assert index.sync(articles) == {
+        "added": 1,
+        "updated": 1,
+        "removed": 1,
+        "unchanged": 0,
+    }
+    found = index.search("apricots bananas cherries")
+    assert sorted(h.slug for h in found) == ["a", "c"]
+    assert index.sync(articles)["unchanged"] == 2
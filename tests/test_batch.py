@@ -0,0 +1,110 @@
+import asyncio
+import os
+import time
+from contextlib import ExitStack
+
+import pytest
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from agentic_ai_kata.utils.batch import classify_job, iter_sharded, map_sharded
+from agentic_ai_kata.utils.clients import registry
+from agentic_ai_kata.utils.text_message import TextMessage
+
+_overrides = ExitStack()
+
+
+async def square_with_pid(n: int) -> tuple[int, int]:
+    return n * n, os.getpid()
+
+
+async def fail_on_three(n: int) -> int:
+    if n == 3:
+        raise ValueError("three")
+    return n
+
+
+async def exit_on_one(n: int) -> int:
+    if n == 1:
+        os._exit(3)
+    return n
+
+
+async def slow_after_zero(n: int) -> int:
+    if n:
+        await asyncio.sleep(30)
+    return n
+
+
+def conversation(messages, info: AgentInfo) -> ModelResponse:
+    args = {
+        "category": "chat",
+        "confidence": 0.9,
+        "handler": "conversation",
+        "reasoning": "Small talk",
+    }
+    return ModelResponse(
+        parts=[ToolCallPart.from_raw_args(info.result_tools[0].name, args)]
+    )
+
+
+def install_conversation_model() -> None:
+    _overrides.enter_context(registry.override_model(FunctionModel(conversation)))
+
+
+def test_items_are_sharded_across_processes_and_merged_in_order():
+    # When: We square 20 numbers in two worker processes
+    results = map_sharded(square_with_pid, list(range(20)), workers=2)
+
+    # Then: Results come back in input order, computed outside this process
+    assert [square for square, _ in results] == [n * n for n in range(20)]
+    pids = {pid for _, pid in results}
+    assert len(pids) == 2 and os.getpid() not in pids
+
+
+def test_item_errors_are_raised_or_returned():
+    # Then: By default the first failure is raised in the caller
+    with pytest.raises(ValueError, match="three"):
+        map_sharded(fail_on_three, list(range(6)), workers=2)
+
+    # And: With return_exceptions, the exception takes the item's place
+    results = dict(
+        iter_sharded(fail_on_three, list(range(6)), workers=2, return_exceptions=True)
+    )
+    assert isinstance(results.pop(3), ValueError)
+    assert results == {n: n for n in range(6) if n != 3}
+
+
+def test_early_exit_stops_the_workers():
+    # Given: A sharded run where every item but the first takes 30 seconds
+    started = time.monotonic()
+    results = iter_sharded(slow_after_zero, list(range(4)), workers=2)
+
+    # When: The caller takes the first result and stops
+    assert next(results) == (0, 0)
+    results.close()
+
+    # Then: It returns promptly instead of waiting for the slow items
+    assert time.monotonic() - started < 10
+
+
+def test_a_dead_worker_is_reported():
+    # Then: A worker process that exits without reporting raises in the caller
+    with pytest.raises(RuntimeError, match="exited with code 3"):
+        map_sharded(exit_on_one, list(range(4)), workers=2)
+
+
+def test_bulk_routing_in_workers():
+    # Given: Messages, and workers that classify with a local model
+    messages = [
+        TextMessage(from_="+1", to="+2", body=f"hi {n}", media=None, meta=None)
+        for n in range(4)
+    ]
+
+    # When: They are classified in two workers
+    classifications = map_sharded(
+        classify_job, messages, workers=2, initializer=install_conversation_model
+    )
+
+    # Then: Every message got the model's classification
+    assert [c.handler for c in classifications] == ["conversation"] * 4
@@ -0,0 +1,108 @@
+import pytest
+from pydantic import BaseModel
+from pydantic_ai import Agent, UnexpectedModelBehavior
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from agentic_ai_kata.utils.cascade import ModelCascade
+from agentic_ai_kata.utils.rate_limit import RateLimitedModel, RateLimiter
+
+PRICES = {"small": (1.0, 1.0), "large": (10.0, 10.0)}
+
+
+class Guess(BaseModel):
+    answer: str
+    confidence: float
+
+
+def answering(calls: list, name: str, confidence: float = 0.9):
+    """A model that answers with its name, or with invalid output if confidence<0."""
+
+    def respond(messages, info: AgentInfo) -> ModelResponse:
+        calls.append(name)
+        args = {"answer": name, "confidence": confidence}
+        if confidence < 0:
+            args = {"answer": name}
+        return ModelResponse(
+            parts=[ToolCallPart.from_raw_args(info.result_tools[0].name, args)]
+        )
+
+    # Through the rate limiter, which records the tokens of each request
+    return RateLimitedModel(FunctionModel(respond), RateLimiter())
+
+
+def cascade(models: dict) -> ModelCascade:
+    return ModelCascade(
+        policy={"guess": "small"},
+        escalate_to="large",
+        prices=PRICES,
+        model_factory=models.__getitem__,
+    )
+
+
+def accept(guess: Guess) -> bool:
+    return guess.confidence >= 0.7
+
+
+async def test_confident_results_of_the_small_model_are_kept():
+    # Given: A cascade whose small model is confident
+    calls = []
+    models = {"small": answering(calls, "small"), "large": answering(calls, "large")}
+    c = cascade(models)
+
+    # When: A step in the policy runs
+    result = await c.run(Agent(result_type=Guess), "guess", "Hi", accept=accept)
+
+    # Then: Only the small model is called, and spend is saved
+    assert result.data.answer == "small"
+    assert calls == ["small"]
+    stats = c.stats.summary()["guess"]
+    assert stats["runs"] == 1 and stats["escalations"] == {}
+    assert stats["models"]["small"]["prompt_tokens"] > 0
+    assert stats["saved"] == pytest.approx(stats["cost"] * 9)
+
+
+async def test_unconfident_or_invalid_results_escalate():
+    # Given: Small models that are unsure, or whose output never validates
+    calls = []
+    unsure = {
+        "small": answering(calls, "small", 0.3),
+        "large": answering(calls, "large"),
+    }
+    invalid = {"small": answering([], "small", -1), "large": answering([], "large")}
+    agent = Agent(result_type=Guess, retries=0)
+
+    # When: The step runs on each
+    result = await cascade(unsure).run(agent, "guess", "Hi", accept=accept)
+    c = cascade(invalid)
+    escalated = await c.run(agent, "guess", "Hi", accept=accept)
+
+    # Then: Both are escalated to the large model, with the reason recorded
+    assert result.data.answer == escalated.data.answer == "large"
+    assert calls == ["small", "large"]
+    stats = c.stats.summary()["guess"]
+    assert stats["escalations"] == {"validation": 1}
+    small = stats["models"]["small"]
+    assert (small["attempts"], small["accepted"]) == (1, 0)
+    assert small["cost"] > 0
+    # Running on both costs more than the large model alone
+    assert stats["saved"] < 0
+
+
+async def test_unlisted_steps_run_once_on_the_default_model():
+    # Given: A step the policy doesn't mention, and a large model that fails
+    calls = []
+    models = {"small": answering(calls, "small"), "large": answering(calls, "large", 0)}
+    c = cascade(models)
+
+    # When: It runs with a check the result doesn't pass
+    result = await c.run(Agent(result_type=Guess), "other", "Hi", accept=accept)
+
+    # Then: The last model's result is returned as is, without escalating
+    assert result.data.answer == "large"
+    assert calls == ["large"]
+
+    # And: A last model whose output is invalid raises
+    models["large"] = answering(calls, "large", -1)
+    with pytest.raises(UnexpectedModelBehavior):
+        await c.run(Agent(result_type=Guess, retries=0), "other", "Hi")
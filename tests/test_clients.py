@@ -0,0 +1,89 @@
+import asyncio
+
+import httpx
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import FunctionModel
+from pydantic_ai.models.openai import OpenAIModel
+
+from agentic_ai_kata.utils.clients import (
+    ClientConfig,
+    ClientRegistry,
+    LoopLocalTransport,
+    get_model,
+    get_openai_client,
+)
+from agentic_ai_kata.kata_01_augmented import AugmentedKata
+from agentic_ai_kata.kata_02_chaining import ChainingKata
+
+
+def test_registry_shares_clients_per_config():
+    # Given: A registry and two configs that differ only in pool limits
+    registry = ClientRegistry()
+    small = ClientConfig(api_key="DUMMY", max_connections=5)
+    large = ClientConfig(api_key="DUMMY", max_connections=50)
+
+    # When: We ask for clients
+    first = registry.openai_client(small)
+    second = registry.openai_client(small)
+    other = registry.openai_client(large)
+
+    # Then: Equal configs share a client and different configs don't
+    assert first is second
+    assert first is not other
+
+
+def test_katas_share_the_process_wide_client():
+    # Given: Two different katas
+    augmented = AugmentedKata()
+    chaining = ChainingKata()
+
+    # Then: Their deps, the search agent and the models all use one client
+    client = get_openai_client()
+    assert augmented.deps.openai is client
+    assert chaining.deps.openai is client
+    assert chaining.search_agent.openai is client
+
+    model = get_model("openai:gpt-4o")
+    assert isinstance(model.wrapped, OpenAIModel)
+    assert model.wrapped.client is client
+
+
+def test_transport_keeps_one_pool_per_event_loop():
+    # Given: A loop-local transport
+    transport = LoopLocalTransport(httpx.Limits(max_connections=10))
+
+    async def pools():
+        return (
+            transport.transport_for_running_loop(),
+            transport.transport_for_running_loop(),
+        )
+
+    def run_on_new_loop():
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(pools())
+        finally:
+            loop.close()
+
+    # When: We use it from two separate event loops
+    first_a, first_b = run_on_new_loop()
+    second_a, _ = run_on_new_loop()
+
+    # Then: Each loop gets its own pool, reused within the loop
+    assert first_a is first_b
+    assert first_a is not second_a
+
+
+def test_model_override_replaces_the_provider_model():
+    # Given: A registry and a local stub model
+    registry = ClientRegistry()
+    stub = FunctionModel(lambda messages, info: ModelResponse(parts=[TextPart("Hi")]))
+
+    # When: Models are requested with and without the override
+    with registry.override_model(stub):
+        overridden = registry.model()
+    restored = registry.model()
+
+    # Then: The stub is still rate limited, and the override is undone on exit
+    assert overridden.wrapped is stub
+    assert isinstance(restored.wrapped, OpenAIModel)
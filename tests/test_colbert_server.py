@@ -0,0 +1,80 @@
+import pytest
+import requests
+
+from agentic_ai_kata.utils.colbert_server import ColBERTStubServer, load_corpus
+from agentic_ai_kata.utils.colbert_v2 import ColBERTv2
+
+PASSAGES = [
+    "Gazorpazorp | The capital of Gazorpazorp is Gazorpazorpfield.",
+    "Squanch | Squanchers squanch in the squanch festival.",
+    "Plumbus | Everyone has a plumbus in their home.",
+]
+
+
+@pytest.fixture
+def server():
+    with ColBERTStubServer(PASSAGES) as server:
+        yield server
+
+
+async def test_get_and_post_follow_the_colbert_contract(server):
+    # Given: Clients for both request styles
+    get_client = ColBERTv2(url=server.url)
+    post_client = ColBERTv2(url=server.url, post_requests=True)
+
+    # When: Both ask the same question, sync and async
+    results = [
+        get_client.call_sync("Where is the capital of Gazorpazorp?", k=2),
+        post_client.call_sync("Where is the capital of Gazorpazorp?", k=2),
+        await get_client("Where is the capital of Gazorpazorp?", k=2),
+        await post_client("Where is the capital of Gazorpazorp?", k=2),
+    ]
+
+    # Then: They get the same k passages, the matching one first
+    for topk in results:
+        assert [p["pid"] for p in topk] == [0, results[0][1]["pid"]]
+        assert [p["rank"] for p in topk] == [1, 2]
+        assert topk[0]["text"] == PASSAGES[0]
+    assert results[0][0]["long_text"] == PASSAGES[0]
+
+
+def test_injected_errors_and_latency_are_reproducible():
+    # Given: Two servers with the same seed and a 50% error rate
+    first = ColBERTStubServer(PASSAGES, error_rate=0.5, tail_rate=0.5, seed=7)
+    second = ColBERTStubServer(PASSAGES, error_rate=0.5, tail_rate=0.5, seed=7)
+
+    # Then: The same request fails, or is slow, on both
+    queries = [(f"query {i}", n) for i in range(50) for n in range(2)]
+    failures = [first.fails(q, n) for q, n in queries]
+    assert failures == [second.fails(q, n) for q, n in queries]
+    assert 0 < sum(failures) < len(queries)
+    delays = [first.delay_for(q, n) for q, n in queries]
+    assert delays == [second.delay_for(q, n) for q, n in queries]
+    assert set(delays) == {0.0, 1.0}
+
+
+def test_failures_are_served_with_the_configured_status():
+    # Given: A server where every request fails
+    with ColBERTStubServer(PASSAGES, error_rate=1.0, error_status=429) as server:
+        # When: We query it
+        response = requests.get(server.url, params={"query": "plumbus", "k": 1})
+        stats = requests.get(server.url.replace("wiki17_abstracts", "stats")).json()
+
+    # Then: The injected error is returned and counted
+    assert response.status_code == 429
+    assert stats == {"passages": 3, "requests": 1, "errors": 1}
+
+
+def test_payload_size_and_corpus_loading(tmp_path):
+    # Given: An article on disk
+    (tmp_path / "plumbus.md").write_text(
+        "# Plumbus\n\nA plumbus is\na household device.\n\n## History\n\nOld."
+    )
+
+    # When: It is loaded, with passages padded to a fixed size
+    passages = load_corpus(tmp_path)
+    server = ColBERTStubServer(passages, passage_chars=64)
+
+    # Then: Each paragraph is a titled passage of exactly that size
+    assert passages == ["Plumbus | A plumbus is a household device.", "Plumbus | Old."]
+    assert [len(p["text"]) for p in server.search("plumbus", k=5)] == [64, 64]
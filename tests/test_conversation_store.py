@@ -0,0 +1,286 @@
+import pytest
+
+from agentic_ai_kata.utils.conversation_store import (
+    DirectoryStore,
+    JsonlStore,
+    SqliteStore,
+    open_store,
+)
+from agentic_ai_kata.utils.text_message import Conversation, MediaObject, TextMessage
+
+
+def _conversation(topic: str, phones: tuple[str, str], times: list[int]):
+    a, b = phones
+    return Conversation(
+        who=[],
+        topic=topic,
+        messages=[
+            TextMessage(
+                from_=a, to=b, body=f"{topic} {t}", media=None, meta=None, createdAt=t
+            )
+            for t in times
+        ],
+    )
+
+
+@pytest.fixture(params=["directory", "jsonl", "sqlite"])
+def store(request, tmp_path):
+    path = {
+        "directory": tmp_path / "conversations",
+        "jsonl": tmp_path / "conversations.jsonl",
+        "sqlite": tmp_path / "conversations.sqlite3",
+    }[request.param]
+    return open_store(request.param, path)
+
+
+@pytest.fixture
+def conversations():
+    return {
+        "plumbus": _conversation("plumbus", ("+1001", "+1002"), [100, 200]),
+        "knights": _conversation("knights", ("+1002", "+1003"), [300, 400]),
+        "shanty": _conversation("shanty", ("+1003", "+1004"), [500]),
+    }
+
+
+def test_store_round_trips_conversations(store, conversations):
+    # Given: A store with three conversations saved in bulk
+    store.save_many(conversations)
+
+    # Then: They can be loaded by name, in bulk and by iteration
+    assert store.load("knights") == conversations["knights"]
+    assert store.load("missing") is None
+    assert store.load_many(["shanty", "missing"]) == {"shanty": conversations["shanty"]}
+    assert dict(store.items()) == conversations
+    assert len(store) == 3 and "plumbus" in store
+
+
+def test_store_indexes_id_participant_topic_and_time(store, conversations):
+    # Given: A store with three conversations
+    store.save_many(conversations)
+
+    def topics(found):
+        return [c.topic for c in found]
+
+    # Then: Each index finds the right conversations
+    assert store.get_by_id(conversations["shanty"].id) == conversations["shanty"]
+    assert topics(store.find(participant="+1002")) == ["knights", "plumbus"]
+    assert topics(store.find(topic="shanty")) == ["shanty"]
+    assert topics(store.find(since=200, until=400)) == ["knights", "plumbus"]
+    # Between two of a conversation's messages
+    assert topics(store.find(since=150, until=200)) == []
+
+    # And: Filters combine
+    assert topics(store.find(participant="+1003", since=450)) == ["shanty"]
+
+
+def test_resaving_replaces_the_indexed_conversation(store, conversations):
+    # Given: A stored conversation
+    store.save_many(conversations)
+
+    # When: It is replaced with one on a different topic
+    store.save("plumbus", _conversation("schleem", ("+1009", "+1008"), [900]))
+
+    # Then: Only the new version is found
+    assert [c.topic for c in store.find(participant="+1001")] == []
+    assert [c.topic for c in store.find(participant="+1009")] == ["schleem"]
+    assert len(store) == 3
+
+    # And: Clearing removes everything
+    store.clear()
+    assert len(store) == 0 and store.find() == []
+
+
+def test_stores_reopen_from_disk(tmp_path, conversations):
+    # Given: Conversations written by each backend
+    stores = [
+        (DirectoryStore, tmp_path / "dir"),
+        (JsonlStore, tmp_path / "c.jsonl"),
+        (SqliteStore, tmp_path / "c.sqlite3"),
+    ]
+    for cls, path in stores:
+        cls(path).save_many(conversations)
+
+    # Then: A new store on the same path sees them, indexes included
+    for cls, path in stores:
+        reopened = cls(path)
+        assert dict(reopened.items()) == conversations
+        assert [c.topic for c in reopened.find(topic="knights")] == ["knights"]
+
+
+def test_jsonl_compaction_keeps_only_latest_records(tmp_path, conversations):
+    # Given: A JSONL store where one conversation was saved twice
+    store = JsonlStore(tmp_path / "c.jsonl")
+    store.save_many(conversations)
+    store.save("plumbus", conversations["shanty"])
+
+    # When: It is compacted
+    store.compact()
+
+    # Then: One line per conversation remains, with the latest content
+    assert len(store.path.read_text().splitlines()) == 3
+    assert JsonlStore(store.path).load("plumbus") == conversations["shanty"]
+
+
+def test_directory_store_reads_the_committed_conversations():
+    # Given: The conversations shipped with the repo
+    store = open_store("directory")
+
+    # Then: They load through the store unchanged
+    assert "casual_banter" in store
+    assert store.load("casual_banter").topic == "luscious-plumbus"
+
+
+def test_messages_stream_in_created_order_across_conversations(store):
+    # Given: Conversations whose messages interleave in time, with a tie
+    store.save_many(
+        {
+            "a": _conversation("a", ("+1", "+2"), [30, 10, 50]),
+            "b": _conversation("b", ("+3", "+4"), [20, 30]),
+            "c": _conversation("c", ("+5", "+6"), [60]),
+        }
+    )
+
+    # When: We stream every message
+    messages = list(store.iter_messages())
+
+    # Then: They come out oldest first, ties broken by conversation name
+    assert [m.body for m in messages] == [
+        "a 10",
+        "b 20",
+        "a 30",
+        "b 30",
+        "a 50",
+        "c 60",
+    ]
+
+
+def test_streamed_messages_match_the_stored_ones(store, conversations):
+    # Given: Stored messages covering every field
+    conversations["plumbus"].messages[0] = TextMessage(
+        from_="+1001",
+        to="+1002",
+        body="pic",
+        media=[MediaObject(url="https://example.com/a.jpg", type="image/jpeg")],
+        meta={"carrier": "intergalactic"},
+        expected_handler="conversation",
+        createdAt=100,
+    )
+    store.save_many(conversations)
+
+    # When: They are streamed, validated in bulk
+    streamed = list(store.iter_messages())
+
+    # Then: They are the same messages, field for field
+    expected = sorted(
+        (m for c in conversations.values() for m in c.messages),
+        key=lambda m: m.createdAt,
+    )
+    assert streamed == expected
+    assert all(type(m.media[0]) is MediaObject for m in streamed if m.media)
+
+
+def test_message_stream_opens_conversations_lazily(tmp_path):
+    # Given: A directory store of conversations that don't overlap in time
+    store = DirectoryStore(tmp_path)
+    store.save_many(
+        {
+            f"c{i}": _conversation(f"c{i}", ("+1", "+2"), [i * 10, i * 10 + 1])
+            for i in range(5)
+        }
+    )
+    opened = []
+    load_raw = store._load_raw
+    store._load_raw = lambda name: opened.append(name) or load_raw(name)
+
+    # When: We read the first two messages
+    stream = store.iter_messages()
+    first_two = [next(stream).body for _ in range(2)]
+
+    # Then: Only the first conversation has been read from disk
+    assert first_two == ["c0 0", "c0 1"]
+    assert opened == ["c0"]
+
+    # And: The rest are read as the stream reaches them
+    assert len(list(stream)) == 8
+    assert opened == ["c0", "c1", "c2", "c3", "c4"]
+
+
+def test_appended_messages_join_their_conversation(store, conversations):
+    # Given: A store with saved conversations
+    store.save_many(conversations)
+
+    # When: Messages are appended to an existing and to a new conversation
+    late = TextMessage(
+        from_="+1009", to="+1001", body="late", media=None, meta=None, createdAt=150
+    )
+    store.append_message("plumbus", late)
+    first = TextMessage(
+        from_="+1005", to="+1006", body="hi", media=None, meta=None, createdAt=600
+    )
+    store.append_message("new", first, who=[{"name": "A", "phone": "+1005"}])
+
+    # Then: Loads, lookups and the message stream include them, in time order
+    plumbus = store.load("plumbus")
+    assert [m.body for m in plumbus.messages] == ["plumbus 100", "late", "plumbus 200"]
+    assert store.load("new").who == [{"name": "A", "phone": "+1005"}]
+    assert [c.topic for c in store.find(participant="+1009")] == ["plumbus"]
+    assert [c.topic for c in store.find(since=150, until=151)] == ["plumbus"]
+    assert [m.body for m in store.iter_messages()][:3] == [
+        "plumbus 100",
+        "late",
+        "plumbus 200",
+    ]
+
+    # And: Saving the conversation again keeps each message once
+    store.save("plumbus", plumbus)
+    assert len(store.load("plumbus").messages) == 3
+
+
+def test_sqlite_loads_read_only_their_appended_messages(tmp_path, conversations):
+    # Given: A SQLite store with messages appended to two conversations
+    store = SqliteStore(tmp_path / "conversations.sqlite3")
+    store.save_many(conversations)
+    for name, t in (("plumbus", 250), ("knights", 450), ("plumbus", 260)):
+        message = TextMessage(
+            from_="+1001", to="+1002", body=f"{t}", media=None, meta=None, createdAt=t
+        )
+        store.append_message(name, message)
+    read = []
+    store._db.set_trace_callback(read.append)
+
+    # When: Some of the conversations are loaded
+    loaded = store.load_many(["plumbus", "shanty"])
+
+    # Then: They include their appended messages, looked up by name only
+    assert [m.body for m in loaded["plumbus"].messages][-2:] == ["250", "260"]
+    assert len(loaded["shanty"].messages) == 1
+    appended = [sql for sql in read if "FROM appended_messages" in sql]
+    assert appended and all("WHERE name IN" in sql for sql in appended)
+
+
+@pytest.mark.parametrize("backend", ["jsonl", "sqlite"])
+def test_appending_doesnt_rewrite_the_conversation(tmp_path, backend, conversations):
+    # Given: A store on disk with a conversation
+    path = tmp_path / f"conversations.{backend}"
+    store = open_store(backend, path)
+    store.save_many(conversations)
+    saves = []
+    store.save_many = lambda batch: saves.append(batch)
+
+    # When: Many messages are appended to it
+    for t in range(1000, 1010):
+        store.append_message(
+            "shanty",
+            TextMessage(
+                from_="+1003",
+                to="+1004",
+                body=f"{t}",
+                media=None,
+                meta=None,
+                createdAt=t,
+            ),
+        )
+
+    # Then: Nothing was re-saved, and a reopened store sees every message
+    assert saves == []
+    assert len(open_store(backend, path).load("shanty").messages) == 11
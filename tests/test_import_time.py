@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+HEAVY_MODULES = {"openai", "pydantic_ai", "aiohttp", "requests", "logfire"}
+
+# logfire registers a pydantic plugin that pydantic loads when the first model is
+# defined; that cost comes from the environment, so it's excluded from the benchmark
+ENV = {**os.environ, "PYDANTIC_DISABLE_PLUGINS": "logfire-plugin"}
+
+# Generous budget for a cold `import` so this guards regressions, not CPU speed
+IMPORT_BUDGET_US = 500_000
+
+
+def import_time(module: str) -> dict[str, int]:
+    """Import a module in a fresh interpreter and return cumulative import times.
+
+    Args:
+        module: Dotted name of the module to import
+
+    Returns:
+        dict[str, int]: Cumulative import time in microseconds, keyed by module name
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=Path(__file__).parent.parent,
+        env=ENV,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        timings[name.strip()] = int(cumulative)
+    return timings
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "agentic_ai_kata.settings",
+        "agentic_ai_kata.utils",
+        "agentic_ai_kata.utils.colbert_v2",
+    ],
+)
+def test_import_is_cheap(module):
+    # Given: A fresh interpreter
+    # When: We import the module
+    timings = import_time(module)
+
+    # Then: No heavy SDKs should be loaded
+    loaded = {name.split(".")[0] for name in timings}
+    assert not HEAVY_MODULES & loaded, f"{module} eagerly imports {HEAVY_MODULES & loaded}"
+
+    # And: The import should fit within the cold-start budget
+    assert timings[module] < IMPORT_BUDGET_US, f"{module} took {timings[module]}us"
+
+
+def test_settings_are_loaded_on_first_use():
+    # Given: A fresh interpreter that imports the settings module
+    code = (
+        "import sys\n"
+        "from agentic_ai_kata import settings as s\n"
+        "assert s.get_settings.cache_info().currsize == 0\n"
+        "assert 'logfire' not in sys.modules\n"
+    )
+
+    # When / Then: Nothing is loaded until an attribute is read
+    subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).parent.parent,
+        env=ENV,
+        check=True,
+    )
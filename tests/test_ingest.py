@@ -0,0 +1,199 @@
+import asyncio
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from agentic_ai_kata.utils.conversation_store import DirectoryStore, JsonlStore
+from agentic_ai_kata.utils.ingest import IngestService, thread_name
+from agentic_ai_kata.utils.text_message import TextMessage
+from agentic_ai_kata.utils.thread_summary import ThreadSummaries
+
+
+def _payload(body: str, sender: str = "+18015551234") -> dict:
+    return {
+        "from": sender,
+        "to": "+18015554321",
+        "body": body,
+        "media": None,
+        "meta": None,
+    }
+
+
+async def test_webhooks_are_acked_stored_and_routed(tmp_path):
+    # Given: An ingest service with a classifier that records what it routes
+    routed = []
+
+    async def classify(message, tools):
+        return f"routed {message.body}"
+
+    async def on_routed(message, result):
+        routed.append(result)
+
+    service = IngestService(
+        DirectoryStore(tmp_path), [], classify=classify, on_routed=on_routed
+    )
+
+    async with TestClient(TestServer(service.create_app())) as client:
+        # When: Both sides of a thread post webhooks, plus one invalid payload
+        first = await client.post("/webhooks/sms", json=_payload("who dis?"))
+        reply = await client.post(
+            "/webhooks/sms",
+            json={**_payload("it's me", "+18015554321"), "to": "+18015551234"},
+        )
+        invalid = await client.post("/webhooks/sms", json={"body": "no sender"})
+        ack = await first.json()
+        await service.drain()
+        while len(routed) < 2:
+            await asyncio.sleep(0.01)
+
+    # Then: Valid posts are acked immediately and invalid ones rejected
+    assert (first.status, reply.status, invalid.status) == (200, 200, 400)
+    assert ack["status"] == "queued"
+
+    # And: Both messages are routed and stored in the same thread
+    assert sorted(routed) == ["routed it's me", "routed who dis?"]
+    message = TextMessage.model_validate(_payload("who dis?"))
+    thread = service.store.load(thread_name(message))
+    assert [m.body for m in thread.messages] == ["who dis?", "it's me"]
+    assert thread.messages[0].id == ack["id"]
+
+
+async def test_full_queue_answers_503(tmp_path):
+    # Given: A service whose router isn't draining and whose queue holds one message
+    service = IngestService(DirectoryStore(tmp_path), [], queue_size=1)
+    app = service.create_app()
+    app.on_startup.clear()
+
+    # When: Two webhooks arrive
+    async with TestClient(TestServer(app)) as client:
+        accepted = await client.post("/webhooks/sms", json=_payload("one"))
+        rejected = await client.post("/webhooks/sms", json=_payload("two"))
+
+    # Then: The overflow is pushed back to the sender with Retry-After
+    assert accepted.status == 200
+    assert rejected.status == 503
+    assert rejected.headers["Retry-After"] == "1"
+    assert service.rejected == 1
+
+
+async def test_failed_callbacks_are_counted_and_routing_continues(tmp_path):
+    # Given: A service whose callback fails for one message
+    routed = []
+
+    async def classify(message, tools):
+        return message.body
+
+    async def on_routed(message, result):
+        if result == "boom":
+            raise RuntimeError("callback down")
+        routed.append(result)
+
+    service = IngestService(
+        DirectoryStore(tmp_path), [], classify=classify, on_routed=on_routed
+    )
+
+    async with TestClient(TestServer(service.create_app())) as client:
+        # When: Three messages arrive, the first of which breaks the callback
+        for body in ("boom", "one", "two"):
+            await client.post("/webhooks/sms", json=_payload(body))
+        await service.drain()
+        while service.routed + service.failed < 3:
+            await asyncio.sleep(0.01)
+        health = await client.get("/health")
+        status = await health.json()
+
+    # Then: The failure is counted and the other messages are still routed
+    assert sorted(routed) == ["one", "two"]
+    assert (service.routed, service.failed) == (2, 1)
+    assert health.status == 200
+    assert status["router"] == "running"
+
+
+async def test_stopped_router_stops_acking(tmp_path):
+    # Given: A service whose router dies as it starts
+    service = IngestService(DirectoryStore(tmp_path), [])
+
+    async def broken():
+        raise RuntimeError("store down")
+        yield
+
+    service._stored_messages = broken
+
+    async with TestClient(TestServer(service.create_app())) as client:
+        await asyncio.sleep(0.01)
+
+        # When: A webhook arrives and the health check runs
+        posted = await client.post("/webhooks/sms", json=_payload("anyone there?"))
+        health = await client.get("/health")
+
+        # Then: Both report the dead router instead of acking
+        assert posted.status == 503
+        assert health.status == 503
+        assert "store down" in (await health.json())["router"]
+        assert service.received == 0
+
+
+async def test_stop_routes_acked_messages_before_stopping(tmp_path):
+    # Given: A service with a slow classifier
+    routed = []
+
+    async def classify(message, tools):
+        await asyncio.sleep(0.05)
+        return message.body
+
+    async def on_routed(message, result):
+        routed.append(result)
+
+    service = IngestService(
+        DirectoryStore(tmp_path), [], classify=classify, on_routed=on_routed
+    )
+
+    async with TestClient(TestServer(service.create_app())) as client:
+        for body in ("one", "two", "three"):
+            await client.post("/webhooks/sms", json=_payload(body))
+
+        # When: The service stops with the messages still queued or in flight
+        stopping = asyncio.create_task(service.stop())
+        await asyncio.sleep(0)
+        late = await client.post("/webhooks/sms", json=_payload("too late"))
+        await stopping
+
+    # Then: New webhooks are turned away, and every acked message was routed
+    assert late.status == 503
+    assert sorted(routed) == ["one", "three", "two"]
+    assert service.received == 3
+
+
+async def test_thread_context_does_not_reload_the_thread(tmp_path):
+    # Given: A service giving follow-ups their thread's summary, over a store that
+    # counts loads
+    loads, contexts = [], []
+
+    class CountingStore(JsonlStore):
+        def load(self, name):
+            loads.append(name)
+            return super().load(name)
+
+    async def summarize(summary, messages, max_words, model):
+        return " / ".join([summary, *(m.body for m in messages)]).strip(" /")
+
+    async def classify(message, tools, context=None):
+        contexts.append(context)
+        return message.body
+
+    service = IngestService(
+        CountingStore(tmp_path / "conversations.jsonl"),
+        [],
+        concurrency=1,
+        classify=classify,
+        summaries=ThreadSummaries(summarize=summarize),
+    )
+
+    # When: Three messages of one thread are routed
+    await service.start()
+    for body in ("one", "two", "three"):
+        await service.queue.put(TextMessage.model_validate(_payload(body)))
+    await service.stop()
+
+    # Then: Each follow-up saw the thread so far, and the thread was loaded once
+    assert contexts == [None, "one", "one / two"]
+    assert len(loads) == 1
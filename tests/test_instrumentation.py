@@ -0,0 +1,93 @@
+import json
+
+import httpx
+import openai
+import pytest
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import FunctionModel
+
+from agentic_ai_kata.utils.instrumentation import get_recorder, record, span
+from agentic_ai_kata.utils.rate_limit import RateLimitedModel, RateLimiter
+
+
+@pytest.fixture
+def recorder():
+    recorder = get_recorder()
+    recorder.clear()
+    yield recorder
+    recorder.clear()
+
+
+def _group(summary: dict, kind: str, name: str) -> dict:
+    return next(
+        g for g in summary["groups"] if g["kind"] == kind and g["name"] == name
+    )
+
+
+def test_counters_roll_up_and_summarize(recorder, tmp_path):
+    # Given: A step that runs a tool twice, one of which fails
+    with span("step", "outline") as step:
+        for i in range(2):
+            try:
+                with span("tool", "search"):
+                    record(requests=1, prompt_tokens=10)
+                    if i:
+                        raise ValueError("boom")
+            except ValueError:
+                pass
+
+    # When: We summarize and export the spans
+    summary = recorder.summary()
+    path = recorder.write_summary(tmp_path / "out" / "summary.json")
+
+    # Then: The step includes its tools' counters and both are grouped by name
+    assert step.counters == {"requests": 2, "prompt_tokens": 20}
+    tool = _group(summary, "tool", "search")
+    assert tool["count"] == 2 and tool["errors"] == 1
+    assert tool["prompt_tokens"] == 20
+    assert _group(summary, "step", "outline")["wall_time"]["max"] >= (
+        tool["wall_time"]["total"]
+    )
+    assert json.loads(path.read_text()) == summary
+
+
+def test_record_outside_a_span_is_ignored(recorder):
+    # When: Counters are recorded with no span open
+    record(requests=1)
+
+    # Then: Nothing is kept
+    assert recorder.summary() == {"spans": 0, "groups": []}
+
+
+async def test_model_requests_record_tokens_queue_time_and_retries(recorder):
+    # Given: A rate limited model that gets one 429 before answering
+    calls = []
+
+    def flaky(messages, info):
+        calls.append(1)
+        if len(calls) == 1:
+            response = httpx.Response(
+                429,
+                headers={"retry-after": "0"},
+                request=httpx.Request("POST", "https://api.openai.com/v1"),
+            )
+            raise openai.RateLimitError("Slow down", response=response, body=None)
+        return ModelResponse(parts=[TextPart("Ok")])
+
+    agent = Agent(RateLimitedModel(FunctionModel(flaky), RateLimiter()))
+
+    # When: An agent run is instrumented
+    with span("agent", "greeter"):
+        result = await agent.run("Hello")
+
+    # Then: The model request and the agent run both report the usage
+    summary = recorder.summary()
+    model = _group(summary, "model", "function:flaky")
+    usage = result.usage()
+    for group in (model, _group(summary, "agent", "greeter")):
+        assert group["requests"] == 1
+        assert group["retries"] == 1
+        assert group["prompt_tokens"] == usage.request_tokens
+        assert group["completion_tokens"] == usage.response_tokens
+        assert group["queue_time"] >= 0
@@ -0,0 +1,257 @@
+import asyncio
+
+import pytest
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from agentic_ai_kata.utils.clients import registry
+from agentic_ai_kata.utils.job_queue import (
+    JobWorker,
+    LocalRedis,
+    RedisJobQueue,
+    SqliteJobQueue,
+)
+
+
+class Clock:
+    """A clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def queue(request, tmp_path, clock):
+    if request.param == "sqlite":
+        return SqliteJobQueue(tmp_path / "jobs.sqlite3", clock=clock)
+    return RedisJobQueue(LocalRedis(), clock=clock)
+
+
+def test_leases_hide_jobs_until_they_expire(queue, clock):
+    # Given: One queued job
+    job_id = queue.enqueue("wiki_search", {"question": "Who?"})
+
+    # When: A worker leases it
+    job = queue.lease(visibility_timeout=30)
+
+    # Then: No one else sees it while the lease lasts
+    assert job.id == job_id and job.attempts == 1
+    assert queue.lease(30) is None
+    clock.now += 29
+    assert queue.lease(30) is None
+
+    # And: Once it expires another worker gets it, and the old lease is void
+    clock.now += 2
+    retaken = queue.lease(30)
+    assert retaken.id == job_id and retaken.attempts == 2
+    assert not queue.ack(job, "stale")
+    assert queue.ack(retaken, {"answer": "Paris"})
+    assert queue.result(job_id) == {"answer": "Paris"}
+    assert queue.stats() == {"ready": 0, "leased": 0, "done": 1, "dead": 0}
+
+
+def test_extended_leases_stay_hidden(queue, clock):
+    queue.enqueue("route", {})
+    job = queue.lease(10)
+
+    # When: The lease is extended before it expires
+    clock.now += 8
+    assert queue.extend(job, 10)
+
+    # Then: It outlives the original timeout
+    clock.now += 8
+    assert queue.lease(10) is None
+
+
+@pytest.mark.parametrize("settle", ["extend", "ack", "fail"])
+def test_stale_lease_loses_to_a_lease_retaken_meanwhile(clock, settle):
+    # Given: A Redis queue where another worker retakes the expired lease just
+    # after the first worker has read the job to check its lease
+    class RacingRedis(LocalRedis):
+        def hget(self, name, key):
+            value = super().hget(name, key)
+            if races:
+                races.pop()
+                clock.now += 31
+                retaken.append(RedisJobQueue(self, clock=clock).lease(30))
+            return value
+
+    races, retaken = [], []
+    queue = RedisJobQueue(RacingRedis(), clock=clock)
+    queue.enqueue("route", {})
+    job = queue.lease(30)
+
+    # When: The first worker extends, acks or fails its lease
+    races.append("retake")
+    if settle == "extend":
+        settled = queue.extend(job, 30)
+    elif settle == "ack":
+        settled = queue.ack(job, "stale")
+    else:
+        settled = queue.fail(job, "stale")
+
+    # Then: It learns the lease is lost, and only the new owner can settle it
+    assert retaken[0].id == job.id
+    assert not settled
+    assert queue.ack(retaken[0], "fresh")
+    assert queue.result(job.id) == "fresh"
+    assert queue.stats() == {"ready": 0, "leased": 0, "done": 1, "dead": 0}
+
+
+def test_racing_claims_lease_a_job_once(clock):
+    # Given: A Redis queue where another worker claims the job just after the
+    # first worker has read it
+    class RacingRedis(LocalRedis):
+        def hget(self, name, key):
+            value = super().hget(name, key)
+            if races:
+                races.pop()
+                claimed.append(RedisJobQueue(self, clock=clock).lease(30))
+            return value
+
+    races, claimed = [], []
+    queue = RedisJobQueue(RacingRedis(), clock=clock)
+    queue.enqueue("route", {})
+    races.append("claim")
+
+    # When: The first worker tries to lease it
+    job = queue.lease(30)
+
+    # Then: Only the other worker got it
+    assert claimed[0] is not None
+    assert job is None
+    assert queue.stats()["leased"] == 1
+
+
+def test_failures_retry_then_dead_letter(queue, clock):
+    # Given: A job allowed two attempts
+    job_id = queue.enqueue("article", {}, max_attempts=2)
+
+    # When: The first attempt fails with a retry delay
+    assert queue.fail(queue.lease(30), "boom", retry_delay=5)
+
+    # Then: It's retried only after the delay
+    assert queue.lease(30) is None
+    clock.now += 5
+    second = queue.lease(30)
+    assert second.attempts == 2 and second.last_error == "boom"
+
+    # And: Failing its last attempt dead-letters it
+    assert queue.fail(second, "boom again")
+    clock.now += 60
+    assert queue.lease(30) is None
+    [dead] = queue.dead_letters()
+    assert dead.id == job_id and dead.last_error == "boom again"
+
+    # And: Dead letters can be requeued with fresh attempts
+    assert queue.requeue_dead() == 1
+    assert queue.lease(30).attempts == 1
+
+
+def test_expired_last_attempt_is_dead_lettered(queue, clock):
+    # Given: A single-attempt job whose worker died holding the lease
+    queue.enqueue("route", {}, max_attempts=1)
+    queue.lease(10)
+
+    # When: The lease expires
+    clock.now += 11
+
+    # Then: It goes to the dead letters instead of running again
+    assert queue.lease(10) is None
+    assert [job.last_error for job in queue.dead_letters()] == ["lease expired"]
+
+
+async def test_worker_dispatches_by_kind_and_retries(queue):
+    # Given: A handler that fails the first time it sees each payload
+    seen = set()
+
+    async def flaky(payload):
+        if payload["n"] not in seen:
+            seen.add(payload["n"])
+            raise RuntimeError("transient")
+        return payload["n"] * 2
+
+    ids = queue.enqueue_many([("double", {"n": n}) for n in range(5)])
+    unknown = queue.enqueue("mystery", {})
+
+    # When: A worker drains the queue
+    worker = JobWorker(queue, {"double": flaky}, concurrency=3, retry_delay=0)
+    stats = await worker.arun(stop_when_idle=True)
+
+    # Then: Every job succeeded on its retry, and the unknown kind was dead-lettered
+    assert [queue.result(job_id) for job_id in ids] == [0, 2, 4, 6, 8]
+    assert stats.succeeded == 5 and stats.failed == 6
+    assert [job.id for job in queue.dead_letters()] == [unknown]
+
+
+async def test_worker_leases_at_most_max_jobs(queue):
+    # Given: More queued jobs than the worker is allowed to take
+    queue.enqueue_many([("echo", {"n": n}) for n in range(4)])
+
+    async def echo(payload):
+        await asyncio.sleep(0.01)
+        return payload["n"]
+
+    # When: A worker with four slots runs for one job
+    worker = JobWorker(queue, {"echo": echo}, concurrency=4)
+    stats = await worker.arun(max_jobs=1)
+
+    # Then: Only one job was leased and run
+    assert stats.succeeded == 1
+    assert queue.stats()["ready"] == 3
+
+
+async def test_worker_gives_up_jobs_whose_lease_was_lost(tmp_path, clock):
+    # Given: A handler that stalls past its lease, which another worker retakes
+    queue = SqliteJobQueue(tmp_path / "jobs.sqlite3", clock=clock)
+    queue.enqueue("slow", {})
+
+    async def slow(payload):
+        clock.now += 60
+        queue.lease(visibility_timeout=30)  # What a second worker would do
+        await asyncio.sleep(1)
+
+    # When: The worker's heartbeat tries to extend the lease
+    worker = JobWorker(queue, {"slow": slow}, visibility_timeout=0.3)
+    stats = await worker.arun(max_jobs=1)
+
+    # Then: The handler was cancelled and the job left to its new owner
+    assert stats.lost == 1 and stats.succeeded == 0
+    assert queue.stats()["leased"] == 1
+
+
+async def test_route_jobs_are_classified(tmp_path):
+    # Given: A local model that routes everything to the rolodex
+    def rolodex(messages, info: AgentInfo) -> ModelResponse:
+        args = {
+            "category": "identity",
+            "confidence": 0.8,
+            "handler": "search_rolodex",
+            "reasoning": "Asks who this is",
+        }
+        return ModelResponse(
+            parts=[ToolCallPart.from_raw_args(info.result_tools[0].name, args)]
+        )
+
+    queue = SqliteJobQueue(tmp_path / "jobs.sqlite3")
+    message = {"from": "+1", "to": "+2", "body": "who?", "media": None, "meta": None}
+    job_id = queue.enqueue("route", {"message": message})
+
+    # When: A worker with the default handlers processes it
+    with registry.override_model(FunctionModel(rolodex)):
+        await JobWorker(queue).arun(stop_when_idle=True)
+
+    # Then: The stored result is the chosen route
+    assert queue.result(job_id) == {
+        "category": "identity",
+        "confidence": 0.8,
+        "handler": "search_rolodex",
+    }
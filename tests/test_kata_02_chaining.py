@@ -1,6 +1,58 @@
 import pytest
-from agentic_ai_kata.kata_02_chaining import ChainingKata, ChainResult, ChainStep
-from agentic_ai_kata.settings import settings
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from agentic_ai_kata.kata_02_chaining import (
+    ChainingKata,
+    ChainResult,
+    ChainStep,
+    get_chain_agents,
+)
+from agentic_ai_kata.settings import get_settings, settings
+from agentic_ai_kata.utils.article_index import get_article_index
+from agentic_ai_kata.utils.clients import registry
+from agentic_ai_kata.utils.near_duplicates import (
+    get_draft_index,
+    get_near_duplicate_index,
+)
+
+from schema_samples import sample_from_schema
+
+
+@pytest.fixture
+def article_index(tmp_path, monkeypatch):
+    """Index written articles, in a fresh index."""
+    monkeypatch.setattr(get_settings(), "ARTICLE_INDEX", True)
+    monkeypatch.setattr(
+        get_settings(), "ARTICLE_INDEX_PATH", str(tmp_path / "articles.sqlite3")
+    )
+    get_article_index.cache_clear()
+    yield get_article_index()
+    get_article_index.cache_clear()
+
+
+@pytest.fixture
+def near_duplicate_index(tmp_path, monkeypatch):
+    """Check articles for near-duplicates, with fresh signatures."""
+    monkeypatch.setattr(get_settings(), "ARTICLE_DEDUPE", True)
+    monkeypatch.setattr(
+        get_settings(), "ARTICLE_DEDUPE_PATH", str(tmp_path / "signatures.sqlite3")
+    )
+    get_near_duplicate_index.cache_clear()
+    yield get_near_duplicate_index()
+    get_near_duplicate_index.cache_clear()
+
+
+@pytest.fixture
+def draft_index(tmp_path, monkeypatch, near_duplicate_index):
+    """Also check drafts, against fresh draft signatures."""
+    monkeypatch.setattr(get_settings(), "ARTICLE_DEDUPE_SKIP_FORMATTER", True)
+    monkeypatch.setattr(
+        get_settings(), "ARTICLE_DEDUPE_DRAFTS_PATH", str(tmp_path / "drafts.sqlite3")
+    )
+    get_draft_index.cache_clear()
+    yield get_draft_index()
+    get_draft_index.cache_clear()
 
 
 def test_chaining_kata_initialization():
@@ -9,7 +61,7 @@ def test_chaining_kata_initialization():
 
 
 @pytest.mark.vcr()
-def test_chaining_kata_run():
+def test_chaining_kata_run(article_index, near_duplicate_index):
     # Given: A configured kata instance
     kata = ChainingKata()
 
@@ -18,3 +70,49 @@ def test_chaining_kata_run():
 
     # Then: We should get a valid chain result
     assert kata.validate_result(result)
+
+    # And: The article was indexed, and its signature kept for later checks
+    assert result.duplicate_of is None
+    assert len(article_index) == 1
+    assert near_duplicate_index.query(result.final_result)[0].similarity == 1.0
+
+
+def test_chain_agents_are_built_once_without_a_model():
+    # When: The chain's agents are requested twice
+    agents = get_chain_agents()
+
+    # Then: They're shared, and each run supplies the model
+    assert get_chain_agents() is agents
+    assert agents.outline.model is None
+
+
+def test_duplicate_drafts_skip_the_formatter(tmp_path, monkeypatch, draft_index):
+    # Given: A model that writes the same draft for two differently named cities,
+    # and formats it into something else
+    monkeypatch.chdir(tmp_path)
+    titles = iter(["Glorpton the Magnificent", "Fribbleburg the Lesser"])
+    formatted = []
+
+    def respond(messages, info: AgentInfo) -> ModelResponse:
+        tool = info.result_tools[0]
+        args = sample_from_schema(tool.parameters_json_schema)
+        if "full_title_of_planetary_capital" in args:
+            args["full_title_of_planetary_capital"] = next(titles)
+        if "highlight" in args:
+            args["article"] = "# City\n\nThe formatted article reads differently."
+            formatted.append(args)
+        return ModelResponse(parts=[ToolCallPart.from_raw_args(tool.name, args)])
+
+    # When: The kata runs twice
+    with registry.override_model(FunctionModel(respond)):
+        first = ChainingKata().run()
+        second = ChainingKata().run()
+
+    # Then: The second draft matches the first article's draft, so it's neither
+    # formatted nor written
+    assert first.duplicate_of is None
+    assert second.duplicate_of == "glorpton-the-magnificent"
+    assert len(formatted) == 1
+    assert [p.name for p in (tmp_path / "articles").iterdir()] == [
+        "glorpton-the-magnificent.md"
+    ]
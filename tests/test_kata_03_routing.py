@@ -1,5 +1,14 @@
+import asyncio
+
 import pytest
-from agentic_ai_kata.kata_03_routing import RoutingKata
+from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from agentic_ai_kata.kata_03_routing import RoutingKata, RoutingReport
+from agentic_ai_kata.settings import get_settings
+from agentic_ai_kata.utils.clients import registry
+from agentic_ai_kata.utils.routing import default_ensemble
+from agentic_ai_kata.utils.text_message import get_example_conversations
 
 
 # def test_routing_kata_initialization():
@@ -20,3 +29,52 @@ def test_routing_kata_run():
 
     # Then: We should get a valid routing result
     assert kata.validate_result(result)
+
+    # And: Confident classifications weren't put to the ensemble
+    report = RoutingReport.from_results(result)
+    assert report.accuracy == 1.0
+    assert report.calls_per_message == 1.0
+
+
+def test_routing_kata_routes_follow_ups_with_thread_context(monkeypatch):
+    # Given: Thread context enabled and a model that knows the opening handlers, and
+    # is unsure about follow-ups
+    monkeypatch.setattr(get_settings(), "ROUTING_THREAD_CONTEXT", True)
+    conversations = asyncio.run(get_example_conversations())
+    openers = [c.messages[0] for c in conversations]
+    handlers = {m.body: m.expected_handler for m in openers}
+    prompts = []
+
+    def respond(messages, info: AgentInfo) -> ModelResponse:
+        prompt = messages[-1].parts[-1].content
+        if not info.result_tools:
+            return ModelResponse(parts=[TextPart("The thread so far.")])
+        prompts.append(prompt)
+        handler = next((h for b, h in handlers.items() if b in prompt), "conversation")
+        args = {
+            "category": handler,
+            "confidence": 0.3 if "The thread so far." in prompt else 0.95,
+            "handler": handler,
+            "reasoning": f"Looks like {handler}",
+        }
+        return ModelResponse(
+            parts=[ToolCallPart.from_raw_args(info.result_tools[0].name, args)]
+        )
+
+    # When: We run the kata
+    kata = RoutingKata()
+    with registry.override_model(FunctionModel(respond)):
+        result = kata.run()
+
+    # Then: Every message is routed, and the labeled openers correctly
+    assert kata.validate_result(result)
+    report = RoutingReport.from_results(result)
+    assert report.messages == sum(len(c.messages) for c in conversations)
+    assert report.labeled == len(conversations) and report.accuracy == 1.0
+
+    # And: Only the follow-ups were classified with the thread summary, and being
+    # unsure, each was also put to the ensemble with it
+    follow_ups = report.messages - len(conversations)
+    calls = 1 + len(default_ensemble())
+    assert len([p for p in prompts if "The thread so far." in p]) == follow_ups * calls
+    assert report.calls == len(conversations) + follow_ups * calls
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from agentic_ai_kata.base import KataBase
+from agentic_ai_kata.kata_00_setup import Koan, SetupKata
+from agentic_ai_kata.utils.clients import registry
+from agentic_ai_kata.utils.kata_runner import KataRunner
+
+
+class SleepyKata(KataBase):
+    """Records which loop it ran on and how many ran at once."""
+
+    running = 0
+    peak = 0
+    loops = set()
+
+    async def arun(self):
+        cls = SleepyKata
+        cls.loops.add(asyncio.get_running_loop())
+        cls.running += 1
+        cls.peak = max(cls.peak, cls.running)
+        await asyncio.sleep(0.01)
+        cls.running -= 1
+        return "done"
+
+    def run(self):
+        return asyncio.run(self.arun())
+
+    def validate_result(self, result) -> bool:
+        return result == "done"
+
+
+class SyncKata(KataBase):
+    """A kata with only a sync implementation."""
+
+    def run(self):
+        if threading.current_thread() is threading.main_thread():
+            raise RuntimeError("blocked the event loop")
+        return "sync"
+
+    def validate_result(self, result) -> bool:
+        return False
+
+
+def test_runner_runs_katas_concurrently_on_one_loop():
+    # Given: A runner allowing three katas at once
+    with KataRunner(concurrency=3) as runner:
+        # When: We run two batches of repeated katas
+        first = runner.run([SleepyKata(), SleepyKata()], repeat=3)
+        second = runner.run([SleepyKata()], repeat=2)
+
+    # Then: Runs overlapped up to the limit, all on the runner's single loop
+    assert SleepyKata.peak == 3
+    assert len(SleepyKata.loops) == 1
+    assert len(first.runs) == 6 and first.failures == 0
+    assert first.throughput > 0 and len(second.runs) == 2
+
+
+def test_sync_katas_run_in_a_thread_and_failures_are_reported():
+    # Given: A sync-only kata whose result never validates
+    with KataRunner() as runner:
+        # When: It is run with validation
+        report = runner.run([SyncKata()], validate=True)
+
+    # Then: It ran off the loop, and the failed validation was reported
+    assert report.runs[0].error == "AssertionError: validate_result returned False"
+    assert "1 failed" in report.summary()
+
+
+def test_setup_kata_runs_on_the_runner_loop():
+    # Given: A local model that always answers with a koan
+    def koan(messages, info: AgentInfo) -> ModelResponse:
+        args = {"koan": "A loop that never closes", "master": "Monk Uvicorn"}
+        return ModelResponse(
+            parts=[ToolCallPart.from_raw_args(info.result_tools[0].name, args)]
+        )
+
+    # When: The setup kata is run with the runner
+    with registry.override_model(FunctionModel(koan)), KataRunner() as runner:
+        report = runner.run([SetupKata()], validate=True)
+
+    # Then: It answered through `arun()`
+    assert report.failures == 0
+    assert isinstance(report.runs[0].result.data, Koan)
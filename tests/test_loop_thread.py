@@ -0,0 +1,63 @@
+import asyncio
+import concurrent.futures
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from agentic_ai_kata.utils.loop_thread import LoopThread
+
+
+@pytest.fixture
+def loop_thread():
+    loop_thread = LoopThread()
+    yield loop_thread
+    loop_thread.stop()
+
+
+def test_calls_from_many_threads_share_one_loop(loop_thread):
+    # Given: A coroutine that reports the loop it runs on
+    async def which_loop(i):
+        await asyncio.sleep(0.01)
+        return i, asyncio.get_running_loop()
+
+    # When: 32 threads call it synchronously at once
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        results = list(pool.map(lambda i: loop_thread.run(which_loop(i)), range(32)))
+
+    # Then: Each got its own result, all computed on the one background loop
+    assert [i for i, _ in results] == list(range(32))
+    assert {loop for _, loop in results} == {loop_thread.start()}
+
+
+def test_errors_and_timeouts_reach_the_caller(loop_thread):
+    async def fail():
+        raise ValueError("boom")
+
+    cancelled = threading.Event()
+
+    async def hang():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    # Then: Exceptions are re-raised in the calling thread
+    with pytest.raises(ValueError, match="boom"):
+        loop_thread.run(fail())
+
+    # And: A timed out coroutine is cancelled on the loop
+    with pytest.raises(concurrent.futures.TimeoutError):
+        loop_thread.run(hang(), timeout=0.05)
+    assert cancelled.wait(1)
+
+
+def test_calling_from_the_loop_itself_is_refused(loop_thread):
+    # Given: A coroutine that calls back into the facade from the loop
+    async def reenter():
+        return loop_thread.run(asyncio.sleep(0))
+
+    # Then: It fails instead of deadlocking
+    with pytest.raises(RuntimeError, match="its own loop"):
+        loop_thread.run(reenter())
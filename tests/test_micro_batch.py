@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from agentic_ai_kata.utils.micro_batch import MicroBatcher
+
+
+def _recording(batches: list, fail_on=None):
+    async def process(items):
+        batches.append(list(items))
+        await asyncio.sleep(0)
+        if fail_on in items:
+            raise RuntimeError("batch failed")
+        return [item * 10 for item in items]
+
+    return process
+
+
+def test_full_batches_are_sent_without_waiting():
+    # Given: A batcher of four items that would otherwise wait a minute
+    batches = []
+    batcher = MicroBatcher(_recording(batches), max_batch_size=4, max_latency=60)
+
+    # When: Eight items are submitted at once
+    async def submit_all():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(8)))
+
+    results = asyncio.run(asyncio.wait_for(submit_all(), timeout=5))
+
+    # Then: They go in two full batches, and each caller gets its own result
+    assert batches == [[0, 1, 2, 3], [4, 5, 6, 7]]
+    assert results == [i * 10 for i in range(8)]
+    assert batcher.stats.full_batches == 2
+
+
+def test_partial_batches_are_sent_after_the_latency():
+    # Given: A batcher with room for more items than are submitted
+    batches = []
+    batcher = MicroBatcher(_recording(batches), max_batch_size=16, max_latency=0.01)
+
+    # When: Items arrive in two bursts further apart than the latency
+    async def submit_bursts():
+        first = asyncio.gather(*(batcher.submit(i) for i in range(3)))
+        await asyncio.sleep(0.05)
+        second = await asyncio.gather(*(batcher.submit(i) for i in range(3, 5)))
+        return await first, second
+
+    first, second = asyncio.run(submit_bursts())
+
+    # Then: Each burst is one batch
+    assert batches == [[0, 1, 2], [3, 4]]
+    assert (first, second) == ([0, 10, 20], [30, 40])
+    assert batcher.stats.mean_batch_size == 2.5
+
+
+def test_a_failed_batch_fails_each_of_its_callers():
+    # Given: A process that fails on batches containing item 5
+    batches = []
+    batcher = MicroBatcher(_recording(batches, 5), max_batch_size=4, max_latency=60)
+
+    # When: Two batches are submitted, the second of which fails
+    async def submit_all():
+        return await asyncio.gather(
+            *(batcher.submit(i) for i in range(8)), return_exceptions=True
+        )
+
+    results = asyncio.run(submit_all())
+
+    # Then: Only the second batch's callers see the error
+    assert results[:4] == [0, 10, 20, 30]
+    for result in results[4:]:
+        assert isinstance(result, RuntimeError)
+
+    # And: A process returning the wrong number of results fails its batch
+    async def short(items):
+        return items[:-1]
+
+    async def submit_pair():
+        batcher = MicroBatcher(short, max_batch_size=2, max_latency=60)
+        await asyncio.gather(batcher.submit(1), batcher.submit(2))
+
+    with pytest.raises(ValueError, match="got 1 results"):
+        asyncio.run(submit_pair())
+
+
+def test_a_cancelled_batch_cancels_each_of_its_callers():
+    # Given: A batch whose processing never finishes
+    async def hang(items):
+        await asyncio.Event().wait()
+
+    async def cancel_the_batch():
+        batcher = MicroBatcher(hang, max_batch_size=2, max_latency=60)
+        callers = [asyncio.create_task(batcher.submit(i)) for i in range(2)]
+        await asyncio.sleep(0)
+
+        # When: The batch's task is cancelled (e.g. as the event loop shuts down)
+        for task in batcher._tasks:
+            task.cancel()
+        return await asyncio.gather(*callers, return_exceptions=True)
+
+    results = asyncio.run(asyncio.wait_for(cancel_the_batch(), timeout=5))
+
+    # Then: Its callers are cancelled instead of waiting forever
+    assert all(isinstance(r, asyncio.CancelledError) for r in results)
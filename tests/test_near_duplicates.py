@@ -0,0 +1,88 @@
+import os
+import random
+
+import pytest
+
+from agentic_ai_kata.utils.near_duplicates import (
+    NearDuplicateIndex,
+    minhash,
+    shingles,
+    similarity,
+)
+
+WORDS = [
+    "glorp", "fribble", "nexus", "quantum", "wobble", "plains", "citadel", "gleebor",
+    "squanch", "nebula", "prankster", "bubbling", "crystal", "river", "garden",
+    "portal", "council", "mayor", "festival", "zorp", "meteor", "bazaar", "spire",
+]  # fmt: skip
+
+
+def make_article(seed: int, words: int = 400) -> str:
+    rng = random.Random(seed)
+    return "# City\n\n" + " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def edit(article: str, changes: int, seed: int = 0) -> str:
+    """The article with `changes` words replaced."""
+    rng = random.Random(seed)
+    words = article.split(" ")
+    for i in rng.sample(range(2, len(words)), changes):
+        words[i] = "EDITED"
+    return " ".join(words)
+
+
+@pytest.fixture
+def index(tmp_path):
+    return NearDuplicateIndex(tmp_path / "signatures.sqlite3", threshold=0.8)
+
+
+def test_signatures_estimate_shingle_similarity():
+    # Given: An article and a lightly edited copy
+    a, b = make_article(1), edit(make_article(1), 5)
+
+    # When: Their similarity is estimated from their signatures
+    estimate = similarity(minhash(a), minhash(b))
+
+    # Then: It's close to the Jaccard similarity of their shingles
+    sa, sb = shingles(a), shingles(b)
+    assert estimate == pytest.approx(len(sa & sb) / len(sa | sb), abs=0.1)
+
+
+def test_near_duplicates_are_found_and_distinct_articles_are_not(index):
+    # Given: An index of distinct articles
+    for seed in range(20):
+        index.add(f"city-{seed}", make_article(seed))
+
+    # When: A lightly edited copy of one, and a new article, are checked
+    duplicates = index.query(edit(make_article(7), 3))
+    distinct = index.query(make_article(100))
+
+    # Then: Only the copy matches, and only its original
+    assert [match.slug for match in duplicates] == ["city-7"]
+    assert duplicates[0].similarity >= 0.8
+    assert distinct == []
+
+    # And: An article's own earlier version can be excluded
+    assert index.query(make_article(7), exclude="city-7") == []
+
+
+def test_sync_reads_only_changed_files_and_lists_pairs(index, tmp_path):
+    # Given: A directory with two near-duplicate articles and a distinct one
+    directory = tmp_path / "articles"
+    directory.mkdir()
+    (directory / "a.md").write_text(make_article(1))
+    (directory / "b.md").write_text(edit(make_article(1), 2))
+    (directory / "c.md").write_text(make_article(2))
+    assert index.sync(directory)["added"] == 3
+    assert [pair[:2] for pair in index.pairs()] == [("a", "b")]
+
+    # When: One file changes and one is deleted
+    (directory / "b.md").write_text(make_article(3))
+    os.utime(directory / "b.md", (0, 0))
+    (directory / "c.md").unlink()
+
+    # Then: Only those are re-indexed, and the pair is gone
+    counts = index.sync(directory)
+    assert counts == {"added": 0, "updated": 1, "removed": 1, "unchanged": 1}
+    assert len(index) == 2
+    assert index.pairs() == []
@@ -0,0 +1,189 @@
+import asyncio
+import time
+
+import httpx
+import openai
+import pytest
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import FunctionModel
+from pydantic_ai.models.openai import OpenAIModel
+
+from agentic_ai_kata.utils import rate_limit
+from agentic_ai_kata.utils.clients import ClientConfig, ClientRegistry, get_model
+from agentic_ai_kata.utils.rate_limit import (
+    Priority,
+    RateLimitedModel,
+    RateLimiter,
+)
+
+CHAT_COMPLETION = {
+    "id": "chatcmpl-1",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-4o",
+    "choices": [
+        {
+            "index": 0,
+            "message": {"role": "assistant", "content": "Ok"},
+            "finish_reason": "stop",
+        }
+    ],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+}
+
+
+def test_token_budget_makes_callers_wait():
+    # Given: A limiter with 10 tokens/sec and an exhausted bucket
+    limiter = RateLimiter(tokens_per_minute=600)
+
+    async def two_requests():
+        first = await limiter.acquire(600)
+        second = await limiter.acquire(3)
+        return first, second
+
+    # When: A second request arrives
+    first, second = asyncio.run(two_requests())
+
+    # Then: Only the second one waits, for about the refill time
+    assert first < 0.05
+    assert 0.2 < second < 1.0
+    assert limiter.metrics.lanes[Priority.INTERACTIVE].throttled == 1
+
+
+def test_interactive_requests_jump_the_batch_queue():
+    # Given: A limiter with an exhausted request budget
+    limiter = RateLimiter(requests_per_minute=600)
+    limiter.requests.consume(600)
+    order = []
+
+    async def request(name, lane):
+        await limiter.acquire(1, lane)
+        order.append(name)
+
+    async def scenario():
+        batch = asyncio.create_task(request("batch", Priority.BATCH))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(request("interactive", Priority.INTERACTIVE))
+        await asyncio.gather(batch, interactive)
+
+    # When: A batch request queues before an interactive one
+    asyncio.run(scenario())
+
+    # Then: The interactive request is served first
+    assert order == ["interactive", "batch"]
+
+
+def test_rate_limited_responses_pause_and_retry():
+    # Given: A model that returns a 429 with Retry-After once
+    calls = []
+
+    def flaky(messages, info):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            response = httpx.Response(
+                429,
+                headers={"retry-after": "0.2"},
+                request=httpx.Request("POST", "https://api.openai.com/v1"),
+            )
+            raise openai.RateLimitError("Slow down", response=response, body=None)
+        return ModelResponse(parts=[TextPart("Ok")])
+
+    limiter = RateLimiter()
+    agent = Agent(RateLimitedModel(FunctionModel(flaky), limiter))
+
+    # When: We run the agent
+    result = asyncio.run(agent.run("Hello"))
+
+    # Then: The request is retried after the provider's Retry-After
+    assert result.data == "Ok"
+    assert len(calls) == 2
+    assert calls[1] - calls[0] >= 0.2
+    assert limiter.metrics.rate_limited_responses == 1
+
+
+def test_every_model_is_rate_limited():
+    # Then: Models from the registry share the default model's limiter
+    assert isinstance(get_model(), RateLimitedModel)
+    assert get_model().limiter is get_model().limiter
+
+
+def test_provider_429s_reach_the_limiter_without_sdk_retries():
+    # Given: The shared OpenAI client, pointed at a provider that always says 429
+    hits = []
+
+    def too_many(request: httpx.Request) -> httpx.Response:
+        hits.append(request.url.path)
+        return httpx.Response(429, headers={"retry-after": "0"}, json={})
+
+    client = ClientRegistry().openai_client(ClientConfig(api_key="DUMMY"))
+    client = client.with_options(
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(too_many))
+    )
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=100_000)
+    model = RateLimitedModel(
+        OpenAIModel("gpt-4o", openai_client=client), limiter, max_retries=1
+    )
+
+    # When: An agent makes a request
+    with pytest.raises(openai.RateLimitError):
+        asyncio.run(Agent(model).run("Hello"))
+
+    # Then: Every 429 was handled by the limiter, not retried by the SDK
+    assert len(hits) == 2
+    assert limiter.metrics.rate_limited_responses == 2
+
+    # And: The refused attempts were refunded to the budget
+    assert limiter.requests.level == pytest.approx(60, abs=0.1)
+    assert limiter.tokens.level == pytest.approx(100_000, abs=10)
+
+
+def test_transient_errors_are_retried_with_backoff(monkeypatch):
+    # Given: The shared OpenAI client, pointed at a provider that fails with a 503,
+    # then drops the connection, then answers
+    monkeypatch.setattr(rate_limit, "TRANSIENT_RETRY_DELAY", 0.01)
+    hits = []
+
+    def flaky(request: httpx.Request) -> httpx.Response:
+        hits.append(request.url.path)
+        if len(hits) == 1:
+            return httpx.Response(503, json={})
+        if len(hits) == 2:
+            raise httpx.ConnectError("Connection reset", request=request)
+        return httpx.Response(200, json=CHAT_COMPLETION)
+
+    client = ClientRegistry().openai_client(ClientConfig(api_key="DUMMY"))
+    client = client.with_options(
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(flaky))
+    )
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=100_000)
+    model = RateLimitedModel(OpenAIModel("gpt-4o", openai_client=client), limiter)
+
+    # When: An agent makes a request
+    result = asyncio.run(Agent(model).run("Hello"))
+
+    # Then: The limiter retried both failures, without pausing every caller
+    assert result.data == "Ok"
+    assert len(hits) == 3
+    assert limiter.metrics.transient_errors == 2
+    assert limiter.metrics.rate_limited_responses == 0
+
+
+def test_client_errors_are_not_retried():
+    # Given: A model whose request is rejected as invalid
+    calls = []
+
+    def invalid(messages, info):
+        calls.append(messages)
+        response = httpx.Response(
+            400, request=httpx.Request("POST", "https://api.openai.com/v1")
+        )
+        raise openai.BadRequestError("Invalid", response=response, body=None)
+
+    limiter = RateLimiter()
+    agent = Agent(RateLimitedModel(FunctionModel(invalid), limiter))
+
+    # When / Then: The error is raised after one attempt
+    with pytest.raises(openai.BadRequestError):
+        asyncio.run(agent.run("Hello"))
+    assert len(calls) == 1
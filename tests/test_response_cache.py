@@ -0,0 +1,80 @@
+import asyncio
+
+from pydantic import BaseModel
+from pydantic_ai import Agent
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+
+from agentic_ai_kata.utils.response_cache import CachedModel, ResponseCache
+
+
+class Capital(BaseModel):
+    city: str
+
+
+class Population(BaseModel):
+    people: int
+
+
+def counting_model(calls: list) -> FunctionModel:
+    """A model that records each call and returns the result tool's first field."""
+
+    def respond(messages, info: AgentInfo) -> ModelResponse:
+        calls.append(messages)
+        tool = info.result_tools[0]
+        field = next(iter(tool.parameters_json_schema["properties"]))
+        value = 1 if field == "people" else "Paris"
+        return ModelResponse(parts=[ToolCallPart.from_raw_args(tool.name, {field: value})])
+
+    return FunctionModel(respond)
+
+
+def test_identical_requests_are_served_from_cache(tmp_path):
+    # Given: An agent whose model is wrapped in a cache
+    calls = []
+    model = CachedModel(counting_model(calls), ResponseCache(tmp_path / "cache.db"))
+    agent = Agent(model, result_type=Capital, system_prompt="Answer briefly.")
+
+    # When: The same run is repeated
+    first = asyncio.run(agent.run("Capital of France?"))
+    second = asyncio.run(agent.run("Capital of France?"))
+
+    # Then: The model is called once and the result is identical
+    assert len(calls) == 1
+    assert first.data == second.data == Capital(city="Paris")
+    assert second.usage().details == {"cache_hits": 1}
+
+
+def test_prompt_and_schema_are_part_of_the_key(tmp_path):
+    # Given: A shared cache and two agents with different result schemas
+    calls = []
+    model = CachedModel(counting_model(calls), ResponseCache(tmp_path / "cache.db"))
+    capital_agent = Agent(model, result_type=Capital)
+    population_agent = Agent(model, result_type=Population)
+
+    # When: We vary the prompt and the schema
+    asyncio.run(capital_agent.run("Capital of France?"))
+    asyncio.run(capital_agent.run("Capital of Germany?"))
+    asyncio.run(population_agent.run("Capital of France?"))
+
+    # Then: Every request misses the cache
+    assert len(calls) == 3
+
+
+def test_ttl_and_size_limits(tmp_path):
+    # Given: A cache that keeps at most two entries
+    calls = []
+    cache = ResponseCache(tmp_path / "cache.db", max_entries=2)
+    agent = Agent(CachedModel(counting_model(calls), cache), result_type=Capital)
+
+    # When: Three different requests are made
+    for question in ["One?", "Two?", "Three?"]:
+        asyncio.run(agent.run(question))
+
+    # Then: The least recently used entry was evicted
+    assert len(cache) == 2
+
+    # And: An expired entry is a miss
+    cache.ttl = 0
+    asyncio.run(agent.run("Three?"))
+    assert len(calls) == 4
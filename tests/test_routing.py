@@ -0,0 +1,261 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from agentic_ai_kata.kata_03_routing import mock_tools
+from agentic_ai_kata.utils.clients import registry
+from agentic_ai_kata.utils.routing import (
+    BatchClassifier,
+    EnsembleMember,
+    TextMessageClassification,
+    classify_with_ensemble,
+    route_messages,
+    vote,
+)
+from agentic_ai_kata.utils.text_message import TextMessage
+
+
+def _messages(count: int):
+    for i in range(count):
+        yield TextMessage(
+            from_="+1", to="+2", body=f"message {i}", media=None, meta=None
+        )
+
+
+def test_route_messages_bounds_requests_in_flight():
+    # Given: A classifier that records how many calls run at once
+    stats = SimpleNamespace(running=0, peak=0)
+
+    async def classify(message, tools):
+        stats.running += 1
+        stats.peak = max(stats.peak, stats.running)
+        await asyncio.sleep(0.001)
+        stats.running -= 1
+        return f"routed {message.body}"
+
+    async def route_all():
+        return [r async for r in route_messages(_messages(50), [], 4, classify)]
+
+    # When: We route fifty messages with a concurrency of four
+    results = asyncio.run(route_all())
+
+    # Then: Every message is routed, never more than four at a time
+    assert stats.peak == 4
+    assert sorted(r for _, r in results) == sorted(
+        f"routed message {i}" for i in range(50)
+    )
+
+
+def test_route_messages_surfaces_classifier_errors():
+    # Given: A classifier that fails on one message
+    async def classify(message, tools):
+        if message.body == "message 3":
+            raise RuntimeError("classifier down")
+        return "ok"
+
+    async def route_all():
+        return [r async for r in route_messages(_messages(10), [], 2, classify)]
+
+    # Then: The error reaches the consumer instead of hanging the pipeline
+    with pytest.raises(RuntimeError, match="classifier down"):
+        asyncio.run(route_all())
+
+
+def _classifier(calls: list, answers: dict):
+    """A model answering by the ensemble instructions in its system prompt.
+
+    `answers` maps an instructions prefix ("" for the plain classifier) to a
+    handler and confidence, or to an exception to raise.
+    """
+
+    def respond(messages, info: AgentInfo) -> ModelResponse:
+        prompt = "".join(
+            part.content
+            for part in messages[0].parts
+            if part.part_kind == "system-prompt"
+        )
+        key = next((k for k in answers if k and k in prompt), "")
+        calls.append(key)
+        answer = answers[key]
+        if isinstance(answer, Exception):
+            raise answer
+        handler, confidence = answer
+        args = {
+            "category": handler,
+            "confidence": confidence,
+            "handler": handler,
+            "reasoning": f"Looks like {handler}",
+        }
+        return ModelResponse(
+            parts=[ToolCallPart.from_raw_args(info.result_tools[0].name, args)]
+        )
+
+    return FunctionModel(respond)
+
+
+MESSAGE = TextMessage(
+    from_="+1", to="+2", body="new phone who dis", media=None, meta=None
+)
+MEMBERS = [EnsembleMember(f"Member {name}.") for name in "ABC"]
+
+
+def test_confident_classifications_skip_the_ensemble():
+    # Given: A classifier that is sure
+    calls = []
+    model = _classifier(calls, {"": ("search_rolodex", 0.95)})
+
+    # When: A message is classified with the ensemble gate
+    with registry.override_model(model):
+        ensemble = classify_with_ensemble(MESSAGE, mock_tools, 0.7, MEMBERS)
+        decision = asyncio.run(ensemble)
+
+    # Then: Its one classification is used as is
+    assert decision.classification.handler == "search_rolodex"
+    assert decision.calls == 1 and calls == [""]
+
+
+def test_unsure_classifications_are_put_to_a_vote():
+    # Given: An unsure first classification and members that mostly disagree
+    calls = []
+    model = _classifier(
+        calls,
+        {
+            "": ("conversation", 0.5),
+            "Member A.": ("search_rolodex", 0.9),
+            "Member B.": ("search_rolodex", 0.8),
+            "Member C.": RuntimeError("member down"),
+        },
+    )
+
+    # When: The message is classified with the ensemble gate
+    with registry.override_model(model):
+        ensemble = classify_with_ensemble(MESSAGE, mock_tools, 0.7, MEMBERS)
+        decision = asyncio.run(ensemble)
+
+    # Then: The majority wins, the failed member doesn't vote
+    assert decision.classification.handler == "search_rolodex"
+    assert decision.classification.confidence == pytest.approx(1.7 / 2.2)
+    assert decision.calls == 3
+    assert sorted(calls) == ["", "Member A.", "Member B.", "Member C."]
+
+
+def test_tied_votes_go_to_the_more_confident_handler():
+    # Given: Two handlers with two votes each
+    votes = [
+        TextMessageClassification(category=h, confidence=c, handler=h, reasoning="")
+        for h, c in [("a", 0.9), ("b", 0.6), ("b", 0.6), ("a", 0.4)]
+    ]
+
+    # Then: The handler with more summed confidence wins
+    winner = vote(votes)
+    assert winner.handler == "a"
+    assert winner.reasoning.startswith("2 of 4 votes.")
+
+
+def _batch_classifier(requests: list, skip: str = ""):
+    """A model classifying each numbered message, leaving out bodies with `skip`."""
+
+    def respond(messages, info: AgentInfo) -> ModelResponse:
+        prompt = messages[-1].parts[-1].content
+        requests.append(prompt)
+        if info.result_tools[0].parameters_json_schema.get("required") != [
+            "classifications"
+        ]:
+            # A message classified on its own
+            args = {
+                "category": "alone",
+                "confidence": 0.9,
+                "handler": "conversation",
+                "reasoning": prompt,
+            }
+            return ModelResponse(
+                parts=[ToolCallPart.from_raw_args(info.result_tools[0].name, args)]
+            )
+        classifications = []
+        for entry in prompt.split("\n\n"):
+            number, body = entry.split("\n", 1)
+            if skip and skip in body:
+                continue
+            classifications.append(
+                {
+                    "index": int(number.removeprefix("Message ").rstrip(":")),
+                    "category": "batch",
+                    "confidence": 0.9,
+                    "handler": "search_rolodex",
+                    "reasoning": body,
+                }
+            )
+        # Answer out of order; the classifier matches them up by number
+        args = {"classifications": classifications[::-1]}
+        return ModelResponse(
+            parts=[ToolCallPart.from_raw_args(info.result_tools[0].name, args)]
+        )
+
+    return FunctionModel(respond)
+
+
+def test_batch_classifier_packs_concurrent_messages_into_one_request():
+    # Given: A batch classifier with room for all the messages
+    requests = []
+    classifier = BatchClassifier(
+        mock_tools, max_batch_size=8, max_latency=60, model=_batch_classifier(requests)
+    )
+
+    # When: Eight messages are classified concurrently
+    async def classify_all():
+        return await asyncio.gather(
+            *(classifier.classify(message) for message in _messages(8))
+        )
+
+    results = asyncio.run(classify_all())
+
+    # Then: They take one request, and each caller gets its own classification
+    assert len(requests) == 1
+    assert [r.reasoning for r in results] == [f"message {i}" for i in range(8)]
+    assert {r.category for r in results} == {"batch"}
+    assert classifier.fallbacks == 0
+
+
+def test_batch_classifier_classifies_left_out_messages_alone():
+    # Given: A model that leaves one message out of the batch's response
+    requests = []
+    model = _batch_classifier(requests, skip="message 2")
+    classifier = BatchClassifier(
+        mock_tools, max_batch_size=4, max_latency=60, model=model
+    )
+
+    # When: A full batch is classified
+    async def classify_all():
+        return await asyncio.gather(
+            *(classifier.classify(message) for message in _messages(4))
+        )
+
+    results = asyncio.run(classify_all())
+
+    # Then: The left out message is classified in a request of its own
+    assert [r.category for r in results] == ["batch", "batch", "alone", "batch"]
+    assert requests[1] == "message 2"
+    assert classifier.fallbacks == 1
+
+
+def test_route_messages_can_batch_classifications():
+    # Given: A batch classifier with room for every message in flight
+    requests = []
+    classifier = BatchClassifier(
+        mock_tools, max_batch_size=8, max_latency=60, model=_batch_classifier(requests)
+    )
+
+    async def route_all():
+        routed = route_messages(_messages(8), mock_tools, 8, batch=classifier)
+        return [r async for r in routed]
+
+    # When: Eight messages are routed with it
+    results = asyncio.run(asyncio.wait_for(route_all(), timeout=5))
+
+    # Then: They share one request, and each gets its own classification
+    assert len(requests) == 1
+    assert sorted(c.reasoning for _, c in results) == [f"message {i}" for i in range(8)]
+    assert all(m.body == c.reasoning for m, c in results)
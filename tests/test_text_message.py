@@ -0,0 +1,121 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from agentic_ai_kata.utils import conversation_store, text_message
+from agentic_ai_kata.utils.conversation_store import DirectoryStore
+from agentic_ai_kata.utils.text_message import (
+    Conversation,
+    TextMessage,
+    get_example_conversations,
+    load_examples,
+)
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    store = DirectoryStore(tmp_path)
+    monkeypatch.setattr(conversation_store, "get_conversation_store", lambda: store)
+    return tmp_path
+
+
+@pytest.fixture
+def fake_generator(monkeypatch):
+    """Replace the LLM call with one that records how many run at once."""
+    stats = SimpleNamespace(running=0, peak=0, calls=[])
+
+    async def fabriate_conversation(theme: str, topic: str):
+        stats.calls.append(topic)
+        stats.running += 1
+        stats.peak = max(stats.peak, stats.running)
+        await asyncio.sleep(0.01)
+        stats.running -= 1
+        return SimpleNamespace(data=Conversation(who=[], topic=topic))
+
+    monkeypatch.setattr(text_message, "fabriate_conversation", fabriate_conversation)
+    return stats
+
+
+def test_missing_conversations_are_generated_concurrently_with_a_bound(
+    cache_dir, fake_generator
+):
+    # Given: Ten examples and nothing cached
+    examples = {f"example_{i}": f"Theme {i}" for i in range(10)}
+
+    # When: We get the conversations with at most three generations at a time
+    conversations = asyncio.run(get_example_conversations(examples, concurrency=3))
+
+    # Then: They are generated concurrently, bounded, and returned in order
+    assert fake_generator.peak == 3
+    assert [c.topic for c in conversations] == list(examples)
+
+    # And: Each was written to the cache without leaving temporary files behind
+    assert sorted(p.name for p in cache_dir.iterdir()) == sorted(
+        f"{name}.json" for name in examples
+    )
+
+
+def test_cached_conversations_are_not_regenerated(cache_dir, fake_generator):
+    # Given: One of two examples is already cached
+    text_message.save_conversation_to_cache(
+        "cached", Conversation(who=[], topic="from-cache")
+    )
+
+    # When: We get the conversations
+    conversations = asyncio.run(
+        get_example_conversations({"cached": "a", "fresh": "b"})
+    )
+
+    # Then: Only the missing one is generated
+    assert fake_generator.calls == ["fresh"]
+    assert [c.topic for c in conversations] == ["from-cache", "fresh"]
+
+
+def test_examples_load_from_a_config_file(tmp_path):
+    # Given: A JSON file of example themes
+    path = tmp_path / "examples.json"
+    path.write_text(json.dumps({"robots": "Two robots discuss the weather"}))
+
+    # When / Then: The examples come from the file
+    assert load_examples(path) == {"robots": "Two robots discuss the weather"}
+
+    # And: A file that isn't a name -> theme mapping is rejected
+    path.write_text(json.dumps(["robots"]))
+    with pytest.raises(ValueError):
+        load_examples(path)
+
+
+def _message(created_at: int, body: str) -> TextMessage:
+    return TextMessage(
+        from_="+1", to="+2", body=body, media=None, meta=None, createdAt=created_at
+    )
+
+
+def test_conversation_keeps_messages_sorted_on_insert():
+    # Given: A conversation loaded with out-of-order messages
+    conversation = Conversation(
+        who=[], messages=[_message(30, "c"), _message(10, "a"), _message(20, "b")]
+    )
+
+    # When: Messages arrive late, including one tied with an existing timestamp
+    conversation.insert_message(_message(20, "b2"))
+    conversation.insert_message(_message(5, "first"))
+
+    # Then: They are stored in createdAt order, ties in arrival order
+    assert [m.body for m in conversation.messages] == ["first", "a", "b", "b2", "c"]
+    assert conversation.get_messages() == conversation.messages
+
+
+def test_conversation_windowed_accessors():
+    # Given: A conversation with five messages
+    conversation = Conversation(
+        who=[], messages=[_message(t, str(t)) for t in (10, 20, 20, 30, 40)]
+    )
+
+    # Then: We can read the latest messages or those since a time, oldest first
+    assert [m.body for m in conversation.last_messages(2)] == ["30", "40"]
+    assert conversation.last_messages(0) == []
+    assert [m.body for m in conversation.messages_since(20)] == ["20", "20", "30", "40"]
+    assert conversation.messages_since(41) == []
@@ -0,0 +1,105 @@
+from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from agentic_ai_kata.utils.thread_summary import ThreadSummaries, classify_in_thread
+from agentic_ai_kata.utils.text_message import Conversation, TextMessage
+
+
+def _thread(*bodies: str) -> Conversation:
+    return Conversation(
+        who=[],
+        messages=[
+            TextMessage(
+                from_="+1", to="+2", body=body, media=None, meta=None, createdAt=i
+            )
+            for i, body in enumerate(bodies)
+        ],
+    )
+
+
+def _recording_summarizer(calls: list):
+    async def summarize(summary, messages, max_words, model):
+        calls.append((summary, [m.body for m in messages]))
+        return " | ".join(filter(None, [summary] + [m.body for m in messages]))
+
+    return summarize
+
+
+async def test_first_message_has_no_context():
+    # Given: A thread summary cache
+    calls = []
+    summaries = ThreadSummaries(summarize=_recording_summarizer(calls))
+    thread = _thread("Could you look up space scurvy?")
+
+    # Then: The opening message gets no context and nothing is summarized
+    assert await summaries.context_for(thread, thread.messages[0]) is None
+    assert calls == []
+
+
+async def test_summary_is_updated_incrementally():
+    # Given: A thread that grows one message at a time
+    calls = []
+    summaries = ThreadSummaries(summarize=_recording_summarizer(calls))
+    thread = _thread("look up space scurvy?", "I'll get back to you", "found it")
+
+    # When: The second and third messages are routed
+    second = await summaries.context_for(thread, thread.messages[1])
+    thread.add_message("+1", "+2", "Ok, go on")
+    fourth = await summaries.context_for(thread, thread.messages[3])
+
+    # Then: Each summarizer call only sees the messages it hasn't folded in yet
+    assert second == "look up space scurvy?"
+    assert calls == [
+        ("", ["look up space scurvy?"]),
+        ("look up space scurvy?", ["I'll get back to you", "found it"]),
+    ]
+    assert fourth == "look up space scurvy? | I'll get back to you | found it"
+
+
+async def test_summaries_are_capped_at_max_words():
+    # Given: A summarizer that ignores the word budget
+    summaries = ThreadSummaries(max_words=3, summarize=_recording_summarizer([]))
+    thread = _thread("one two three four five", "six")
+
+    # Then: The context handed on is cut to the budget
+    assert await summaries.context_for(thread, thread.messages[1]) == "one two three"
+
+
+async def test_follow_ups_are_classified_with_the_summary():
+    # Given: A classifier model that records its prompts
+    prompts = []
+
+    def respond(messages, info: AgentInfo) -> ModelResponse:
+        prompts.append(messages[-1].parts[-1].content)
+        return ModelResponse(
+            parts=[
+                ToolCallPart.from_raw_args(
+                    info.result_tools[0].name,
+                    {
+                        "category": "research",
+                        "confidence": 0.9,
+                        "handler": "search_wikipedia",
+                        "reasoning": "follow-up to a lookup",
+                    },
+                )
+            ]
+        )
+
+    def summarize(messages, info: AgentInfo) -> ModelResponse:
+        return ModelResponse(parts=[TextPart("Boss asked to look up space scurvy.")])
+
+    summaries = ThreadSummaries(model=FunctionModel(summarize))
+    thread = _thread("Could you look up space scurvy?", "Ok, go on")
+
+    # When: Both messages are classified in their thread
+    for message in thread.messages:
+        await classify_in_thread(
+            thread, message, [], summaries, model=FunctionModel(respond)
+        )
+
+    # Then: The first is sent as-is and the follow-up carries the summary
+    assert prompts == [
+        "Could you look up space scurvy?",
+        "Conversation so far: Boss asked to look up space scurvy.\n\n"
+        "New message: Ok, go on",
+    ]
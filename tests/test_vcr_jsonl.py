@@ -0,0 +1,92 @@
+from pathlib import Path
+
+from vcr.request import Request
+
+from vcr_jsonl import (
+    IndexedCassette,
+    JsonlPersister,
+    deserialize,
+    match_request_key,
+    request_key,
+    serialize,
+)
+
+CASSETTES = Path(__file__).parent / "cassettes"
+
+
+class _Serializer:
+    serialize = staticmethod(serialize)
+    deserialize = staticmethod(deserialize)
+
+
+def _load(name: str) -> IndexedCassette:
+    return IndexedCassette.load(
+        path=str(CASSETTES / name),
+        serializer=_Serializer,
+        persister=JsonlPersister,
+        match_on=(match_request_key,),
+    )
+
+
+def test_jsonl_round_trip_keeps_binary_bodies():
+    # Given: A cassette dict with a binary response body
+    cassette = {
+        "version": 1,
+        "interactions": [
+            {
+                "request": {"method": "POST", "body": b"{\"a\": 1}"},
+                "response": {"status": {"code": 200}, "body": {"string": b"\x00\xff"}},
+            }
+        ],
+    }
+
+    # When: It is serialized and parsed again
+    text = serialize(cassette)
+
+    # Then: One header line plus one line per interaction, with bytes intact
+    assert len(text.splitlines()) == 2
+    assert deserialize(text) == cassette
+
+
+def test_cassette_matches_each_recorded_request_by_hash():
+    # Given: The largest recorded cassette
+    cassette = _load("test_chaining_kata_run.jsonl")
+
+    # Then: Every recorded request was hashed on load and plays back its response
+    for request, response in cassette.data:
+        assert "_vcr_jsonl_key" in request.__dict__
+        assert cassette.can_play_response_for(request)
+        assert response in [r for _, r in cassette._responses(request)]
+
+
+def test_cassette_misses_unknown_request():
+    # Given: A request that was never recorded
+    cassette = _load("test_setup_kata_run.jsonl")
+    request = Request("POST", "https://api.openai.com/v1/unknown", b"{}", {})
+
+    # Then: The cassette has nothing to play for it
+    assert not cassette.can_play_response_for(request)
+
+
+def test_cassette_looks_requests_up_by_hash():
+    # Given: The largest recorded cassette
+    cassette = _load("test_chaining_kata_run.jsonl")
+
+    # Then: Its requests are indexed by hash, so a lookup touches only its matches
+    assert sum(map(len, cassette._index.values())) == len(cassette.data)
+    for request, _ in cassette.data:
+        for index, _ in cassette._responses(request):
+            assert request_key(cassette.data[index][0]) == request_key(request)
+
+
+def test_json_bodies_match_regardless_of_key_order():
+    # Given: Two JSON requests that differ only in key order and spacing
+    headers = {"Content-Type": "application/json"}
+    url = "https://api.openai.com/v1/chat/completions"
+    a = Request("POST", url, b'{"model": "gpt-4o", "n": 1}', headers)
+    b = Request("POST", url, b'{"n":1,"model":"gpt-4o"}', headers)
+    other = Request("POST", url, b'{"n":2,"model":"gpt-4o"}', headers)
+
+    # Then: They match each other but not a request with a different value
+    assert match_request_key(a, b)
+    assert not match_request_key(a, other)
@@ -0,0 +1,201 @@
+"""Compact JSONL cassettes and indexed request matching for VCR.py.
+
+YAML cassettes are slow to parse, and VCR.py finds a recorded response by comparing
+the incoming request with every stored request (parsing both JSON bodies each time).
+This module provides:
+
+    - A JSONL serializer: one header line, then one interaction per line, with binary
+      bodies stored as base64
+    - `JsonlPersister` and the `match_request_key` matcher: each stored request is
+      hashed once when the cassette is loaded, so matching an incoming request
+      compares hashes instead of parsing both JSON bodies
+    - `IndexedCassette` (used through `IndexedVCR`): looks recorded requests up by
+      hash in a dict rather than comparing the incoming request with each of them
+    - A converter from the existing YAML cassettes
+
+Usage:
+    # Convert YAML cassettes to JSONL (the YAML files are removed)
+    python tests/vcr_jsonl.py tests/cassettes/*.yaml
+"""
+
+import base64
+import functools
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+from vcr import VCR
+from vcr.cassette import Cassette
+from vcr.matchers import read_body
+from vcr.persisters.filesystem import FilesystemPersister
+from vcr.serializers import yamlserializer
+
+CASSETTE_FORMAT_VERSION = 1
+
+
+def _encode(value):
+    if isinstance(value, bytes):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    raise TypeError(f"Can't serialize {type(value).__name__} in a cassette")
+
+
+def _decode(obj):
+    if len(obj) == 1 and "__bytes__" in obj:
+        return base64.b64decode(obj["__bytes__"])
+    return obj
+
+
+def serialize(cassette_dict: dict) -> str:
+    """Serialize a cassette dict as JSON lines (VCR.py serializer interface)."""
+    header = {"version": cassette_dict.get("version", CASSETTE_FORMAT_VERSION)}
+    lines = [json.dumps(header)]
+    for interaction in cassette_dict["interactions"]:
+        lines.append(json.dumps(interaction, default=_encode, separators=(",", ":")))
+    return "\n".join(lines) + "\n"
+
+
+def deserialize(cassette_string: str) -> dict:
+    """Parse JSON lines back into a cassette dict (VCR.py serializer interface)."""
+    lines = cassette_string.splitlines()
+    header = json.loads(lines[0])
+    interactions = [json.loads(line, object_hook=_decode) for line in lines[1:] if line]
+    return {"version": header["version"], "interactions": interactions}
+
+
+def _canonical_body(request) -> bytes:
+    """The request body, with JSON re-encoded so key order and spacing don't matter.
+
+    The recorded requests are OpenAI calls (JSON) and Logfire exports (protobuf,
+    compared byte for byte); a body that claims to be JSON but doesn't parse is
+    compared byte for byte too.
+    """
+    body = read_body(request) or b""
+    if isinstance(body, str):
+        body = body.encode()
+    if "application/json" in (request.headers.get("Content-Type") or ""):
+        try:
+            parsed = json.loads(body)
+        except ValueError:
+            return body
+        return json.dumps(parsed, sort_keys=True, separators=(",", ":")).encode()
+    return body
+
+
+# The request fields compared, as by VCR's method, scheme, host, port, path, query
+# and body matchers
+_KEY_PARTS = (
+    lambda r: r.method,
+    lambda r: r.scheme,
+    lambda r: r.host,
+    lambda r: r.port,
+    lambda r: r.path,
+    lambda r: r.query,
+    _canonical_body,
+)
+
+
+def request_key(request) -> str:
+    """Hash the fields of a request that playback matches on.
+
+    The hash is kept on the request, so each request is hashed once however many
+    recorded requests it's compared with.
+
+    Args:
+        request: A VCR.py request
+
+    Returns:
+        str: A hex digest
+    """
+    key = request.__dict__.get("_vcr_jsonl_key")
+    if key is None:
+        digest = hashlib.sha256()
+        for extract in _KEY_PARTS:
+            digest.update(repr(extract(request)).encode())
+        key = request.__dict__["_vcr_jsonl_key"] = digest.hexdigest()
+    return key
+
+
+def match_request_key(r1, r2) -> bool:
+    """VCR.py matcher comparing two requests by `request_key`."""
+    return request_key(r1) == request_key(r2)
+
+
+class JsonlPersister(FilesystemPersister):
+    """Loads cassettes and hashes every recorded request once, up front."""
+
+    @classmethod
+    def load_cassette(cls, cassette_path, serializer):
+        requests, responses = super().load_cassette(cassette_path, serializer)
+        for request in requests:
+            request_key(request)
+        return requests, responses
+
+
+class IndexedCassette(Cassette):
+    """A cassette that finds recorded responses by `request_key` in a dict.
+
+    Only used when `match_request_key` is the sole matcher; with any other matchers
+    it compares requests one by one like `Cassette`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # request_key -> indexes into self.data, in recording order
+        self._index: dict[str, list[int]] = {}
+
+    def append(self, request, response):
+        recorded = len(self.data)
+        super().append(request, response)
+        if len(self.data) > recorded:
+            key = request_key(self.data[-1][0])
+            self._index.setdefault(key, []).append(recorded)
+
+    def _responses(self, request):
+        if tuple(self._match_on) != (match_request_key,):
+            yield from super()._responses(request)
+            return
+        request = self._before_record_request(request)
+        if not request:
+            return
+        for index in self._index.get(request_key(request), ()):
+            yield index, self.data[index][1]
+
+
+class IndexedVCR(VCR):
+    """A `VCR` whose cassettes are `IndexedCassette`s."""
+
+    @classmethod
+    def from_vcr(cls, vcr: VCR) -> "IndexedVCR":
+        """Copy a configured `VCR` (such as pytest-vcr's) as an `IndexedVCR`."""
+        indexed = cls.__new__(cls)
+        indexed.__dict__.update(vcr.__dict__)
+        return indexed
+
+    def _use_cassette(self, with_current_defaults=False, **kwargs):
+        # As VCR._use_cassette, with IndexedCassette
+        if with_current_defaults:
+            return IndexedCassette.use(**self.get_merged_config(**kwargs))
+        args_getter = functools.partial(self.get_merged_config, **kwargs)
+        return IndexedCassette.use_arg_getter(args_getter)
+
+
+def convert(yaml_path: Path) -> Path:
+    """Convert a YAML cassette to JSONL next to it and remove the YAML file.
+
+    Args:
+        yaml_path: The YAML cassette
+
+    Returns:
+        Path: The new JSONL cassette
+    """
+    data = yamlserializer.deserialize(yaml_path.read_text())
+    jsonl_path = yaml_path.with_suffix(".jsonl")
+    jsonl_path.write_text(serialize(data))
+    yaml_path.unlink()
+    return jsonl_path
+
+
+if __name__ == "__main__":
+    for arg in sys.argv[1:]:
+        print(f"Converted {arg} -> {convert(Path(arg))}")